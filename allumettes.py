@@ -2,13 +2,16 @@ from __future__ import annotations
 
 import random
 from random import randint
+from typing import Callable
 
+import bots
 import display
+import mcts
 import terminal
 from display import center, waiting_screen
-from players import difficulty_level, get_display_name
-from scores import get_scores, set_scores
-from terminal import bold, get_key
+from players import Bot, Player
+from scores import SCORES_LOCK, get_scores, set_scores
+from terminal import bold, get_key, gray, green, red
 
 SCOREBOARD = "allumettes"
 RULES = [
@@ -16,32 +19,54 @@ RULES = [
     "Le gagnant est celui qui fait que l'autre prenne la dernière allumette disponible.",
     "A tour de rôle, chaque joueur pourra prendre entre 1 et 3 allumettes comprises.",
     "Ce jeu se joue normalement avec 20 allumettes, mais vous pouvez en choisir un peu plus ou un peu moins.",
+    "D'autres variantes sont disponibles: plusieurs tas, d'autres nombres d'allumettes à prendre,",
+    "ou encore une partie où celui qui prend la dernière allumette gagne.",
 ]
+# les variantes proposées: (nom, nombre de tas, nombres d'allumettes qu'il est possible de prendre, misère)
+# un ensemble de prises vide signifie qu'il est possible de prendre autant d'allumettes que voulu dans un tas,
+# et une partie "misère" est une partie où celui qui prend la dernière allumette perd
+VARIANTS: list[tuple[str, int, tuple[int, ...], bool]] = [
+    ("Classique (1 tas, 1 à 3 allumettes, celui qui prend la dernière perd)", 1, (1, 2, 3), True),
+    ("Nim (3 tas, sans limite, celui qui prend la dernière gagne)", 3, (), False),
+    ("Nim misère (3 tas, sans limite, celui qui prend la dernière perd)", 3, (), True),
+    ("Soustraction (2 tas, 1, 3 ou 4 allumettes, celui qui prend la dernière gagne)", 2, (1, 3, 4), False),
+    ("Personnalisée", 0, (), False),
+]
+MAX_HEAPS = 5
+MAX_MATCHES = 9999
+# la hauteur d'une allumette quand il y a assez de place pour l'afficher en entier
+MATCH_HEIGHT = 6
+# le nombre de parties aléatoires jouées par le bot moyen pour choisir un coup (voir `mcts.search`)
+MCTS_PLAYOUTS = 500
+
+# les valeurs de Grundy de chaque ensemble de prises (voir `grundy`), calculées au fur et à mesure des besoins
+_grundy_tables: dict[tuple[int, ...], list[int]] = {}
 
 
-def add_score(winner: str, loser: str) -> None:
+def add_score(winner: Player, loser: Player) -> None:
     """Met à jour le score des deux joueurs dans la base de donnée des scores.
 
     Le gagnant se voit ajouter une victoire et les deux joueurs se voient ajouter une partie jouée.
 
-    :param winner: Le nom du gagnant
-    :param loser:  Le nom du perdant
+    :param winner: Le gagnant
+    :param loser:  Le perdant
     """
     scores: dict[str, list[float]]
 
-    scores = dict(get_scores(SCOREBOARD))
-    if winner[0] != "\t" and winner not in scores:
-        scores[winner] = [0, 0]
-    if loser[0] != "\t" and loser not in scores:
-        scores[loser] = [0, 0]
+    with SCORES_LOCK:
+        scores = dict(get_scores(SCOREBOARD))
+        if not isinstance(winner, Bot) and winner.name not in scores:
+            scores[winner.name] = [0, 0]
+        if not isinstance(loser, Bot) and loser.name not in scores:
+            scores[loser.name] = [0, 0]
 
-    if winner[0] != "\t":
-        scores[winner][0] += 1
-        scores[winner][1] += 1
-    if loser[0] != "\t":
-        scores[loser][1] += 1
+        if not isinstance(winner, Bot):
+            scores[winner.name][0] += 1
+            scores[winner.name][1] += 1
+        if not isinstance(loser, Bot):
+            scores[loser.name][1] += 1
 
-    set_scores(SCOREBOARD, scores.items())
+        set_scores(SCOREBOARD, scores.items())
 
 
 def get_sorted_scores() -> list[tuple[str, str]]:
@@ -67,93 +92,580 @@ def get_sorted_scores() -> list[tuple[str, str]]:
     return [(player, f"{winrate:.2f}") for player, winrate in score_lines]
 
 
-def auto_choose(bot_name: str, matches_count: int) -> int:
-    """Choisis un nombre d'allumettes à prendre en fonction du niveau de difficulté du bot.
+def grundy(takes: tuple[int, ...], heap: int) -> int:
+    """Retourne la valeur de Grundy d'un tas de `heap` allumettes.
+
+    La valeur de Grundy d'un tas est le plus petit entier qui n'est la valeur d'aucun des tas que l'on peut obtenir en
+    un seul coup. Les valeurs sont stockées dans une table propre à chaque ensemble de prises, qui n'est complétée que
+    jusqu'au plus grand tas demandé: chaque valeur n'est calculée qu'une seule fois.
+
+    :param takes: Les nombres d'allumettes qu'il est possible de prendre (vide s'il n'y a pas de limite)
+    :param heap:  Le nombre d'allumettes dans le tas
+    :returns:     La valeur de Grundy du tas
+    """
+    table: list[int]
+    options: set[int]
+    value: int
+    n: int
+
+    if not takes:
+        # sans limite, on peut obtenir n'importe quel tas plus petit: c'est le jeu de Nim
+        return heap
+
+    table = _grundy_tables.setdefault(takes, [])
+    for n in range(len(table), heap + 1):
+        options = {table[n - take] for take in takes if take <= n}
+        value = 0
+        while value in options:
+            value += 1
+        table.append(value)
+
+    return table[heap]
+
+
+def legal_takes(takes: tuple[int, ...], heap: int) -> list[int]:
+    """Retourne les nombres d'allumettes qu'il est possible de prendre dans un tas.
+
+    :param takes: Les nombres d'allumettes qu'il est possible de prendre (vide s'il n'y a pas de limite)
+    :param heap:  Le nombre d'allumettes dans le tas
+    :returns:     Les nombres d'allumettes qu'il est possible de prendre dans ce tas
+    """
+    if not takes:
+        return list(range(1, heap + 1))
+    return [take for take in takes if take <= heap]
+
+
+def can_play(heaps: list[int], takes: tuple[int, ...]) -> bool:
+    """Vérifie s'il reste au moins un coup possible.
+
+    :param heaps: Le nombre d'allumettes dans chaque tas
+    :param takes: Les nombres d'allumettes qu'il est possible de prendre (vide s'il n'y a pas de limite)
+    :returns:     Vrai si le joueur dont c'est le tour peut jouer
+    """
+    return any(legal_takes(takes, heap) for heap in heaps)
+
 
-    Si cette fonction est appelée avec le nom d'un joueur, son comportement n'est pas définie.
+class Heaps:
+    """Une position du jeu des allumettes, qui peut être explorée par la recherche de Monte-Carlo (voir `mcts`).
 
-    :param bot_name:      Le nom du bot (qui contient des métadonnées sur sa difficultée)
-    :param matches_count: Le nombre d'allumettes restante
-    :returns:             Le nombre d'allumettes à prendre
+    Elle offre les mêmes méthodes que `board.Grid`, les coups étant des paires (indice du tas, nombre d'allumettes).
     """
-    diff_level = difficulty_level(bot_name)
+
+    __slots__ = ("heaps", "takes", "misere", "moves", "turn", "key")
+
+    # le nombre d'allumettes dans chaque tas
+    heaps: list[int]
+    # les nombres d'allumettes qu'il est possible de prendre (vide s'il n'y a pas de limite)
+    takes: tuple[int, ...]
+    # vrai si celui qui prend la dernière allumette perd
+    misere: bool
+    # les coups joués, dans l'ordre
+    moves: list[tuple[int, int]]
+    # le joueur qui doit jouer (1 ou 2)
+    turn: int
+    # une clé qui identifie la position
+    key: int
+
+    def __init__(self, heaps: list[int], takes: tuple[int, ...], misere: bool) -> None:
+        """Crée une position, où c'est au joueur 1 de jouer.
+
+        :param heaps:  Le nombre d'allumettes dans chaque tas (la liste est copiée)
+        :param takes:  Les nombres d'allumettes qu'il est possible de prendre (vide s'il n'y a pas de limite)
+        :param misere: Vrai si celui qui prend la dernière allumette perd
+        """
+        self.heaps = heaps.copy()
+        self.takes = takes
+        self.misere = misere
+        self.moves = []
+        self.turn = 1
+        self.key = hash((tuple(self.heaps), self.turn))
+
+    def result(self) -> int | None:
+        """Retourne le résultat de la partie.
+
+        :returns: Le joueur qui a gagné (1 ou 2), ou None si la partie n'est pas terminée
+        """
+        if can_play(self.heaps, self.takes):
+            return None
+        # le joueur qui n'est pas en train de jouer a joué le dernier coup
+        return self.turn if self.misere else 3 - self.turn
+
+    def legal_moves(self) -> list[tuple[int, int]]:
+        """Retourne les coups possibles.
+
+        :returns: Les paires (indice du tas, nombre d'allumettes à y prendre)
+        """
+        return [(i, take) for i, heap in enumerate(self.heaps) for take in legal_takes(self.takes, heap)]
+
+    def random_move(self) -> tuple[int, int]:
+        """Tire un coup possible au hasard (il doit en rester au moins un).
+
+        :returns: L'indice du tas et le nombre d'allumettes à y prendre
+        """
+        playable: list[int] = [i for i, heap in enumerate(self.heaps) if heap >= (min(self.takes) if self.takes else 1)]
+        heap: int = random.choice(playable)
+
+        if not self.takes:
+            return heap, randint(1, self.heaps[heap])
+        return heap, random.choice(legal_takes(self.takes, self.heaps[heap]))
+
+    def play(self, move: tuple[int, int]) -> None:
+        """Joue un coup.
+
+        :param move: L'indice du tas et le nombre d'allumettes à y prendre
+        """
+        self.heaps[move[0]] -= move[1]
+        self.moves.append(move)
+        self.turn = 3 - self.turn
+        self.key = hash((tuple(self.heaps), self.turn))
+
+    def undo(self) -> None:
+        """Annule le dernier coup joué."""
+        heap: int
+        take: int
+
+        heap, take = self.moves.pop()
+        self.heaps[heap] += take
+        self.turn = 3 - self.turn
+        self.key = hash((tuple(self.heaps), self.turn))
+
+
+def is_winning(total: int, large: bool, misere: bool) -> bool:
+    """Indique si le joueur dont c'est le tour peut gagner, à partir des valeurs de Grundy des tas.
+
+    En partie normale, le joueur peut gagner si et seulement si le ou exclusif des valeurs de Grundy des tas est non
+    nul. En partie misère la règle est la même tant qu'un tas a une valeur d'au moins 2, sinon le joueur peut gagner
+    si et seulement si ce ou exclusif ne vaut pas 1 (c'est la règle de Bouton pour le Nim misère, qui s'applique de la
+    même manière aux jeux de soustraction proposés ici).
+
+    :param total:  Le ou exclusif des valeurs de Grundy de tous les tas
+    :param large:  Vrai si au moins un tas a une valeur de Grundy d'au moins 2
+    :param misere: Vrai si celui qui joue le dernier coup perd
+    :returns:      Vrai si la position est gagnante pour le joueur dont c'est le tour
+    """
+    if misere and not large:
+        return total != 1
+    return total != 0
+
+
+def best_move(heaps: list[int], takes: tuple[int, ...], misere: bool) -> tuple[int, int] | None:
+    """Cherche un coup qui laisse l'adversaire dans une position perdante.
+
+    Les valeurs de Grundy de tous les tas sont calculées une seule fois, puis chaque coup est évalué en ne
+    recalculant que la valeur du tas modifié.
+
+    :param heaps:  Le nombre d'allumettes dans chaque tas
+    :param takes:  Les nombres d'allumettes qu'il est possible de prendre (vide s'il n'y a pas de limite)
+    :param misere: Vrai si celui qui joue le dernier coup perd
+    :returns:      L'indice du tas et le nombre d'allumettes à y prendre, ou None si tous les coups sont perdants
+    """
+    values: list[int] = [grundy(takes, heap) for heap in heaps]
+    total: int = 0
+    large_count: int = sum(value >= 2 for value in values)
+    value: int
+    new_value: int
+    i: int
+    take: int
+
+    for value in values:
+        total ^= value
+
+    for i, heap in enumerate(heaps):
+        for take in legal_takes(takes, heap):
+            new_value = grundy(takes, heap - take)
+            if not is_winning(
+                total ^ values[i] ^ new_value,
+                large_count - (values[i] >= 2) + (new_value >= 2) > 0,
+                misere,
+            ):
+                return i, take
+
+    return None
+
+
+def auto_choose(
+    bot: Bot, heaps: list[int], takes: tuple[int, ...], misere: bool, deadline: float
+) -> tuple[int, int]:
+    """Choisis un tas et un nombre d'allumettes à y prendre en fonction du niveau de difficulté du bot.
+
+    Seul le bot moyen a besoin de temps pour réfléchir (voir `bots.play`): les autres jouent immédiatement.
+
+    :param bot:      Le bot qui joue
+    :param heaps:    Le nombre d'allumettes dans chaque tas
+    :param takes:    Les nombres d'allumettes qu'il est possible de prendre (vide s'il n'y a pas de limite)
+    :param misere:   Vrai si celui qui prend la dernière allumette perd
+    :param deadline: L'instant (selon `time.monotonic`) auquel le bot doit avoir choisi son coup
+    :returns:        L'indice du tas et le nombre d'allumettes à y prendre
+    """
+    diff_level: int
+    move: tuple[int, int] | None
+    playable: list[int]
+    heap: int
+
+    diff_level = bot.level
 
     if diff_level == 1:  # niveau de difficulté moyen
-        # le bot à 1 chance sur 2 de faire le meilleur choix
-        diff_level = random.choice((0, 2))
+        # le bot cherche son coup en jouant des parties au hasard: il joue d'autant mieux qu'il en joue beaucoup
+        if bot.state is None:
+            bot.state = mcts.Tree()
+        return mcts.search(Heaps(heaps, takes, misere), bot.state, MCTS_PLAYOUTS, deadline=deadline)
+
+    playable = [i for i, heap in enumerate(heaps) if legal_takes(takes, heap)]
 
     if diff_level == 0:  # niveau de difficulté facile
-        return randint(1, 3)
+        heap = random.choice(playable)
+        return heap, random.choice(legal_takes(takes, heaps[heap]))
     else:  # niveau de difficulté difficile
-        if matches_count % 4 == 0:
-            to_take = 3
-        else:
-            target = (matches_count // 4) * 4 + 1
-            to_take = matches_count - target
-        if (to_take <= 0) or (to_take > 3):
-            # ce code sera exécuté si le bot se retrouve avec un nombre d'allumettes avec lequel il ne peut pas gagner
-            return 1
-        else:
-            return to_take
+        move = best_move(heaps, takes, misere)
+        if move is None:
+            # le bot ne peut pas gagner si l'adversaire joue bien, il prend le moins possible pour faire durer la partie
+            heap = max(playable, key=lambda i: heaps[i])
+            return heap, min(legal_takes(takes, heaps[heap]))
+        return move
 
 
-def game(player1: str, player2: str) -> None:
-    """Lance une partie du jeu des allumettes et sauvegarde le score à la fin de la partie.
+def describe_takes(takes: tuple[int, ...]) -> str:
+    """Décrit les nombres d'allumettes qu'il est possible de prendre.
 
-    :param player1: Le nom du joueur 1 (celui qui commence)
-    :param player2: Le nom du joueur 2
+    :param takes: Les nombres d'allumettes qu'il est possible de prendre (vide s'il n'y a pas de limite)
+    :returns:     La description, par exemple "entre 1 et 3" ou "1, 3 ou 4"
     """
-    matches: int
-    playing: str
-    waiting: str
-    matches_display: list[tuple[int, int, str]]
-    width: int
-    height: int
+    if not takes:
+        return "autant que vous voulez"
+    if len(takes) == 1:
+        return bold(str(takes[0]))
+    if takes == tuple(range(takes[0], takes[-1] + 1)):
+        return f"entre {bold(str(takes[0]))} et {bold(str(takes[-1]))}"
+    return ", ".join(bold(str(take)) for take in takes[:-1]) + f" ou {bold(str(takes[-1]))}"
+
+
+def parse_takes(text: str) -> tuple[int, ...] | None:
+    """Lit les nombres d'allumettes qu'il est possible de prendre, entrés par un joueur.
+
+    :param text: Les nombres, séparés par des virgules ou des espaces (rien pour aucune limite)
+    :returns:    Les nombres, triés (vide s'il n'y a pas de limite), ou None s'ils ne sont pas tous des entiers
+                 distincts entre 1 et `MAX_MATCHES`
+    """
+    numbers: list[str] = text.replace(",", " ").split()
+    takes: tuple[int, ...]
+
+    if not all(number.isdigit() for number in numbers):
+        return None
+    takes = tuple(sorted(int(number) for number in numbers))
+    if len(set(takes)) != len(takes) or not all(1 <= take <= MAX_MATCHES for take in takes):
+        return None
+    return takes
+
+
+def prompt_takes() -> tuple[int, ...]:
+    """Demande aux joueurs les nombres d'allumettes qu'il sera possible de prendre à chaque tour.
+
+    :returns: Les nombres, triés (vide s'il n'y a pas de limite)
+    """
+    key: str
+    text: str = ""
+    takes: tuple[int, ...] | None
+
+    terminal.show_cursor()
+
+    while True:
+        takes = parse_takes(text)
+        display.screen(
+            [
+                "Combien d'allumettes sera-t-il possible de prendre à chaque tour ?",
+                gray("Par exemple 1, 3, 4 (rien pour aucune limite)"),
+                "\b\b" + (red("> ") if takes is None else green("> ")) + text,
+                "",
+                "" if takes is None else f"Chaque tour: {describe_takes(takes)}",
+            ],
+            keys={"ENTER": "Valider"},
+        )
+
+        key = get_key()
+
+        if len(key) == 1 and (key.isdigit() or key in ", "):
+            text += key
+        elif key == "BACKSPACE":
+            text = text[:-1]
+        elif key == "\n" and takes is not None:
+            terminal.hide_cursor()
+            return takes
+
+
+def matches_display(heaps: list[int], width: int, height: int) -> list[tuple[int, int, str]]:
+    """Calcule les décorations qui représentent les tas d'allumettes.
+
+    Un tas trop large pour le terminal est coupé en plusieurs rangées. S'il n'y a pas assez de place en hauteur,
+    les allumettes sont raccourcies, puis les rangées en trop ne sont pas affichées (ce qui est indiqué par "…").
+
+    :param heaps:  Le nombre d'allumettes dans chaque tas
+    :param width:  La largeur du terminal
+    :param height: La hauteur du terminal
+    :returns:      Les décorations, au format de `display.screen`
+    """
+    decorations: list[tuple[int, int, str]] = []
+    per_row: int = max(1, (width - 6) // 2)
+    labels: int = len(heaps) if len(heaps) > 1 else 0
+    # les lignes disponibles au dessus du message, qui est centré verticalement
+    space: int = height // 2 - 4
+    rows: list[int] = [max(1, -(-heap // per_row)) for heap in heaps]
+    match_height: int = MATCH_HEIGHT
+    max_rows: int
+    row_count: int
+    row: int
+    count: int
+    x: int
     y: int
+    i: int
+
+    while match_height > 1 and labels + sum(rows) * match_height > space:
+        match_height = 2 if match_height > 2 else 1
+
+    # nombre maximum de rangées par tas pour que tout tienne dans l'espace disponible
+    max_rows = max(1, (space - labels) // (match_height * len(heaps)))
+
+    y = 3 if labels or match_height < MATCH_HEIGHT else max(3, height // 4 - MATCH_HEIGHT // 2)
+    for i, heap in enumerate(heaps):
+        if labels:
+            decorations.append((center(12, width), y, f"Tas {bold(str(i + 1))}: {heap}"))
+            y += 1
+
+        row_count = min(rows[i], max_rows)
+        for row in range(row_count):
+            count = min(per_row, heap - row * per_row)
+            x = center(2 * count, width)
+            if row == row_count - 1 and row_count < rows[i]:
+                # il n'y a pas la place d'afficher le reste du tas
+                decorations.append((x, y, "▆ " * count + "…"))
+            else:
+                decorations.append((x, y, "▆ " * count))
+            for _ in range(match_height - 1):
+                y += 1
+                decorations.append((x, y, "┃ " * count))
+            y += 1
+
+    return decorations
+
+
+def prompt_variant(both_bots: bool) -> tuple[list[int], tuple[int, ...], bool]:
+    """Demande aux joueurs les règles de la partie et le nombre d'allumettes de chaque tas.
+
+    :param both_bots: Vrai si les deux joueurs sont des bots (le nombre d'allumettes est alors tiré au hasard)
+    :returns:         Le nombre d'allumettes dans chaque tas, les nombres d'allumettes qu'il est possible de prendre
+                      (vide s'il n'y a pas de limite), et vrai si celui qui prend la dernière allumette perd
+    """
     choice: int
-
-    if player1[0] == player2[0] == "\t":
-        matches = randint(15, 30)
-        waiting_screen(f"La partie commencera avec {bold(str(matches))} allumettes")
-    else:
-        matches = display.prompt_int(
-            f"Avec quel nombre d'allumettes la partie va commencer (entre {bold(str(15))} et {bold(str(30))}) ?",
-            15,
-            30,
+    heap_count: int
+    takes: tuple[int, ...]
+    misere: bool
+    heaps: list[int] = []
+    i: int
+
+    choice = display.prompt_choice("À quelle variante voulez-vous jouer ?", [variant[0] for variant in VARIANTS])
+    _, heap_count, takes, misere = VARIANTS[choice]
+
+    if heap_count == 0:
+        heap_count = display.prompt_int(f"Nombre de tas (entre {bold('1')} et {bold(str(MAX_HEAPS))}) ?", 1, MAX_HEAPS)
+        takes = prompt_takes()
+        misere = (
+            display.prompt_choice(
+                "Qui gagne la partie ?",
+                ["Celui qui fait prendre la dernière allumette à l'autre", "Celui qui prend la dernière allumette"],
+            )
+            == 0
         )
 
-    playing, waiting = player2, player1
-    while matches > 0:
-        playing, waiting = waiting, playing
-
-        width, height = terminal.get_size()
-        y = height // 4 - 6 // 2
-
-        matches_display = [
-            (center(2 * matches, width), y + 0, "▆ " * matches),
-            (center(2 * matches, width), y + 1, "┃ " * matches),
-            (center(2 * matches, width), y + 2, "┃ " * matches),
-            (center(2 * matches, width), y + 3, "┃ " * matches),
-            (center(2 * matches, width), y + 4, "┃ " * matches),
-            (center(2 * matches, width), y + 5, "┃ " * matches),
-        ]
-
-        if playing[0] == "\t":
-            choice = auto_choose(playing, matches)
-            waiting_screen(f"{bold(get_display_name(playing))} enlève {bold(str(choice))} allumettes", matches_display)
-            matches -= choice
+    for i in range(heap_count):
+        if both_bots:
+            heaps.append(randint(15, 30))
+            waiting_screen(f"Le tas {i + 1} commencera avec {bold(str(heaps[-1]))} allumettes")
+        elif heap_count == 1 and choice == 0:
+            heaps.append(
+                display.prompt_int(
+                    f"Avec quel nombre d'allumettes la partie va commencer "
+                    f"(entre {bold(str(15))} et {bold(str(30))}) ?",
+                    15,
+                    30,
+                )
+            )
         else:
-            matches -= display.prompt_int(
-                f"{bold(get_display_name(playing))}, combien voulez-vous prendre d'allumettes (entre {bold(str(1))} et {bold(str(3))}) ?",
+            heaps.append(
+                display.prompt_int(
+                    f"Combien d'allumettes dans le tas {i + 1} (entre {bold('1')} et {bold(str(MAX_MATCHES))}) ?",
+                    1,
+                    MAX_MATCHES,
+                )
+            )
+
+    return heaps, takes, misere
+
+
+def prompt_move(
+    player: str, heaps: list[int], takes: tuple[int, ...], decorations: list[tuple[int, int, str]]
+) -> tuple[int, int]:
+    """Demande au joueur dans quel tas il veut prendre des allumettes, et combien.
+
+    :param player:      Le nom d'affichage du joueur
+    :param heaps:       Le nombre d'allumettes dans chaque tas
+    :param takes:       Les nombres d'allumettes qu'il est possible de prendre (vide s'il n'y a pas de limite)
+    :param decorations: Les tas d'allumettes, au format de `display.screen`
+    :returns:           L'indice du tas et le nombre d'allumettes à y prendre
+    """
+    playable: list[int] = [i for i, heap in enumerate(heaps) if legal_takes(takes, heap)]
+    heap: int = playable[0]
+    take: int
+    question: str
+
+    if len(playable) > 1:
+        heap = (
+            display.prompt_int(
+                f"{bold(player)}, dans quel tas voulez-vous prendre des allumettes "
+                f"(entre {bold('1')} et {bold(str(len(heaps)))}) ?",
                 1,
-                3,
-                decorations=matches_display,
+                len(heaps),
+                decorations=decorations,
+            )
+            - 1
+        )
+        while heap not in playable:
+            heap = (
+                display.prompt_int(
+                    f"Impossible de prendre des allumettes dans le tas {heap + 1}, choisissez un autre tas",
+                    1,
+                    len(heaps),
+                    decorations=decorations,
+                )
+                - 1
             )
 
-    add_score(waiting, playing)
+    question = f"{bold(player)}, combien voulez-vous prendre d'allumettes"
+    if len(heaps) > 1:
+        question += f" dans le tas {heap + 1}"
+    question += f" ({describe_takes(takes)}) ?"
+
+    take = display.prompt_int(question, 1, heaps[heap], decorations=decorations)
+    while take not in legal_takes(takes, heaps[heap]):
+        take = display.prompt_int(
+            f"Vous ne pouvez prendre que {describe_takes(takes)} allumettes", 1, heaps[heap], decorations=decorations
+        )
+
+    return heap, take
+
+
+def play_turn(
+    position: Heaps, players: tuple[Player, Player], choose: Callable[[Player, Player, Heaps], tuple[int, int]]
+) -> int | None:
+    """Fait jouer le joueur dont c'est le tour: le déroulement d'une partie, commun à `game` et `simulate`.
+
+    :param position: La position de la partie
+    :param players:  Le joueur 1 et le joueur 2
+    :param choose:   La fonction qui choisit le coup du joueur, appelée avec le joueur, son adversaire et la position
+    :returns:        Le joueur qui a gagné (1 ou 2), ou None si la partie n'est pas terminée
+    """
+    position.play(choose(players[position.turn - 1], players[2 - position.turn], position))
+    return position.result()
+
+
+def bot_move(bot: Player, opponent: Player, position: Heaps) -> tuple[int, int]:
+    """Demande son coup à un bot, sans rien afficher (voir `play_turn`).
+
+    :param bot:      Le bot qui doit jouer
+    :param opponent: Son adversaire
+    :param position: La position de la partie
+    :returns:        L'indice du tas et le nombre d'allumettes à y prendre
+    """
+    assert isinstance(bot, Bot)
+    return bots.play(bot, auto_choose, position.heaps, position.takes, position.misere)
+
+
+def choose_move(player: Player, opponent: Player, position: Heaps) -> tuple[int, int]:
+    """Demande son coup au joueur dont c'est le tour, pendant une partie lancée depuis le menu (voir `play_turn`).
+
+    :param player:   Le joueur qui doit jouer
+    :param opponent: Son adversaire
+    :param position: La position de la partie
+    :returns:        L'indice du tas et le nombre d'allumettes à y prendre
+    """
+    width: int
+    height: int
+    decorations: list[tuple[int, int, str]]
+    heap: int
+    choice: int
+
+    width, height = terminal.get_size()
+    decorations = matches_display(position.heaps, width, height)
+
+    if not isinstance(player, Bot):
+        return prompt_move(player.display_name, position.heaps, position.takes, decorations)
+
+    heap, choice = bot_move(player, opponent, position)
+    if len(position.heaps) > 1:
+        waiting_screen(
+            f"{bold(player.display_name)} enlève {bold(str(choice))} allumettes du tas {heap + 1}",
+            decorations,
+        )
+    else:
+        waiting_screen(f"{bold(player.display_name)} enlève {bold(str(choice))} allumettes", decorations)
+    return heap, choice
+
+
+def simulate(player1: Bot, player2: Bot, variant: int) -> tuple[int, int]:
+    """Joue une partie entre deux bots sans rien afficher ni attendre de touche.
+
+    Comme dans une partie entre deux bots lancée depuis le menu, chaque tas commence avec 15 à 30 allumettes.
+
+    :param player1: Le bot qui commence
+    :param player2: L'autre bot
+    :param variant: L'indice de la variante dans `VARIANTS` (la variante personnalisée n'est pas acceptée)
+    :returns:       Le joueur qui a gagné (1 ou 2) et le nombre de coups joués
+    """
+    players: tuple[Bot, Bot] = (player1, player2)
+    heap_count: int
+    takes: tuple[int, ...]
+    misere: bool
+    position: Heaps
+    result: int | None
+
+    player1.new_game()
+    player2.new_game()
+    _, heap_count, takes, misere = VARIANTS[variant]
+    position = Heaps([randint(15, 30) for _ in range(heap_count)], takes, misere)
+
+    result = position.result()
+    while result is None:
+        result = play_turn(position, players, bot_move)
+
+    return result, len(position.moves)
+
+
+def game(player1: Player, player2: Player) -> None:
+    """Lance une partie du jeu des allumettes et sauvegarde le score à la fin de la partie.
+
+    :param player1: Le joueur 1 (celui qui commence)
+    :param player2: Le joueur 2
+    """
+    players: tuple[Player, Player] = (player1, player2)
+    position: Heaps
+    playing: Player
+    winner: Player
+    loser: Player
+    result: int | None
+
+    for playing in players:
+        if isinstance(playing, Bot):
+            playing.new_game()
+
+    position = Heaps(*prompt_variant(isinstance(player1, Bot) and isinstance(player2, Bot)))
+
+    result = position.result()
+    while result is None:
+        result = play_turn(position, players, choose_move)
+
+    winner, loser = players[result - 1], players[2 - result]
+    add_score(winner, loser)
 
     display.screen(
-        [f"{bold(get_display_name(waiting))} a gagné !!!"],
+        [f"{bold(winner.display_name)} a gagné !!!"],
         keys={"ENTER": "Continuer"},
     )
 
@@ -0,0 +1,275 @@
+"""Des milliers de grilles d'alignement (morpion, puissance 4) jouées en même temps avec NumPy.
+
+Ce module sert aux simulations de masse et à l'entraînement des heuristiques des bots: chaque opération (jouer un coup,
+détecter une victoire, choisir un coup au hasard ou le meilleur coup selon l'heuristique) est appliquée à toutes les
+grilles du lot en une seule fois. Les règles sont celles de `board.Grid`: les mêmes lignes gagnantes (voir
+`board.make_lines`), tenues à jour de la même façon, et donc les mêmes résultats que `morpion.check_win` et
+`pow4.check_win`. Par exemple:
+
+    python3 batch.py pow4 --boards 10000 --policy greedy
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+
+import morpion
+import pow4
+from board import make_cell_lines, make_lines, make_weights
+
+# les politiques qui choisissent les coups du lot
+POLICIES = ("random", "greedy")
+# le bonus d'un coup qui gagne, ou qui bloque une victoire de l'adversaire (plus que toutes les lignes d'une case)
+WIN_BONUS = 1 << 40
+
+
+class Batch:
+    """Un lot de `size` grilles de `width` par `height` cases, sur lesquelles il faut aligner `length` symboles.
+
+    Comme pour `board.Grid`, les joueurs sont représentés par 1 (celui qui commence) et 2, une case vide par 0, et le
+    lot tient à jour le nombre de cases qu'occupe chaque joueur sur chaque ligne gagnante de chaque grille.
+    """
+
+    __slots__ = (
+        "size",
+        "width",
+        "height",
+        "length",
+        "gravity",
+        "cell_lines",
+        "weights",
+        "cells",
+        "heights",
+        "counts",
+        "turn",
+        "winner",
+        "moves",
+    )
+
+    # le nombre de grilles du lot
+    size: int
+    # la taille des grilles et le nombre de symboles à aligner pour gagner
+    width: int
+    height: int
+    length: int
+    # vrai si les jetons tombent en bas de leur colonne (puissance 4)
+    gravity: bool
+    # pour chaque case, les indices des lignes qui la contiennent, complétés par l'indice d'une ligne fictive
+    cell_lines: np.ndarray
+    # la valeur d'une ligne en fonction du nombre de cases qu'y occupe un joueur (voir `board.make_weights`)
+    weights: np.ndarray
+    # le contenu des grilles, une ligne par grille (forme: size × width * height)
+    cells: np.ndarray
+    # le nombre de jetons dans chaque colonne de chaque grille (forme: size × width)
+    heights: np.ndarray
+    # le nombre de cases qu'occupe chaque joueur sur chaque ligne de chaque grille (forme: 3 × size × lignes + 1)
+    counts: np.ndarray
+    # le joueur dont c'est le tour, le gagnant (0 si personne n'a gagné) et le nombre de coups joués de chaque grille
+    turn: np.ndarray
+    winner: np.ndarray
+    moves: np.ndarray
+
+    def __init__(self, size: int, width: int, height: int, length: int, *, gravity: bool = False) -> None:
+        """Crée un lot de grilles vides.
+
+        :param size:    Le nombre de grilles
+        :param width:   La largeur des grilles
+        :param height:  La hauteur des grilles
+        :param length:  Le nombre de symboles à aligner pour gagner
+        :param gravity: Vrai si les jetons tombent en bas de leur colonne
+        """
+        cell_lines: tuple[tuple[int, ...], ...] = make_cell_lines(width, height, length)
+        line_count: int = len(make_lines(width, height, length))
+        widest: int = max(map(len, cell_lines))
+
+        self.size = size
+        self.width = width
+        self.height = height
+        self.length = length
+        self.gravity = gravity
+        self.cell_lines = np.array(
+            [lines + (line_count,) * (widest - len(lines)) for lines in cell_lines], dtype=np.intp
+        ).reshape(width * height, widest)
+        self.weights = np.array(make_weights(length), dtype=np.int64)
+        self.cells = np.zeros((size, width * height), dtype=np.int8)
+        self.heights = np.zeros((size, width), dtype=np.int16)
+        self.counts = np.zeros((3, size, line_count + 1), dtype=np.int16)
+        self.turn = np.ones(size, dtype=np.int8)
+        self.winner = np.zeros(size, dtype=np.int8)
+        self.moves = np.zeros(size, dtype=np.int32)
+
+    def active(self) -> np.ndarray:
+        """Retourne, pour chaque grille, vrai si la partie n'est pas terminée."""
+        return (self.winner == 0) & (self.moves < self.width * self.height)
+
+    def legal(self) -> np.ndarray:
+        """Retourne, pour chaque grille et chaque case, vrai si le joueur dont c'est le tour peut y jouer.
+
+        Les grilles dont la partie est terminée n'ont aucun coup possible.
+
+        :returns: Un tableau de booléens de forme size × width * height
+        """
+        legal: np.ndarray
+        rows: np.ndarray
+        boards: np.ndarray
+        columns: np.ndarray
+
+        if not self.gravity:
+            legal = self.cells == 0
+        else:
+            # seule la case la plus basse encore vide de chaque colonne peut être jouée
+            legal = np.zeros(self.cells.shape, dtype=bool)
+            rows = self.height - 1 - self.heights
+            boards, columns = np.nonzero(rows >= 0)
+            legal[boards, rows[boards, columns] * self.width + columns] = True
+
+        legal &= self.active()[:, None]
+        return legal
+
+    def play(self, moves: np.ndarray) -> None:
+        """Joue un coup sur chaque grille dont la partie n'est pas terminée.
+
+        :param moves: La case jouée sur chaque grille (-1 pour ne pas jouer), qui doit être un coup possible
+        """
+        boards: np.ndarray = np.nonzero(self.active() & (moves >= 0))[0]
+        cells: np.ndarray = moves[boards]
+        players: np.ndarray = self.turn[boards]
+        lines: np.ndarray = self.cell_lines[cells]
+
+        self.cells[boards, cells] = players
+        self.heights[boards, cells % self.width] += 1
+        self.counts[players[:, None], boards[:, None], lines] += 1
+        # la ligne fictive ne doit jamais être complétée
+        self.counts[:, :, -1] = 0
+
+        self.winner[boards] = np.where(
+            (self.counts[players[:, None], boards[:, None], lines] == self.length).any(axis=1), players, 0
+        )
+        self.moves[boards] += 1
+        self.turn[boards] = 3 - players
+
+    def random_moves(self, generator: np.random.Generator) -> np.ndarray:
+        """Choisit un coup possible au hasard sur chaque grille.
+
+        :param generator: Le générateur aléatoire
+        :returns:         La case choisie sur chaque grille (-1 si la partie est terminée)
+        """
+        legal: np.ndarray = self.legal()
+        draws: np.ndarray = np.where(legal, generator.random(legal.shape), -1.0)
+
+        return np.where(legal.any(axis=1), draws.argmax(axis=1), -1)
+
+    def greedy_moves(self, generator: np.random.Generator) -> np.ndarray:
+        """Choisit le meilleur coup de chaque grille selon l'heuristique des lignes.
+
+        Comme `morpion.cell_score`, la valeur d'une case est la somme de la valeur des lignes qu'elle permet de
+        prolonger et de celles qu'elle bloque. Un coup gagnant passe avant tout, puis un coup qui empêche l'adversaire
+        de gagner au coup suivant. Les égalités sont départagées au hasard.
+
+        :param generator: Le générateur aléatoire
+        :returns:         La case choisie sur chaque grille (-1 si la partie est terminée)
+        """
+        legal: np.ndarray = self.legal()
+        boards: np.ndarray = np.arange(self.size)[:, None, None]
+        players: np.ndarray = self.turn.astype(np.intp)[:, None, None]
+        real: np.ndarray = (self.cell_lines != self.counts.shape[2] - 1)[None, :, :]
+        # le nombre de cases qu'occupent le joueur et son adversaire sur chaque ligne de chaque case
+        mine: np.ndarray = self.counts[players, boards, self.cell_lines[None, :, :]]
+        theirs: np.ndarray = self.counts[3 - players, boards, self.cell_lines[None, :, :]]
+        open_mine: np.ndarray = real & (theirs == 0)
+        open_theirs: np.ndarray = real & (mine == 0)
+        scores: np.ndarray
+
+        scores = (
+            np.where(open_mine, self.weights[np.minimum(mine + 1, self.length)], 0).sum(axis=2)
+            + np.where(open_theirs, self.weights[np.minimum(theirs + 1, self.length)], 0).sum(axis=2)
+            + WIN_BONUS * 2 * (open_mine & (mine == self.length - 1)).any(axis=2)
+            + WIN_BONUS * (open_theirs & (theirs == self.length - 1)).any(axis=2)
+        ).astype(np.float64)
+        scores += generator.random(scores.shape)
+        scores[~legal] = -np.inf
+
+        return np.where(legal.any(axis=1), scores.argmax(axis=1), -1)
+
+
+def make_batch(game: str, size: int, variant: int = 0) -> Batch:
+    """Crée un lot de grilles vides pour un jeu.
+
+    :param game:    "morpion" ou "pow4"
+    :param size:    Le nombre de grilles
+    :param variant: L'indice de la variante du jeu (dans `morpion.VARIANTS` ou `pow4.SIZES`)
+    :returns:       Le lot
+    """
+    width: int
+    height: int
+    length: int
+
+    if game == "morpion":
+        _, width, height, length = morpion.VARIANTS[variant]
+        return Batch(size, width, height, length)
+    else:
+        _, width, height = pow4.SIZES[variant]
+        return Batch(size, width, height, pow4.ALIGN, gravity=True)
+
+
+def play_out(batch: Batch, policies: tuple[str, str], generator: np.random.Generator) -> np.ndarray:
+    """Joue toutes les grilles du lot jusqu'à la fin de leur partie.
+
+    :param batch:     Le lot
+    :param policies:  La politique de chaque joueur ("random" ou "greedy")
+    :param generator: Le générateur aléatoire
+    :returns:         Le nombre de parties gagnées par chaque joueur (l'indice 0 compte les égalités)
+    """
+    random_moves: np.ndarray
+    greedy_moves: np.ndarray
+
+    while batch.active().any():
+        if policies[0] == policies[1]:
+            batch.play(batch.random_moves(generator) if policies[0] == "random" else batch.greedy_moves(generator))
+        else:
+            # les deux politiques sont calculées pour tout le lot, chaque grille garde celle du joueur dont c'est le
+            # tour
+            random_moves = batch.random_moves(generator)
+            greedy_moves = batch.greedy_moves(generator)
+            batch.play(np.where((batch.turn == 1) == (policies[0] == "random"), random_moves, greedy_moves))
+
+    return np.bincount(batch.winner, minlength=3)
+
+
+def main() -> None:
+    """Lit les arguments de la ligne de commande, joue un lot de parties et affiche leur bilan."""
+    parser: argparse.ArgumentParser
+    args: argparse.Namespace
+    batch: Batch
+    results: np.ndarray
+    start: float
+    duration: float
+
+    parser = argparse.ArgumentParser(description="Joue des milliers de parties en même temps avec NumPy.")
+    parser.add_argument("game", choices=("morpion", "pow4"), help="le jeu")
+    parser.add_argument("-n", "--boards", type=int, default=10000, help="le nombre de grilles du lot")
+    parser.add_argument("-v", "--variant", type=int, default=0, help="l'indice de la variante du jeu")
+    parser.add_argument(
+        "-p", "--policy", choices=POLICIES, nargs="+", default=["random"], help="la politique de chaque joueur"
+    )
+    parser.add_argument("-s", "--seed", type=int, default=None, help="la graine du générateur aléatoire")
+    args = parser.parse_args()
+
+    batch = make_batch(args.game, args.boards, args.variant)
+    start = time.perf_counter()
+    results = play_out(batch, (args.policy[0], args.policy[-1]), np.random.default_rng(args.seed))
+    duration = time.perf_counter() - start
+
+    print(f"Parties jouées:          {args.boards}")
+    print(f"Victoires du joueur 1:   {results[1] / args.boards:.2%}")
+    print(f"Victoires du joueur 2:   {results[2] / args.boards:.2%}")
+    print(f"Égalités:                {results[0] / args.boards:.2%}")
+    print(f"Coups par seconde:       {batch.moves.sum() / duration:.0f}")
+    print(f"Grilles par seconde:     {args.boards / duration:.0f}")
+
+
+if __name__ == "__main__":
+    main()
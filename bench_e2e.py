@@ -0,0 +1,329 @@
+"""Mesure de bout en bout des temps de réponse de l'interface: `main.py` est lancé dans un pseudo-terminal et piloté
+par des suites de touches écrites à l'avance (voir `SCENARIOS`).
+
+Après chaque touche, la sortie du programme est lue jusqu'à ce qu'elle reste silencieuse pendant `QUIET` secondes
+(plus longtemps pendant la chute d'un jeton au puissance 4): le temps de réponse de la touche va de son écriture
+jusqu'au dernier octet reçu. Les scénarios entrent les noms des joueurs et naviguent dans le menu, puis jouent une
+partie de morpion et une partie de puissance 4 entre deux humains (sans bot, pour ne mesurer que l'interface). Le
+programme tourne dans une copie temporaire des modules, pour que ses tableaux des scores soient toujours vides et
+que ses parties ne soient pas enregistrées.
+
+Le bilan de chaque scénario (médiane et 95e centile des temps de réponse, octets reçus) est comparé à celui d'une
+exécution précédente, enregistré dans `BASELINE_PATH`: le programme se termine avec une erreur si un scénario est
+devenu plus lent ou écrit plus d'octets. La première exécution enregistre sa référence. Par exemple:
+
+    python3 bench_e2e.py --repeat 5           # compare à la référence (ou l'enregistre s'il n'y en a pas)
+    python3 bench_e2e.py --update             # remplace la référence
+
+La référence dépend de la machine: elle n'a de sens que comparée à des exécutions sur la même machine.
+"""
+
+from __future__ import annotations
+
+import argparse
+import fcntl
+import json
+import os
+import select
+import shutil
+import signal
+import struct
+import subprocess
+import sys
+import tempfile
+import termios
+import time
+from pathlib import Path
+
+from tracing import percentile
+
+PACKAGE_PATH = Path(__file__).parent.resolve()
+BASELINE_PATH = PACKAGE_PATH / "baselines" / "bench_e2e.json"
+# la taille du pseudo-terminal (largeur, hauteur)
+SIZE = (100, 40)
+# le temps sans sortie après lequel l'affichage est considéré comme terminé, et le temps maximum d'attente de la
+# première image, en secondes
+QUIET = 0.05
+STARTUP_TIMEOUT = 10.0
+# les écarts tolérés avant de signaler une régression: en proportion, et en secondes (pour que le bruit sur des temps
+# de l'ordre de la milliseconde ne suffise pas)
+LATENCY_TOLERANCE = 0.5
+LATENCY_SLACK = 0.002
+BYTES_TOLERANCE = 0.01
+
+# le temps de silence qui termine la chute d'un jeton au puissance 4: plus long que l'intervalle entre deux images
+# de l'animation (voir `pow4.drop_token`), qui fait partie du temps de réponse de la touche
+DROP_QUIET = 0.3
+
+UP, DOWN, RIGHT, LEFT, ENTER = "\x1b[A", "\x1b[B", "\x1b[C", "\x1b[D", "\r"
+
+
+def steps(*keys: str, quiet: float = QUIET) -> list[tuple[str, float]]:
+    """Retourne les étapes d'un scénario.
+
+    :param keys:  Les touches
+    :param quiet: Le temps de silence qui termine l'affichage de chaque touche, en secondes
+    :returns:     Chaque touche, avec son temps de silence
+    """
+    return [(key, quiet) for key in keys]
+
+
+# les touches de chaque scénario, dans l'ordre où ils sont joués (chacun reprend où le précédent s'est arrêté)
+SCENARIOS: dict[str, list[tuple[str, float]]] = {
+    # les noms des deux joueurs, puis un aller-retour dans le menu principal
+    "menu": steps(*"alice", ENTER, *"bob", ENTER, DOWN, DOWN, DOWN, DOWN, UP, UP, UP, UP),
+    # la première grille; le curseur repart du centre à chaque tour, × gagne sur la diagonale
+    "morpion": steps(
+        *(DOWN, DOWN, ENTER, ENTER, ENTER),
+        ENTER,
+        *(UP, ENTER),
+        *(UP, LEFT, ENTER),
+        *(UP, RIGHT, ENTER),
+        *(DOWN, RIGHT, ENTER),
+        ENTER,
+    ),
+    # la première taille; le premier joueur gagne en empilant ses jetons au centre
+    "pow4": [
+        *steps(DOWN, DOWN, DOWN, ENTER, ENTER, ENTER),
+        *(steps(ENTER, quiet=DROP_QUIET) + steps(LEFT) + steps(ENTER, quiet=DROP_QUIET)) * 3,
+        *steps(ENTER, quiet=DROP_QUIET),
+        *steps(ENTER),
+    ],
+}
+# la touche qui quitte le programme depuis le menu principal
+QUIT = "q"
+
+
+def copy_package(destination: Path) -> Path:
+    """Copie les modules du programme dans un dossier, pour qu'il y enregistre ses scores et ses caches.
+
+    :param destination: Le dossier
+    :returns:           Le chemin de `main.py` dans la copie
+    """
+    path: Path
+
+    for path in PACKAGE_PATH.glob("*.py"):
+        shutil.copy(path, destination)
+    return destination / "main.py"
+
+
+def start_interface(main: Path) -> tuple[subprocess.Popen[bytes], int]:
+    """Lance l'interface dans un pseudo-terminal de taille `SIZE`.
+
+    :param main: Le chemin de `main.py`
+    :returns:    Le processus, et le descripteur du côté maître du pseudo-terminal
+    """
+    master: int
+    slave: int
+    process: subprocess.Popen[bytes]
+
+    master, slave = os.openpty()
+    fcntl.ioctl(slave, termios.TIOCSWINSZ, struct.pack("HHHH", SIZE[1], SIZE[0], 0, 0))
+    process = subprocess.Popen(
+        [sys.executable, str(main)],
+        stdin=slave,
+        stdout=slave,
+        stderr=slave,
+        cwd=main.parent,
+        env={**os.environ, "TERM": "xterm"},
+        start_new_session=True,
+    )
+    os.close(slave)
+    return process, master
+
+
+def settle(master: int, quiet: float, timeout: float) -> tuple[float | None, int]:
+    """Lit la sortie du programme jusqu'à ce qu'elle reste silencieuse pendant `quiet` secondes.
+
+    :param master:  Le descripteur du côté maître du pseudo-terminal
+    :param quiet:   Le temps de silence qui termine l'affichage, en secondes
+    :param timeout: Le temps maximum d'attente du premier octet, en secondes
+    :returns:       Le moment où le dernier octet a été reçu (None si rien n'a été reçu), et le nombre d'octets reçus
+    :raises EOFError: Si le programme s'est terminé
+    """
+    last: float | None = None
+    received: int = 0
+    data: bytes
+
+    while select.select([master], [], [], quiet if last is not None else timeout)[0]:
+        try:
+            data = os.read(master, 1 << 16)
+        except OSError:
+            # Linux signale ainsi la fermeture du côté esclave
+            data = b""
+        if not data:
+            raise EOFError
+        last = time.perf_counter()
+        received += len(data)
+
+    return last, received
+
+
+def run_scenarios() -> dict[str, tuple[list[float], int]]:
+    """Lance l'interface et joue tous les scénarios.
+
+    :returns: Pour chaque scénario (et "startup", le lancement jusqu'à la première image): le temps de réponse de
+              chaque touche, en secondes, et le nombre d'octets reçus
+    :raises RuntimeError: Si une touche n'a rien affiché, ou si le programme s'est terminé avant la fin
+    """
+    results: dict[str, tuple[list[float], int]] = {}
+    directory: str
+    process: subprocess.Popen[bytes]
+    master: int
+    start: float
+    last: float | None
+    received: int
+    name: str
+    keys: list[tuple[str, float]]
+    key: str
+    quiet: float
+    latencies: list[float]
+    total: int
+
+    with tempfile.TemporaryDirectory() as directory:
+        process, master = start_interface(copy_package(Path(directory)))
+        try:
+            start = time.perf_counter()
+            last, received = settle(master, QUIET, STARTUP_TIMEOUT)
+            if last is None:
+                raise RuntimeError("le programme n'a rien affiché")
+            results["startup"] = ([last - start], received)
+
+            for name, keys in SCENARIOS.items():
+                latencies = []
+                total = 0
+                for key, quiet in keys:
+                    start = time.perf_counter()
+                    os.write(master, key.encode())
+                    last, received = settle(master, quiet, STARTUP_TIMEOUT)
+                    if last is None:
+                        raise RuntimeError(f"{name}: la touche {key!r} n'a rien affiché")
+                    latencies.append(last - start)
+                    total += received
+                results[name] = (latencies, total)
+
+            os.write(master, QUIT.encode())
+            process.wait(STARTUP_TIMEOUT)
+        except EOFError:
+            raise RuntimeError("le programme s'est terminé avant la fin des scénarios") from None
+        finally:
+            if process.poll() is None:
+                os.killpg(process.pid, signal.SIGKILL)
+                process.wait()
+            os.close(master)
+
+    return results
+
+
+def summarize(runs: list[dict[str, tuple[list[float], int]]]) -> dict[str, dict[str, float]]:
+    """Résume plusieurs exécutions des scénarios.
+
+    :param runs: Les résultats de chaque exécution (voir `run_scenarios`)
+    :returns:    Pour chaque scénario: la médiane, le 95e centile et le maximum des temps de réponse de toutes les
+                 exécutions (en secondes), et la médiane des octets reçus par exécution
+    """
+    summary: dict[str, dict[str, float]] = {}
+    name: str
+    latencies: list[float]
+
+    for name in runs[0]:
+        latencies = [latency for run in runs for latency in run[name][0]]
+        summary[name] = {
+            "p50": percentile(latencies, 0.5),
+            "p95": percentile(latencies, 0.95),
+            "max": max(latencies),
+            "bytes": percentile([run[name][1] for run in runs], 0.5),
+        }
+
+    return summary
+
+
+def compare(summary: dict[str, dict[str, float]], baseline: dict[str, dict[str, float]]) -> list[str]:
+    """Cherche les régressions par rapport à une référence.
+
+    Seuls la médiane et le 95e centile des temps de réponse, et les octets reçus, sont comparés (le maximum dépend
+    trop de la charge de la machine).
+
+    :param summary:  Le résumé de l'exécution (voir `summarize`)
+    :param baseline: Celui de la référence
+    :returns:        Une ligne par régression
+    """
+    regressions: list[str] = []
+    name: str
+    key: str
+
+    for name in summary.keys() & baseline.keys():
+        for key in ("p50", "p95"):
+            if summary[name][key] > baseline[name][key] * (1 + LATENCY_TOLERANCE) + LATENCY_SLACK:
+                regressions.append(
+                    f"{name}: {key} {summary[name][key] * 1000:.2f} ms (référence: {baseline[name][key] * 1000:.2f} ms)"
+                )
+        if summary[name]["bytes"] > baseline[name]["bytes"] * (1 + BYTES_TOLERANCE):
+            regressions.append(
+                f"{name}: {summary[name]['bytes']:.0f} octets (référence: {baseline[name]['bytes']:.0f} octets)"
+            )
+
+    return sorted(regressions)
+
+
+def format_summary(summary: dict[str, dict[str, float]]) -> list[str]:
+    """Met en forme le résumé des scénarios.
+
+    :param summary: Le résumé (voir `summarize`)
+    :returns:       Le tableau, ligne par ligne
+    """
+    lines: list[str] = [f"{'':10}{'médiane':>12}{'95e cent.':>12}{'maximum':>12}{'octets':>10}"]
+    name: str
+    values: dict[str, float]
+
+    for name, values in summary.items():
+        lines.append(
+            f"{name:10}{values['p50'] * 1000:>9.2f} ms{values['p95'] * 1000:>9.2f} ms{values['max'] * 1000:>9.2f} ms"
+            + f"{values['bytes']:>10.0f}"
+        )
+
+    return lines
+
+
+def main() -> None:
+    """Lit les arguments de la ligne de commande, joue les scénarios et les compare à la référence."""
+    parser: argparse.ArgumentParser
+    args: argparse.Namespace
+    runs: list[dict[str, tuple[list[float], int]]] = []
+    summary: dict[str, dict[str, float]]
+    regressions: list[str]
+    line: str
+
+    parser = argparse.ArgumentParser(description="Mesure les temps de réponse de l'interface dans un pseudo-terminal.")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="le nombre d'exécutions des scénarios")
+    parser.add_argument("-b", "--baseline", type=Path, default=BASELINE_PATH, help="le fichier de la référence")
+    parser.add_argument("-u", "--update", action="store_true", help="remplace la référence par cette exécution")
+    args = parser.parse_args()
+
+    try:
+        for _ in range(args.repeat):
+            runs.append(run_scenarios())
+    except RuntimeError as error:
+        parser.exit(1, f"{parser.prog}: {error}\n")
+    summary = summarize(runs)
+
+    for line in format_summary(summary):
+        print(line)
+
+    if args.update or not args.baseline.exists():
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(summary, indent=4) + "\n")
+        print(f"Référence enregistrée dans {args.baseline}")
+        return
+
+    regressions = compare(summary, json.loads(args.baseline.read_text()))
+    if regressions:
+        print("Régressions par rapport à la référence:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print("Aucune régression par rapport à la référence")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+"""Mesures de performance des fonctions critiques: les moteurs des jeux, le dessin des écrans et les tableaux des
+scores.
+
+Chaque mesure (voir `measure`) appelle sa fonction en boucle par échantillons d'au moins `MIN_SAMPLE` secondes (le
+nombre d'appels par échantillon est choisi pendant l'échauffement), le ramasse-miettes désactivé, et donne le
+minimum, la médiane et le 95e centile du temps par appel sur tous les échantillons. Les fonctions des bots sont
+appelées avec un générateur aléatoire réinitialisé et une mémoire vide, sans échéance: elles font le même travail à
+chaque appel. Les tableaux des scores sont écrits dans un dossier temporaire (voir `scores.SCORES_PATH`), avec de
+`SCORE_SIZES[0]` à `SCORE_SIZES[-1]` lignes, et les tables de finales du puissance 4 ne sont pas utilisées.
+
+Les résultats sont comparés à ceux d'une exécution précédente, enregistrés dans `BASELINE_PATH`: le programme se
+termine avec une erreur si un minimum (le moins sensible à la charge de la machine) est devenu plus lent que
+`TOLERANCE` ne le permet. Par exemple:
+
+    python3 benchmarks.py                     # compare à la référence (ou l'enregistre s'il n'y en a pas)
+    python3 benchmarks.py -k pow4 -k scores   # seulement les mesures dont le nom contient "pow4" ou "scores"
+    python3 benchmarks.py --update            # remplace la référence
+
+Comme celle de `bench_e2e`, la référence n'a de sens que comparée à des exécutions sur la même machine.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import math
+import random
+import sys
+import tempfile
+import time
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable
+
+import allumettes
+import display
+import morpion
+import pow4
+import scores
+import tablebase
+import terminal
+from board import DropGrid, Grid
+from players import Bot
+from terminal import bold, green, invert, strip_escapes
+from tracing import percentile
+
+BASELINE_PATH = Path(__file__).parent.resolve() / "baselines" / "benchmarks.json"
+# la durée minimum d'un échantillon, en secondes, et le nombre d'échantillons par défaut
+MIN_SAMPLE = 0.01
+REPEAT = 7
+# l'écart toléré sur le minimum avant de signaler une régression, en proportion
+TOLERANCE = 0.25
+# la graine du générateur aléatoire avant chaque coup d'un bot
+SEED = 0
+# le nombre de lignes des tableaux des scores mesurés
+SCORE_SIZES = (10**3, 10**4, 10**5, 10**6)
+# la taille du terminal sans écran
+SIZE = (100, 40)
+
+
+class NullConsole(terminal.Console):
+    """Un terminal qui n'affiche rien (voir `terminal.Console`), pour ne mesurer que le dessin des écrans."""
+
+    __slots__ = ()
+
+    def write(self, text: str) -> None:
+        """Oublie le texte."""
+
+    def flush(self) -> None:
+        """Ne fait rien."""
+
+    def get_size(self) -> tuple[int, int]:
+        """Retourne la taille `SIZE`."""
+        return SIZE
+
+
+def measure(function: Callable[[], Any], repeat: int) -> dict[str, float]:
+    """Mesure le temps d'un appel à une fonction.
+
+    Un premier échantillon, qui n'est pas compté, choisit le nombre d'appels par échantillon pour qu'il dure au moins
+    `MIN_SAMPLE` secondes (et échauffe les caches de la fonction et de Python).
+
+    :param function: La fonction
+    :param repeat:   Le nombre d'échantillons comptés
+    :returns:        Le minimum, la médiane et le 95e centile du temps par appel (en secondes), et le nombre d'appels
+                     par échantillon
+    """
+    number: int = 1
+    samples: list[float] = []
+    enabled: bool = gc.isenabled()
+    elapsed: float
+
+    gc.disable()
+    try:
+        while True:
+            elapsed = run(function, number)
+            if elapsed >= MIN_SAMPLE:
+                break
+            number = max(number * 2, math.ceil(number * MIN_SAMPLE / max(elapsed, 1e-9)))
+        for _ in range(repeat):
+            samples.append(run(function, number) / number)
+    finally:
+        if enabled:
+            gc.enable()
+
+    return {
+        "min": min(samples),
+        "p50": percentile(samples, 0.5),
+        "p95": percentile(samples, 0.95),
+        "number": number,
+    }
+
+
+def run(function: Callable[[], Any], number: int) -> float:
+    """Appelle une fonction plusieurs fois.
+
+    :param function: La fonction
+    :param number:   Le nombre d'appels
+    :returns:        Le temps total, en secondes
+    """
+    start: float = time.perf_counter()
+
+    for _ in range(number):
+        function()
+    return time.perf_counter() - start
+
+
+def bot_move(choose: Callable[..., Any], bot: Bot, *args: Any) -> Any:
+    """Fait choisir un coup à un bot, toujours dans le même état.
+
+    :param choose: La fonction qui choisit le coup (par exemple `morpion.auto_play`)
+    :param bot:    Le bot
+    :param args:   Les arguments de la fonction après le bot, sans l'échéance
+    :returns:      Le coup choisi
+    """
+    bot.new_game()
+    random.seed(SEED)
+    return choose(bot, *args, math.inf)
+
+
+def play(grid: Grid, cells: list[int]) -> Grid:
+    """Joue des coups sur une grille.
+
+    :param grid:  La grille
+    :param cells: Les cases des coups (les colonnes pour une `DropGrid`)
+    :returns:     La grille
+    """
+    cell: int
+
+    for cell in cells:
+        grid.play(grid.column_cell(cell) if isinstance(grid, DropGrid) else cell)
+    return grid
+
+
+def engine_cases() -> dict[str, Callable[[], Any]]:
+    """Retourne les mesures des moteurs des jeux, sur des parties en cours.
+
+    :returns: La fonction mesurée, par nom
+    """
+    small: Grid = play(Grid(3, 3, 3), [4, 0])
+    large: Grid = play(Grid(7, 7, 4), [24, 25, 17, 31, 16])
+    gomoku: Grid = play(Grid(15, 15, 5), [112, 113, 97, 98, 82, 127])
+    drop: Grid = play(DropGrid(7, 6, pow4.ALIGN), [3, 3, 2, 4, 4, 2])
+
+    return {
+        "morpion.check_win 15x15": partial(morpion.check_win, gomoku),
+        "morpion.check_possible_win 15x15": partial(morpion.check_possible_win, gomoku, 1),
+        "morpion.auto_play moyen 3x3": partial(bot_move, morpion.auto_play, Bot(1, 1), small),
+        "morpion.auto_play difficile 7x7": partial(bot_move, morpion.auto_play, Bot(1, 2), large),
+        "pow4.check_win 7x6": partial(pow4.check_win, drop),
+        "pow4.auto_play moyen 7x6": partial(bot_move, pow4.auto_play, Bot(1, 1), drop),
+        # la profondeur du bot difficile est réduite pour que la mesure ne dure que quelques secondes
+        "pow4.auto_play difficile 7x6": partial(bot_move, pow4.auto_play, Bot(1, 2, depth=8), drop),
+        "allumettes.auto_choose moyen": partial(bot_move, allumettes.auto_choose, Bot(1, 1), [3, 5, 7], (), False),
+        "allumettes.auto_choose difficile": partial(
+            bot_move, allumettes.auto_choose, Bot(1, 2), [30, 50, 70], (1, 3, 4), True
+        ),
+    }
+
+
+def render_cases() -> dict[str, Callable[[], Any]]:
+    """Retourne les mesures du dessin des écrans (sur un `NullConsole`, voir `main`) et de `strip_escapes`.
+
+    :returns: La fonction mesurée, par nom
+    """
+    content: list[str] = [bold("Qui commence ?"), "", green("> ") + invert("alice"), "bob"]
+    keys: dict[str, str] = {"q": "Écran titre", "↑ / ↓": "Choisir une option", "ENTER": "Valider"}
+    text: str = "".join(f"{bold(str(i))} {green('⬤')} {invert('case')} " for i in range(SIZE[0] * SIZE[1] // 16))
+
+    return {
+        "display.screen": partial(display.screen, content, keys=keys),
+        f"strip_escapes {len(text)} car.": partial(strip_escapes, text),
+    }
+
+
+def score_cases(sizes: tuple[int, ...]) -> dict[str, Callable[[], Any]]:
+    """Écrit des tableaux des scores de différentes tailles, et retourne les mesures de leur lecture et écriture.
+
+    Les tableaux sont écrits dans `scores.SCORES_PATH`, qui doit déjà être un dossier temporaire.
+
+    :param sizes: Les nombres de lignes des tableaux
+    :returns:     La fonction mesurée, par nom
+    """
+    cases: dict[str, Callable[[], Any]] = {}
+    size: int
+    lines: list[scores.ScoreLine]
+
+    for size in sizes:
+        lines = [(f"joueur {i}", [float(i % 97), float(i % 89)]) for i in range(size)]
+        scores.set_scores(f"bench-{size}", lines)
+        cases[f"scores.get_scores {size} lignes"] = partial(scores.get_scores, f"bench-{size}")
+        cases[f"scores.set_scores {size} lignes"] = partial(scores.set_scores, f"bench-{size}", lines)
+
+    return cases
+
+
+def compare(
+    results: dict[str, dict[str, float]], baseline: dict[str, dict[str, float]], tolerance: float = TOLERANCE
+) -> list[str]:
+    """Cherche les régressions par rapport à une référence.
+
+    :param results:   Les résultats de l'exécution (voir `measure`), par nom
+    :param baseline:  Ceux de la référence
+    :param tolerance: L'écart toléré sur le minimum, en proportion
+    :returns:         Une ligne par régression
+    """
+    return [
+        f"{name}: {format_duration(results[name]['min'])} (référence: {format_duration(baseline[name]['min'])})"
+        for name in results
+        if name in baseline and results[name]["min"] > baseline[name]["min"] * (1 + tolerance)
+    ]
+
+
+def format_duration(seconds: float) -> str:
+    """Écrit une durée dans l'unité la plus lisible.
+
+    :param seconds: La durée, en secondes
+    :returns:       La durée écrite, par exemple "12.3 µs"
+    """
+    unit: str
+    scale: float
+
+    for unit, scale in (("ns", 1e-9), ("µs", 1e-6), ("ms", 1e-3)):
+        if seconds < scale * 1000:
+            return f"{seconds / scale:.1f} {unit}"
+    return f"{seconds:.2f} s"
+
+
+def format_results(results: dict[str, dict[str, float]], baseline: dict[str, dict[str, float]]) -> list[str]:
+    """Met en forme les résultats.
+
+    :param results:  Les résultats, par nom
+    :param baseline: Ceux de la référence (vide s'il n'y en a pas)
+    :returns:        Le tableau, ligne par ligne, avec le rapport des minimums à ceux de la référence
+    """
+    width: int = max(len(name) for name in results)
+    lines: list[str] = [f"{'':{width}}{'minimum':>12}{'médiane':>12}{'95e cent.':>12}{'référence':>12}"]
+    name: str
+    values: dict[str, float]
+    ratio: str
+
+    for name, values in results.items():
+        ratio = f"{values['min'] / baseline[name]['min']:.2f}x" if name in baseline else "-"
+        lines.append(
+            f"{name:{width}}{format_duration(values['min']):>12}{format_duration(values['p50']):>12}"
+            + f"{format_duration(values['p95']):>12}{ratio:>12}"
+        )
+
+    return lines
+
+
+def main() -> None:
+    """Lit les arguments de la ligne de commande, fait les mesures et les compare à la référence."""
+    parser: argparse.ArgumentParser
+    args: argparse.Namespace
+    directory: str
+    cases: dict[str, Callable[[], Any]]
+    results: dict[str, dict[str, float]] = {}
+    baseline: dict[str, dict[str, float]] = {}
+    regressions: list[str]
+    name: str
+    function: Callable[[], Any]
+    line: str
+
+    parser = argparse.ArgumentParser(description="Mesure les performances des moteurs, des écrans et des scores.")
+    parser.add_argument("-r", "--repeat", type=int, default=REPEAT, help="le nombre d'échantillons par mesure")
+    parser.add_argument("-k", "--filter", action="append", help="ne fait que les mesures dont le nom contient ce texte")
+    parser.add_argument(
+        "--max-lines", type=int, default=SCORE_SIZES[-1], help="le nombre maximum de lignes des tableaux des scores"
+    )
+    parser.add_argument("-b", "--baseline", type=Path, default=BASELINE_PATH, help="le fichier de la référence")
+    parser.add_argument(
+        "-t", "--tolerance", type=float, default=TOLERANCE, help="l'écart toléré avant de signaler une régression"
+    )
+    parser.add_argument("-u", "--update", action="store_true", help="remplace la référence par cette exécution")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        scores.SCORES_PATH = Path(directory) / "scores"
+        tablebase.TABLEBASE_PATH = Path(directory) / "tablebase"
+        terminal.set_console(NullConsole())
+
+        cases = engine_cases() | render_cases()
+        if args.filter is None or any("scores" in text for text in args.filter):
+            cases |= score_cases(tuple(size for size in SCORE_SIZES if size <= args.max_lines))
+
+        for name, function in cases.items():
+            if args.filter is None or any(text in name for text in args.filter):
+                results[name] = measure(function, args.repeat)
+
+    if not results:
+        parser.error("aucune mesure ne correspond aux filtres")
+    if args.baseline.exists() and not args.update:
+        baseline = json.loads(args.baseline.read_text())
+
+    for line in format_results(results, baseline):
+        print(line)
+
+    if args.update or not args.baseline.exists():
+        # les mesures qui n'ont pas été faites cette fois restent dans la référence
+        baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(baseline | results, indent=4) + "\n")
+        print(f"Référence enregistrée dans {args.baseline}")
+        return
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print("Régressions par rapport à la référence:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print("Aucune régression par rapport à la référence")
+
+
+if __name__ == "__main__":
+    main()
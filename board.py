@@ -0,0 +1,589 @@
+"""Outils communs aux jeux d'alignement (morpion, puissance 4).
+
+Une grille de `width` par `height` cases est vue comme une suite de cases numérotées de gauche à droite
+puis de haut en bas (la case x,y a l'indice `y * width + x`). Un ensemble de cases est représenté par
+un entier dont le bit `i` vaut 1 si la case `i` fait partie de l'ensemble (un "masque").
+"""
+
+from __future__ import annotations
+
+import random
+from functools import lru_cache
+from typing import Callable
+
+# les quatre directions dans lesquelles une ligne peut être alignée: horizontale, verticale et les deux diagonales
+DIRECTIONS = ((1, 0), (0, 1), (1, 1), (1, -1))
+# graine des clés de Zobrist, fixe pour que les clés soient les mêmes d'une exécution à l'autre
+ZOBRIST_SEED = 0x5AE101
+# le nombre de bits d'une clé de Zobrist
+KEY_BITS = 64
+KEY_MASK = (1 << KEY_BITS) - 1
+
+
+@lru_cache(maxsize=None)
+def make_lines(width: int, height: int, length: int) -> tuple[int, ...]:
+    """Calcule toutes les lignes gagnantes d'une grille.
+
+    Une ligne gagnante est un segment de `length` cases consécutives, horizontal, vertical ou diagonal.
+    Le résultat est mis en cache, il n'est donc calculé qu'une seule fois par taille de grille.
+
+    :param width:  La largeur de la grille
+    :param height: La hauteur de la grille
+    :param length: Le nombre de cases à aligner pour gagner
+    :returns:      Le masque de chaque ligne gagnante
+    """
+    lines: list[int] = []
+    x: int
+    y: int
+    dx: int
+    dy: int
+    i: int
+    mask: int
+
+    for dx, dy in DIRECTIONS:
+        for y in range(height):
+            for x in range(width):
+                if not (0 <= x + dx * (length - 1) < width and 0 <= y + dy * (length - 1) < height):
+                    continue
+
+                mask = 0
+                for i in range(length):
+                    mask |= 1 << ((y + dy * i) * width + x + dx * i)
+                lines.append(mask)
+
+    return tuple(lines)
+
+
+def lowest_cell(mask: int) -> int:
+    """Retourne l'indice de la première case d'un masque.
+
+    :param mask: Un masque non vide
+    :returns:    L'indice de la case
+    """
+    return (mask & -mask).bit_length() - 1
+
+
+def is_winning(lines: tuple[int, ...], mine: int) -> bool:
+    """Vérifie si les cases `mine` contiennent une ligne gagnante.
+
+    :param lines: Les lignes gagnantes (voir `make_lines`)
+    :param mine:  Le masque des cases occupées par le joueur
+    :returns:     Vrai si le joueur a gagné
+    """
+    line: int
+
+    for line in lines:
+        if line & mine == line:
+            return True
+    return False
+
+
+@lru_cache(maxsize=None)
+def make_zobrist(cells: int) -> tuple[tuple[int, int, int], ...]:
+    """Tire les clés de Zobrist d'une grille de `cells` cases.
+
+    La clé d'une position est le ou exclusif des clés (case, joueur) de toutes les cases occupées, elle peut donc être
+    mise à jour en une seule opération à chaque coup joué ou annulé.
+
+    :param cells: Le nombre de cases de la grille
+    :returns:     Pour chaque case, la clé de la case vide (toujours 0) puis celles des joueurs 1 et 2 (sur 64 bits)
+    """
+    generator: random.Random = random.Random(ZOBRIST_SEED)
+
+    return tuple((0, generator.getrandbits(KEY_BITS), generator.getrandbits(KEY_BITS)) for _ in range(cells))
+
+
+@lru_cache(maxsize=None)
+def make_symmetries(
+    width: int, height: int, gravity: bool = False
+) -> tuple[tuple[tuple[int, ...], ...], tuple[int, ...]]:
+    """Calcule les symétries d'une grille: les transformations qui changent une position en une position équivalente.
+
+    Une grille carrée a 8 symétries (les 4 rotations, dont l'identité, et 4 réflexions), une grille rectangulaire en
+    a 4 (l'identité, les deux réflexions et le demi-tour). Quand les jetons tombent en bas de leur colonne, seule la
+    réflexion gauche-droite garde les mêmes règles.
+
+    :param width:   La largeur de la grille
+    :param height:  La hauteur de la grille
+    :param gravity: Vrai si les jetons tombent en bas de leur colonne
+    :returns:       La permutation des cases de chaque symétrie, l'identité en premier (la case `cell` a pour image
+                    la case `symmetries[i][cell]`), puis pour chaque symétrie l'indice de la symétrie réciproque
+    """
+    points: list[tuple[int, int]] = [(x, y) for y in range(height) for x in range(width)]
+    images: list[Callable[[int, int], tuple[int, int]]] = [
+        lambda x, y: (x, y),
+        lambda x, y: (width - 1 - x, y),
+    ]
+    symmetries: list[tuple[int, ...]]
+    inverses: list[int]
+    symmetry: tuple[int, ...]
+
+    if not gravity:
+        images += [lambda x, y: (x, height - 1 - y), lambda x, y: (width - 1 - x, height - 1 - y)]
+        if width == height:
+            images += [
+                lambda x, y: (y, x),
+                lambda x, y: (width - 1 - y, x),
+                lambda x, y: (y, width - 1 - x),
+                lambda x, y: (width - 1 - y, width - 1 - x),
+            ]
+
+    symmetries = []
+    for image in images:
+        symmetry = tuple(y * width + x for x, y in (image(*point) for point in points))
+        if symmetry not in symmetries:
+            symmetries.append(symmetry)
+
+    inverses = [
+        next(j for j, other in enumerate(symmetries) if all(other[symmetry[cell]] == cell for cell in symmetry))
+        for symmetry in symmetries
+    ]
+    return tuple(symmetries), tuple(inverses)
+
+
+@lru_cache(maxsize=None)
+def make_symmetric_zobrist(symmetries: tuple[tuple[int, ...], ...]) -> tuple[tuple[int, int, int], ...]:
+    """Calcule les clés de Zobrist de chaque case pour toutes les symétries d'une grille à la fois.
+
+    La clé de l'image d'une position par chaque symétrie est rangée dans un seul entier, `KEY_BITS` bits par
+    symétrie (la symétrie d'indice `i` dans les bits `i * KEY_BITS` et suivants): jouer ou annuler un coup met
+    toutes les clés à jour en une seule opération, quel que soit le nombre de symétries.
+
+    :param symmetries: Les symétries de la grille (voir `make_symmetries`)
+    :returns:          Pour chaque case, les clés de la case vide (toujours 0) puis des joueurs 1 et 2
+    """
+    zobrist: tuple[tuple[int, int, int], ...] = make_zobrist(len(symmetries[0]))
+
+    return tuple(
+        (
+            0,
+            sum(zobrist[symmetry[cell]][1] << i * KEY_BITS for i, symmetry in enumerate(symmetries)),
+            sum(zobrist[symmetry[cell]][2] << i * KEY_BITS for i, symmetry in enumerate(symmetries)),
+        )
+        for cell in range(len(symmetries[0]))
+    )
+
+
+@lru_cache(maxsize=None)
+def make_weights(length: int) -> tuple[int, ...]:
+    """Retourne la valeur d'une ligne gagnante en fonction du nombre de cases qu'y occupe un joueur.
+
+    Une ligne ne compte que si l'adversaire n'y a pas joué. Chaque case supplémentaire multiplie sa valeur par 4.
+
+    :param length: Le nombre de cases à aligner pour gagner
+    :returns:      La valeur de la ligne pour chaque nombre de cases occupées (de 0 à `length`)
+    """
+    return tuple(0 if count == 0 else 4 ** (count - 1) for count in range(length + 1))
+
+
+@lru_cache(maxsize=None)
+def make_cell_lines(width: int, height: int, length: int) -> tuple[tuple[int, ...], ...]:
+    """Calcule, pour chaque case de la grille, les lignes gagnantes qui passent par cette case.
+
+    Le résultat est mis en cache, il n'est donc calculé qu'une seule fois par taille de grille.
+
+    :param width:  La largeur de la grille
+    :param height: La hauteur de la grille
+    :param length: Le nombre de cases à aligner pour gagner
+    :returns:      Pour chaque case, les indices des lignes (dans le résultat de `make_lines`) qui la contiennent
+    """
+    lines: tuple[int, ...]
+    cell: int
+
+    lines = make_lines(width, height, length)
+    return tuple(
+        tuple(i for i, line in enumerate(lines) if line >> cell & 1) for cell in range(width * height)
+    )
+
+
+class Grid:
+    """Une grille de `width` par `height` cases, sur laquelle il faut aligner `length` symboles pour gagner.
+
+    Les joueurs sont représentés par 1 (celui qui commence) et 2, une case vide par 0.
+    La grille tient à jour, pour chaque ligne gagnante, le nombre de cases qu'y occupe chaque joueur.
+    Jouer ou annuler un coup ne touche donc que les lignes qui passent par la case jouée (au plus
+    `4 * length` lignes), quelle que soit la taille de la grille.
+    """
+
+    __slots__ = (
+        "width",
+        "height",
+        "length",
+        "lines",
+        "cell_lines",
+        "zobrist",
+        "symmetries",
+        "inverses",
+        "symmetric_zobrist",
+        "weights",
+        "cells",
+        "masks",
+        "counts",
+        "live_lines",
+        "moves",
+        "turn",
+        "winner",
+        "key",
+        "keys",
+        "score",
+    )
+
+    width: int
+    height: int
+    length: int
+    # le masque de chaque ligne gagnante (voir `make_lines`)
+    lines: tuple[int, ...]
+    # les lignes qui passent par chaque case (voir `make_cell_lines`)
+    cell_lines: tuple[tuple[int, ...], ...]
+    # les clés de Zobrist de chaque case (voir `make_zobrist`)
+    zobrist: tuple[tuple[int, int, int], ...]
+    # les symétries de la grille et l'indice de la réciproque de chacune (voir `make_symmetries`)
+    symmetries: tuple[tuple[int, ...], ...]
+    inverses: tuple[int, ...]
+    # les clés de Zobrist de chaque case pour toutes les symétries (voir `make_symmetric_zobrist`)
+    symmetric_zobrist: tuple[tuple[int, int, int], ...]
+    # la valeur d'une ligne selon le nombre de cases occupées (voir `make_weights`)
+    weights: tuple[int, ...]
+    # le contenu de chaque case (0, 1 ou 2)
+    cells: list[int]
+    # les cases occupées par chaque joueur (l'indice 0 n'est pas utilisé)
+    masks: list[int]
+    # le nombre de cases occupées par chaque joueur dans chaque ligne (l'indice 0 n'est pas utilisé)
+    counts: list[list[int]]
+    # pour chaque joueur et chaque nombre de cases n, les lignes où le joueur a n cases et l'adversaire aucune
+    live_lines: list[list[set[int]]]
+    # les cases jouées, dans l'ordre
+    moves: list[int]
+    # le joueur qui doit jouer (1 ou 2)
+    turn: int
+    # le joueur qui a gagné, ou 0 si personne n'a encore gagné
+    winner: int
+    # la clé de Zobrist de la position
+    key: int
+    # les clés de Zobrist des images de la position par toutes les symétries, dans un seul entier
+    # (voir `make_symmetric_zobrist`, la première est `key`)
+    keys: int
+    # l'évaluation de la position du point de vue du joueur 1: la somme des valeurs de ses lignes
+    # moins celle des lignes de l'adversaire
+    score: int
+
+    def __init__(self, width: int, height: int, length: int) -> None:
+        """Crée une grille vide.
+
+        :param width:  La largeur de la grille
+        :param height: La hauteur de la grille
+        :param length: Le nombre de cases à aligner pour gagner
+        """
+        self.width = width
+        self.height = height
+        self.length = length
+        self.lines = make_lines(width, height, length)
+        self.cell_lines = make_cell_lines(width, height, length)
+        self.zobrist = make_zobrist(width * height)
+        self.symmetries, self.inverses = make_symmetries(width, height)
+        self.symmetric_zobrist = make_symmetric_zobrist(self.symmetries)
+        self.weights = make_weights(length)
+        self.cells = [0] * (width * height)
+        self.masks = [0, 0, 0]
+        self.counts = [[], [0] * len(self.lines), [0] * len(self.lines)]
+        self.live_lines = [[], [set() for _ in range(length + 1)], [set() for _ in range(length + 1)]]
+        self.live_lines[1][0].update(range(len(self.lines)))
+        self.live_lines[2][0].update(range(len(self.lines)))
+        self.moves = []
+        self.turn = 1
+        self.winner = 0
+        self.key = 0
+        self.keys = 0
+        self.score = 0
+
+    def copy(self) -> Grid:
+        """Retourne une copie de la grille, qui peut être modifiée sans toucher à l'originale.
+
+        :returns: La copie, où les mêmes coups ont été joués dans le même ordre
+        """
+        grid: Grid = type(self)(self.width, self.height, self.length)
+        cell: int
+
+        for cell in self.moves:
+            grid.play(cell)
+        return grid
+
+    def occupied(self) -> int:
+        """Retourne le masque des cases occupées.
+
+        :returns: Le masque
+        """
+        return self.masks[1] | self.masks[2]
+
+    def is_full(self) -> bool:
+        """Vérifie si toutes les cases de la grille sont occupées.
+
+        :returns: Vrai si la grille est pleine
+        """
+        return len(self.moves) == len(self.cells)
+
+    def is_over(self) -> bool:
+        """Vérifie si la partie est terminée (victoire ou grille pleine).
+
+        :returns: Vrai si la partie est terminée
+        """
+        return self.winner != 0 or self.is_full()
+
+    def result(self) -> int | None:
+        """Retourne le résultat de la partie.
+
+        :returns: Le joueur qui a gagné (1 ou 2), 0 en cas d'égalité, ou None si la partie n'est pas terminée
+        """
+        if self.winner != 0:
+            return self.winner
+        if self.is_full():
+            return 0
+        return None
+
+    def legal_moves(self) -> list[int]:
+        """Retourne les coups possibles, c'est-à-dire les cases vides.
+
+        :returns: Les indices des cases
+        """
+        return [cell for cell, content in enumerate(self.cells) if content == 0]
+
+    def random_move(self) -> int:
+        """Tire un coup possible au hasard (la grille ne doit pas être pleine).
+
+        :returns: L'indice de la case
+        """
+        cell: int = random.randrange(len(self.cells))
+
+        while self.cells[cell] != 0:
+            cell = random.randrange(len(self.cells))
+        return cell
+
+    def play(self, cell: int) -> None:
+        """Place le symbole du joueur dont c'est le tour sur la case `cell` (qui doit être vide).
+
+        :param cell: L'indice de la case
+        """
+        player: int = self.turn
+        ennemy: int = 3 - player
+        mine: list[int] = self.counts[player]
+        theirs: list[int] = self.counts[ennemy]
+        weights: tuple[int, ...] = self.weights
+        delta: int = 0
+        line: int
+        count: int
+
+        for line in self.cell_lines[cell]:
+            count = mine[line]
+            mine[line] = count + 1
+            if theirs[line] == 0:
+                self.live_lines[player][count].discard(line)
+                self.live_lines[player][count + 1].add(line)
+                delta += weights[count + 1] - weights[count]
+                if count + 1 == self.length and self.winner == 0:
+                    self.winner = player
+            elif count == 0:
+                # la ligne ne peut plus être complétée par l'adversaire
+                self.live_lines[ennemy][theirs[line]].discard(line)
+                delta += weights[theirs[line]]
+
+        self.cells[cell] = player
+        self.masks[player] |= 1 << cell
+        self.moves.append(cell)
+        self.turn = ennemy
+        self.key ^= self.zobrist[cell][player]
+        self.keys ^= self.symmetric_zobrist[cell][player]
+        self.score += delta if player == 1 else -delta
+
+    def undo(self) -> None:
+        """Annule le dernier coup joué."""
+        cell: int = self.moves.pop()
+        player: int = self.cells[cell]
+        ennemy: int = 3 - player
+        mine: list[int] = self.counts[player]
+        theirs: list[int] = self.counts[ennemy]
+        weights: tuple[int, ...] = self.weights
+        delta: int = 0
+        line: int
+        count: int
+
+        for line in self.cell_lines[cell]:
+            count = mine[line]
+            mine[line] = count - 1
+            if theirs[line] == 0:
+                self.live_lines[player][count].discard(line)
+                self.live_lines[player][count - 1].add(line)
+                delta += weights[count] - weights[count - 1]
+            elif count == 1:
+                self.live_lines[ennemy][theirs[line]].add(line)
+                delta += weights[theirs[line]]
+
+        if self.winner == player and not self.live_lines[player][self.length]:
+            self.winner = 0
+
+        self.cells[cell] = 0
+        self.masks[player] &= ~(1 << cell)
+        self.turn = player
+        self.key ^= self.zobrist[cell][player]
+        self.keys ^= self.symmetric_zobrist[cell][player]
+        self.score -= delta if player == 1 else -delta
+
+    def canonical(self) -> tuple[int, int]:
+        """Retourne la clé canonique de la position: la plus petite des clés de ses images par les symétries.
+
+        Les positions symétriques l'une de l'autre ont la même clé canonique, elles peuvent donc partager une entrée
+        de table de transposition, à condition de transformer les coups (voir `to_canonical` et `from_canonical`).
+
+        :returns: La clé canonique, et l'indice de la symétrie qui transforme la position en la position canonique
+        """
+        keys: list[int] = [self.keys >> i * KEY_BITS & KEY_MASK for i in range(len(self.symmetries))]
+        key: int = min(keys)
+
+        return key, keys.index(key)
+
+    def to_canonical(self, cell: int, symmetry: int) -> int:
+        """Transforme une case de la position en la case correspondante de la position canonique.
+
+        :param cell:     L'indice de la case
+        :param symmetry: L'indice de la symétrie renvoyé par `canonical`
+        :returns:        L'indice de la case dans la position canonique
+        """
+        return self.symmetries[symmetry][cell]
+
+    def from_canonical(self, cell: int, symmetry: int) -> int:
+        """Transforme une case de la position canonique en la case correspondante de la position.
+
+        :param cell:     L'indice de la case dans la position canonique
+        :param symmetry: L'indice de la symétrie renvoyé par `canonical`
+        :returns:        L'indice de la case
+        """
+        return self.symmetries[self.inverses[symmetry]][cell]
+
+    def winning_cells(self, player: int) -> int:
+        """Retourne les cases où `player` gagnerait immédiatement en jouant.
+
+        :param player: Le joueur (1 ou 2)
+        :returns:      Le masque des cases gagnantes
+        """
+        occupied: int = self.occupied()
+        cells: int = 0
+        line: int
+
+        # ce sont les cases vides des lignes où il ne manque qu'une case au joueur et où l'adversaire n'a pas joué
+        for line in self.live_lines[player][self.length - 1]:
+            cells |= self.lines[line] & ~occupied
+
+        return cells
+
+    def fork_cells(self, player: int) -> int:
+        """Retourne les cases où `player` créerait une fourchette en jouant.
+
+        Une fourchette est un coup qui crée au moins deux menaces (deux lignes où il ne manque plus qu'une case),
+        l'adversaire ne pouvant en bloquer qu'une seule.
+
+        :param player: Le joueur (1 ou 2)
+        :returns:      Le masque des cases qui créent une fourchette
+        """
+        occupied: int = self.occupied()
+        seen: int = 0
+        forks: int = 0
+        line: int
+        missing: int
+
+        # il manque exactement deux cases dans ces lignes: jouer l'une des deux crée une menace sur l'autre
+        for line in self.live_lines[player][self.length - 2]:
+            missing = self.lines[line] & ~occupied
+            forks |= seen & missing
+            seen |= missing
+
+        return forks
+
+
+class DropGrid(Grid):
+    """Une grille où chaque jeton tombe tout en bas de la colonne dans laquelle il est placé (comme au puissance 4).
+
+    Les coups sont toujours des indices de cases (voir `column_cell` pour trouver la case où tombe un jeton).
+    """
+
+    __slots__ = ("heights",)
+
+    # le nombre de jetons dans chaque colonne
+    heights: list[int]
+
+    def __init__(self, width: int, height: int, length: int) -> None:
+        """Crée une grille vide.
+
+        :param width:  La largeur de la grille
+        :param height: La hauteur de la grille
+        :param length: Le nombre de jetons à aligner pour gagner
+        """
+        super().__init__(width, height, length)
+        self.heights = [0] * width
+        # la gravité ne laisse que la réflexion gauche-droite
+        self.symmetries, self.inverses = make_symmetries(width, height, gravity=True)
+        self.symmetric_zobrist = make_symmetric_zobrist(self.symmetries)
+
+    def can_play(self, x: int) -> bool:
+        """Vérifie si la colonne `x` n'est pas encore remplie.
+
+        :param x: La colonne
+        :returns: Vrai si un jeton peut être placé dans la colonne
+        """
+        return self.heights[x] < self.height
+
+    def column_cell(self, x: int) -> int:
+        """Retourne la case où tomberait un jeton placé dans la colonne `x`.
+
+        :param x: La colonne (qui ne doit pas être remplie)
+        :returns: L'indice de la case
+        """
+        return (self.height - 1 - self.heights[x]) * self.width + x
+
+    def legal_moves(self) -> list[int]:
+        """Retourne les coups possibles, c'est-à-dire la case où tomberait un jeton dans chaque colonne non remplie.
+
+        :returns: Les indices des cases
+        """
+        return [self.column_cell(x) for x in range(self.width) if self.heights[x] < self.height]
+
+    def random_move(self) -> int:
+        """Tire un coup possible au hasard (la grille ne doit pas être pleine).
+
+        :returns: L'indice de la case
+        """
+        x: int = random.randrange(self.width)
+
+        while self.heights[x] == self.height:
+            x = random.randrange(self.width)
+        return self.column_cell(x)
+
+    def canonical(self) -> tuple[int, int]:
+        """Retourne la clé canonique de la position (voir `Grid.canonical`).
+
+        Seules la position et son reflet gauche-droite sont comparés, sans passer par une liste de clés.
+
+        :returns: La clé canonique, et l'indice de la symétrie qui transforme la position en la position canonique
+        """
+        key: int = self.keys & KEY_MASK
+        mirror: int = self.keys >> KEY_BITS
+
+        return (key, 0) if key <= mirror else (mirror, 1)
+
+    def is_symmetric(self) -> bool:
+        """Vérifie si la position est son propre reflet gauche-droite (les coups symétriques se valent alors).
+
+        :returns: Vrai si la position est symétrique
+        """
+        return self.keys & KEY_MASK == self.keys >> KEY_BITS
+
+    def play(self, cell: int) -> None:
+        """Place le jeton du joueur dont c'est le tour sur la case `cell`.
+
+        :param cell: L'indice de la case, qui doit être la case renvoyée par `column_cell` pour sa colonne
+        """
+        self.heights[cell % self.width] += 1
+        super().play(cell)
+
+    def undo(self) -> None:
+        """Annule le dernier coup joué."""
+        self.heights[self.moves[-1] % self.width] -= 1
+        super().undo()
@@ -0,0 +1,56 @@
+"""L'interface commune des bots: chaque coup est choisi avant une échéance, quel que soit le jeu.
+
+Chaque jeu fournit une fonction qui choisit le coup d'un bot (`allumettes.auto_choose`, `morpion.auto_play`,
+`plus_minus.auto_guess` et `pow4.auto_play`). Elle reçoit le bot, l'état de la partie, puis l'échéance (selon
+`time.monotonic`) à laquelle elle doit avoir répondu: les recherches longues s'arrêtent à l'échéance et renvoient le
+meilleur coup trouvé jusque-là (approfondissement itératif, nombre de parties aléatoires limité, etc.).
+
+Le temps accordé dépend du niveau de difficulté du bot, et le temps réellement passé sur chaque coup est enregistré
+dans les statistiques du bot (`Bot.stats`), ainsi que dans celles de `metrics` quand elles sont activées.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Any, Callable, TypeVar
+
+import metrics
+from players import Bot
+
+# le temps de réflexion accordé par coup à chaque niveau de difficulté, en secondes
+LATENCY_BUDGETS = (0.05, 0.5, 1.0)
+# le temps gardé en réserve sur chaque coup, pour que le bot ait le temps de s'arrêter et de répondre, en secondes
+MARGIN = 0.005
+
+Move = TypeVar("Move")
+
+
+def budget(bot: Bot) -> float:
+    """Retourne le temps de réflexion accordé au bot pour chaque coup.
+
+    :param bot: Le bot
+    :returns:   Le temps, en secondes
+    """
+    return LATENCY_BUDGETS[bot.level] if bot.duration is None else bot.duration
+
+
+def play(bot: Bot, choose: Callable[..., Move], *args: Any) -> Move:
+    """Demande son coup au bot, avec une échéance, et enregistre le temps qu'il a mis à répondre.
+
+    :param bot:    Le bot
+    :param choose: La fonction du jeu qui choisit le coup, appelée avec le bot, `args` puis l'échéance (un peu
+                   avant la fin du temps accordé, voir `MARGIN`)
+    :param args:   L'état de la partie
+    :returns:      Le coup choisi par le bot
+    """
+    allowed: float = budget(bot)
+    start: float = time.monotonic()
+    move: Move
+    elapsed: float
+
+    move = choose(bot, *args, start + max(allowed - MARGIN, 0.0))
+    elapsed = time.monotonic() - start
+    bot.stats.record(elapsed, allowed)
+    if metrics.ENABLED:
+        metrics.observe("bot_decision_seconds", elapsed, game=choose.__module__, level=str(bot.level))
+    return move
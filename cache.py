@@ -0,0 +1,233 @@
+"""Cache sur disque des évaluations des bots, gardé d'une exécution à l'autre.
+
+Les entrées de table de transposition (profondeur, score, meilleur coup, recherche complète ou non, et nature du
+score: exact ou seulement une borne, voir `pow4.negamax`) sont rangées dans un fichier de taille fixe du dossier
+`cache`, à côté du dossier `scores`, et lu par `mmap`: ouvrir le cache ne lit rien, seules les pages du fichier
+réellement consultées sont chargées.
+
+Le fichier est une table de hachage dont chaque clé a sa place dans un seau de `BUCKET_SLOTS` emplacements. Quand un
+seau est plein, l'entrée utilisée le moins récemment est remplacée: la taille du fichier ne dépasse jamais la taille
+choisie à sa création. Chaque emplacement porte une somme de contrôle, un emplacement abîmé (par exemple par deux
+programmes qui écrivent en même temps) est simplement ignoré. Dans un même programme, un cache est partagé par
+toutes les sessions et les réflexions des bots (voir `get_cache`): ses accès sont protégés par un verrou.
+"""
+
+from __future__ import annotations
+
+import mmap
+import struct
+import threading
+from pathlib import Path
+from typing import BinaryIO
+
+CACHE_PATH = Path(__file__).parent.resolve() / "cache"
+# la taille par défaut d'un fichier de cache, en octets
+CACHE_SIZE = 8 * 1024 * 1024
+# l'en-tête du fichier: signature, version du format, nombre de seaux et horloge des accès
+HEADER = struct.Struct("<4sIIQ")
+MAGIC = b"S1CA"
+VERSION = 3
+# un emplacement: clé, somme de contrôle, date du dernier accès, score, profondeur, coup, drapeaux et nature du score
+SLOT = struct.Struct("<QIQiHbBB")
+# la date du dernier accès d'un emplacement, et sa position (sur 64 bits: l'ordre des dates reste juste quand
+# l'horloge dépasse 2^32)
+STAMP = struct.Struct("<Q")
+STAMP_OFFSET = 12
+# le nombre d'emplacements d'un seau
+BUCKET_SLOTS = 4
+# les drapeaux d'un emplacement: occupé, et entrée issue d'une recherche complète depuis la position
+USED = 1
+ROOT = 2
+
+Entry = tuple[int, int, int, bool, int]
+
+# les caches déjà ouverts, par nom (voir `get_cache`)
+_caches: dict[str, Cache] = {}
+_caches_lock: threading.Lock = threading.Lock()
+
+
+def checksum(key: int, score: int, depth: int, move: int, flags: int, bound: int) -> int:
+    """Calcule la somme de contrôle d'un emplacement.
+
+    :param key:   La clé de la position
+    :param score: Le score de la position
+    :param depth: La profondeur de la recherche
+    :param move:  Le meilleur coup
+    :param flags: Les drapeaux de l'emplacement
+    :param bound: La nature du score
+    :returns:     La somme de contrôle, sur 32 bits
+    """
+    return (
+        key ^ key >> 32 ^ score * 0x9E3779B1 ^ depth << 16 ^ (move & 0xFF) << 8 ^ flags ^ bound << 28
+    ) & 0xFFFFFFFF
+
+
+class Cache:
+    """Une table d'entrées de table de transposition dans un fichier de taille fixe (voir le début du module)."""
+
+    __slots__ = ("path", "file", "map", "buckets", "clock", "lock")
+
+    # le chemin du fichier
+    path: Path
+    # le fichier ouvert, et sa projection en mémoire
+    file: BinaryIO
+    map: mmap.mmap
+    # le nombre de seaux du fichier
+    buckets: int
+    # l'horloge des accès: augmente à chaque lecture ou écriture, pour savoir quelle entrée est la plus ancienne
+    clock: int
+    # à prendre pour lire ou modifier les emplacements et l'horloge
+    lock: threading.Lock
+
+    def __init__(self, path: Path, size: int = CACHE_SIZE) -> None:
+        """Ouvre un fichier de cache, en le créant (vide) s'il n'existe pas ou s'il n'a pas le bon format.
+
+        :param path: Le chemin du fichier
+        :param size: La taille maximum du fichier, en octets (ignorée si le fichier existe déjà)
+        """
+        magic: bytes = b""
+        version: int = 0
+        buckets: int = 0
+        clock: int = 0
+
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch(exist_ok=True)
+        self.file = path.open("r+b")
+
+        if path.stat().st_size >= HEADER.size:
+            magic, version, buckets, clock = HEADER.unpack(self.file.read(HEADER.size))
+
+        if (
+            magic != MAGIC
+            or version != VERSION
+            or buckets == 0
+            or path.stat().st_size != HEADER.size + buckets * BUCKET_SLOTS * SLOT.size
+        ):
+            # fichier absent, abîmé ou d'un autre format: il est recréé vide
+            buckets = max(1, (size - HEADER.size) // (BUCKET_SLOTS * SLOT.size))
+            clock = 0
+            self.file.truncate(0)
+            self.file.truncate(HEADER.size + buckets * BUCKET_SLOTS * SLOT.size)
+            self.file.seek(0)
+            self.file.write(HEADER.pack(MAGIC, VERSION, buckets, clock))
+            self.file.flush()
+
+        self.map = mmap.mmap(self.file.fileno(), 0)
+        self.buckets = buckets
+        self.clock = clock
+        self.lock = threading.Lock()
+
+    def _bucket(self, key: int) -> range:
+        """Retourne la position dans le fichier de chaque emplacement du seau de `key`.
+
+        :param key: La clé de la position
+        :returns:   Les positions, en octets
+        """
+        start: int = HEADER.size + key % self.buckets * BUCKET_SLOTS * SLOT.size
+
+        return range(start, start + BUCKET_SLOTS * SLOT.size, SLOT.size)
+
+    def _tick(self) -> int:
+        """Avance l'horloge des accès (avec le verrou).
+
+        :returns: La nouvelle date
+        """
+        self.clock += 1
+        return self.clock
+
+    def get(self, key: int) -> Entry | None:
+        """Cherche l'entrée d'une position.
+
+        :param key: La clé de la position
+        :returns:   La profondeur de la recherche, le score, le meilleur coup, vrai si la recherche était complète et
+                    la nature du score, ou None si la position n'est pas dans le cache
+        """
+        offset: int
+        slot_key: int
+        check: int
+        score: int
+        depth: int
+        move: int
+        flags: int
+        bound: int
+
+        with self.lock:
+            for offset in self._bucket(key):
+                slot_key, check, _, score, depth, move, flags, bound = SLOT.unpack_from(self.map, offset)
+                if flags & USED and slot_key == key and check == checksum(key, score, depth, move, flags, bound):
+                    STAMP.pack_into(self.map, offset + STAMP_OFFSET, self._tick())
+                    return depth, score, move, bool(flags & ROOT), bound
+
+        return None
+
+    def put(self, key: int, entry: Entry) -> None:
+        """Range l'entrée d'une position, à la place de la plus ancienne entrée de son seau s'il est plein.
+
+        Une entrée déjà présente pour la même position n'est remplacée que par une recherche au moins aussi profonde.
+
+        :param key:   La clé de la position
+        :param entry: La profondeur de la recherche, le score, le meilleur coup, vrai si la recherche était complète
+                      et la nature du score
+        """
+        depth, score, move, root, bound = entry
+        flags: int = USED | (ROOT if root else 0)
+        victim: int = -1
+        oldest: int = 0
+        offset: int
+        slot_key: int
+        stamp: int
+        slot_depth: int
+        slot_flags: int
+
+        with self.lock:
+            for offset in self._bucket(key):
+                slot_key, _, stamp, _, slot_depth, _, slot_flags, _ = SLOT.unpack_from(self.map, offset)
+                if slot_flags & USED and slot_key == key:
+                    if slot_depth > depth and not root:
+                        return
+                    victim = offset
+                    break
+                if not slot_flags & USED:
+                    # un emplacement libre passe avant toutes les entrées
+                    stamp = -1
+                if victim < 0 or stamp < oldest:
+                    victim, oldest = offset, stamp
+
+            SLOT.pack_into(
+                self.map,
+                victim,
+                key,
+                checksum(key, score, depth, move, flags, bound),
+                self._tick(),
+                score,
+                depth,
+                move,
+                flags,
+                bound,
+            )
+
+    def flush(self) -> None:
+        """Écrit sur le disque les entrées modifiées et l'horloge des accès."""
+        with self.lock:
+            HEADER.pack_into(self.map, 0, MAGIC, VERSION, self.buckets, self.clock)
+            self.map.flush()
+
+    def close(self) -> None:
+        """Écrit les modifications et ferme le fichier."""
+        self.flush()
+        self.map.close()
+        self.file.close()
+
+
+def get_cache(name: str, size: int = CACHE_SIZE) -> Cache:
+    """Retourne le cache nommé `name`, en l'ouvrant s'il ne l'est pas encore.
+
+    :param name: Le nom du cache (celui du fichier, dans le dossier `cache`)
+    :param size: La taille maximum du fichier, s'il doit être créé
+    :returns:    Le cache
+    """
+    with _caches_lock:
+        if name not in _caches:
+            _caches[name] = Cache(CACHE_PATH / (name + ".bin"), size)
+        return _caches[name]
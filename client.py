@@ -0,0 +1,440 @@
+"""Client des parties en réseau: joue contre un joueur d'un autre terminal, par l'intermédiaire de `server`.
+
+Le client n'est qu'un affichage: il envoie les coups du joueur au serveur, et suit la partie en appliquant les coups
+que le serveur lui renvoie (ceux du joueur comme ceux de l'adversaire) avec les mêmes règles que lui (voir
+`sessions`). L'affichage et la saisie des coups sont ceux des jeux en local. Par exemple:
+
+    python3 client.py --host 127.0.0.1 --port 7777
+
+Comme en local, le joueur peut appuyer sur F1 au moment d'entrer son nom pour qu'un bot joue à sa place: le bot
+réfléchit alors sur la machine du client, jamais sur le serveur.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import socket
+from random import randint
+from typing import TextIO
+
+import allumettes
+import bots
+import display
+import metrics
+import morpion
+import plus_minus
+import pow4
+import terminal
+from board import DropGrid
+from display import center, print_at, waiting_screen
+from players import Bot, Player
+from server import DEFAULT_HOST, DEFAULT_PORT
+from sessions import ANSWERS, AllumettesRules, MorpionRules, PlusMinusRules, Pow4Rules, Rules, make_rules, variant_names
+from terminal import bold, strip_escapes
+
+# le nom de chaque jeu, tel qu'il est affiché dans le menu principal
+GAME_NAMES = {"plus_minus": "PLUS OU MOINS", "allumettes": "ALLUME-LE", "morpion": "MORPION", "pow4": "PUISSANCE 4"}
+
+
+class Remote:
+    """La connexion au serveur."""
+
+    __slots__ = ("socket", "lines")
+
+    # la connexion
+    socket: socket.socket
+    # les lignes reçues du serveur
+    lines: TextIO
+
+    def __init__(self, host: str, port: int) -> None:
+        """Se connecte au serveur.
+
+        :param host: L'adresse du serveur
+        :param port: Le port du serveur
+        """
+        self.socket = socket.create_connection((host, port))
+        self.lines = self.socket.makefile("r", encoding="utf-8")
+
+    def send(self, line: str) -> None:
+        """Envoie une commande au serveur.
+
+        :param line: La commande, sans le retour à la ligne
+        """
+        self.socket.sendall(line.encode() + b"\n")
+
+    def receive(self) -> list[str]:
+        """Attend la prochaine ligne envoyée par le serveur.
+
+        :returns: Les mots de la ligne
+        :raises ConnectionError: Si le serveur a fermé la connexion
+        """
+        line: str = self.lines.readline()
+
+        if line == "":
+            raise ConnectionError("le serveur a fermé la connexion")
+        return line.split()
+
+    def request(self, line: str) -> list[str]:
+        """Envoie une commande au serveur et attend sa réponse.
+
+        :param line: La commande
+        :returns:    Les mots de la réponse
+        """
+        self.send(line)
+        return self.receive()
+
+    def close(self) -> None:
+        """Ferme la connexion."""
+        self.lines.close()
+        self.socket.close()
+
+
+def decorations(rules: Rules, names: list[str]) -> list[tuple[int, int, str]]:
+    """Retourne les décorations qui accompagnent tous les écrans de la partie (au format de `display.screen`).
+
+    :param rules: Les règles de la partie
+    :param names: Le nom de chaque joueur (l'indice 0 n'est pas utilisé)
+    :returns:     Les tas d'allumettes, ou les compteurs du plus ou moins (aucune pour les autres jeux)
+    """
+    width: int
+    height: int
+
+    if isinstance(rules, AllumettesRules):
+        width, height = terminal.get_size()
+        return allumettes.matches_display(rules.heaps.heaps, width, height)
+    elif isinstance(rules, PlusMinusRules) and rules.maximum != 0:
+        return [
+            (3, 2, f"Maximum: {rules.maximum}"),
+            (3, 3, f"Nombre d'essais: {bold(str(rules.guess_count))}"),
+            (3, 4, f"Vie(s) de {bold(names[1])}: {bold(str(rules.lives))}"),
+        ]
+    return []
+
+
+def render(rules: Rules, names: list[str], message: str) -> None:
+    """Affiche la partie, avec un message.
+
+    :param rules:   Les règles de la partie
+    :param names:   Le nom de chaque joueur (l'indice 0 n'est pas utilisé)
+    :param message: Le message
+    """
+    width: int
+    y: int
+
+    if isinstance(rules, MorpionRules):
+        morpion.display_grid(message, rules.grid, keys={})
+    elif isinstance(rules, Pow4Rules):
+        pow4.display_grid(rules.grid)
+        width, _ = terminal.get_size()
+        _, y = pow4.grid_origin(rules.grid)
+        print_at(center(len(strip_escapes(message)), width), y - 3, message)
+        terminal.flush()
+    else:
+        display.screen([message], decorations=decorations(rules, names))
+
+
+def status(rules: Rules, names: list[str], player: int) -> str:
+    """Retourne le message à afficher pendant que le joueur attend le coup de son adversaire.
+
+    :param rules:  Les règles de la partie
+    :param names:  Le nom de chaque joueur (l'indice 0 n'est pas utilisé)
+    :param player: Le numéro du joueur (1 ou 2)
+    :returns:      Le message
+    """
+    waiting: str = f"En attente de {bold(names[3 - player])}…"
+
+    if isinstance(rules, PlusMinusRules) and rules.turn() == 1 and rules.guess >= 0:
+        return f"{bold(names[2])} a choisi {bold(str(rules.guess))}. {waiting}"
+    if isinstance(rules, PlusMinusRules) and rules.truth == 1:
+        return f"Le nombre est plus grand que {bold(str(rules.guess))} ! {waiting}"
+    if isinstance(rules, PlusMinusRules) and rules.truth == -1:
+        return f"Le nombre est plus petit que {bold(str(rules.guess))} ! {waiting}"
+    return waiting
+
+
+def prompt_move(me: Player, rules: Rules, names: list[str]) -> list[int]:
+    """Demande son coup au joueur humain, avec l'affichage des jeux en local.
+
+    :param me:    Le joueur
+    :param rules: Les règles de la partie, où c'est au tour du joueur
+    :param names: Le nom de chaque joueur (l'indice 0 n'est pas utilisé)
+    :returns:     Le coup, au format des règles de la partie (voir `sessions`)
+    """
+    grid: DropGrid
+    maximum: int
+    number: int
+
+    if isinstance(rules, MorpionRules):
+        return [morpion.place_symbol(me, rules.grid)]
+    elif isinstance(rules, Pow4Rules):
+        # le jeton tombe dans une copie: la grille ne change qu'une fois le coup accepté par le serveur
+        grid = rules.grid.copy()
+        pow4.place_token(me, grid)
+        return [grid.moves[-1] % grid.width]
+    elif isinstance(rules, AllumettesRules):
+        return list(
+            allumettes.prompt_move(
+                me.display_name, rules.heaps.heaps, rules.heaps.takes, decorations(rules, names)
+            )
+        )
+    elif isinstance(rules, PlusMinusRules) and rules.maximum == 0:
+        maximum = display.prompt_int(f"{bold(me.display_name)} choisit la borne maximum (minimum 10)", 10)
+        number = plus_minus.prompt_int_hideable(f"{bold(me.display_name)} choisit un nombre")
+        while number > maximum:
+            number = plus_minus.prompt_int_hideable("Votre nombre ne peut pas dépasser le nombre maximum")
+        rules.number = number
+        return [maximum, number]
+    elif isinstance(rules, PlusMinusRules) and rules.turn() == 2:
+        return [display.prompt_int(f"{bold(me.display_name)} devine", decorations=decorations(rules, names))]
+    else:
+        assert isinstance(rules, PlusMinusRules)
+        return [
+            ANSWERS[plus_minus.prompt_plus_minus(names[1], names[2], rules.guess, decorations(rules, names))]
+        ]
+
+
+def auto_move(bot: Bot, rules: Rules) -> list[int]:
+    """Choisit le coup d'un bot qui joue à la place du joueur (voir `bots.play`).
+
+    :param bot:   Le bot
+    :param rules: Les règles de la partie, où c'est au tour du bot
+    :returns:     Le coup, au format des règles de la partie (voir `sessions`)
+    """
+    heap: int
+    take: int
+    maximum: int
+
+    if isinstance(rules, MorpionRules):
+        return [bots.play(bot, morpion.auto_play, rules.grid)]
+    elif isinstance(rules, Pow4Rules):
+        return [bots.play(bot, pow4.auto_play, rules.grid)]
+    elif isinstance(rules, AllumettesRules):
+        heap, take = bots.play(bot, allumettes.auto_choose, rules.heaps.heaps, rules.heaps.takes, rules.heaps.misere)
+        return [heap, take]
+    elif isinstance(rules, PlusMinusRules) and rules.maximum == 0:
+        maximum = plus_minus.auto_maximum(bot)
+        rules.number = randint(0, maximum)
+        return [maximum, rules.number]
+    elif isinstance(rules, PlusMinusRules) and rules.turn() == 2:
+        if bot.state is None:
+            bot.state = plus_minus.GuessState(rules.maximum)
+        return [bots.play(bot, plus_minus.auto_guess)]
+    else:
+        # un bot répond toujours honnêtement
+        assert isinstance(rules, PlusMinusRules)
+        return [(rules.number > rules.guess) - (rules.number < rules.guess)]
+
+
+def update(me: Player, rules: Rules, player: int, move: list[int]) -> None:
+    """Applique un coup envoyé par le serveur.
+
+    :param me:     Le joueur
+    :param rules:  Les règles de la partie
+    :param player: Le joueur qui a joué (1 ou 2)
+    :param move:   La forme publique du coup
+    """
+    state: plus_minus.GuessState
+
+    if isinstance(rules, Pow4Rules) and not isinstance(me, Bot):
+        # le jeton tombe avec la même animation qu'en local
+        pow4.drop_token(move[0], rules.grid.copy())
+
+    rules.apply(player, move)
+
+    if isinstance(me, Bot) and isinstance(me.state, plus_minus.GuessState) and player == 1 and rules.truth is not None:
+        # le bot qui devine resserre les bornes connues du nombre, d'après la vraie réponse
+        state = me.state
+        if rules.truth == 1:
+            state.minimum = rules.guess + 1
+        elif rules.truth == -1:
+            state.maximum = rules.guess - 1
+
+
+def play(remote: Remote, me: Player, start: list[str]) -> None:
+    """Joue une partie jusqu'à sa fin.
+
+    :param remote: La connexion au serveur
+    :param me:     Le joueur
+    :param start:  Les mots de la ligne `START` qui a commencé la partie (voir `server`)
+    """
+    player: int = int(start[1])
+    names: list[str] = ["", start[4], start[5]]
+    rules: Rules = make_rules(start[2], [int(word) for word in start[6:]])
+    winner: int | None = None
+    words: list[str]
+
+    if isinstance(me, Bot):
+        me.new_game()
+
+    while winner is None:
+        if rules.result() is None and rules.turn() == player:
+            if isinstance(me, Bot):
+                remote.send(" ".join(["MOVE", *map(str, auto_move(me, rules))]))
+            else:
+                remote.send(" ".join(["MOVE", *map(str, prompt_move(me, rules, names))]))
+        else:
+            render(rules, names, status(rules, names, player))
+
+        words = remote.receive()
+        if words[0] == "MOVED":
+            update(me, rules, int(words[1]), [int(word) for word in words[2:]])
+        elif words[0] == "END":
+            winner = int(words[1])
+        elif words[0] == "ERROR":
+            waiting_screen(f"Le serveur a refusé le coup: {' '.join(words[1:])}", decorations(rules, names))
+
+    if winner == 0:
+        waiting_screen("Égalité !!!", decorations(rules, names))
+    else:
+        waiting_screen(f"{bold(names[winner])} a gagné !!!", decorations(rules, names))
+
+
+def choose_game() -> tuple[str, int]:
+    """Demande au joueur à quel jeu, et à quelle variante, il veut jouer.
+
+    :returns: Le nom du jeu et l'indice de la variante
+    """
+    games: list[str] = list(GAME_NAMES)
+    game: str
+    variant: int = 0
+
+    game = games[display.prompt_choice("À quel jeu voulez-vous jouer ?", [GAME_NAMES[game] for game in games])]
+    if len(variant_names(game)) > 1:
+        variant = display.prompt_choice("À quelle variante voulez-vous jouer ?", variant_names(game))
+    return game, variant
+
+
+def create(remote: Remote, me: Player) -> None:
+    """Crée une partie, attend un adversaire et la joue.
+
+    :param remote: La connexion au serveur
+    :param me:     Le joueur
+    """
+    game: str
+    variant: int
+    words: list[str]
+
+    game, variant = choose_game()
+    words = remote.request(f"NEW {game} {variant}")
+    if words[0] != "CREATED":
+        waiting_screen(f"Impossible de créer la partie: {' '.join(words[1:])}")
+        return
+
+    display.screen([f"Partie n°{bold(words[1])} créée, en attente d'un adversaire…"])
+    words = remote.receive()
+    play(remote, me, words)
+
+
+def find_opponent(remote: Remote, me: Player) -> None:
+    """Demande au serveur un adversaire de niveau proche (voir `matchmaking`), et joue la partie.
+
+    :param remote: La connexion au serveur
+    :param me:     Le joueur
+    """
+    game: str
+    variant: int
+    words: list[str]
+
+    game, variant = choose_game()
+    words = remote.request(f"PLAY {game} {variant}")
+    if words[0] != "OK":
+        waiting_screen(f"Impossible de chercher un adversaire: {' '.join(words[1:])}")
+        return
+
+    display.screen(["Recherche d'un adversaire de votre niveau…"])
+    words = remote.receive()
+    play(remote, me, words)
+
+
+def join(remote: Remote, me: Player) -> None:
+    """Rejoint une partie qui attend un deuxième joueur, et la joue.
+
+    :param remote: La connexion au serveur
+    :param me:     Le joueur
+    """
+    sessions: list[list[str]] = [session.split(",") for session in remote.request("LIST")[1:]]
+    choice: int
+    words: list[str]
+
+    if not sessions:
+        waiting_screen("Aucune partie n'attend de joueur")
+        return
+
+    choice = display.prompt_choice(
+        "Quelle partie voulez-vous rejoindre ?",
+        [
+            f"{GAME_NAMES[game]}, {variant_names(game)[int(variant)]}, contre {name}"
+            for _, game, variant, name in sessions
+        ]
+        + ["Retour"],
+    )
+    if choice == len(sessions):
+        return
+
+    words = remote.request(f"JOIN {sessions[choice][0]}")
+    if words[0] != "START":
+        waiting_screen(f"Impossible de rejoindre la partie: {' '.join(words[1:])}")
+        return
+    play(remote, me, words)
+
+
+def real_main(remote: Remote) -> None:
+    """Demande son nom au joueur, puis lui propose de créer ou de rejoindre des parties.
+
+    :param remote: La connexion au serveur
+    """
+    me: Player
+    selection: int
+
+    me = display.prompt_player(f"NOM DU {bold('JOUEUR')}")
+    if isinstance(me, Bot):
+        remote.request(f"HELLO Bot_{os.getpid()}")
+    else:
+        # les mots des messages sont séparés par des espaces
+        remote.request(f"HELLO {me.name.replace(' ', '_')}")
+
+    while True:
+        selection = display.prompt_choice(
+            "Que voulez-vous faire ?",
+            ["Trouver un adversaire", "Créer une partie", "Rejoindre une partie", "Quitter"],
+        )
+        if selection == 0:
+            find_opponent(remote, me)
+        elif selection == 1:
+            create(remote, me)
+        elif selection == 2:
+            join(remote, me)
+        else:
+            break
+
+
+def main() -> None:
+    """Lit les arguments de la ligne de commande, se connecte au serveur et passe le terminal en mode "raw"."""
+    parser: argparse.ArgumentParser
+    args: argparse.Namespace
+    remote: Remote
+    console: terminal.Console = terminal.get_console()
+
+    parser = argparse.ArgumentParser(description="Joue en réseau contre un joueur d'un autre terminal.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="l'adresse du serveur")
+    parser.add_argument("-p", "--port", type=int, default=DEFAULT_PORT, help="le port du serveur")
+    args = parser.parse_args()
+
+    remote = Remote(args.host, args.port)
+    metrics.setup_from_environment()
+    console.make_raw()
+
+    try:
+        real_main(remote)
+    finally:
+        terminal.set_cursor(0, 0)
+        terminal.show_cursor()
+        terminal.clear()
+        terminal.flush()
+        console.restore()
+        remote.close()
+
+
+if __name__ == "__main__":
+    main()
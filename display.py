@@ -1,27 +1,32 @@
 from __future__ import annotations
 
 import display
+import metrics
 import terminal
+from players import Bot, Player
 from terminal import bold, get_key, green, invert, red, strip_escapes
 
+# le nom de chaque niveau de difficulté des bots
+DIFFICULTY_LEVELS = ["Facile", "Moyen", "Difficile"]
+
 
 def print_at(x: int, y: int, text: str) -> None:
     """Écrit `text` en x,y sur le terminal.
 
-    Le texte ne sera affiché qu'après avoir flush stdout.
+    Le texte ne sera affiché qu'après avoir appelé `terminal.flush`.
 
     :param x:    La position x à laquelle écrire le texte (tout à gauche étant 1 et non 0)
     :param y:    La position y à laquelle écrire le texte (tout en haut étant 1 et non 0)
     :param text: Le texte à écrire
     """
     terminal.set_cursor(x, y)
-    print(text, end="")
+    terminal.write(text)
 
 
 def display_at(text: list[str], x: int, y: int) -> None:
     """Écrit un bloc de texte sur plusieurs lignes avec le coin en haut à gauche en x,y.
 
-    Le texte ne sera affiché qu'après avoir flush stdout.
+    Le texte ne sera affiché qu'après avoir appelé `terminal.flush`.
 
     :param text: Les lignes de texte afficher
     :param x:    La position x à laquelle écrire le texte (tout à gauche étant 1 et non 0)
@@ -37,7 +42,7 @@ def display_at(text: list[str], x: int, y: int) -> None:
 def hline(x: int, y1: int, y2: int, char: str) -> None:
     """Affiche une ligne horizontale composée de `char` entre `y1` et `y2` (les deux sont inclus).
 
-    La ligne ne sera affiché qu'après avoir flush stdout.
+    La ligne ne sera affiché qu'après avoir appelé `terminal.flush`.
     Si y1 > y2, rien ne sera affiché.
 
     :param x:    Le colonne où sera affiché la ligne (commence à 1 et non 0)
@@ -69,7 +74,7 @@ def center(text_length: int, available_space: int) -> int:
 def main_frame() -> None:
     """Affiche le cadre principale du programme (un cadre en double ligne sur les bords du terminal).
 
-    Le cadre ne sera affiché qu'après avoir flush stdout.
+    Le cadre ne sera affiché qu'après avoir appelé `terminal.flush`.
     """
     width: int
     height: int
@@ -88,7 +93,7 @@ def main_frame() -> None:
 def keys_help(keys: dict[str, str]) -> None:
     """Affiche l'aide des touches en bas à gauche du terminal.
 
-    L'aide ne sera affiché qu'après avoir flush stdout.
+    L'aide ne sera affiché qu'après avoir appelé `terminal.flush`.
 
     :param keys: Un dictionnaire associant le nom des touches à leur action
     """
@@ -117,7 +122,7 @@ def screen(
       - affiche l'aide des touches
       - affiche les décorations
       - affiche le contenu principal
-      - flush stdout, ce n'est donc pas nécessaire de le faire manuellement
+      - vide la sortie du terminal, ce n'est donc pas nécessaire de le faire manuellement
 
     :param content:     Le contenu principal, sera centré en hauteur et en largeur
     :param keys:        Les touches pour lesquelles afficher l'aide (même format que pour `keys_help`)
@@ -131,6 +136,7 @@ def screen(
     height: int
     max_length: int
     text: str
+    start: float = metrics.start_frame() if metrics.ENABLED else 0.0
 
     terminal.clear()
     main_frame()
@@ -151,8 +157,11 @@ def screen(
 
         display_at(content, x, y)
 
-    # force stdout to be flushed so everything we wrote is actually displayed
-    print(end="", flush=True)
+    # force the output to be flushed so everything we wrote is actually displayed
+    terminal.flush()
+
+    if metrics.ENABLED:
+        metrics.end_frame(start)
 
 
 def waiting_screen(text: str, decorations: list[tuple[int, int, str]] = []) -> None:
@@ -166,21 +175,31 @@ def waiting_screen(text: str, decorations: list[tuple[int, int, str]] = []) -> N
         pass
 
 
-def prompt_difficulty_level() -> int:
-    """Affiche un menu qui propose trois choix ("Facile", "Moyen", "Difficile").
+def prompt_choice(prompt: str, options: list[str]) -> int:
+    """Affiche un menu qui propose de choisir une option parmi `options`.
 
-    :returns: L'indice de l'option qui à été choisie
+    :param prompt:  La question à afficher au dessus des options
+    :param options: Les options proposées
+    :returns:       L'indice de l'option qui à été choisie
     """
-    prompt = "Quel sera le niveau de difficulté du bot ?"
-    options = ["Facile", "Moyen", "Difficile"]
-    selected = 0
+    selected: int = 0
+    max_width: int
+    width: int
+    height: int
+    x: int
+    y: int
+    i: int
+    line: str
+    key: str
+
+    max_width = max(len(option) for option in options)
 
     while True:
         terminal.clear()
         main_frame()
         width, height = terminal.get_size()
 
-        x = center(len("Difficile"), width)
+        x = center(max_width, width)
         y = center(len(options) + 2, height)
 
         print_at(center(len(prompt), width), y, bold(prompt))
@@ -191,7 +210,7 @@ def prompt_difficulty_level() -> int:
                 print_at(x, y + 2 + i, line)
 
         display.keys_help({"↑ / ↓": "Choisir une option", "ENTER": "Valider"})
-        print("", end="", flush=True)
+        terminal.flush()
 
         key = get_key()
         if key == "UP":
@@ -202,16 +221,22 @@ def prompt_difficulty_level() -> int:
             return selected
 
 
-def prompt_player(question: str, *, decorations: list[tuple[int, int, str]] = [], invalid: list[str] = []) -> str:
-    r"""Affiche un écran qui demande au joueur d'entrer son nom, ou d'appuyer sur F1 pour qu'un bot joue.
+def prompt_difficulty_level() -> int:
+    """Affiche un menu qui propose trois choix ("Facile", "Moyen", "Difficile", voir `DIFFICULTY_LEVELS`).
+
+    :returns: L'indice de l'option qui à été choisie
+    """
+    return prompt_choice("Quel sera le niveau de difficulté du bot ?", DIFFICULTY_LEVELS)
+
+
+def prompt_player(question: str, *, decorations: list[tuple[int, int, str]] = [], invalid: list[str] = []) -> Player:
+    """Affiche un écran qui demande au joueur d'entrer son nom, ou d'appuyer sur F1 pour qu'un bot joue.
 
     :param question:    Le texte de la question qui sera affiché
     :param decorations: Même chose que dans `screen`.
     :param invalid:     La liste des noms invalides (permet d'empecher les deux joueurs de mettre le même nom)
-    :returns:           Le nom qui à été rentré par le joueur, ou le nom du bot
-
-    Le nom du bot est formaté comme ceci: "\txy" ou `x` est l'indice du bot (joueur 1 ou joueur 2)
-    et `y` est le niveau de difficulté du bot (entre 0 et 2)
+    :returns:           Le joueur dont le nom à été rentré, ou un bot (dont l'indice est le nombre de noms invalides
+                        plus un, et dont le niveau de difficulté est demandé au joueur)
     """
     key: str
     value: str = ""
@@ -240,10 +265,10 @@ def prompt_player(question: str, *, decorations: list[tuple[int, int, str]] = []
             value = value[:-1]
         elif key == "F1":
             terminal.hide_cursor()
-            return "\t" + str(len(invalid) + 1) + str(prompt_difficulty_level())
+            return Bot(len(invalid) + 1, prompt_difficulty_level())
         elif key == "\n" and value != "" and value not in invalid:
             terminal.hide_cursor()
-            return value
+            return Player(value)
 
 
 def check_number(number: int, minimum: int | None = None, maximum: int | None = None) -> bool:
@@ -0,0 +1,241 @@
+"""Écran virtuel: l'image de ce qu'affiche un terminal, pour n'envoyer que ce qui a changé d'une image à l'autre.
+
+L'interface redessine souvent tout l'écran (`display.screen` efface le terminal avant d'afficher le cadre, l'aide des
+touches, etc.). Quand le terminal est à l'autre bout d'une connexion réseau, ce qui est écrit est d'abord appliqué à
+une `Frame`, qui comprend les séquences d'échappement utilisées par `terminal`. Au moment de vider la sortie, seules
+les cases qui ont changé depuis la dernière image envoyée sont transmises (voir `Frame.diff`). Par exemple:
+
+    frame = Frame(80, 24)
+    frame.feed("\x1b[2J\x1b[3;5HBonjour")
+    sent = frame.copy()
+    frame.feed("\x1b[3;5HBonsoir")
+    frame.diff(sent)  # "\x1b[3;8Hsoir", ou presque
+"""
+
+from __future__ import annotations
+
+import re
+
+# une séquence d'échappement CSI (ses paramètres puis sa lettre finale), un caractère de contrôle, ou un morceau de
+# texte
+TOKEN = re.compile(r"\x1b\[([^@-~]*)([@-~])|([\b\r\n])|([^\x1b\b\r\n]+)|\x1b")
+# les paramètres d'une séquence CSI comprise par l'écran, les autres sont ignorées comme par un terminal
+PARAMS = re.compile(r"\??[\d;]*")
+# le nombre de cases inchangées en dessous duquel il coûte moins cher de les renvoyer que de déplacer le curseur
+GAP = 6
+
+
+class Frame:
+    """Le contenu d'un écran de `width` par `height` cases, avec le style de chaque case et l'état du curseur.
+
+    Comme dans un terminal, les positions commencent à 1. Le curseur ne sort jamais de l'écran: les déplacements sont
+    ramenés sur les bords, et le texte qui dépasse à droite est coupé (il n'est pas renvoyé à la ligne).
+    """
+
+    __slots__ = ("width", "height", "chars", "styles", "x", "y", "style", "cursor")
+
+    width: int
+    height: int
+    # le caractère et le style (les paramètres de la séquence SGR, "" pour le style par défaut) de chaque case,
+    # ligne par ligne
+    chars: list[list[str]]
+    styles: list[list[str]]
+    # la position du curseur
+    x: int
+    y: int
+    # le style du texte écrit à la position du curseur
+    style: str
+    # vrai si le curseur est visible
+    cursor: bool
+
+    def __init__(self, width: int, height: int) -> None:
+        """Crée un écran vide.
+
+        :param width:  La largeur de l'écran
+        :param height: La hauteur de l'écran
+        """
+        self.width = width
+        self.height = height
+        self.chars = [[" "] * width for _ in range(height)]
+        self.styles = [[""] * width for _ in range(height)]
+        self.x = 1
+        self.y = 1
+        self.style = ""
+        self.cursor = True
+
+    def copy(self) -> Frame:
+        """Retourne une copie de l'écran, qui ne change pas quand l'écran change."""
+        frame: Frame = Frame.__new__(Frame)
+
+        frame.width = self.width
+        frame.height = self.height
+        frame.chars = [row.copy() for row in self.chars]
+        frame.styles = [row.copy() for row in self.styles]
+        frame.x = self.x
+        frame.y = self.y
+        frame.style = self.style
+        frame.cursor = self.cursor
+        return frame
+
+    def move(self, x: int, y: int) -> None:
+        """Déplace le curseur, en le gardant sur l'écran.
+
+        :param x: La colonne
+        :param y: La ligne
+        """
+        self.x = min(max(x, 1), self.width)
+        self.y = min(max(y, 1), self.height)
+
+    def clear(self) -> None:
+        """Efface tout l'écran (le curseur ne bouge pas)."""
+        self.chars = [[" "] * self.width for _ in range(self.height)]
+        self.styles = [[""] * self.width for _ in range(self.height)]
+
+    def put(self, text: str) -> None:
+        """Écrit du texte sans caractère de contrôle à la position du curseur, dans le style courant.
+
+        :param text: Le texte
+        """
+        start: int = self.x - 1
+        end: int = min(start + len(text), self.width)
+
+        self.chars[self.y - 1][start:end] = text[: end - start]
+        self.styles[self.y - 1][start:end] = [self.style] * (end - start)
+        # le curseur peut se trouver juste après la dernière colonne, comme dans un terminal
+        self.x = min(self.x + len(text), self.width + 1)
+
+    def control(self, params: str, command: str) -> None:
+        """Applique une séquence d'échappement CSI.
+
+        :param params:  Les paramètres de la séquence (par exemple "3;5")
+        :param command: La lettre qui termine la séquence (par exemple "H")
+        """
+        numbers: list[int]
+        count: int
+        y: str
+        x: str
+
+        if command == "H":
+            # le cas le plus fréquent (voir `display.print_at`), traité sans passer par les expressions régulières
+            y, _, x = params.partition(";")
+            if (y.isdigit() or y == "") and (x.isdigit() or x == ""):
+                self.move(int(x or 1), int(y or 1))
+            return
+
+        if not PARAMS.fullmatch(params):
+            # par exemple une position négative, quand un texte est plus large que le terminal
+            return
+
+        numbers = [int(number) if number.isdigit() else 0 for number in params.lstrip("?").split(";")]
+        count = max(numbers[0], 1)
+
+        if command == "G":
+            self.move(numbers[0], self.y)
+        elif command == "A":
+            self.move(self.x, self.y - count)
+        elif command == "B":
+            self.move(self.x, self.y + count)
+        elif command == "C":
+            self.move(self.x + count, self.y)
+        elif command == "D":
+            self.move(self.x - count, self.y)
+        elif command == "J" and numbers[0] == 2:
+            self.clear()
+        elif command == "m":
+            if numbers[0] == 0 and len(numbers) == 1:
+                self.style = ""
+            else:
+                self.style = f"{self.style};{params}" if self.style else params
+        elif params == "?25" and command in "hl":
+            self.cursor = command == "h"
+
+    def feed(self, text: str) -> None:
+        """Applique à l'écran du texte écrit sur le terminal, séquences d'échappement comprises.
+
+        :param text: Le texte
+        """
+        match: re.Match[str]
+        char: str
+
+        for match in TOKEN.finditer(text):
+            if match[4] is not None:
+                self.put(match[4])
+            elif match[2] is not None:
+                self.control(match[1], match[2])
+            elif match[3] is not None:
+                char = match[3]
+                if char == "\b":
+                    self.move(self.x - 1, self.y)
+                elif char == "\r":
+                    self.x = 1
+                else:
+                    self.move(1, self.y + 1)
+
+    def row_runs(self, y: int, previous: Frame) -> list[tuple[int, int]]:
+        """Retourne les morceaux de la ligne `y` qui ont changé depuis `previous`.
+
+        Deux morceaux séparés par moins de `GAP` cases inchangées sont réunis en un seul.
+
+        :param y:        La ligne (à partir de 0)
+        :param previous: L'écran tel qu'il a été envoyé
+        :returns:        Le début et la fin (exclue) de chaque morceau, à partir de 0
+        """
+        chars: list[str] = self.chars[y]
+        styles: list[str] = self.styles[y]
+        old_chars: list[str] = previous.chars[y]
+        old_styles: list[str] = previous.styles[y]
+        runs: list[tuple[int, int]] = []
+        start: int = -1
+        last: int = -1
+        x: int
+
+        for x in range(self.width):
+            if chars[x] != old_chars[x] or styles[x] != old_styles[x]:
+                if start < 0:
+                    start = x
+                elif x - last > GAP:
+                    runs.append((start, last + 1))
+                    start = x
+                last = x
+
+        if start >= 0:
+            runs.append((start, last + 1))
+        return runs
+
+    def diff(self, previous: Frame | None) -> str:
+        """Retourne ce qu'il faut écrire sur un terminal qui affiche `previous` pour qu'il affiche cet écran.
+
+        :param previous: L'écran affiché par le terminal, ou None s'il est inconnu (l'écran est alors effacé et
+                         entièrement redessiné)
+        :returns:        Le texte à écrire, séquences d'échappement comprises (vide si rien n'a changé)
+        """
+        parts: list[str] = []
+        style: str = ""
+        start: int
+        end: int
+        x: int
+        y: int
+
+        if previous is None or previous.width != self.width or previous.height != self.height:
+            parts.append("\x1b[0m\x1b[2J")
+            previous = Frame(self.width, self.height)
+            previous.cursor = not self.cursor
+
+        for y in range(self.height):
+            if self.chars[y] == previous.chars[y] and self.styles[y] == previous.styles[y]:
+                continue
+            for start, end in self.row_runs(y, previous):
+                parts.append(f"\x1b[{y + 1};{start + 1}H")
+                for x in range(start, end):
+                    if self.styles[y][x] != style:
+                        style = self.styles[y][x]
+                        parts.append(f"\x1b[0;{style}m" if style else "\x1b[0m")
+                    parts.append(self.chars[y][x])
+
+        if style:
+            parts.append("\x1b[0m")
+        if parts or (self.x, self.y) != (previous.x, previous.y):
+            parts.append(f"\x1b[{self.y};{self.x}H")
+        if self.cursor != previous.cursor:
+            parts.append("\x1b[?25h" if self.cursor else "\x1b[?25l")
+        return "".join(parts)
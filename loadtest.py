@@ -0,0 +1,428 @@
+"""Test de charge du serveur de parties en réseau: des milliers de bots jouent en même temps contre un serveur local.
+
+Le serveur (`server.py`, sans enregistrement des scores) est lancé dans son propre processus, sur un port libre de la
+machine. Chaque partie est jouée par deux clients, qui sont des bots des modules des jeux (voir `client.auto_move`):
+ils suivent la partie avec les règles de `sessions`, exactement comme `client.py`. Les clients sont répartis entre
+plusieurs processus, chacun avec sa boucle `asyncio`. Par exemple:
+
+    python3 loadtest.py --sessions 2000 --game pow4 --workers 4
+
+Toutes les parties commencent avant que le premier coup soit joué, pour mesurer la mémoire du serveur par partie
+en cours. Le bilan donne ensuite la latence des coups (entre l'envoi d'un coup et la réception de sa confirmation
+par le serveur, `MOVED`), médiane et 99e centile, et le nombre de coups joués par seconde.
+
+La latence mesurée comprend l'attente du client dans sa boucle: quand les bots réfléchissent longtemps (voir
+`--think`) ou que les processus des clients sont trop peu nombreux, ce sont les clients qui saturent, pas le serveur.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+from multiprocessing.queues import Queue
+from multiprocessing.synchronize import Barrier
+from pathlib import Path
+
+from client import auto_move, update
+from players import Bot
+from server import DEFAULT_HOST
+from sessions import GAMES, Rules, make_rules
+
+SERVER_PATH = Path(__file__).parent.resolve() / "server.py"
+# le temps laissé au serveur pour commencer à écouter, en secondes
+STARTUP_TIMEOUT = 10.0
+# le temps de réflexion par défaut des bots, en secondes (court, pour que ce soit le serveur qui soit mesuré)
+THINK_TIME = 0.001
+# la longueur maximum d'une ligne envoyée par le serveur, en octets
+MAX_LINE = 1 << 16
+
+
+class LoadResult:
+    """Le bilan d'un test de charge, ou de la part d'un processus de clients."""
+
+    __slots__ = ("sessions", "errors", "moves", "latencies", "duration", "memory")
+
+    # le nombre de parties jouées jusqu'au bout, et le nombre de parties interrompues par une erreur
+    sessions: int
+    errors: int
+    # le nombre de coups joués
+    moves: int
+    # la latence de chaque coup, en secondes
+    latencies: list[float]
+    # le temps passé à jouer (depuis le premier coup), en secondes
+    duration: float
+    # la mémoire occupée par le serveur pour les parties en cours, en octets
+    memory: int
+
+    def __init__(self) -> None:
+        """Crée un bilan vide."""
+        self.sessions = 0
+        self.errors = 0
+        self.moves = 0
+        self.latencies = []
+        self.duration = 0.0
+        self.memory = 0
+
+    def merge(self, other: LoadResult) -> None:
+        """Ajoute au bilan celui d'un processus de clients.
+
+        :param other: Le bilan du processus
+        """
+        self.sessions += other.sessions
+        self.errors += other.errors
+        self.moves += other.moves
+        self.latencies.extend(other.latencies)
+
+    def percentile(self, fraction: float) -> float:
+        """Retourne une latence telle qu'une proportion `fraction` des coups a été plus rapide.
+
+        :param fraction: La proportion, entre 0 et 1 (0.5 pour la médiane)
+        :returns:        La latence, en secondes (0 si aucun coup n'a été joué)
+        """
+        latencies: list[float] = sorted(self.latencies)
+
+        if not latencies:
+            return 0.0
+        return latencies[min(int(len(latencies) * fraction), len(latencies) - 1)]
+
+    def moves_per_second(self) -> float:
+        """Retourne le nombre de coups joués par seconde."""
+        return self.moves / self.duration if self.duration else 0.0
+
+
+def free_port(host: str) -> int:
+    """Retourne un port libre de la machine.
+
+    :param host: L'adresse sur laquelle le port doit être libre
+    :returns:    Le port
+    """
+    with socket.socket() as probe:
+        probe.bind((host, 0))
+        return probe.getsockname()[1]
+
+
+def start_server(host: str, port: int) -> subprocess.Popen[bytes]:
+    """Lance le serveur dans son propre processus, et attend qu'il accepte les connexions.
+
+    :param host: L'adresse sur laquelle le serveur écoute
+    :param port: Le port sur lequel le serveur écoute
+    :returns:    Le processus du serveur
+    :raises RuntimeError: Si le serveur n'écoute toujours pas après `STARTUP_TIMEOUT`
+    """
+    process: subprocess.Popen[bytes] = subprocess.Popen(
+        [sys.executable, str(SERVER_PATH), "--host", host, "-p", str(port), "--no-scores"]
+    )
+    deadline: float = time.monotonic() + STARTUP_TIMEOUT
+
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((host, port)).close()
+            return process
+        except ConnectionRefusedError:
+            time.sleep(0.05)
+
+    process.kill()
+    raise RuntimeError("le serveur n'a pas démarré")
+
+
+def server_memory(pid: int) -> int:
+    """Retourne la mémoire occupée par un processus (sa mémoire résidente, lue dans `/proc`).
+
+    :param pid: Le numéro du processus
+    :returns:   La mémoire, en octets
+    """
+    line: str
+
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+async def play_client(
+    host: str,
+    port: int,
+    name: str,
+    game: str,
+    think: float,
+    session_ids: asyncio.Queue[str],
+    creator: bool,
+    started: asyncio.Queue[None],
+    go: asyncio.Event,
+    result: LoadResult,
+) -> None:
+    """Joue une partie avec un bot, comme `client.play`, en mesurant la latence de chacun de ses coups.
+
+    :param host:        L'adresse du serveur
+    :param port:        Le port du serveur
+    :param name:        Le nom du client
+    :param game:        Le jeu
+    :param think:       Le temps de réflexion du bot par coup, en secondes
+    :param session_ids: La file où le client qui crée la partie dépose son identifiant, et où l'autre client le lit
+    :param creator:     Vrai pour le client qui crée la partie (le joueur 1), faux pour celui qui la rejoint
+    :param started:     La file où le client signale que sa partie a commencé (ou qu'elle ne commencera pas)
+    :param go:          L'évènement qui autorise le premier coup
+    :param result:      Le bilan, complété par le client
+    """
+    bot: Bot = Bot(1 if creator else 2, 0, duration=think)
+    reader: asyncio.StreamReader
+    writer: asyncio.StreamWriter | None = None
+    words: list[str] = []
+    rules: Rules
+    player: int
+    sent: float = 0.0
+    signalled: bool = False
+
+    async def receive() -> list[str]:
+        """Attend la prochaine ligne du serveur et retourne ses mots."""
+        line: bytes = await reader.readline()
+
+        if not line:
+            raise ConnectionError("connexion fermée par le serveur")
+        return line.decode().split()
+
+    try:
+        reader, writer = await asyncio.open_connection(host, port, limit=MAX_LINE)
+        writer.write(f"HELLO {name}\n".encode())
+        await receive()
+        if creator:
+            writer.write(f"NEW {game} 0\n".encode())
+            words = await receive()
+            session_ids.put_nowait(words[1])
+            words = await receive()
+        else:
+            writer.write(f"JOIN {await session_ids.get()}\n".encode())
+            words = await receive()
+        if words[0] != "START":
+            raise ConnectionError(" ".join(words))
+
+        player = int(words[1])
+        rules = make_rules(words[2], [int(word) for word in words[6:]])
+        started.put_nowait(None)
+        signalled = True
+        await go.wait()
+
+        while True:
+            if rules.result() is None and rules.turn() == player:
+                words = ["MOVE", *map(str, auto_move(bot, rules))]
+                sent = time.perf_counter()
+                writer.write(" ".join(words).encode() + b"\n")
+
+            words = await receive()
+            if words[0] == "END":
+                break
+            if words[0] != "MOVED":
+                raise ConnectionError(" ".join(words))
+            if int(words[1]) == player:
+                result.latencies.append(time.perf_counter() - sent)
+                result.moves += 1
+            update(bot, rules, int(words[1]), [int(word) for word in words[2:]])
+
+        if creator:
+            result.sessions += 1
+    except (OSError, ValueError, IndexError):
+        if creator:
+            result.errors += 1
+            if session_ids.empty():
+                # l'autre client ne doit pas attendre une partie qui ne sera jamais créée
+                session_ids.put_nowait("0")
+    finally:
+        if not signalled:
+            started.put_nowait(None)
+        if writer is not None:
+            writer.close()
+
+
+async def run_clients(
+    host: str, port: int, sessions: int, games: list[str], think: float, worker: int, barrier: Barrier
+) -> LoadResult:
+    """Joue les parties d'un processus de clients.
+
+    :param host:     L'adresse du serveur
+    :param port:     Le port du serveur
+    :param sessions: Le nombre de parties à jouer
+    :param games:    Les jeux, joués à tour de rôle d'une partie à l'autre
+    :param think:    Le temps de réflexion des bots par coup, en secondes
+    :param worker:   Le numéro du processus (pour le nom des clients)
+    :param barrier:  La barrière franchie une première fois quand toutes les parties ont commencé, puis une deuxième
+                     fois pour que les clients commencent à jouer
+    :returns:        Le bilan des parties du processus
+    """
+    result: LoadResult = LoadResult()
+    started: asyncio.Queue[None] = asyncio.Queue()
+    go: asyncio.Event = asyncio.Event()
+    tasks: list[asyncio.Task[None]] = []
+    session_ids: asyncio.Queue[str]
+    creator: bool
+    i: int
+
+    for i in range(sessions):
+        session_ids = asyncio.Queue()
+        for creator in (True, False):
+            tasks.append(
+                asyncio.create_task(
+                    play_client(
+                        host,
+                        port,
+                        f"Bot_{worker}_{i}_{2 - creator}",
+                        games[i % len(games)],
+                        think,
+                        session_ids,
+                        creator,
+                        started,
+                        go,
+                        result,
+                    )
+                )
+            )
+
+    for _ in tasks:
+        await started.get()
+
+    await asyncio.to_thread(barrier.wait)
+    await asyncio.to_thread(barrier.wait)
+    go.set()
+    await asyncio.gather(*tasks)
+    return result
+
+
+def run_worker(
+    host: str,
+    port: int,
+    sessions: int,
+    games: list[str],
+    think: float,
+    worker: int,
+    barrier: Barrier,
+    results: Queue[LoadResult],
+) -> None:
+    """Le point d'entrée d'un processus de clients (voir `run_clients`): dépose son bilan dans `results`."""
+    result: LoadResult = LoadResult()
+
+    try:
+        result = asyncio.run(run_clients(host, port, sessions, games, think, worker, barrier))
+    except BaseException:
+        # le processus principal ne doit pas attendre indéfiniment un processus qui a échoué
+        barrier.abort()
+        raise
+    finally:
+        results.put(result)
+
+
+def run_load(host: str, sessions: int, games: list[str], *, think: float = THINK_TIME, workers: int = 1) -> LoadResult:
+    """Lance un serveur local et y fait jouer `sessions` parties en même temps.
+
+    :param host:     L'adresse sur laquelle le serveur écoute
+    :param sessions: Le nombre de parties
+    :param games:    Les jeux, joués à tour de rôle d'une partie à l'autre
+    :param think:    Le temps de réflexion des bots par coup, en secondes
+    :param workers:  Le nombre de processus de clients
+    :returns:        Le bilan du test
+    """
+    port: int = free_port(host)
+    server: subprocess.Popen[bytes]
+    barrier: Barrier = multiprocessing.Barrier(workers + 1)
+    results: Queue[LoadResult] = multiprocessing.Queue()
+    processes: list[multiprocessing.Process]
+    result: LoadResult = LoadResult()
+    idle: int
+    start: float
+    worker: int
+
+    # chaque partie ouvre deux connexions, dans le processus des clients comme dans celui du serveur
+    resource.setrlimit(resource.RLIMIT_NOFILE, (resource.getrlimit(resource.RLIMIT_NOFILE)[1],) * 2)
+
+    server = start_server(host, port)
+    try:
+        idle = server_memory(server.pid)
+        processes = [
+            multiprocessing.Process(
+                target=run_worker,
+                args=(host, port, sessions // workers + (worker < sessions % workers), games, think, worker, barrier),
+                kwargs={"results": results},
+            )
+            for worker in range(workers)
+        ]
+        for process in processes:
+            process.start()
+
+        # toutes les parties ont commencé et attendent leur premier coup
+        barrier.wait()
+        result.memory = server_memory(server.pid) - idle
+        start = time.perf_counter()
+        barrier.wait()
+
+        for _ in processes:
+            result.merge(results.get())
+        result.duration = time.perf_counter() - start
+        for process in processes:
+            process.join()
+    finally:
+        server.terminate()
+        server.wait()
+
+    return result
+
+
+def format_result(result: LoadResult) -> list[str]:
+    """Met en forme le bilan d'un test de charge.
+
+    :param result: Le bilan
+    :returns:      Les lignes à afficher
+    """
+    started: int = result.sessions + result.errors
+
+    return [
+        f"Parties jouées:        {result.sessions} ({result.errors} interrompues par une erreur)",
+        f"Coups joués:           {result.moves} en {result.duration:.2f} s",
+        f"Débit:                 {result.moves_per_second():.0f} coups par seconde",
+        f"Latence des coups:     {result.percentile(0.5) * 1000:.2f} ms (médiane), "
+        + f"{result.percentile(0.99) * 1000:.2f} ms (99e centile)",
+        f"Mémoire du serveur:    {result.memory / max(started, 1) / 1024:.1f} Ko par partie "
+        + f"({result.memory / 1024 / 1024:.1f} Mo pour {started} parties)",
+    ]
+
+
+def main() -> None:
+    """Lit les arguments de la ligne de commande, lance le test de charge et affiche son bilan."""
+    parser: argparse.ArgumentParser
+    args: argparse.Namespace
+    line: str
+
+    parser = argparse.ArgumentParser(description="Fait jouer des milliers de bots contre un serveur local.")
+    parser.add_argument("-n", "--sessions", type=int, default=1000, help="le nombre de parties jouées en même temps")
+    parser.add_argument(
+        "-g", "--game", choices=GAMES + ("all",), default="all", help="le jeu (all: tous les jeux à tour de rôle)"
+    )
+    parser.add_argument(
+        "-t", "--think", type=float, default=THINK_TIME, help="le temps de réflexion des bots par coup, en secondes"
+    )
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count(), help="le nombre de processus de clients")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="l'adresse sur laquelle le serveur écoute")
+    args = parser.parse_args()
+
+    if args.sessions < 1 or args.workers < 1:
+        parser.error("il faut au moins une partie et un processus")
+
+    for line in format_result(
+        run_load(
+            args.host,
+            args.sessions,
+            list(GAMES) if args.game == "all" else [args.game],
+            think=args.think,
+            workers=min(args.workers, args.sessions),
+        )
+    ):
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
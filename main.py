@@ -3,17 +3,16 @@
 
 from __future__ import annotations
 
-import sys
-from typing import Any
-
 import allumettes
 import display
+import metrics
 import morpion
 import plus_minus
 import pow4
 import terminal
+import tracing
 from display import center, display_at, print_at
-from players import get_display_name
+from players import Player
 from terminal import bold, get_key, gray, green, invert, strip_escapes
 
 SCOREBOARD_WIDTH = 40
@@ -135,7 +134,7 @@ def display_main_menu(options: list[str], selected: int) -> None:
             print_at(x - 2, y + i, green("> ") + invert(line.center(max_width)) + green(" <"))
         else:
             print_at(x, y + i, line.center(max_width))
-    print(end="", flush=True)
+    terminal.flush()
 
 
 def main_menu(options: list[str]) -> int:
@@ -162,30 +161,30 @@ def main_menu(options: list[str]) -> int:
             return selected
 
 
-def login_screen(player: str, player1: str | None = None) -> str:
+def login_screen(player: str, player1: Player | None = None) -> Player:
     """Demande à un joueur d'entrer son nom.
 
     :param player:  Le joueur pour lequel on demande le nom (e.g "Joueur 1")
-    :param player1: Si précisé, le nom du joueur 1. Ce nom ne pourra pas être réutilisé
-    :returns:       Le nom que le joueur à choisis
+    :param player1: Si précisé, le joueur 1. Son nom ne pourra pas être réutilisé
+    :returns:       Le joueur (ou le bot) qui a été choisi
     """
     if player1 is None:
         return display.prompt_player(f"NOM DU {bold(player)}", invalid=[])
     else:
-        return display.prompt_player(f"NOM DU {bold(player)}", invalid=[player1])
+        return display.prompt_player(f"NOM DU {bold(player)}", invalid=[player1.name])
 
 
-def get_player_roles(question: str, player1: str, player2: str, rules: list[str]) -> tuple[str, str]:
+def get_player_roles(question: str, player1: Player, player2: Player, rules: list[str]) -> tuple[Player, Player] | None:
     """Obtient les rôles des joueurs.
 
     :param question: La question a afficher (quel rôle est en train d'être choisi)
-    :param player1:  Le nom du joueur 1 (l'ordre n'a pas d'importance)
-    :param player2:  Le nom du joueur 2
+    :param player1:  Le joueur 1 (l'ordre n'a pas d'importance)
+    :param player2:  Le joueur 2
     :param rules:    Les règles du jeu pour lequel un rôle est en train d'être choisi
-    :returns:   Le joueur qui à été selectionné en premier et l'autre en deuxième. Si l'utilisateur est revenu au menu principal ("", "") sera retourné.
+    :returns:   Le joueur qui à été selectionné en premier et l'autre en deuxième. Si l'utilisateur est revenu au menu principal None sera retourné.
     """
-    p1: str
-    p2: str
+    p1: Player
+    p2: Player
     content: list[str]
     width: int
     height: int
@@ -198,8 +197,8 @@ def get_player_roles(question: str, player1: str, player2: str, rules: list[str]
     content = [bold(question), "", ""]
 
     while True:
-        content[1] = get_display_name(p1)
-        content[2] = get_display_name(p2)
+        content[1] = p1.display_name
+        content[2] = p2.display_name
 
         if player1 == p1:
             content[1] = "\b\b" + green("> ") + invert(content[1])
@@ -214,13 +213,13 @@ def get_player_roles(question: str, player1: str, player2: str, rules: list[str]
         for i, line in enumerate(rules):
             print_at(center(len(line), width), y + i, line)
 
-        print("", end="", flush=True)
+        terminal.flush()
 
         key = get_key()
         if key in ("UP", "DOWN"):
             player1, player2 = player2, player1
         elif key == "q":
-            return ("", "")
+            return None
         elif key == "\n":
             return player1, player2
 
@@ -230,10 +229,9 @@ def real_main() -> None:
 
     Pour chaque jeu cette fonction demandera aussi le rôle de chaque joueur.
     """
-    player1: str
-    player2: str
-    role1: str
-    role2: str
+    player1: Player
+    player2: Player
+    roles: tuple[Player, Player] | None
     selection: int
 
     player1 = login_screen("JOUEUR 1")
@@ -242,36 +240,37 @@ def real_main() -> None:
     while True:
         selection = main_menu(["PLUS OU MOINS", "ALLUME-LE", "MORPION", "PUISSANCE 4", "QUITTER"])
         if selection == 0:
-            role1, role2 = get_player_roles("Qui fera deviner à l'autre ?", player1, player2, plus_minus.RULES)
-            if role1 == "":
+            roles = get_player_roles("Qui fera deviner à l'autre ?", player1, player2, plus_minus.RULES)
+            if roles is None:
                 continue
-            plus_minus.game(role1, role2)
+            plus_minus.game(*roles)
         elif selection == 1:
-            role1, role2 = get_player_roles("Qui commence ?", player1, player2, allumettes.RULES)
-            if role1 == "":
+            roles = get_player_roles("Qui commence ?", player1, player2, allumettes.RULES)
+            if roles is None:
                 continue
-            allumettes.game(role1, role2)
+            allumettes.game(*roles)
         elif selection == 2:
-            role1, role2 = get_player_roles("Qui commence ?", player1, player2, morpion.RULES)
-            if role1 == "":
+            roles = get_player_roles("Qui commence ?", player1, player2, morpion.RULES)
+            if roles is None:
                 continue
-            morpion.game(role1, role2)
+            morpion.game(*roles)
         elif selection == 3:
-            role1, role2 = get_player_roles("Qui commence ?", player1, player2, pow4.RULES)
-            if role1 == "":
+            roles = get_player_roles("Qui commence ?", player1, player2, pow4.RULES)
+            if roles is None:
                 continue
-            pow4.game(role1, role2)
+            pow4.game(*roles)
         elif selection in (-1, 4):
             break
 
 
 def main() -> None:
     """Cette fonction passe le terminal en mode "raw" et appelle `real_main`, puis repasse le terminal en mode normal avant la fin du programme."""
-    screen: int
-    mode: list[Any]
+    console: terminal.Console
 
-    screen = sys.stdin.fileno()
-    mode = terminal.make_raw(screen)
+    metrics.setup_from_environment()
+    tracing.setup_from_environment()
+    console = terminal.get_console()
+    console.make_raw()
 
     # the try-except is here to make sure that the terminal
     # don't stay in "raw" mode when our program exits, even
@@ -282,7 +281,8 @@ def main() -> None:
         terminal.set_cursor(0, 0)
         terminal.show_cursor()
         terminal.clear()
-        terminal.restore(screen, mode)
+        terminal.flush()
+        console.restore()
 
 
 if __name__ == "__main__":
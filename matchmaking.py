@@ -0,0 +1,281 @@
+"""Recherche d'adversaires: les joueurs qui attendent une partie en réseau sont appariés par jeu et par niveau.
+
+Le niveau d'un joueur vient des tableaux des scores (voir `load_ratings`): c'est un nombre entre 0 et 100, 50 pour
+un joueur qui n'a encore jamais joué. Chaque file d'attente (un jeu et une variante) range ses joueurs dans des seaux
+de `BUCKET_WIDTH` points de niveau, et garde la liste triée des seaux qui ne sont pas vides: trouver l'adversaire le
+plus proche ne demande qu'une recherche dichotomique dans cette liste, puis l'examen des seaux voisins. Dans un seau,
+c'est le joueur qui attend depuis le plus longtemps qui est choisi.
+
+Un joueur n'est d'abord apparié qu'à des adversaires de niveau très proche, puis l'écart accepté grandit avec son
+temps d'attente (voir `window`), jusqu'à accepter n'importe quel adversaire. Par exemple:
+
+    matchmaker = Matchmaker()
+    matchmaker.enqueue("alice", "alice", "pow4", 0, 62.0, 0.0)  # None: personne n'attend
+    matchmaker.enqueue("bob", "bob", "pow4", 0, 30.0, 1.0)      # None: trop loin pour l'instant
+    matchmaker.tick(20.0)                                       # [(ticket d'alice, ticket de bob)]
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left, insort
+from collections.abc import Hashable
+
+import allumettes
+import morpion
+import plus_minus
+import pow4
+from scores import get_scores
+
+# le niveau d'un joueur qui n'a pas encore de score
+DEFAULT_RATING = 50.0
+# la largeur d'un seau, en points de niveau
+BUCKET_WIDTH = 2.0
+# l'écart de niveau accepté au début de l'attente, en points, puis l'augmentation de cet écart par seconde
+# d'attente, et l'écart maximum (qui accepte tous les adversaires)
+BASE_WINDOW = 4.0
+WIDEN_RATE = 2.0
+MAX_WINDOW = 100.0
+# le tableau des scores de chaque jeu
+SCOREBOARDS = {
+    "allumettes": allumettes.SCOREBOARD,
+    "morpion": morpion.SCOREBOARD,
+    "plus_minus": plus_minus.SCOREBOARD,
+    "pow4": pow4.SCOREBOARD,
+}
+
+
+def load_ratings(game: str) -> dict[str, float]:
+    """Calcule le niveau des joueurs d'un jeu à partir de son tableau des scores.
+
+    Pour les jeux à deux joueurs, c'est le pourcentage de victoires, compté comme si chaque joueur avait aussi
+    gagné une partie et perdu une autre (pour qu'une seule victoire ne donne pas 100). Au plus ou moins, où un
+    score plus petit est meilleur, c'est 100 moins le score moyen du joueur.
+
+    :param game: Le nom du jeu (une clé de `SCOREBOARDS`)
+    :returns:    Le niveau de chaque joueur qui a un score
+    """
+    ratings: dict[str, float] = {}
+    totals: dict[str, list[float]] = {}
+    name: str
+    numbers: list[float]
+
+    if game == "plus_minus":
+        for name, numbers in get_scores(SCOREBOARDS[game]):
+            totals.setdefault(name, [0.0, 0.0])
+            totals[name][0] += numbers[0]
+            totals[name][1] += 1
+        for name, numbers in totals.items():
+            ratings[name] = min(max(100.0 - numbers[0] / numbers[1], 0.0), 100.0)
+    else:
+        for name, numbers in get_scores(SCOREBOARDS[game]):
+            ratings[name] = (numbers[0] + 1) / (numbers[1] + 2) * 100.0
+
+    return ratings
+
+
+def window(waited: float) -> float:
+    """Retourne l'écart de niveau accepté pour un joueur qui attend depuis `waited` secondes.
+
+    :param waited: Le temps d'attente, en secondes
+    :returns:      L'écart, en points de niveau
+    """
+    return min(BASE_WINDOW + WIDEN_RATE * waited, MAX_WINDOW)
+
+
+class Ticket:
+    """Un joueur qui attend un adversaire."""
+
+    __slots__ = ("player", "name", "game", "variant", "rating", "bucket", "since")
+
+    # le joueur (par exemple sa connexion au serveur), et son nom (deux joueurs du même nom ne sont pas appariés)
+    player: Hashable
+    name: str
+    # le jeu et l'indice de sa variante
+    game: str
+    variant: int
+    # le niveau du joueur, et le seau où il est rangé
+    rating: float
+    bucket: int
+    # le moment où le joueur a commencé à attendre, en secondes
+    since: float
+
+    def __init__(self, player: Hashable, name: str, game: str, variant: int, rating: float, since: float) -> None:
+        """Crée le ticket d'un joueur qui commence à attendre.
+
+        :param player:  Le joueur
+        :param name:    Son nom
+        :param game:    Le jeu
+        :param variant: L'indice de la variante
+        :param rating:  Le niveau du joueur
+        :param since:   Le moment présent, en secondes
+        """
+        self.player = player
+        self.name = name
+        self.game = game
+        self.variant = variant
+        self.rating = rating
+        self.bucket = int(rating // BUCKET_WIDTH)
+        self.since = since
+
+
+class RatingQueue:
+    """Les joueurs qui attendent pour un jeu et une variante, rangés par seaux de niveau."""
+
+    __slots__ = ("buckets", "keys")
+
+    # les tickets de chaque seau qui n'est pas vide, du plus ancien au plus récent
+    buckets: dict[int, dict[Hashable, Ticket]]
+    # les seaux qui ne sont pas vides, triés
+    keys: list[int]
+
+    def __init__(self) -> None:
+        """Crée une file vide."""
+        self.buckets = {}
+        self.keys = []
+
+    def __len__(self) -> int:
+        """Retourne le nombre de joueurs qui attendent."""
+        return sum(len(bucket) for bucket in self.buckets.values())
+
+    def add(self, ticket: Ticket) -> None:
+        """Ajoute un joueur à la file.
+
+        :param ticket: Son ticket
+        """
+        if ticket.bucket not in self.buckets:
+            self.buckets[ticket.bucket] = {}
+            insort(self.keys, ticket.bucket)
+        self.buckets[ticket.bucket][ticket.player] = ticket
+
+    def remove(self, ticket: Ticket) -> None:
+        """Retire un joueur de la file.
+
+        :param ticket: Son ticket
+        """
+        bucket: dict[Hashable, Ticket] = self.buckets[ticket.bucket]
+
+        del bucket[ticket.player]
+        if not bucket:
+            del self.buckets[ticket.bucket]
+            del self.keys[bisect_left(self.keys, ticket.bucket)]
+
+    def find(self, ticket: Ticket, gap: float) -> Ticket | None:
+        """Cherche l'adversaire le plus proche en niveau d'un joueur.
+
+        Les seaux sont examinés du plus proche au plus éloigné de celui du joueur, et seul le joueur qui attend depuis
+        le plus longtemps de chaque seau est candidat.
+
+        :param ticket: Le ticket du joueur (qui peut être dans la file ou non)
+        :param gap:    L'écart de niveau accepté
+        :returns:      Le ticket de l'adversaire, ou None si aucun n'est assez proche
+        """
+        index: int = bisect_left(self.keys, ticket.bucket)
+        below: int = index - 1
+        above: int = index
+        key: int
+        candidate: Ticket
+
+        while below >= 0 or above < len(self.keys):
+            # le seau le plus proche parmi les deux voisins pas encore examinés
+            if above >= len(self.keys) or (
+                below >= 0 and ticket.bucket - self.keys[below] <= self.keys[above] - ticket.bucket
+            ):
+                key = self.keys[below]
+                below -= 1
+            else:
+                key = self.keys[above]
+                above += 1
+
+            if (abs(key - ticket.bucket) - 1) * BUCKET_WIDTH > gap:
+                # les seaux suivants sont encore plus loin
+                return None
+            for candidate in self.buckets[key].values():
+                if candidate.player != ticket.player and candidate.name != ticket.name:
+                    if abs(candidate.rating - ticket.rating) <= gap:
+                        return candidate
+                    break
+
+        return None
+
+
+class Matchmaker:
+    """Les files d'attente de tous les jeux."""
+
+    __slots__ = ("queues", "tickets")
+
+    # la file de chaque jeu et variante
+    queues: dict[tuple[str, int], RatingQueue]
+    # le ticket de chaque joueur qui attend, du plus ancien au plus récent
+    tickets: dict[Hashable, Ticket]
+
+    def __init__(self) -> None:
+        """Crée des files vides."""
+        self.queues = {}
+        self.tickets = {}
+
+    def waiting(self, player: Hashable) -> bool:
+        """Retourne vrai si le joueur attend un adversaire.
+
+        :param player: Le joueur
+        """
+        return player in self.tickets
+
+    def enqueue(
+        self, player: Hashable, name: str, game: str, variant: int, rating: float, now: float
+    ) -> tuple[Ticket, Ticket] | None:
+        """Cherche un adversaire à un joueur, et le fait attendre s'il n'y en a pas d'assez proche.
+
+        :param player:  Le joueur (qui ne doit pas déjà attendre)
+        :param name:    Son nom
+        :param game:    Le jeu
+        :param variant: L'indice de la variante
+        :param rating:  Le niveau du joueur
+        :param now:     Le moment présent, en secondes
+        :returns:       Le ticket de l'adversaire (qui attendait déjà) puis celui du joueur, ou None si le joueur
+                        attend
+        """
+        ticket: Ticket = Ticket(player, name, game, variant, rating, now)
+        queue: RatingQueue = self.queues.setdefault((game, variant), RatingQueue())
+        opponent: Ticket | None = queue.find(ticket, window(0.0))
+
+        if opponent is not None:
+            self.cancel(opponent.player)
+            return opponent, ticket
+
+        queue.add(ticket)
+        self.tickets[player] = ticket
+        return None
+
+    def cancel(self, player: Hashable) -> None:
+        """Arrête l'attente d'un joueur (s'il attendait).
+
+        :param player: Le joueur
+        """
+        ticket: Ticket | None = self.tickets.pop(player, None)
+
+        if ticket is not None:
+            self.queues[ticket.game, ticket.variant].remove(ticket)
+
+    def tick(self, now: float) -> list[tuple[Ticket, Ticket]]:
+        """Élargit l'écart accepté pour les joueurs qui attendent, et apparie ceux qui peuvent l'être.
+
+        Les joueurs qui attendent depuis le plus longtemps choisissent leur adversaire en premier.
+
+        :param now: Le moment présent, en secondes
+        :returns:   Les paires formées, le joueur qui attendait depuis le plus longtemps en premier
+        """
+        pairs: list[tuple[Ticket, Ticket]] = []
+        ticket: Ticket
+        opponent: Ticket | None
+
+        for ticket in list(self.tickets.values()):
+            if ticket.player not in self.tickets:
+                # déjà choisi comme adversaire pendant ce tour
+                continue
+            opponent = self.queues[ticket.game, ticket.variant].find(ticket, window(now - ticket.since))
+            if opponent is not None:
+                self.cancel(ticket.player)
+                self.cancel(opponent.player)
+                pairs.append((ticket, opponent))
+
+        return pairs
@@ -0,0 +1,301 @@
+"""Recherche arborescente de Monte-Carlo (UCT), utilisable par tous les jeux à deux joueurs du projet.
+
+La recherche ne connaît pas les règles des jeux: elle manipule une "position" qui doit offrir les mêmes attributs et
+méthodes que `board.Grid` (morpion), `board.DropGrid` (puissance 4) ou `allumettes.Heaps`:
+
+- `turn`: le joueur dont c'est le tour (1 ou 2)
+- `key`: une clé qui identifie la position (pour retrouver la position dans l'arbre d'un coup à l'autre)
+- `legal_moves()`: la liste des coups possibles
+- `random_move()`: un coup possible tiré au hasard
+- `play(move)` et `undo()`: jouer un coup et annuler le dernier coup joué
+- `result()`: le gagnant (1 ou 2), 0 pour une égalité, ou None si la partie n'est pas terminée
+
+Les nœuds de l'arbre sont stockés dans une réserve (`NodePool`) dont les emplacements libérés sont réutilisés, et
+l'arbre est gardé d'un coup à l'autre: la recherche suivante repart du nœud de la position atteinte.
+"""
+
+from __future__ import annotations
+
+import math
+import random
+import time
+from typing import Any, Callable
+
+# le poids de l'exploration dans la formule UCT (√2 en théorie)
+EXPLORATION = 1.4
+# le nombre de coups au-delà duquel une partie aléatoire est arrêtée et comptée comme une égalité
+ROLLOUT_LIMIT = 10_000
+# la profondeur (en demi-coups) à laquelle la position actuelle est cherchée dans l'arbre de la recherche précédente
+REUSE_DEPTH = 2
+
+# une position de jeu (voir la description du module)
+Position = Any
+
+
+class NodePool:
+    """Les nœuds d'un arbre de recherche, stockés dans des listes parallèles.
+
+    Un nœud est un indice dans ces listes. Les nœuds libérés sont réutilisés par les nœuds suivants, ce qui évite
+    de recréer des objets à chaque coup.
+    """
+
+    __slots__ = ("parent", "move", "player", "key", "children", "untried", "visits", "wins", "free")
+
+    # le parent de chaque nœud (-1 pour la racine)
+    parent: list[int]
+    # le coup qui mène au nœud depuis son parent
+    move: list[Any]
+    # le joueur qui a joué ce coup
+    player: list[int]
+    # la clé de la position du nœud
+    key: list[int]
+    # les enfants déjà développés de chaque nœud
+    children: list[list[int]]
+    # les coups du nœud qui n'ont pas encore d'enfant (None tant qu'ils n'ont pas été calculés)
+    untried: list[list[Any] | None]
+    # le nombre de parties passées par le nœud, et le nombre de points qu'y a marqués `player`
+    visits: list[int]
+    wins: list[float]
+    # les nœuds libres
+    free: list[int]
+
+    def __init__(self) -> None:
+        """Crée une réserve vide."""
+        self.parent = []
+        self.move = []
+        self.player = []
+        self.key = []
+        self.children = []
+        self.untried = []
+        self.visits = []
+        self.wins = []
+        self.free = []
+
+    def __len__(self) -> int:
+        """Retourne le nombre de nœuds utilisés."""
+        return len(self.parent) - len(self.free)
+
+    def new(self, parent: int, move: Any, player: int, key: int) -> int:
+        """Crée un nœud.
+
+        :param parent: Le parent du nœud (-1 pour une racine)
+        :param move:   Le coup qui mène au nœud
+        :param player: Le joueur qui a joué ce coup
+        :param key:    La clé de la position du nœud
+        :returns:      Le nœud
+        """
+        node: int
+
+        if self.free:
+            node = self.free.pop()
+            self.parent[node] = parent
+            self.move[node] = move
+            self.player[node] = player
+            self.key[node] = key
+            self.children[node] = []
+            self.untried[node] = None
+            self.visits[node] = 0
+            self.wins[node] = 0.0
+        else:
+            node = len(self.parent)
+            self.parent.append(parent)
+            self.move.append(move)
+            self.player.append(player)
+            self.key.append(key)
+            self.children.append([])
+            self.untried.append(None)
+            self.visits.append(0)
+            self.wins.append(0.0)
+
+        if parent >= 0:
+            self.children[parent].append(node)
+        return node
+
+    def release(self, node: int) -> None:
+        """Libère un nœud et tous ses descendants.
+
+        :param node: Le nœud
+        """
+        stack: list[int] = [node]
+
+        while stack:
+            node = stack.pop()
+            stack.extend(self.children[node])
+            self.children[node] = []
+            self.untried[node] = None
+            self.move[node] = None
+            self.free.append(node)
+
+
+class Tree:
+    """Un arbre de recherche, gardé d'un coup à l'autre."""
+
+    __slots__ = ("pool", "root")
+
+    # les nœuds de l'arbre
+    pool: NodePool
+    # la racine de l'arbre (-1 si l'arbre est vide)
+    root: int
+
+    def __init__(self) -> None:
+        """Crée un arbre vide."""
+        self.pool = NodePool()
+        self.root = -1
+
+    def find(self, key: int) -> int:
+        """Cherche la position de clé `key` parmi les descendants proches de la racine.
+
+        :param key: La clé de la position
+        :returns:   Le nœud de la position, ou -1 s'il n'est pas dans l'arbre
+        """
+        level: list[int] = [self.root]
+        node: int
+
+        for _ in range(REUSE_DEPTH + 1):
+            for node in level:
+                if self.pool.key[node] == key:
+                    return node
+            level = [child for node in level for child in self.pool.children[node]]
+        return -1
+
+    def reroot(self, position: Position) -> None:
+        """Place la racine de l'arbre sur la position actuelle, en gardant ce qui a déjà été exploré si possible.
+
+        :param position: La position actuelle
+        """
+        pool: NodePool = self.pool
+        node: int = -1
+
+        if self.root >= 0:
+            node = self.find(position.key)
+            if node == self.root:
+                return
+            if node >= 0:
+                # détache le nœud de son parent pour qu'il ne soit pas libéré avec le reste de l'arbre
+                pool.children[pool.parent[node]].remove(node)
+                pool.parent[node] = -1
+            pool.release(self.root)
+
+        self.root = node if node >= 0 else pool.new(-1, None, 3 - position.turn, position.key)
+
+    def select(self, position: Position) -> tuple[int, int]:
+        """Descend dans l'arbre depuis la racine en suivant la formule UCT, puis ajoute un enfant à la feuille atteinte.
+
+        Les coups de la descente sont joués sur `position`: il faut les annuler une fois la partie évaluée.
+
+        :param position: La position de la racine
+        :returns:        Le nœud atteint, et le nombre de coups joués pour l'atteindre
+        """
+        pool: NodePool = self.pool
+        node: int = self.root
+        depth: int = 0
+        untried: list[Any] | None
+        move: Any
+        log_visits: float
+
+        while position.result() is None:
+            untried = pool.untried[node]
+            if untried is None:
+                untried = pool.untried[node] = position.legal_moves()
+                random.shuffle(untried)
+
+            if untried:
+                move = untried.pop()
+                position.play(move)
+                return pool.new(node, move, 3 - position.turn, position.key), depth + 1
+
+            log_visits = math.log(max(pool.visits[node], 1))
+            node = max(
+                pool.children[node],
+                key=lambda child: pool.wins[child] / max(pool.visits[child], 1)
+                + EXPLORATION * math.sqrt(log_visits / max(pool.visits[child], 1)),
+            )
+            position.play(pool.move[node])
+            depth += 1
+
+        return node, depth
+
+    def update(self, node: int, winner: int) -> None:
+        """Remonte le résultat d'une partie depuis un nœud jusqu'à la racine.
+
+        :param node:   Le nœud où la partie a commencé
+        :param winner: Le gagnant de la partie (1 ou 2, 0 pour une égalité)
+        """
+        pool: NodePool = self.pool
+
+        while node >= 0:
+            pool.visits[node] += 1
+            if winner == 0:
+                pool.wins[node] += 0.5
+            elif winner == pool.player[node]:
+                pool.wins[node] += 1.0
+            node = pool.parent[node]
+
+    def best_move(self) -> Any:
+        """Retourne le coup le plus exploré depuis la racine (None si la racine n'a pas d'enfant)."""
+        pool: NodePool = self.pool
+
+        if not pool.children[self.root]:
+            return None
+        return pool.move[max(pool.children[self.root], key=lambda child: pool.visits[child])]
+
+
+def rollout(position: Position) -> int:
+    """Termine la partie au hasard, puis remet la position dans son état initial.
+
+    :param position: La position
+    :returns:        Le gagnant de la partie (1 ou 2, 0 pour une égalité)
+    """
+    played: int = 0
+    result: int | None = position.result()
+
+    while result is None and played < ROLLOUT_LIMIT:
+        position.play(position.random_move())
+        played += 1
+        result = position.result()
+
+    for _ in range(played):
+        position.undo()
+
+    return 0 if result is None else result
+
+
+def search(
+    position: Position,
+    tree: Tree,
+    playouts: int,
+    *,
+    deadline: float | None = None,
+    check: Callable[[], None] | None = None,
+) -> Any:
+    """Cherche le meilleur coup par une recherche de Monte-Carlo.
+
+    Les parties déjà jouées depuis la position lors des recherches précédentes comptent dans le budget: si le bot
+    a assez réfléchi pendant le tour de l'humain (voir `ponder`), il joue immédiatement.
+
+    :param position: La position actuelle (elle est modifiée pendant la recherche puis remise dans son état initial)
+    :param tree:     L'arbre de la recherche précédente (il est mis à jour)
+    :param playouts: Le nombre de parties aléatoires à jouer
+    :param deadline: L'instant (selon `time.monotonic`) auquel la recherche doit s'arrêter, None pour aucune limite
+                     (une première partie est jouée même si l'échéance est déjà passée)
+    :param check:    Si précisée, une fonction appelée avant chaque partie (voir `ponder.Ponderer.check`)
+    :returns:        Le coup à jouer
+    """
+    played: int
+    node: int
+    depth: int
+
+    tree.reroot(position)
+    played = tree.pool.visits[tree.root]
+
+    # tant que la racine n'a pas d'enfant, il n'y a pas de coup à retourner: l'échéance ne compte qu'ensuite
+    while played < playouts and (deadline is None or time.monotonic() < deadline or not tree.pool.children[tree.root]):
+        if check is not None:
+            check()
+        node, depth = tree.select(position)
+        tree.update(node, rollout(position))
+        for _ in range(depth):
+            position.undo()
+        played += 1
+
+    return tree.best_move()
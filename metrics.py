@@ -0,0 +1,305 @@
+"""Mesures des chemins critiques du programme, exportées au format texte de Prometheus.
+
+Les mesures sont désactivées par défaut: chaque point de mesure ne coûte alors qu'un test de `ENABLED`. Elles sont
+activées par des variables d'environnement, lues au lancement de l'interface (voir `setup_from_environment`):
+
+    S101_METRICS_PORT=9101 python3 main.py                  # http://127.0.0.1:9101/metrics
+    S101_METRICS_FILE=/var/lib/node_exporter/s101.prom python3 main.py
+
+Le fichier est réécrit toutes les `FILE_INTERVAL` secondes, à la réception du signal SIGUSR1 et à la fin du
+programme. Les mesures sont rangées dans des histogrammes à seaux fixes (voir `METRICS`):
+
+  - le temps passé à dessiner un écran et le nombre d'octets écrits pour le dessiner (`display.screen`),
+  - le temps entre la lecture d'une touche (`terminal.get_key`) et l'affichage suivant (`terminal.flush`),
+  - le temps de réflexion des bots, par jeu et par niveau de difficulté (`bots.play`),
+  - le temps de lecture et d'écriture des tableaux des scores (`scores`).
+"""
+
+from __future__ import annotations
+
+import atexit
+import os
+import signal
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# vrai si les mesures sont enregistrées (à ne changer qu'avec `enable` et `disable`)
+ENABLED: bool = False
+
+# le préfixe du nom des mesures exportées
+PREFIX = "s101_"
+# les bornes des seaux des histogrammes de durées (en secondes) et de tailles (en octets)
+TIME_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144)
+# pour chaque mesure: sa description, et les bornes de ses seaux
+METRICS: dict[str, tuple[str, tuple[float, ...]]] = {
+    "screen_render_seconds": ("Temps passé à dessiner un écran (display.screen).", TIME_BUCKETS),
+    "screen_bytes": ("Octets écrits pour dessiner un écran (display.screen).", SIZE_BUCKETS),
+    "key_to_frame_seconds": ("Temps entre la lecture d'une touche et l'affichage suivant.", TIME_BUCKETS),
+    "bot_decision_seconds": ("Temps de réflexion d'un bot pour un coup, par jeu et niveau.", TIME_BUCKETS),
+    "scores_io_seconds": ("Temps de lecture ou d'écriture d'un tableau des scores.", TIME_BUCKETS),
+}
+# l'intervalle entre deux écritures du fichier des mesures, en secondes
+FILE_INTERVAL = 15.0
+# les variables d'environnement qui activent l'export
+PORT_VARIABLE = "S101_METRICS_PORT"
+FILE_VARIABLE = "S101_METRICS_FILE"
+
+
+class Histogram:
+    """La répartition des valeurs d'une mesure dans des seaux de bornes fixes."""
+
+    __slots__ = ("bounds", "counts", "total", "count")
+
+    # les bornes supérieures des seaux (le dernier seau, sans borne, n'y figure pas)
+    bounds: tuple[float, ...]
+    # le nombre de valeurs de chaque seau (une de plus que les bornes), non cumulé
+    counts: list[int]
+    # la somme et le nombre des valeurs
+    total: float
+    count: int
+
+    def __init__(self, bounds: tuple[float, ...]) -> None:
+        """Crée un histogramme vide.
+
+        :param bounds: Les bornes supérieures des seaux, croissantes
+        """
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def copy(self) -> Histogram:
+        """Retourne une copie de l'histogramme, qui ne change pas quand l'histogramme change."""
+        histogram: Histogram = Histogram(self.bounds)
+
+        histogram.counts = self.counts.copy()
+        histogram.total = self.total
+        histogram.count = self.count
+        return histogram
+
+    def observe(self, value: float) -> None:
+        """Ajoute une valeur.
+
+        :param value: La valeur
+        """
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+# les histogrammes de chaque mesure, par nom et étiquettes
+_histograms: dict[tuple[str, tuple[tuple[str, str], ...]], Histogram] = {}
+_lock: threading.Lock = threading.Lock()
+# l'état de la session du fil d'exécution en cours: les octets écrits depuis le début de l'écran (`written`), et le
+# moment où la dernière touche a été lue, si elle n'a pas encore été suivie d'un affichage (`key`)
+_local: threading.local = threading.local()
+# vrai si l'export a déjà été mis en place
+_configured: bool = False
+
+
+def enable() -> None:
+    """Active les mesures."""
+    global ENABLED
+    ENABLED = True
+
+
+def disable() -> None:
+    """Désactive les mesures (celles déjà enregistrées sont gardées)."""
+    global ENABLED
+    ENABLED = False
+
+
+def reset() -> None:
+    """Oublie toutes les mesures enregistrées."""
+    with _lock:
+        _histograms.clear()
+
+
+def observe(name: str, value: float, **labels: str) -> None:
+    """Enregistre une valeur d'une mesure.
+
+    :param name:   Le nom de la mesure (une clé de `METRICS`)
+    :param value:  La valeur
+    :param labels: Les étiquettes de la valeur (par exemple le jeu)
+    """
+    key: tuple[str, tuple[tuple[str, str], ...]] = (name, tuple(sorted(labels.items())))
+
+    with _lock:
+        if key not in _histograms:
+            _histograms[key] = Histogram(METRICS[name][1])
+        _histograms[key].observe(value)
+
+
+def start_frame() -> float:
+    """Marque le début du dessin d'un écran.
+
+    :returns: Le moment présent, à passer à `end_frame`
+    """
+    _local.written = 0
+    return time.perf_counter()
+
+
+def count_output(text: str) -> None:
+    """Compte du texte écrit sur le terminal de la session (voir `terminal.write`).
+
+    :param text: Le texte
+    """
+    _local.written = getattr(_local, "written", 0) + len(text.encode())
+
+
+def end_frame(start: float) -> None:
+    """Enregistre le temps et le nombre d'octets du dessin d'un écran.
+
+    :param start: Le moment où le dessin a commencé (voir `start_frame`)
+    """
+    observe("screen_render_seconds", time.perf_counter() - start)
+    observe("screen_bytes", getattr(_local, "written", 0))
+
+
+def key_read() -> None:
+    """Marque la lecture d'une touche (voir `terminal.get_key`)."""
+    _local.key = time.perf_counter()
+
+
+def frame_shown() -> None:
+    """Enregistre le temps écoulé depuis la dernière touche lue, si c'est le premier affichage qui la suit."""
+    key: float | None = getattr(_local, "key", None)
+
+    if key is not None:
+        observe("key_to_frame_seconds", time.perf_counter() - key)
+        _local.key = None
+
+
+def format_number(value: float) -> str:
+    """Écrit un nombre comme l'attend le format de Prometheus.
+
+    :param value: Le nombre
+    :returns:     Le nombre écrit
+    """
+    if value == float("inf"):
+        return "+Inf"
+    return repr(value)
+
+
+def render() -> str:
+    """Retourne toutes les mesures au format texte de Prometheus.
+
+    :returns: Le texte, une ligne par valeur
+    """
+    lines: list[str] = []
+    histograms: list[tuple[tuple[str, tuple[tuple[str, str], ...]], Histogram]]
+    name: str
+    labels: tuple[tuple[str, str], ...]
+    histogram: Histogram
+    metric: str
+    text: str
+    cumulated: int
+    bound: float
+    count: int
+
+    with _lock:
+        # une copie, pour ne pas bloquer les mesures pendant la mise en forme
+        histograms = [(key, _histograms[key].copy()) for key in sorted(_histograms)]
+
+    for name in METRICS:
+        lines.append(f"# HELP {PREFIX}{name} {METRICS[name][0]}")
+        lines.append(f"# TYPE {PREFIX}{name} histogram")
+        for (metric, labels), histogram in histograms:
+            if metric != name:
+                continue
+            text = "".join(f'{label}="{value}",' for label, value in labels)
+            cumulated = 0
+            for bound, count in zip(histogram.bounds + (float("inf"),), histogram.counts):
+                cumulated += count
+                lines.append(f'{PREFIX}{name}_bucket{{{text}le="{format_number(bound)}"}} {cumulated}')
+            # sans étiquette, la somme et le nombre de valeurs s'écrivent sans accolades
+            text = f"{{{text[:-1]}}}" if text else ""
+            lines.append(f"{PREFIX}{name}_sum{text} {format_number(histogram.total)}")
+            lines.append(f"{PREFIX}{name}_count{text} {histogram.count}")
+
+    return "\n".join(lines) + "\n"
+
+
+def write_file(path: Path) -> None:
+    """Écrit toutes les mesures dans un fichier, sans que l'ancien contenu ne soit jamais lu à moitié écrit.
+
+    :param path: Le chemin du fichier
+    """
+    temporary: Path = path.with_name(path.name + ".tmp")
+
+    temporary.write_text(render())
+    os.replace(temporary, path)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Répond aux requêtes HTTP sur `/metrics` avec toutes les mesures."""
+
+    def do_GET(self) -> None:
+        """Envoie les mesures, ou une erreur 404 pour un autre chemin."""
+        body: bytes
+
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:
+        """N'écrit rien: la sortie d'erreur est le terminal de l'interface."""
+
+
+def serve(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Exporte les mesures en HTTP, dans un fil d'exécution séparé.
+
+    :param port: Le port sur lequel écouter
+    :param host: L'adresse sur laquelle écouter (locale par défaut)
+    :returns:    Le serveur, déjà lancé
+    """
+    server: ThreadingHTTPServer = ThreadingHTTPServer((host, port), MetricsHandler)
+
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def write_periodically(path: Path) -> None:
+    """Réécrit le fichier des mesures toutes les `FILE_INTERVAL` secondes, jusqu'à la fin du programme.
+
+    :param path: Le chemin du fichier
+    """
+    while True:
+        time.sleep(FILE_INTERVAL)
+        write_file(path)
+
+
+def setup_from_environment() -> None:
+    """Active les mesures et leur export si les variables d'environnement le demandent (voir le début du module).
+
+    Il est possible d'appeler cette fonction plusieurs fois: seul le premier appel a un effet.
+    """
+    global _configured
+    port: str | None = os.environ.get(PORT_VARIABLE)
+    file: str | None = os.environ.get(FILE_VARIABLE)
+    path: Path
+
+    if _configured or (port is None and file is None):
+        return
+    _configured = True
+    enable()
+
+    if port is not None:
+        serve(int(port))
+    if file is not None:
+        path = Path(file)
+        threading.Thread(target=write_periodically, args=(path,), daemon=True).start()
+        atexit.register(write_file, path)
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGUSR1, lambda signum, frame: write_file(path))
@@ -1,48 +1,79 @@
 from __future__ import annotations
 
-import random
+import math
+import time
+from functools import partial
 from random import randint
+from typing import Callable
 
+import bots
 import display
+import mcts
 import terminal
-from players import difficulty_level, get_display_name
-from scores import get_scores, set_scores
+from board import Grid, is_winning, lowest_cell, make_lines, make_symmetries
+from display import center, print_at
+from players import Bot, Player
+from ponder import Ponderer, paused
+from scores import SCORES_LOCK, get_scores, set_scores
 from terminal import bold, get_key, invert, strip_escapes
 
 SCOREBOARD = "morpion"
 RULES = [
-    "L'objectif est de mettre trois fois son symbole de suite (× ou ○) dans une grille de 3 par 3.",
+    "L'objectif est d'aligner son symbole (× ou ○) dans une grille, trois fois de suite dans une grille de 3 par 3.",
     "Pour ce faire vous allez placer votre symbole dans une case inoccupée chacun votre tour.",
     "Une ligne peut être horizontale, verticale, ou diagonale.",
+    "D'autres tailles de grille sont disponibles, comme le gomoku (5 symboles à aligner dans une grille de 15 par 15).",
 ]
-
-
-def add_score(winner: str, loser: str, *, tie: bool = False) -> None:
+# les variantes proposées: (nom, largeur, hauteur, nombre de symboles à aligner)
+VARIANTS = [
+    ("Classique (3 × 3, 3 alignés)", 3, 3, 3),
+    ("4 × 4, 4 alignés", 4, 4, 4),
+    ("7 × 7, 4 alignés", 7, 7, 4),
+    ("Gomoku (15 × 15, 5 alignés)", 15, 15, 5),
+    ("Personnalisée", 0, 0, 0),
+]
+# le symbole de chaque joueur (1 commence toujours), une case vide est représentée par 0
+SYMBOLS = ("", "×", "○")
+# marque les cases de la table des solutions qui ne correspondent à aucun coup
+NO_MOVE = 0xFF
+# le nombre maximum de positions examinées par la recherche de menaces (voir `find_threat_sequence`)
+THREAT_SEARCH_BUDGET = 4000
+# la profondeur maximum (en nombre de coups du bot) de la recherche de menaces
+THREAT_SEARCH_DEPTH = 8
+# le nombre de parties aléatoires jouées par le bot moyen pour choisir un coup (voir `mcts.search`)
+MCTS_PLAYOUTS = 500
+
+# table des meilleurs coups, calculée lors de sa première utilisation (voir `get_solution`)
+_solution: bytearray | None = None
+
+
+def add_score(winner: Player, loser: Player, *, tie: bool = False) -> None:
     """Met à jour le score des deux joueurs dans la base de donnée.
 
     Le gagnant se voit ajouter une victoire et les deux joueurs se voient ajouter une partie jouée.
     Si `tie` est vrai, alors aucun joueur ne voit son nombre de victoires augmenter.
 
-    :param winner: Le nom du gagnant
-    :param loser:  Le nom du perdant
+    :param winner: Le gagnant
+    :param loser:  Le perdant
     :param tie:    Vrai si la partie s'est terminée par une égalité.
     """
     scores: dict[str, list[float]]
 
-    scores = dict(get_scores(SCOREBOARD))
-    if winner[0] != "\t" and winner not in scores:
-        scores[winner] = [0, 0]
-    if loser[0] != "\t" and loser not in scores:
-        scores[loser] = [0, 0]
+    with SCORES_LOCK:
+        scores = dict(get_scores(SCOREBOARD))
+        if not isinstance(winner, Bot) and winner.name not in scores:
+            scores[winner.name] = [0, 0]
+        if not isinstance(loser, Bot) and loser.name not in scores:
+            scores[loser.name] = [0, 0]
 
-    if winner[0] != "\t":
-        if not tie:
-            scores[winner][0] += 1
-        scores[winner][1] += 1
-    if loser[0] != "\t":
-        scores[loser][1] += 1
+        if not isinstance(winner, Bot):
+            if not tie:
+                scores[winner.name][0] += 1
+            scores[winner.name][1] += 1
+        if not isinstance(loser, Bot):
+            scores[loser.name][1] += 1
 
-    set_scores(SCOREBOARD, scores.items())
+        set_scores(SCOREBOARD, scores.items())
 
 
 def get_sorted_scores() -> list[tuple[str, str]]:
@@ -69,225 +100,650 @@ def get_sorted_scores() -> list[tuple[str, str]]:
     return [(player, f"{winrate:.2f}") for player, winrate in score_lines]
 
 
-def display_grid(message: str, grid: list[list[str]], *, keys: dict[str, str] | None = None) -> None:
-    """Affiche la grille du jeu.
+def is_compact(grid: Grid) -> bool:
+    """Vérifie si la grille doit être affichée en mode compact (sans séparateurs entre les cases).
+
+    Les grandes grilles (comme celle du gomoku) ne tiennent pas dans le terminal avec des séparateurs.
 
-    :param message: Un message à afficher au dessus de la grille
-    :param grid:    La grille en elle-même
+    :param grid: La grille de jeu
+    :returns:    Vrai si la grille doit être affichée en mode compact
     """
-    LINE_LENGHT: int = 11
+    width: int
+    height: int
+
+    width, height = terminal.get_size()
+    return 4 * grid.width - 1 > width - 4 or 2 * grid.height - 1 > height - 6
+
+
+def cell_position(grid: Grid, cell: int, compact: bool) -> tuple[int, int]:
+    """Retourne la position de la case `cell` sur le terminal.
 
-    line: list[str]
+    La grille est centrée de la même manière que le contenu principal de `display.screen`.
+
+    :param grid:    La grille de jeu
+    :param cell:    L'indice de la case
+    :param compact: Vrai si la grille est affichée en mode compact
+    :returns:       La colonne et la ligne de la case
+    """
+    width: int
+    height: int
+    step_x: int
+    step_y: int
+
+    width, height = terminal.get_size()
+    step_x, step_y = (2, 1) if compact else (4, 2)
+
+    return (
+        center(step_x * grid.width - 1, width) + cell % grid.width * step_x,
+        center(step_y * (grid.height - 1) + 1, height) + cell // grid.width * step_y,
+    )
+
+
+def cell_text(grid: Grid, cell: int, compact: bool) -> str:
+    """Retourne le texte à afficher pour la case `cell`.
+
+    :param grid:    La grille de jeu
+    :param cell:    L'indice de la case
+    :param compact: Vrai si la grille est affichée en mode compact
+    :returns:       Le texte de la case
+    """
+    if compact:
+        return SYMBOLS[grid.cells[cell]] or "·"
+    return f" {SYMBOLS[grid.cells[cell]] or ' '} "
+
+
+def draw_cell(grid: Grid, cell: int, *, selected: bool = False) -> None:
+    """Redessine une seule case de la grille, sans réafficher tout l'écran.
+
+    La case ne sera affichée qu'après avoir appelé `terminal.flush`.
+
+    :param grid:     La grille de jeu
+    :param cell:     L'indice de la case
+    :param selected: Vrai si la case doit être affichée comme sélectionnée
+    """
+    compact: bool = is_compact(grid)
+    text: str = cell_text(grid, cell, compact)
+
+    print_at(*cell_position(grid, cell, compact), invert(text) if selected else text)
+
+
+def display_grid(
+    message: str, grid: Grid, *, selected: int | None = None, keys: dict[str, str] | None = None
+) -> None:
+    """Affiche la grille du jeu.
+
+    :param message:  Un message à afficher au dessus de la grille
+    :param grid:     La grille en elle-même
+    :param selected: La case sélectionnée, s'il y en a une
+    :param keys:     Les touches pour lesquelles afficher l'aide (même format que pour `display.keys_help`)
+    """
+    compact: bool = is_compact(grid)
     lines: list[str] = []
+    row: list[str]
+    width: int
+    y: int
 
     if keys is None:
         keys = {"ENTER": "Valider", "↑ / ↓ / → / ←": "Choisir une case"}
 
-    for line in grid:
-        lines.append("│".join(line))
-        lines.append("───┼───┼───")
+    for y in range(grid.height):
+        row = [cell_text(grid, y * grid.width + x, compact) for x in range(grid.width)]
+        if compact:
+            lines.append(" ".join(row))
+        else:
+            lines.append("│".join(row))
+            lines.append("┼".join(["───"] * grid.width))
 
-    lines.pop()
+    if not compact:
+        lines.pop()
     display.screen(lines, keys=keys)
 
-    # here the cursor is at the end of the last line of the grid
-    terminal.cursor_up(6)
-    terminal.cursor_left(len(strip_escapes(message)) // 2 + LINE_LENGHT // 2)
-    print(message, end="", flush=True)
+    width, _ = terminal.get_size()
+    _, y = cell_position(grid, 0, compact)
+    print_at(center(len(strip_escapes(message)), width), y - 2, message)
 
+    if selected is not None:
+        draw_cell(grid, selected, selected=True)
+    terminal.flush()
 
-def place_symbol(player: str, symbol: str, grid: list[list[str]]) -> None:
-    """Demande au joueur `player` de placer son symbole `symbol` dans la grille.
 
-    :param player: Le joueur qui doit placer son symbol
-    :param symbol: Le symbole qui correspond à ce joueur (× ou ○)
-    :param grid:   La grille de jeu
+def place_symbol(player: Player, grid: Grid, ponderer: Ponderer | None = None) -> int:
+    """Demande au joueur `player` de choisir la case où placer son symbole.
+
+    Seules les cases dont la sélection change sont redessinées quand le joueur déplace le curseur.
+
+    :param player:   Le joueur qui doit placer son symbol
+    :param grid:     La grille de jeu
+    :param ponderer: La réflexion de l'adversaire, mise en pause pendant que les touches sont traitées
+    :returns:        L'indice de la case choisie
     """
     key: str
-    sel_x: int = 1
-    sel_y: int = 1
+    sel_x: int = grid.width // 2
+    sel_y: int = grid.height // 2
+    previous: int
+    size: tuple[int, int]
+    message: str = f"{bold(player.display_name)}, à toi de jouer !"
 
-    while True:
-        grid[sel_y][sel_x] = invert(grid[sel_y][sel_x])
-        display_grid(f"{bold(player)}, à toi de jouer !", grid)
-        grid[sel_y][sel_x] = strip_escapes(grid[sel_y][sel_x])
+    size = terminal.get_size()
+    display_grid(message, grid, selected=sel_y * grid.width + sel_x)
 
+    while True:
         key = get_key()
-        if key == "UP":
-            sel_y = (sel_y - 1) % 3
-        elif key == "DOWN":
-            sel_y = (sel_y + 1) % 3
-        elif key == "LEFT":
-            sel_x = (sel_x - 1) % 3
-        elif key == "RIGHT":
-            sel_x = (sel_x + 1) % 3
-        elif key == "\n" and grid[sel_y][sel_x] == "   ":
-            break
-
-    grid[sel_y][sel_x] = f" {symbol} "
-
-
-def check_win(grid: list[list[str]]) -> str:
+        with paused(ponderer):
+            previous = sel_y * grid.width + sel_x
+
+            if key == "UP":
+                sel_y = (sel_y - 1) % grid.height
+            elif key == "DOWN":
+                sel_y = (sel_y + 1) % grid.height
+            elif key == "LEFT":
+                sel_x = (sel_x - 1) % grid.width
+            elif key == "RIGHT":
+                sel_x = (sel_x + 1) % grid.width
+            elif key == "\n" and grid.cells[previous] == 0:
+                return previous
+
+            if terminal.get_size() != size:
+                # toutes les positions ont changé, il faut tout réafficher
+                size = terminal.get_size()
+                display_grid(message, grid, selected=sel_y * grid.width + sel_x)
+            elif previous != sel_y * grid.width + sel_x:
+                draw_cell(grid, previous)
+                draw_cell(grid, sel_y * grid.width + sel_x, selected=True)
+                terminal.flush()
+
+
+def check_win(grid: Grid) -> str:
     """Vérifie si un joueur a gagné.
 
+    Les lignes sont comptées au fur et à mesure que les coups sont joués, cette fonction ne parcourt donc pas la grille.
+
     :param grid: La grille de jeu
     :returns:    Cette fonction retourne:
         - "×" ou "○" si un joueur a gagné
         - "t" si la partie s'est terminée par une égalité
         - "" si la partie n'est pas terminée
     """
-    line: list[str]
-    x: int
-    symbol: str
+    if grid.winner != 0:
+        return SYMBOLS[grid.winner]
 
-    # check lines
-    for line in grid:
-        if line[0] == line[1] == line[2] != "   ":
-            return line[0].strip()
+    if grid.is_full():
+        return "t"
 
-    # check columns
-    for x in range(3):
-        if grid[0][x] == grid[1][x] == grid[2][x] != "   ":
-            return grid[0][x].strip()
+    return ""
 
-    # check diagonals
-    if grid[0][0] == grid[1][1] == grid[2][2] != "   ":
-        return grid[0][0].strip()
 
-    if grid[0][2] == grid[1][1] == grid[2][0] != "   ":
-        return grid[0][2].strip()
+def check_possible_win(grid: Grid, player: int) -> int | None:
+    """Vérifie si un joueur peut gagner.
 
-    if all(all(symbol != "   " for symbol in line) for line in grid):
-        return "t"
+    :param grid:   La grille de jeu
+    :param player: Le joueur que l'on veut vérifier (1 ou 2)
+    :returns:      La case où le joueur doit placer son symbol pour gagner,
+                   ou None s'il n'y a pas de victoire en un seul coup possible
+    """
+    cells: int
 
-    return ""
+    cells = grid.winning_cells(player)
+    if not cells:
+        return None
+    return lowest_cell(cells)
 
 
-def check_possible_win(grid: list[list[str]], symbol: str) -> tuple[int, int] | None:
-    """Vérifie si un symbole peut gagner.
+def check_possible_fork(grid: Grid, player: int) -> int | None:
+    """Vérifie si un joueur peut créer une fourchette (deux menaces de victoire en un seul coup).
 
     :param grid:   La grille de jeu
-    :param symbol: Le symbole que l'on veut vérifier
-    :returns:      La position où le joueur doit placer son symbol pour gagner,
-                   ou None s'il n'y a pas de victoire en un seul coup possible
+    :param player: Le joueur que l'on veut vérifier (1 ou 2)
+    :returns:      La case où le joueur doit placer son symbol pour créer une fourchette,
+                   ou None s'il n'y en a pas
+    """
+    cells: int
+
+    cells = grid.fork_cells(player)
+    if not cells:
+        return None
+    return lowest_cell(cells)
+
+
+def find_threat_sequence(
+    grid: Grid, player: int, depth: int, budget: list[int], deadline: float = math.inf
+) -> int | None:
+    """Cherche une suite de menaces qui mène `player` à la victoire quoi que fasse son adversaire.
+
+    C'est une recherche dans l'espace des menaces restreinte aux coups forcés: chaque coup du joueur crée une ligne
+    où il ne lui manque plus qu'une case, l'adversaire n'a donc pas d'autre choix que de la bloquer. Seuls ces coups
+    sont examinés, ce qui permet de chercher loin même sur une grande grille. La recherche réussit quand un coup crée
+    deux menaces à la fois.
+
+    :param grid:     La grille de jeu (elle est modifiée pendant la recherche puis remise dans son état initial)
+    :param player:   Le joueur qui attaque (ce doit être à lui de jouer)
+    :param depth:    Le nombre maximum de coups que le joueur peut jouer
+    :param budget:   Le nombre de positions qu'il reste le droit d'examiner (dans une liste pour être partagé
+                     entre les appels récursifs)
+    :param deadline: L'instant (selon `time.monotonic`) auquel la recherche abandonne
+    :returns:        La case où jouer pour commencer la suite de menaces, ou None si aucune suite n'a été trouvée
     """
-    for y in range(3):
-        if grid[y][0] == grid[y][1] == f" {symbol} " and grid[y][2] == "   ":
-            return 2, y
-    for y in range(3):
-        if grid[y][1] == grid[y][2] == f" {symbol} " and grid[y][0] == "   ":
-            return 0, y
-    for y in range(3):
-        if grid[y][0] == grid[y][2] == f" {symbol} " and grid[y][1] == "   ":
-            return 1, y
-
-    for x in range(3):
-        if grid[0][x] == grid[1][x] == f" {symbol} " and grid[2][x] == "   ":
-            return x, 2
-    for x in range(3):
-        if grid[1][x] == grid[2][x] == f" {symbol} " and grid[0][x] == "   ":
-            return x, 0
-    for x in range(3):
-        if grid[0][x] == grid[2][x] == f" {symbol} " and grid[1][x] == "   ":
-            return x, 1
-
-    if grid[0][0] == grid[1][1] == f" {symbol} " and grid[2][2] == "   ":
-        return 2, 2
-    if grid[1][1] == grid[2][2] == f" {symbol} " and grid[0][0] == "   ":
-        return 0, 0
-    if grid[0][0] == grid[2][2] == f" {symbol} " and grid[1][1] == "   ":
-        return 1, 1
-
-    if grid[0][2] == grid[1][1] == f" {symbol} " and grid[2][0] == "   ":
-        return 0, 2
-    if grid[1][1] == grid[2][0] == f" {symbol} " and grid[0][2] == "   ":
-        return 2, 0
-    if grid[0][2] == grid[2][0] == f" {symbol} " and grid[1][1] == "   ":
-        return 1, 1
+    ennemy: int = 3 - player
+    candidates: int = 0
+    occupied: int = grid.occupied()
+    threats: int
+    cell: int
+    line: int
+    found: bool
+
+    if grid.winning_cells(ennemy):
+        # l'adversaire n'a pas besoin de répondre à nos menaces, il peut gagner directement
+        return None
+
+    for line in grid.live_lines[player][grid.length - 2]:
+        candidates |= grid.lines[line] & ~occupied
+
+    while candidates and budget[0] > 0:
+        if time.monotonic() > deadline:
+            # le temps est écoulé: la recherche s'arrête comme si elle avait épuisé son budget
+            budget[0] = 0
+            break
+        cell = lowest_cell(candidates)
+        candidates &= candidates - 1
+        budget[0] -= 1
+
+        grid.play(cell)
+        threats = grid.winning_cells(player)
+        found = False
+
+        if threats & (threats - 1):
+            # deux menaces, l'adversaire ne peut en bloquer qu'une
+            found = True
+        elif threats and depth > 1:
+            grid.play(lowest_cell(threats))
+            found = (
+                grid.winner == 0 and find_threat_sequence(grid, player, depth - 1, budget, deadline) is not None
+            )
+            grid.undo()
+
+        grid.undo()
+        if found:
+            return cell
 
     return None
 
 
-def auto_play(bot_name: str, symbol: str, ennemy_symbol: str, grid: list[list[str]]) -> tuple[int, int]:
-    """Choisi la position à jouer en fonction du niveau de difficulté du bot.
+def candidate_cells(grid: Grid) -> list[int]:
+    """Retourne les cases vides proches des cases déjà jouées (à une distance de 2 cases au plus).
 
-    Si cette fonction est appelée avec le nom d'un joueur, son comportement n'est pas définie.
+    Sur une grande grille, les autres cases n'ont presque jamais d'intérêt.
 
-    :param bot_name:      Le nom du bot (qui contient des métadonnées sur sa difficultée)
-    :param symbol:        Le symbole assigné au bot
-    :param ennemy_symbol: Le symbol assigné à l'ennemi du bot
-    :param grid:          La grille de jeu
-    :returns:             La position où le bot va placer son sympbol
+    :param grid: La grille de jeu
+    :returns:    Les indices des cases
     """
-    diff_level = difficulty_level(bot_name)
+    cells: set[int] = set()
+    cell: int
+    x: int
+    y: int
+    dx: int
+    dy: int
 
-    if diff_level == 1:  # niveau de difficulté moyen
-        # le bot à 1 chance sur 2 d'être en mode "difficile"
-        diff_level = random.choice((0, 2))
+    if not grid.moves:
+        return [grid.height // 2 * grid.width + grid.width // 2]
 
-    if diff_level == 0:  # niveau de difficulté facile
-        x, y = randint(0, 2), randint(0, 2)
-        while grid[y][x] != "   ":
-            x, y = randint(0, 2), randint(0, 2)
-        return x, y
-    else:  # niveau de difficulté difficile
-        # ici le bot ne joue pas toujours le meilleur coup car il est difficile à determiner
-        win_pos = check_possible_win(grid, symbol)
-        if win_pos:
-            return win_pos
+    for cell in grid.moves:
+        y, x = divmod(cell, grid.width)
+        for dy in range(-2, 3):
+            for dx in range(-2, 3):
+                if 0 <= x + dx < grid.width and 0 <= y + dy < grid.height:
+                    cells.add((y + dy) * grid.width + x + dx)
 
-        ennemy_win_pos = check_possible_win(grid, ennemy_symbol)
-        if ennemy_win_pos:
-            return ennemy_win_pos
+    return [cell for cell in cells if grid.cells[cell] == 0]
 
-        x, y = randint(0, 2), randint(0, 2)
-        while grid[y][x] != "   ":
-            x, y = randint(0, 2), randint(0, 2)
 
-        return x, y
+def cell_score(grid: Grid, cell: int, player: int) -> int:
+    """Évalue l'intérêt de jouer sur la case `cell` pour `player`.
 
+    Chaque ligne qui passe par la case rapporte d'autant plus que le joueur (pour attaquer) ou son adversaire
+    (pour défendre) y a déjà de symboles, tant que l'autre joueur n'y a pas joué.
+
+    :param grid:   La grille de jeu
+    :param cell:   L'indice de la case
+    :param player: Le joueur qui va jouer
+    :returns:      Le score de la case
+    """
+    mine: list[int] = grid.counts[player]
+    theirs: list[int] = grid.counts[3 - player]
+    score: int = 0
+    line: int
+
+    for line in grid.cell_lines[cell]:
+        if theirs[line] == 0:
+            score += 5 ** mine[line] + 1
+        if mine[line] == 0:
+            score += 5 ** theirs[line]
+
+    return score
+
+
+def threat_move(grid: Grid, depth: int = THREAT_SEARCH_DEPTH, deadline: float = math.inf) -> int:
+    """Choisi un coup à partir des menaces présentes sur la grille, pour le joueur dont c'est le tour.
+
+    Dans l'ordre, le bot essaye de gagner, de bloquer une victoire de l'adversaire, de trouver une suite de menaces
+    gagnante, d'empêcher l'adversaire d'en jouer une, puis de créer une fourchette ou d'empêcher l'adversaire
+    d'en créer une. Si rien de tout ça n'est possible, il joue la case qui crée ou bloque le plus de lignes.
+
+    :param grid:     La grille de jeu
+    :param depth:    La profondeur maximum de la recherche de menaces (en nombre de coups du joueur)
+    :param deadline: L'instant (selon `time.monotonic`) auquel la recherche de menaces abandonne, le bot joue
+                     alors la case qui crée ou bloque le plus de lignes
+    :returns:        L'indice de la case où jouer
+    """
+    player: int = grid.turn
+    ennemy: int = 3 - player
+    move: int | None
+
+    move = check_possible_win(grid, player)
+    if move is None:
+        move = check_possible_win(grid, ennemy)
+    if move is None:
+        move = find_threat_sequence(grid, player, depth, [THREAT_SEARCH_BUDGET], deadline)
+        if move is None:
+            # on fait comme si c'était à l'adversaire de jouer pour trouver sa suite de menaces et la casser
+            grid.turn = ennemy
+            move = find_threat_sequence(grid, ennemy, depth, [THREAT_SEARCH_BUDGET], deadline)
+            grid.turn = player
+        if move is None:
+            move = check_possible_fork(grid, player)
+        if move is None:
+            move = check_possible_fork(grid, ennemy)
+    if move is None:
+        move = max(candidate_cells(grid), key=lambda cell: cell_score(grid, cell, player))
+
+    return move
+
+
+def encode_grid(grid: Grid) -> list[int]:
+    """Encode une grille de 3 par 3, et ses images par chacune de ses symétries, en entiers en base 3.
+
+    Chaque case est un chiffre (0 pour une case vide, 1 pour ×, 2 pour ○), la case en haut
+    à gauche étant le chiffre de poids faible. Le plus petit des encodages est celui de la position
+    canonique, l'indice de la grille dans la table des solutions.
+
+    :param grid: La grille de jeu
+    :returns:    L'encodage de l'image de la grille par chaque symétrie (voir `board.make_symmetries`)
+    """
+    symmetries: tuple[tuple[int, ...], ...] = make_symmetries(3, 3)[0]
+    indices: list[int] = [0] * len(symmetries)
+    i: int
+    symmetry: tuple[int, ...]
+    cell: int
+
+    for i, symmetry in enumerate(symmetries):
+        for cell in range(9):
+            indices[i] += grid.cells[cell] * 3 ** symmetry[cell]
+
+    return indices
+
+
+def _solve(
+    indices: list[int], masks: list[int], to_play: int, solution: bytearray, scores: dict[int, int]
+) -> int:
+    """Calcule par minimax le meilleur coup pour une position et le stocke dans `solution`.
+
+    Les positions symétriques ne sont calculées qu'une fois: le résultat est rangé à l'indice de la position
+    canonique, et le coup est transformé par la même symétrie.
+
+    :param indices:  L'encodage en base 3 de l'image de la position par chaque symétrie (voir `encode_grid`)
+    :param masks:    Les cases occupées par chaque symbole (à l'indice 1 pour × et 2 pour ○)
+    :param to_play:  Le symbole du joueur qui doit jouer (1 ou 2)
+    :param solution: La table des solutions en cours de construction
+    :param scores:   Les scores des positions canoniques déjà calculées (évite de refaire les calculs)
+    :returns:        Le score de la position pour le joueur qui doit jouer: positif s'il gagne
+                     (d'autant plus grand que la victoire est rapide), négatif s'il perd, 0 pour une égalité
+    """
+    lines: tuple[int, ...] = make_lines(3, 3, 3)
+    symmetries: tuple[tuple[int, ...], ...] = make_symmetries(3, 3)[0]
+    index: int = min(indices)
+    symmetry: tuple[int, ...] = symmetries[indices.index(index)]
+    best_score: int = -100
+    best_move: int = NO_MOVE
+    score: int
+    cell: int
+
+    if index in scores:
+        return scores[index]
+
+    if is_winning(lines, masks[3 - to_play]):
+        # le joueur précédent vient de gagner
+        best_score = -10
+    elif (masks[1] | masks[2]) == 0b111_111_111:
+        best_score = 0
+    else:
+        for cell in range(9):
+            if (masks[1] | masks[2]) & (1 << cell):
+                continue
+
+            masks[to_play] |= 1 << cell
+            score = -_solve(
+                [child + to_play * 3 ** image[cell] for child, image in zip(indices, symmetries)],
+                masks,
+                3 - to_play,
+                solution,
+                scores,
+            )
+            masks[to_play] &= ~(1 << cell)
+
+            if score > best_score:
+                best_score, best_move = score, cell
+
+        # on préfère les victoires rapides et les défaites lentes
+        best_score -= (best_score > 0) - (best_score < 0)
+
+    solution[index] = best_move if best_move == NO_MOVE else symmetry[best_move]
+    scores[index] = best_score
+    return best_score
 
-def game(player1: str, player2: str) -> None:
-    """Lance une partie de morpion et sauvegarde le score à la fin de la partie.
 
-    :param player1: Le nom du joueur 1 (celui qui commence)
-    :param player2: Le nom du joueur 2
+def get_solution() -> bytearray:
+    """Retourne la table des meilleurs coups du morpion, en la calculant si nécessaire.
+
+    La table est indexée par l'encodage en base 3 de la position canonique (voir `encode_grid`) et contient
+    pour chaque position canonique atteignable la case (entre 0 et 8, de gauche à droite puis de haut en bas)
+    que doit y jouer le joueur dont c'est le tour. Les positions terminales, inatteignables ou qui ne sont pas
+    canoniques contiennent `NO_MOVE`. Le calcul n'est fait qu'une seule fois (il y a moins de 800 positions
+    atteignables à une symétrie près).
+
+    :returns: La table des solutions
     """
-    grid: list[list[str]]
-    playing: str
-    waiting: str
-    winner: str
-    loser: str
-    symbol: str
+    global _solution
+
+    if _solution is None:
+        _solution = bytearray([NO_MOVE]) * 3**9
+        _solve([0] * len(make_symmetries(3, 3)[0]), [0, 0, 0], 1, _solution, {})
+
+    return _solution
+
+
+def best_move(grid: Grid) -> int | None:
+    """Retourne le coup parfait pour le joueur dont c'est le tour, sur une grille de 3 par 3.
+
+    :param grid: La grille de jeu
+    :returns:    La case où jouer, ou None si la partie est terminée
+    """
+    indices: list[int] = encode_grid(grid)
+    index: int = min(indices)
+    move: int
+
+    move = get_solution()[index]
+    if move == NO_MOVE:
+        return None
+    return grid.from_canonical(move, indices.index(index))
+
+
+def ponder(bot: Bot, grid: Grid, check: Callable[[], None]) -> None:
+    """Joue des parties aléatoires depuis la position actuelle pendant le tour de l'humain (voir `ponder.Ponderer`).
+
+    La recherche de Monte-Carlo explore d'abord les coups les plus probables de l'humain. Son arbre est gardé par le
+    bot, qui le reprendra depuis le coup que l'humain aura joué. Elle s'arrête à `MCTS_PLAYOUTS` parties, comme le
+    tour du bot: les parties reprises ne dépassent jamais son budget, et sa force ne dépend pas du temps que l'humain
+    met à jouer.
+
+    :param bot:   Le bot qui réfléchit (de niveau moyen)
+    :param grid:  Une copie de la grille, où c'est à l'humain de jouer
+    :param check: La fonction à appeler avant chaque partie aléatoire
+    """
+    if bot.state is None:
+        bot.state = mcts.Tree()
+    mcts.search(grid, bot.state, MCTS_PLAYOUTS, check=check)
+
+
+def auto_play(bot: Bot, grid: Grid, deadline: float) -> int:
+    """Choisi la case à jouer en fonction du niveau de difficulté du bot (voir `bots.play`).
+
+    :param bot:      Le bot qui joue
+    :param grid:     La grille de jeu
+    :param deadline: L'instant (selon `time.monotonic`) auquel le bot doit avoir choisi sa case
+    :returns:        La case où le bot va placer son symbole
+    """
+    diff_level: int
+    move: int | None
     x: int
     y: int
 
-    grid = [
-        ["   ", "   ", "   "],
-        ["   ", "   ", "   "],
-        ["   ", "   ", "   "],
-    ]
-    playing, waiting = player2, player1
+    diff_level = bot.level
+
+    if diff_level == 1:  # niveau de difficulté moyen
+        # le bot cherche son coup en jouant des parties au hasard: il joue d'autant mieux qu'il en joue beaucoup
+        if bot.state is None:
+            bot.state = mcts.Tree()
+        return mcts.search(grid, bot.state, MCTS_PLAYOUTS, deadline=deadline)
+
+    if diff_level == 2:  # niveau de difficulté difficile
+        if grid.width == grid.height == grid.length == 3:
+            # le bot joue le coup parfait, lu dans la table des solutions
+            move = best_move(grid)
+        else:
+            # il n'y a pas de table des solutions pour les autres tailles de grille
+            move = threat_move(grid, THREAT_SEARCH_DEPTH if bot.depth is None else bot.depth, deadline)
+        if move is not None:
+            return move
+
+    # niveau de difficulté facile
+    x, y = randint(0, grid.width - 1), randint(0, grid.height - 1)
+    while grid.cells[y * grid.width + x] != 0:
+        x, y = randint(0, grid.width - 1), randint(0, grid.height - 1)
+    return y * grid.width + x
 
-    while True:
-        playing, waiting = waiting, playing
 
-        symbol = "×" if playing == player1 else "○"
-        if playing[0] == "\t":
-            x, y = auto_play(playing, symbol, "○" if playing == player1 else "×", grid)
-            grid[y][x] = f" {symbol} "
+def prompt_variant() -> tuple[int, int, int]:
+    """Demande aux joueurs sur quelle grille ils veulent jouer.
 
-            display_grid(f"{bold(get_display_name(playing))} a joué !", grid, keys={"ENTER": "Continuer"})
+    :returns: La largeur et la hauteur de la grille, et le nombre de symboles à aligner pour gagner
+    """
+    choice: int
+    width: int
+    height: int
+    length: int
+
+    choice = display.prompt_choice("Sur quelle grille voulez-vous jouer ?", [variant[0] for variant in VARIANTS])
+    _, width, height, length = VARIANTS[choice]
+
+    if width == 0:
+        width = display.prompt_int(f"Largeur de la grille (entre {bold('3')} et {bold('30')}) ?", 3, 30)
+        height = display.prompt_int(f"Hauteur de la grille (entre {bold('3')} et {bold('30')}) ?", 3, 30)
+        length = display.prompt_int(
+            f"Nombre de symboles à aligner (entre {bold('3')} et {bold(str(max(width, height)))}) ?",
+            3,
+            max(width, height),
+        )
+
+    return width, height, length
+
+
+def play_turn(grid: Grid, players: tuple[Player, Player], choose: Callable[[Player, Player, Grid], int]) -> int | None:
+    """Fait jouer le joueur dont c'est le tour: le déroulement d'une partie, commun à `game` et `simulate`.
+
+    :param grid:    La grille de jeu
+    :param players: Le joueur 1 et le joueur 2
+    :param choose:  La fonction qui choisit la case du joueur, appelée avec le joueur, son adversaire et la grille
+    :returns:       Le joueur qui a gagné (1 ou 2, 0 en cas d'égalité), ou None si la partie n'est pas terminée
+    """
+    grid.play(choose(players[grid.turn - 1], players[2 - grid.turn], grid))
+    return grid.result()
+
+
+def choose_cell(player: Player, opponent: Player, grid: Grid) -> int:
+    """Demande sa case au joueur dont c'est le tour, pendant une partie lancée depuis le menu (voir `play_turn`).
+
+    :param player:   Le joueur qui doit jouer
+    :param opponent: Son adversaire, qui réfléchit pendant le tour de l'humain si c'est un bot de niveau moyen
+    :param grid:     La grille de jeu
+    :returns:        La case où le joueur va placer son symbole
+    """
+    ponderer: Ponderer
+
+    if isinstance(player, Bot):
+        return bots.play(player, auto_play, grid)
+
+    if isinstance(opponent, Bot) and opponent.level == 1:
+        # le bot réfléchit pendant que l'humain choisit son coup
+        ponderer = Ponderer(partial(ponder, opponent, grid.copy())).start()
+        try:
+            return place_symbol(player, grid, ponderer)
+        finally:
+            ponderer.stop()
+
+    return place_symbol(player, grid)
+
+
+def simulate(player1: Bot, player2: Bot, variant: int) -> tuple[int, int]:
+    """Joue une partie entre deux bots sans rien afficher ni attendre de touche.
+
+    :param player1: Le bot qui commence
+    :param player2: L'autre bot
+    :param variant: L'indice de la grille dans `VARIANTS` (la grille personnalisée n'est pas acceptée)
+    :returns:       Le joueur qui a gagné (1 ou 2, 0 en cas d'égalité) et le nombre de coups joués
+    """
+    players: tuple[Bot, Bot] = (player1, player2)
+    grid: Grid
+    result: int | None = None
+
+    player1.new_game()
+    player2.new_game()
+    grid = Grid(*VARIANTS[variant][1:])
+
+    while result is None:
+        # entre deux bots, `choose_cell` n'affiche rien
+        result = play_turn(grid, players, choose_cell)
+
+    return result, len(grid.moves)
+
+
+def game(player1: Player, player2: Player) -> None:
+    """Lance une partie de morpion et sauvegarde le score à la fin de la partie.
+
+    :param player1: Le joueur 1 (celui qui commence)
+    :param player2: Le joueur 2
+    """
+    players: tuple[Player, Player] = (player1, player2)
+    grid: Grid
+    playing: Player
+    winner: Player
+    loser: Player
+    result: int | None = None
+
+    for playing in players:
+        if isinstance(playing, Bot):
+            playing.new_game()
+
+    grid = Grid(*prompt_variant())
+
+    while result is None:
+        playing = players[grid.turn - 1]
+        result = play_turn(grid, players, choose_cell)
+
+        if isinstance(playing, Bot):
+            display_grid(f"{bold(playing.display_name)} a joué !", grid, keys={"ENTER": "Continuer"})
             while get_key() != "\n":
                 pass
-        else:
-            place_symbol(playing, symbol, grid)
-
-        winner = check_win(grid)
-        if winner != "":
-            break
 
-    if winner == "t":
+    if result == 0:
         add_score(player1, player2, tie=True)
 
         display.screen(
@@ -295,11 +751,11 @@ def game(player1: str, player2: str) -> None:
             keys={"ENTER": "Continuer"},
         )
     else:
-        winner, loser = (player1, player2) if winner == "×" else (player2, player1)
+        winner, loser = players[result - 1], players[2 - result]
         add_score(winner, loser)
 
         display.screen(
-            [f"{bold(get_display_name(winner))} a gagné !!!"],
+            [f"{bold(winner.display_name)} a gagné !!!"],
             keys={"ENTER": "Continuer"},
         )
 
@@ -1,22 +1,106 @@
-def get_display_name(name: str) -> str:
-    """Récupère le nom d'affichage d'un joueur.
+from __future__ import annotations
 
-    Si le joueur est un humain, son nom est retourné.
-    Si le joueur est un bot, "Bot 1" ou "Bot 2" est retourné.
+from typing import Any
 
-    :param name: Le nom du joueur
-    :returns:    Le nom d'affichage du joueur
-    """
-    if name[0] == "\t":
-        return f"Bot {name[1]}"
-    else:
-        return name
 
+class Player:
+    """Un joueur humain."""
+
+    __slots__ = ("name", "display_name")
+
+    # le nom du joueur, tel qu'il est enregistré dans les tableaux des scores
+    name: str
+    # le nom affiché à l'écran
+    display_name: str
+
+    def __init__(self, name: str) -> None:
+        """Crée un joueur.
+
+        :param name: Le nom du joueur
+        """
+        self.name = name
+        self.display_name = name
+
+
+class MoveStats:
+    """Le temps de réflexion d'un bot, coup par coup (voir `bots.play`)."""
+
+    __slots__ = ("moves", "total", "longest", "overruns")
+
+    # le nombre de coups joués
+    moves: int
+    # le temps total passé à réfléchir, et le plus long temps passé sur un coup, en secondes
+    total: float
+    longest: float
+    # le nombre de coups pour lesquels le bot a dépassé son temps de réflexion
+    overruns: int
+
+    def __init__(self) -> None:
+        """Crée des statistiques vides."""
+        self.moves = 0
+        self.total = 0.0
+        self.longest = 0.0
+        self.overruns = 0
 
-def difficulty_level(name: str) -> int:
-    """Récupère le niveau de difficulté du bot à partir de son nom.
+    def record(self, elapsed: float, budget: float) -> None:
+        """Ajoute le temps de réflexion d'un coup.
 
-    :param name: Le nom du bot
-    :returns:    Le niveau de difficulté du bot (entre 0 et 3)
+        :param elapsed: Le temps passé à réfléchir, en secondes
+        :param budget:  Le temps qui était accordé au bot, en secondes
+        """
+        self.moves += 1
+        self.total += elapsed
+        self.longest = max(self.longest, elapsed)
+        if elapsed > budget:
+            self.overruns += 1
+
+    def mean(self) -> float:
+        """Retourne le temps de réflexion moyen par coup, en secondes."""
+        return self.total / self.moves if self.moves else 0.0
+
+
+class Bot(Player):
+    """Un joueur contrôlé par l'ordinateur.
+
+    En plus de son niveau de difficulté, un bot garde entre deux coups les résultats de ses recherches (sa mémoire),
+    et l'état propre au jeu en cours (par exemple les bornes connues du nombre à deviner au plus ou moins).
     """
-    return int(name[2])
+
+    __slots__ = ("index", "level", "depth", "duration", "memory", "state", "stats")
+
+    # l'indice du bot (1 s'il remplace le joueur 1, 2 s'il remplace le joueur 2)
+    index: int
+    # le niveau de difficulté du bot (0 pour facile, 1 pour moyen et 2 pour difficile)
+    level: int
+    # la profondeur maximum de recherche du bot, None pour celle de son niveau de difficulté
+    depth: int | None
+    # le temps de réflexion maximum du bot par coup en secondes, None pour celui de son niveau de difficulté
+    duration: float | None
+    # la table de transposition du bot: les positions déjà évaluées, selon leur clé
+    memory: dict[int, Any]
+    # l'état propre au jeu en cours, défini par chaque jeu
+    state: Any
+    # le temps de réflexion de chaque coup, sur toutes les parties du bot
+    stats: MoveStats
+
+    def __init__(self, index: int, level: int, *, depth: int | None = None, duration: float | None = None) -> None:
+        """Crée un bot.
+
+        :param index:    L'indice du bot (1 ou 2)
+        :param level:    Le niveau de difficulté du bot (entre 0 et 2)
+        :param depth:    La profondeur maximum de recherche, si elle doit être différente de celle du niveau
+        :param duration: Le temps de réflexion maximum par coup, s'il doit être différent de celui du niveau
+        """
+        super().__init__(f"Bot {index}")
+        self.index = index
+        self.level = level
+        self.depth = depth
+        self.duration = duration
+        self.memory = {}
+        self.state = None
+        self.stats = MoveStats()
+
+    def new_game(self) -> None:
+        """Oublie tout ce que le bot a appris pendant la partie précédente."""
+        self.memory.clear()
+        self.state = None
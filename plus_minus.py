@@ -1,13 +1,17 @@
 from __future__ import annotations
 
 import random
+from functools import partial
+from math import comb
 from random import randint
+from typing import Callable
 
+import bots
 import display
 import terminal
 from display import waiting_screen
-from players import difficulty_level, get_display_name
-from scores import ScoreLine, get_scores, set_scores
+from players import Bot, Player
+from scores import SCORES_LOCK, ScoreLine, get_scores, set_scores
 from terminal import bold, get_key, green, red
 
 SCOREBOARD = "plus_minus"
@@ -18,6 +22,227 @@ RULES = [
     "Le premier joueur possède deux vie où il peut se tromper dans ses réponses (la vraie réponse sera affichée).",
     "Si le premier joueur perd toutes ses vies le jeu s'arrête et le deuxième joueur gagne",
 ]
+P1_LIVES = 2
+
+
+class GuessState:
+    """Ce que le bot qui devine sait du nombre à deviner (voir `Bot.state`)."""
+
+    __slots__ = ("minimum", "maximum", "search")
+
+    # les bornes connues du nombre à deviner, d'après les vraies réponses
+    minimum: int
+    maximum: int
+    # la recherche qui tient compte des mensonges du joueur, si le bot ne se fie qu'à ses réponses
+    search: LieSearch | None
+
+    def __init__(self, maximum: int, search: LieSearch | None = None) -> None:
+        """Crée l'état du bot au début de la partie.
+
+        :param maximum: La borne maximum du nombre à deviner
+        :param search:  La recherche qui tient compte des mensonges du joueur, si le bot ne se fie qu'à ses réponses
+        """
+        self.minimum = 0
+        self.maximum = maximum
+        self.search = search
+
+
+class LieSearch:
+    """Recherche d'un nombre à partir de réponses qui peuvent être des mensonges (le jeu d'Ulam).
+
+    Pour chaque nombre possible, la recherche compte le nombre de réponses qui le contredisent (les mensonges qu'il
+    faudrait que le joueur ait fait pour que ce soit son nombre). Ces compteurs sont constants par intervalles, les
+    candidats sont donc stockés sous forme d'intervalles: le coût de la recherche ne dépend que du nombre de questions
+    posées, et pas de la taille des intervalles (la borne maximum peut aller bien au delà de 10^12).
+    """
+
+    __slots__ = ("intervals", "lies")
+
+    # les candidats: (premier nombre, dernier nombre, nombre de mensonges), triés et sans chevauchement
+    intervals: list[tuple[int, int, int]]
+    # le nombre maximum de mensonges que le joueur peut faire
+    lies: int
+
+    def __init__(self, maximum: int, lies: int) -> None:
+        """Crée une recherche où le nombre est compris entre 0 et `maximum`.
+
+        :param maximum: La borne maximum du nombre à deviner
+        :param lies:    Le nombre maximum de mensonges que le joueur peut faire
+        """
+        self.intervals = [(0, maximum, 0)]
+        self.lies = lies
+
+    def weights(self, questions: int) -> list[int]:
+        """Retourne le poids d'un candidat en fonction de son nombre de mensonges (son "volume" de Berlekamp).
+
+        Le poids d'un candidat est le nombre de façons dont le joueur peut encore mentir sur les `questions` prochaines
+        réponses sans dépasser le nombre maximum de mensonges. Le poids d'un candidat qui a dépassé ce maximum est 0.
+
+        :param questions: Le nombre de questions restantes
+        :returns:         Le poids pour chaque nombre de mensonges, de 0 à `lies + 1`
+        """
+        remaining: int
+
+        return [
+            sum(comb(questions, i) for i in range(self.lies - remaining + 1)) for remaining in range(self.lies + 1)
+        ] + [0]
+
+    def volume(self, questions: int) -> int:
+        """Retourne la somme des poids de tous les candidats.
+
+        :param questions: Le nombre de questions restantes
+        :returns:         Le volume de la recherche
+        """
+        weights: list[int] = self.weights(questions)
+
+        return sum((end - start + 1) * weights[lies] for start, end, lies in self.intervals)
+
+    def volume_after(self, guess: int, answer: str, weights: list[int]) -> int:
+        """Retourne le volume qu'aurait la recherche après la réponse `answer` à la proposition `guess`.
+
+        :param guess:   Le nombre proposé
+        :param answer:  La réponse du joueur ("+", "-" ou "=")
+        :param weights: Les poids des candidats pour le nombre de questions restantes après cette réponse
+        :returns:       Le volume de la recherche
+        """
+        total: int = 0
+        start: int
+        end: int
+        lies: int
+        rest: int
+        consistent: int
+
+        for start, end, lies in self.intervals:
+            # `guess` n'est plus un candidat: si c'était le nombre, la partie serait terminée
+            rest = end - start + 1 - (start <= guess <= end)
+            if answer == "+":
+                consistent = max(0, end - max(start, guess + 1) + 1)
+            elif answer == "-":
+                consistent = max(0, min(end, guess - 1) - start + 1)
+            else:
+                consistent = 0
+
+            total += consistent * weights[lies] + (rest - consistent) * weights[lies + 1]
+
+        return total
+
+    def worst_volume(self, guess: int, weights: list[int]) -> int:
+        """Retourne le plus grand volume que pourrait avoir la recherche après avoir proposé `guess`.
+
+        :param guess:   Le nombre proposé
+        :param weights: Les poids des candidats pour le nombre de questions restantes après la réponse
+        :returns:       Le volume dans le pire des cas
+        """
+        return max(self.volume_after(guess, answer, weights) for answer in ("+", "-", "="))
+
+    def guess(self) -> int:
+        """Choisis le nombre à proposer.
+
+        Le nombre choisi est celui qui minimise le volume de la recherche après la réponse, dans le pire des cas.
+        Le volume après une réponse "+" diminue quand la proposition augmente, et c'est l'inverse pour la réponse "-":
+        le meilleur nombre est donc trouvé par dichotomie à l'endroit où ces deux volumes se croisent.
+
+        :returns: Le nombre proposé
+        """
+        questions: int = 0
+        weights: list[int]
+        low: int
+        high: int
+        middle: int
+
+        if len(self.intervals) == 1 and self.intervals[0][0] == self.intervals[0][1]:
+            return self.intervals[0][0]
+
+        # nombre de questions nécessaires selon la borne de Berlekamp (chaque réponse divise au mieux le volume par 2)
+        while self.volume(questions) > 2**questions:
+            questions += 1
+        weights = self.weights(max(0, questions - 1))
+
+        low, high = self.intervals[0][0], self.intervals[-1][1]
+        while low < high:
+            middle = (low + high) // 2
+            if self.volume_after(middle, "-", weights) >= self.volume_after(middle, "+", weights):
+                high = middle
+            else:
+                low = middle + 1
+
+        if low > self.intervals[0][0] and self.worst_volume(low - 1, weights) < self.worst_volume(low, weights):
+            return low - 1
+        return low
+
+    def update(self, guess: int, answer: str) -> None:
+        """Met à jour les candidats après la réponse `answer` à la proposition `guess`.
+
+        Les candidats qui demanderaient plus de mensonges que le maximum sont retirés.
+
+        :param guess:  Le nombre proposé
+        :param answer: La réponse du joueur ("+", "-" ou "=")
+        """
+        intervals: list[tuple[int, int, int]] = []
+        start: int
+        end: int
+        lies: int
+        part_start: int
+        part_end: int
+        consistent: bool
+
+        for start, end, lies in self.intervals:
+            # on coupe l'intervalle en trois: avant, sur, et après la proposition
+            for part_start, part_end in ((start, min(end, guess - 1)), (max(start, guess + 1), end)):
+                if part_start > part_end:
+                    continue
+
+                consistent = (answer == "+" and part_start > guess) or (answer == "-" and part_end < guess)
+                if consistent:
+                    intervals.append((part_start, part_end, lies))
+                elif lies < self.lies:
+                    intervals.append((part_start, part_end, lies + 1))
+
+        if intervals:
+            self.intervals = intervals
+
+
+class Round:
+    """Une partie de plus ou moins, sans affichage: le nombre à deviner, le dernier essai et les vies du joueur 1."""
+
+    __slots__ = ("maximum", "number", "guess", "guess_count", "lives")
+
+    # la borne maximum, et le nombre à deviner
+    maximum: int
+    number: int
+    # le dernier nombre proposé par le joueur 2 (-1 avant le premier essai), et son nombre d'essais
+    guess: int
+    guess_count: int
+    # le nombre de vies du joueur 1
+    lives: int
+
+    def __init__(self, maximum: int, number: int) -> None:
+        """Crée une partie où le joueur 2 n'a pas encore proposé de nombre.
+
+        :param maximum: La borne maximum
+        :param number:  Le nombre à deviner
+        """
+        self.maximum = maximum
+        self.number = number
+        self.guess = -1
+        self.guess_count = 0
+        self.lives = P1_LIVES
+
+    def truth(self) -> str:
+        """Retourne la vraie réponse au dernier essai: "+", "-" ou "=" (voir `prompt_plus_minus`)."""
+        if self.number > self.guess:
+            return "+"
+        elif self.number < self.guess:
+            return "-"
+        return "="
+
+    def result(self) -> int | None:
+        """Retourne le résultat de la partie.
+
+        :returns: Le joueur qui a gagné (toujours 2, c'est son nombre d'essais qui compte), ou None si la partie
+                  n'est pas terminée
+        """
+        return 2 if self.guess == self.number or self.lives == 0 else None
 
 
 def prompt_int_hideable(message: str, decorations: list[tuple[int, int, str]] = []) -> int:
@@ -90,16 +315,32 @@ def prompt_plus_minus(player1: str, player2: str, guess: int, decorations: list[
     return key
 
 
-def add_score(player: str, guess_count: int, maximum: int) -> None:
+def prompt_lie_mode() -> bool:
+    """Demande si le bot difficile doit deviner à partir des seules réponses du joueur (voir `LieSearch`).
+
+    Par défaut, le bot se sert de la vraie réponse affichée après chaque essai, comme un joueur humain.
+
+    :returns: Vrai si le bot ne se fie qu'aux réponses du joueur, qui peuvent être des mensonges
+    """
+    return (
+        display.prompt_choice(
+            "Comment le bot doit-il deviner ?",
+            ["Avec les vraies réponses", "Avec vos seules réponses (mensonges compris)"],
+        )
+        == 1
+    )
+
+
+def add_score(player: Player, guess_count: int, maximum: int) -> None:
     """Ajoute le score du joueur qui vient de deviner.
 
     Le score dépends du nombre d'essais et de la borne maximum du nombre à deviner.
 
-    :param player:      Le nom du joueur qui a deviné
+    :param player:      Le joueur qui a deviné
     :param guess_count: Le nombre d'essais dont le joueur a eu besoin
     :param maximum:     La borne maximum du nombre à deviner
     """
-    if player[0] == "\t":
+    if isinstance(player, Bot):
         return
 
     scores: list[ScoreLine]
@@ -107,10 +348,11 @@ def add_score(player: str, guess_count: int, maximum: int) -> None:
 
     score = round(guess_count / maximum * 100, 3)
 
-    scores = get_scores(SCOREBOARD)
-    scores.append((player, [score]))
+    with SCORES_LOCK:
+        scores = get_scores(SCOREBOARD)
+        scores.append((player.name, [score]))
 
-    set_scores(SCOREBOARD, scores)
+        set_scores(SCOREBOARD, scores)
 
 
 def get_sorted_scores() -> list[tuple[str, str]]:
@@ -133,139 +375,257 @@ def get_sorted_scores() -> list[tuple[str, str]]:
     return scores
 
 
-def auto_guess(bot_name: str) -> int:
+def auto_guess(bot: Bot, deadline: float) -> int:
     """Choisis un nombre à deviner en fonction du niveau de difficulté du bot.
 
-    Si cette fonction est appelée avec le nom d'un joueur, son comportement n'est pas définie.
-    Cette fonction utilise le minimum et maximum actuels connus qui est enregistré dans le nom du bot
+    Cette fonction utilise le minimum et maximum actuels connus qui sont enregistrés dans l'état du bot,
+    sauf si le bot ne se fie qu'aux réponses du joueur (dans ce cas, l'état contient une `LieSearch`).
+    Le choix est immédiat, l'échéance n'est là que pour suivre l'interface commune des bots (voir `bots.play`).
 
-    :param bot_name: Le nom du bot (qui contient des métadonnées utiles)
+    :param bot:      Le bot qui devine
+    :param deadline: L'instant (selon `time.monotonic`) auquel le bot doit avoir choisi son nombre
     :returns:        Le nombre que le bot à deviné
     """
-    diff_level = difficulty_level(bot_name)
-    min, max = map(int, bot_name.split(",")[1:])
+    state: GuessState = bot.state
+    diff_level: int
+
+    if state.search is not None:
+        return state.search.guess()
+
+    diff_level = bot.level
 
     if diff_level == 1:  # niveau de difficulté moyen
         # le bot à 1 chance sur 2 de faire le meilleur choix
         diff_level = random.choice((0, 2))
 
     if diff_level == 0:  # niveau de difficulté facile
-        return randint(min, max)
+        return randint(state.minimum, state.maximum)
     else:  # niveau de difficulté difficile
-        return min + (max - min) // 2
+        return state.minimum + (state.maximum - state.minimum) // 2
 
 
-def update_bot(bot: str, guess: int, number: int) -> str:
-    """Met à jour les métadonnées contenue dans le bot.
+def auto_maximum(bot: Bot) -> int:
+    """Choisis la borne maximum du nombre à faire deviner en fonction du niveau de difficulté du bot.
+
+    :param bot: Le bot qui fait deviner
+    :returns:   La borne maximum
+    """
+    if bot.level == 0:
+        return randint(10, 100)
+    elif bot.level == 1:
+        return randint(50, 150)
+    else:
+        return randint(100, 200)
+
 
-    Si cette fonction est appelée avec le nom d'un joueur, son comportement n'est pas définie.
-    Ces métadonnées contiennent les nombres minimum et maximum connus pour le chiffre qui est entrain d'être deviné.
+def update_bot(bot: Bot, guess: int, number: int) -> None:
+    """Met à jour les bornes connues par le bot pour le nombre qui est entrain d'être deviné.
 
-    :param bot:    Le nom du bot
+    :param bot:    Le bot qui devine
     :param guess:  Le nombre que le bot viens de deviner
     :param number: Le nombre que le bot cherche
-    :returns:      Le nouveau du bot
     """
-    base_name, min, max = bot.split(",")
+    state: GuessState = bot.state
+
     if number > guess:
-        min = str(guess + 1)
+        state.minimum = guess + 1
     elif number < guess:
-        max = str(guess - 1)
+        state.maximum = guess - 1
     # si number == guess, le bot a gagné et il n'y a pas besoin de le mettre à jour
 
-    return f"{base_name},{min},{max}"
 
+def play_turn(
+    current: Round,
+    players: tuple[Player, Player],
+    guess: Callable[[Player, Player, Round], int],
+    answer: Callable[[Player, Player, Round], str],
+) -> int | None:
+    """Fait jouer un tour: le joueur 2 propose un nombre, puis le joueur 1 répond.
+
+    C'est le déroulement d'une partie, commun à `game` et `simulate`. Une mauvaise réponse coûte une vie au joueur 1.
+    Le bot qui devine resserre ses bornes d'après la vraie réponse, et tient compte de la réponse du joueur s'il ne se
+    fie qu'à ses réponses (voir `GuessState`).
+
+    :param current: La partie
+    :param players: Le joueur 1 (qui fait deviner) et le joueur 2 (qui devine)
+    :param guess:   La fonction qui choisit le nombre du joueur 2, appelée avec le joueur 2, le joueur 1 et la partie
+    :param answer:  La fonction qui choisit la réponse du joueur 1 ("+", "-" ou "="), appelée avec le joueur 1, le
+                    joueur 2 et la partie
+    :returns:       Le joueur qui a gagné (toujours 2), ou None si la partie n'est pas terminée
+    """
+    given: str
+
+    current.guess = guess(players[1], players[0], current)
+    current.guess_count += 1
+    given = answer(players[0], players[1], current)
+    if given != current.truth():
+        current.lives -= 1
+
+    if isinstance(players[1], Bot):
+        if players[1].state.search is not None:
+            players[1].state.search.update(current.guess, given)
+        update_bot(players[1], current.guess, current.number)
 
-def game(player1: str, player2: str) -> None:
+    return current.result()
+
+
+def bot_guess(bot: Player, chooser: Player, current: Round) -> int:
+    """Demande son nombre au bot qui devine, sans rien afficher (voir `play_turn`).
+
+    :param bot:     Le bot qui devine
+    :param chooser: Le joueur qui fait deviner
+    :param current: La partie
+    :returns:       Le nombre proposé
+    """
+    assert isinstance(bot, Bot)
+    return bots.play(bot, auto_guess)
+
+
+def honest_answer(chooser: Player, guesser: Player, current: Round) -> str:
+    """Répond honnêtement au dernier essai, comme le fait toujours un bot (voir `play_turn`).
+
+    :param chooser: Le joueur qui fait deviner
+    :param guesser: Le joueur qui devine
+    :param current: La partie
+    :returns:       La vraie réponse
+    """
+    return current.truth()
+
+
+def ask_guess(guesser: Player, chooser: Player, current: Round, decorations: list[tuple[int, int, str]]) -> int:
+    """Demande son nombre au joueur qui devine, pendant une partie lancée depuis le menu (voir `play_turn`).
+
+    :param guesser:     Le joueur qui devine
+    :param chooser:     Le joueur qui fait deviner
+    :param current:     La partie
+    :param decorations: Les informations affichées autour de l'écran
+    :returns:           Le nombre proposé
+    """
+    guess: int
+
+    if not isinstance(guesser, Bot):
+        return display.prompt_int(f"{bold(guesser.display_name)} devine", decorations=decorations)
+
+    guess = bot_guess(guesser, chooser, current)
+    waiting_screen(f"{bold(guesser.display_name)} à deviné: {bold(str(guess))}", decorations)
+    return guess
+
+
+def ask_answer(chooser: Player, guesser: Player, current: Round, decorations: list[tuple[int, int, str]]) -> str:
+    """Demande sa réponse au joueur qui fait deviner, pendant une partie lancée depuis le menu (voir `play_turn`).
+
+    :param chooser:     Le joueur qui fait deviner
+    :param guesser:     Le joueur qui devine
+    :param current:     La partie
+    :param decorations: Les informations affichées autour de l'écran (le nombre d'essais y est mis à jour)
+    :returns:           La réponse
+    """
+    decorations[1] = (3, 3, f"Nombre d'essais: {bold(str(current.guess_count))}")
+
+    if isinstance(chooser, Bot):
+        return honest_answer(chooser, guesser, current)
+    return prompt_plus_minus(chooser.display_name, guesser.display_name, current.guess, decorations)
+
+
+def simulate(player1: Bot, player2: Bot) -> tuple[int, int]:
+    """Joue une partie entre deux bots sans rien afficher ni attendre de touche.
+
+    Un bot répond toujours honnêtement, le bot qui devine finit donc toujours par trouver le nombre: c'est le nombre
+    d'essais dont il a eu besoin qui compte.
+
+    :param player1: Le bot qui fait deviner
+    :param player2: Le bot qui devine
+    :returns:       Le joueur qui a gagné (toujours 2) et le nombre d'essais
+    """
+    players: tuple[Bot, Bot] = (player1, player2)
+    maximum: int
+    current: Round
+    result: int | None = None
+
+    player1.new_game()
+    player2.new_game()
+    maximum = auto_maximum(player1)
+    current = Round(maximum, randint(0, maximum))
+    player2.state = GuessState(maximum)
+
+    while result is None:
+        result = play_turn(current, players, bot_guess, honest_answer)
+
+    return result, current.guess_count
+
+
+def game(player1: Player, player2: Player) -> None:
     """Lance une partie de plus ou moins et sauvegarde le score à la fin de la partie.
 
-    :param player1: Le nom du joueur 1 (celui qui choisi le chiffre)
-    :param player2: Le nom du joueur 2 (celui qui devine)
+    :param player1: Le joueur 1 (celui qui choisi le chiffre)
+    :param player2: Le joueur 2 (celui qui devine)
     """
+    players: tuple[Player, Player] = (player1, player2)
     max: int
     number: int
-    guess: int = -1
-    guess_count: int = 0
-    answer: str
-    p1_lives: int = 2
-    diff_level: int
+    current: Round
+    result: int | None = None
+    search: LieSearch | None = None
     decorations: list[tuple[int, int, str]] = []
 
-    if player1[0] == "\t":
-        diff_level = difficulty_level(player1)
-        if diff_level == 0:
-            max = randint(10, 100)
-        elif diff_level == 1:
-            max = randint(50, 150)
-        else:
-            max = randint(100, 200)
-        waiting_screen(f"{bold(get_display_name(player1))} a choisi {bold(str(max))} comme borne maximum", decorations)
+    if isinstance(player1, Bot):
+        player1.new_game()
+        max = auto_maximum(player1)
+        waiting_screen(f"{bold(player1.display_name)} a choisi {bold(str(max))} comme borne maximum", decorations)
     else:
-        max = display.prompt_int(f"{bold(get_display_name(player1))} choisit la borne maximum (minimum 10)", 10)
+        max = display.prompt_int(f"{bold(player1.display_name)} choisit la borne maximum (minimum 10)", 10)
     decorations.append((3, 2, f"Maximum: {max}"))
 
-    if player1[0] == "\t":
+    if isinstance(player1, Bot):
         number = randint(0, max)
-        waiting_screen(f"{bold(get_display_name(player1))} a choisi son nombre", decorations)
+        waiting_screen(f"{bold(player1.display_name)} a choisi son nombre", decorations)
     else:
-        number = prompt_int_hideable(f"{bold(get_display_name(player1))} choisit un nombre", decorations)
+        number = prompt_int_hideable(f"{bold(player1.display_name)} choisit un nombre", decorations)
         while number > max:
             number = prompt_int_hideable("Votre nombre ne peut pas dépasser le nombre maximum", decorations)
 
-    decorations.append((3, 3, f"Nombre d'essais: {bold(str(guess_count))}"))
-    decorations.append((3, 4, f"Vie(s) de {bold(get_display_name(player1))}: {bold(str(p1_lives))}"))
-
-    if player2[0] == "\t":
-        # on ajoute le maximum et le minimum connu au nom du bot
-        player2 += f",0,{max}"
-
-    while (guess != number) and (p1_lives > 0):
-        guess_count += 1
-        if player2[0] == "\t":
-            guess = auto_guess(player2)
-            waiting_screen(f"{bold(get_display_name(player2))} à deviné: {bold(str(guess))}", decorations)
-        else:
-            guess = display.prompt_int(f"{bold(get_display_name(player2))} devine", decorations=decorations)
-
-        decorations[1] = (3, 3, f"Nombre d'essais: {bold(str(guess_count))}")
+    current = Round(max, number)
+    decorations.append((3, 3, f"Nombre d'essais: {bold(str(current.guess_count))}"))
+    decorations.append((3, 4, f"Vie(s) de {bold(player1.display_name)}: {bold(str(current.lives))}"))
 
-        if player1[0] != "\t":
-            answer = prompt_plus_minus(get_display_name(player1), get_display_name(player2), guess, decorations)
-            if (
-                (number > guess and answer != "+")
-                or (number < guess and answer != "-")
-                or (number == guess and answer != "=")
-            ):
-                p1_lives -= 1
+    if isinstance(player2, Bot):
+        player2.new_game()
+        if not isinstance(player1, Bot) and player2.level == 2 and prompt_lie_mode():
+            # le bot difficile ne regarde que les réponses de l'humain, qui peuvent être des mensonges
+            # le dernier mensonge fait perdre la partie, il ne peut donc mentir que P1_LIVES - 1 fois sans perdre
+            search = LieSearch(max, P1_LIVES - 1)
+        player2.state = GuessState(max, search)
 
-        if player2[0] == "\t":
-            player2 = update_bot(player2, guess, number)
+    while result is None:
+        result = play_turn(
+            current, players, partial(ask_guess, decorations=decorations), partial(ask_answer, decorations=decorations)
+        )
 
-        decorations[2] = (3, 4, f"Vie(s) de {bold(get_display_name(player1))}: {bold(str(p1_lives))}")
+        decorations[2] = (3, 4, f"Vie(s) de {bold(player1.display_name)}: {bold(str(current.lives))}")
 
-        if p1_lives == 0:
+        if current.lives == 0:
             display.screen(
                 [
-                    f"{bold(get_display_name(player1))} s'est trompé deux fois, {bold(get_display_name(player2))} gagne !",
+                    f"{bold(player1.display_name)} s'est trompé deux fois, {bold(player2.display_name)} gagne !",
                 ],
                 keys={"ENTER": "Écran titre"},
                 decorations=decorations,
             )
-        elif number > guess:
+        elif current.truth() == "+":
             display.screen(
-                [f"Le nombre est plus grand que {bold(str(guess))} !"],
+                [f"Le nombre est plus grand que {bold(str(current.guess))} !"],
                 keys={"ENTER": "Continuer"},
                 decorations=decorations,
             )
-        elif number < guess:
+        elif current.truth() == "-":
             display.screen(
-                [f"Le nombre est plus petit que {bold(str(guess))} !"],
+                [f"Le nombre est plus petit que {bold(str(current.guess))} !"],
                 keys={"ENTER": "Continuer"},
                 decorations=decorations,
             )
         else:
             display.screen(
-                [f"Bravo ! {bold(get_display_name(player2))} a trouvé en {bold(str(guess_count))} essais"],
+                [f"Bravo ! {bold(player2.display_name)} a trouvé en {bold(str(current.guess_count))} essais"],
                 keys={"ENTER": "Continuer"},
                 decorations=decorations,
             )
@@ -273,4 +633,4 @@ def game(player1: str, player2: str) -> None:
         while get_key() != "\n":
             pass
 
-    add_score(player2, guess_count, max)
+    add_score(player2, current.guess_count, max)
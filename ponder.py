@@ -0,0 +1,133 @@
+"""Réflexion des bots pendant le tour de l'humain ("pondering").
+
+Pendant que l'humain déplace son curseur, le bot cherche déjà ses réponses aux coups probables de l'humain dans un
+fil d'exécution séparé, et garde ce qu'il trouve dans sa mémoire (sa table de transposition ou son arbre de
+recherche). Quand l'humain a joué, le bot n'a plus qu'à lire sa réponse.
+
+La réflexion ne doit jamais ralentir l'affichage: elle est mise en pause pendant que les touches sont traitées (voir
+`paused`), et l'intervalle de changement de fil de Python est réduit tant qu'elle tourne, pour que le fil principal
+reprenne la main dès qu'une touche arrive.
+"""
+
+from __future__ import annotations
+
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+# l'intervalle (en secondes) au bout duquel Python passe d'un fil d'exécution à l'autre pendant la réflexion
+SWITCH_INTERVAL = 0.001
+
+# le nombre de réflexions en cours (plusieurs sessions peuvent tourner dans le même processus, voir `telnet`), et
+# l'intervalle de changement de fil d'avant la première d'entre elles, à remettre à la fin de la dernière
+_active: int = 0
+_interval: float = 0.0
+_lock: threading.Lock = threading.Lock()
+
+
+class PonderStop(Exception):
+    """Levée dans le fil de réflexion quand la réflexion doit s'arrêter."""
+
+
+class Ponderer:
+    """Un fil d'exécution dans lequel un bot réfléchit pendant le tour de l'humain.
+
+    La fonction de réflexion reçoit une fonction `check` qu'elle doit appeler régulièrement (par exemple à chaque
+    position examinée): `check` bloque tant que la réflexion est en pause, et lève `PonderStop` quand elle doit
+    s'arrêter.
+    """
+
+    __slots__ = ("thread", "awake", "stopped")
+
+    # le fil d'exécution de la réflexion
+    thread: threading.Thread
+    # levé quand la réflexion n'est pas en pause
+    awake: threading.Event
+    # levé quand la réflexion doit s'arrêter
+    stopped: threading.Event
+
+    def __init__(self, think: Callable[[Callable[[], None]], None]) -> None:
+        """Prépare la réflexion (elle ne commence qu'à l'appel de `start`).
+
+        :param think: La fonction de réflexion, qui reçoit la fonction `check`
+        """
+        self.thread = threading.Thread(target=self._run, args=(think,), daemon=True)
+        self.awake = threading.Event()
+        self.stopped = threading.Event()
+        self.awake.set()
+
+    def _run(self, think: Callable[[Callable[[], None]], None]) -> None:
+        """Exécute la fonction de réflexion dans le fil de réflexion.
+
+        :param think: La fonction de réflexion
+        """
+        try:
+            think(self.check)
+        except PonderStop:
+            pass
+
+    def start(self) -> Ponderer:
+        """Lance la réflexion.
+
+        :returns: Le ponderer lui-même
+        """
+        global _active, _interval
+
+        with _lock:
+            if _active == 0:
+                _interval = sys.getswitchinterval()
+                sys.setswitchinterval(SWITCH_INTERVAL)
+            _active += 1
+        self.thread.start()
+        return self
+
+    def check(self) -> None:
+        """Attend la fin de la pause si la réflexion est en pause (appelée par le fil de réflexion).
+
+        :raises PonderStop: Si la réflexion doit s'arrêter
+        """
+        if not self.awake.is_set():
+            self.awake.wait()
+        if self.stopped.is_set():
+            raise PonderStop
+
+    def pause(self) -> None:
+        """Met la réflexion en pause (elle s'arrête au prochain appel de `check`)."""
+        self.awake.clear()
+
+    def resume(self) -> None:
+        """Reprend la réflexion après une pause."""
+        self.awake.set()
+
+    def stop(self) -> None:
+        """Arrête la réflexion et attend que le fil de réflexion soit terminé.
+
+        Ensuite, la mémoire du bot peut être utilisée par le fil principal sans risque.
+        """
+        global _active
+
+        self.stopped.set()
+        self.awake.set()
+        self.thread.join()
+        with _lock:
+            _active -= 1
+            if _active == 0:
+                sys.setswitchinterval(_interval)
+
+
+@contextmanager
+def paused(ponderer: Ponderer | None) -> Iterator[None]:
+    """Met la réflexion en pause le temps d'un bloc `with` (ne fait rien si `ponderer` est None).
+
+    :param ponderer: La réflexion à mettre en pause
+    """
+    if ponderer is None:
+        yield
+        return
+
+    ponderer.pause()
+    try:
+        yield
+    finally:
+        ponderer.resume()
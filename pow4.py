@@ -1,18 +1,26 @@
 from __future__ import annotations
 
+import math
 import time
+from functools import partial
 from random import randint
+from typing import Callable
 
+import bots
 import display
 import terminal
-from display import center
-from players import get_display_name
-from scores import get_scores, set_scores
+from board import DropGrid
+from cache import Cache, get_cache
+from display import center, print_at
+from players import Bot, Player
+from ponder import Ponderer, paused
+from scores import SCORES_LOCK, get_scores, set_scores
+from tablebase import LOSS, WIN, Tablebase, get_tablebase
 from terminal import bold, get_key, strip_escapes
 
 SCOREBOARD = "pow4"
 RULES = [
-    "L'objectif est d'aligner 4 jetons de sa couleur dans une grille de 7 par 6.",
+    "L'objectif est d'aligner 4 jetons de sa couleur dans une grille de 7 par 6 (ou plus grande si vous le souhaitez).",
     "Pour ce faire vous allez placer votre jeton dans une colonne non remplie chacun votre tour.",
     "Une ligne peut être horizontale, verticale, ou diagonale.",
     "Le premier joueur à aligner 4 jetons de sa couleur gagne la partie.",
@@ -20,37 +28,67 @@ RULES = [
 ]
 P1_COLOR = "31"
 P2_COLOR = "93"
-GRID_WIDTH = 7
-GRID_HEIGHT = 6
+# la couleur de chaque joueur (1 commence toujours), une case vide est représentée par 0
+COLORS = ("", P1_COLOR, P2_COLOR)
+# les tailles de grille proposées: (nom, largeur, hauteur)
+SIZES = [
+    ("Classique (7 × 6)", 7, 6),
+    ("Grande (9 × 7)", 9, 7),
+    ("Très grande (12 × 10)", 12, 10),
+    ("Géante (20 × 20)", 20, 20),
+    ("Personnalisée", 0, 0),
+]
+ALIGN = 4
 TOKEN = "⬤"
-
-
-def add_score(winner: str, loser: str, *, tie: bool = False) -> None:
+# durée maximum de l'animation de chute d'un jeton, en secondes
+DROP_DURATION = 1.2
+# profondeur de recherche (en demi-coups) pour chaque niveau de difficulté
+SEARCH_DEPTHS = (0, 2, 10)
+# score d'une position gagnée, bien plus grand que n'importe quelle évaluation heuristique
+WIN_SCORE = 1_000_000
+# le nombre maximum de demi-coups d'une partie (sur la plus grande grille personnalisée): dans la table de
+# transposition, les scores de fin de partie sont tous à moins de cet écart de `WIN_SCORE` (voir `to_table`)
+MAX_PLIES = 30 * 30
+# la nature du score d'une entrée de la table de transposition: exact, ou seulement une borne inférieure (la
+# recherche a été coupée par beta) ou supérieure (aucun coup n'a dépassé alpha)
+EXACT = 0
+LOWER = 1
+UPPER = 2
+# la profondeur minimum (en demi-coups) des recherches dont le résultat est gardé dans le cache sur disque
+CACHE_DEPTH = 4
+
+
+class SearchTimeout(Exception):
+    """Levée quand le bot a dépassé son temps de réflexion."""
+
+
+def add_score(winner: Player, loser: Player, *, tie: bool = False) -> None:
     """Met à jour le score des deux joueurs dans la base de donnée.
 
     Le gagnant se voit ajouter une victoire et les deux joueurs se voient ajouter une partie jouée.
     Si `tie` est vrai, alors aucun joueur ne voit son nombre de victoires augmenter.
 
-    :param winner: Le nom du gagnant
-    :param loser:  Le nom du perdant
+    :param winner: Le gagnant
+    :param loser:  Le perdant
     :param tie:    Vrai si la partie s'est terminée par une égalité.
     """
     scores: dict[str, list[float]]
 
-    scores = dict(get_scores(SCOREBOARD))
-    if winner[0] != "\t" and winner not in scores:
-        scores[winner] = [0, 0]
-    if loser[0] != "\t" and loser not in scores:
-        scores[loser] = [0, 0]
+    with SCORES_LOCK:
+        scores = dict(get_scores(SCOREBOARD))
+        if not isinstance(winner, Bot) and winner.name not in scores:
+            scores[winner.name] = [0, 0]
+        if not isinstance(loser, Bot) and loser.name not in scores:
+            scores[loser.name] = [0, 0]
 
-    if winner[0] != "\t":
-        if not tie:
-            scores[winner][0] += 1
-        scores[winner][1] += 1
-    if loser[0] != "\t":
-        scores[loser][1] += 1
+        if not isinstance(winner, Bot):
+            if not tie:
+                scores[winner.name][0] += 1
+            scores[winner.name][1] += 1
+        if not isinstance(loser, Bot):
+            scores[loser.name][1] += 1
 
-    set_scores(SCOREBOARD, scores.items())
+        set_scores(SCOREBOARD, scores.items())
 
 
 def get_sorted_scores() -> list[tuple[str, str]]:
@@ -77,18 +115,61 @@ def get_sorted_scores() -> list[tuple[str, str]]:
     return [(player, f"{winrate:.2f}") for player, winrate in score_lines]
 
 
-def display_grid(grid: list[list[str]]) -> None:
+def grid_origin(grid: DropGrid) -> tuple[int, int]:
+    """Retourne la position de la case en haut à gauche de la grille sur le terminal.
+
+    La grille est centrée de la même manière que le contenu principal de `display.screen`.
+
+    :param grid: La grille de jeu
+    :returns:    La colonne et la ligne de la case
+    """
+    width: int
+    height: int
+
+    width, height = terminal.get_size()
+    return center(2 * grid.width + 1, width) + 1, center(grid.height + 1, height)
+
+
+def cell_text(grid: DropGrid, cell: int) -> str:
+    """Retourne le texte à afficher pour la case `cell`.
+
+    :param grid: La grille de jeu
+    :param cell: L'indice de la case
+    :returns:    Le jeton qui occupe la case, ou un espace si elle est vide
+    """
+    if grid.cells[cell] == 0:
+        return " "
+    return make_token(COLORS[grid.cells[cell]])
+
+
+def draw_cell(grid: DropGrid, cell: int, text: str) -> None:
+    """Écrit `text` à l'emplacement de la case `cell`, sans réafficher tout l'écran.
+
+    Le texte ne sera affiché qu'après avoir appelé `terminal.flush`.
+
+    :param grid: La grille de jeu
+    :param cell: L'indice de la case
+    :param text: Le texte à écrire (un seul caractère visible)
+    """
+    x: int
+    y: int
+
+    x, y = grid_origin(grid)
+    print_at(x + cell % grid.width * 2, y + cell // grid.width, text)
+
+
+def display_grid(grid: DropGrid) -> None:
     """Affiche la "grille" du jeu.
 
     :param grid:    La grille du jeu
     """
-    line: list[str]
     lines: list[str] = []
+    y: int
 
-    for line in grid:
-        lines.append("│" + "│".join(line) + "│")
+    for y in range(grid.height):
+        lines.append("│" + "│".join(cell_text(grid, y * grid.width + x) for x in range(grid.width)) + "│")
 
-    lines.append("└─┴─┴─┴─┴─┴─┴─┘")
+    lines.append("└" + "┴".join("─" * grid.width) + "┘")
 
     display.screen(lines, keys={"ENTER": "Valider", "← / →": "Choisir une case"})
 
@@ -101,172 +182,573 @@ def make_token(color: str) -> str:
     return f"\x1b[{color}m{TOKEN}\x1b[0m"
 
 
-def drop_token(x: int, color: str, grid: list[list[str]]) -> None:
-    """Fait tomber un jeton dans la colonne `x` de la grille `grid`.
+def drop_token(x: int, grid: DropGrid) -> None:
+    """Fait tomber le jeton du joueur dont c'est le tour dans la colonne `x` de la grille `grid`.
 
     Cette fonction joue une animation pour faire tomber le jeton ET modifie la grille.
+    Seules les deux cases qui changent sont redessinées à chaque étape de l'animation.
 
-    :param x:     La colonne dans laquelle le jeton doit être placé
-    :param color: La couleur du jeton
-    :param grid:  La grille de jeu
+    :param x:    La colonne dans laquelle le jeton doit être placé
+    :param grid: La grille de jeu
     """
-    DELAY: float = 0.2
-    y: int = 0
+    delay: float = min(0.2, DROP_DURATION / grid.height)
+    token: str = make_token(COLORS[grid.turn])
+    target: int = grid.column_cell(x)
+    cell: int = x
 
-    grid[y][x] = make_token(color)
     display_grid(grid)
-    time.sleep(DELAY)
-
-    while y < GRID_HEIGHT - 1 and grid[y + 1][x] == " ":
-        grid[y][x] = " "
-        grid[y + 1][x] = make_token(color)
-        display_grid(grid)
-        time.sleep(DELAY)
-        y += 1
-
-    grid[y][x] = make_token(color)
+    draw_cell(grid, cell, token)
+    terminal.flush()
+    time.sleep(delay)
+
+    while cell != target:
+        draw_cell(grid, cell, " ")
+        cell += grid.width
+        draw_cell(grid, cell, token)
+        terminal.flush()
+        time.sleep(delay)
+
+    grid.play(target)
     # ignore toutes les touches appuyées pendant les time.sleep()
     terminal.flush_stdin()
 
 
-def place_token(player: str, color: str, grid: list[list[str]]) -> None:
+def place_token(player: Player, grid: DropGrid, ponderer: Ponderer | None = None) -> None:
     """Demande au joueur `player` de placer un jeton dans la grille.
 
-    :param player: Le joueur qui doit placer un jeton
-    :param color:  La couleur du jeton
-    :param grid:   La grille de jeu
+    :param player:   Le joueur qui doit placer un jeton
+    :param grid:     La grille de jeu
+    :param ponderer: La réflexion de l'adversaire, mise en pause pendant que les touches sont traitées
     """
     key: str
-    sel_x: int = 3
-    msg: str
-    width: int
+    sel_x: int = grid.width // 2
+    previous: int
+    msg: str = f"{bold(player.display_name)}, à toi de jouer !"
+    token: str = make_token(COLORS[grid.turn])
+    size: tuple[int, int] = (0, 0)
+    x: int
+    y: int
 
     while True:
-        display_grid(grid)
-        msg = f"{bold(player)}, à toi de jouer !"
+        if terminal.get_size() != size:
+            size = terminal.get_size()
+            display_grid(grid)
 
-        width, _ = terminal.get_size()
-
-        # here the cursor is at the end of the last line of the grid
-        terminal.cursor_up(GRID_HEIGHT + 1)
-        terminal.cursor_left(GRID_WIDTH * 2 - sel_x * 2)
-        print(make_token(color), end="", flush=True)
-
-        terminal.cursor_up(2)
-        terminal.set_cursor_x(center(len(strip_escapes(msg)), width))
-        print(msg, end="", flush=True)
+            x, y = grid_origin(grid)
+            print_at(center(len(strip_escapes(msg)), size[0]), y - 3, msg)
+            print_at(x + sel_x * 2, y - 1, token)
+            terminal.flush()
 
         key = get_key()
-        if key == "LEFT":
-            sel_x = (sel_x - 1) % GRID_WIDTH
-        elif key == "RIGHT":
-            sel_x = (sel_x + 1) % GRID_WIDTH
-        elif key == "\n" and grid[0][sel_x] == " ":
-            break
-
-    drop_token(sel_x, color, grid)
-
-
-def check_win(grid: list[list[str]]) -> str:
+        with paused(ponderer):
+            previous = sel_x
+            if key == "LEFT":
+                sel_x = (sel_x - 1) % grid.width
+            elif key == "RIGHT":
+                sel_x = (sel_x + 1) % grid.width
+            elif key == "\n" and grid.can_play(sel_x):
+                break
+
+            # seul le jeton au dessus de la grille a bougé
+            x, y = grid_origin(grid)
+            print_at(x + previous * 2, y - 1, " ")
+            print_at(x + sel_x * 2, y - 1, token)
+            terminal.flush()
+
+    with paused(ponderer):
+        drop_token(sel_x, grid)
+
+
+def check_win(grid: DropGrid) -> str:
     r"""Vérifie si un joueur a gagné.
 
+    Les lignes sont comptées au fur et à mesure que les jetons sont placés, cette fonction ne parcourt donc pas la
+    grille.
+
     :param grid: La grille de jeu
     :returns:    Cette fonction retourne:
         - le jeton du joueur qui a gagné si un joueur à gagné ("\x1b[31m⬤\x1b[0m" ou "\x1b[93m⬤\x1b[0m")
         - "t" si la partie s'est terminée par une égalité
         - "" si la partie n'est pas terminée
     """
-    x: int
-    y: int
-    token: str
-
-    # vérifie les lignes
-    for y in range(GRID_HEIGHT):
-        for x in range(GRID_WIDTH - 3):
-            if grid[y][x] == grid[y][x + 1] == grid[y][x + 2] == grid[y][x + 3] != " ":
-                return grid[y][x]
-
-    # vérifie les colonnes
-    for y in range(GRID_HEIGHT - 3):
-        for x in range(GRID_WIDTH):
-            if grid[y][x] == grid[y + 1][x] == grid[y + 2][x] == grid[y + 3][x] != " ":
-                return grid[y][x]
-
-    # vérifie les diagonales (haut-gauche vers bas-droite)
-    for y in range(GRID_HEIGHT - 3):
-        for x in range(GRID_WIDTH - 3):
-            if grid[y][x] == grid[y + 1][x + 1] == grid[y + 2][x + 2] == grid[y + 3][x + 3] != " ":
-                return grid[y][x]
-
-    # vérifie les diagonales (bas-gauche vers haut-droite)
-    for y in range(GRID_HEIGHT - 3):
-        for x in range(GRID_WIDTH - 3):
-            if grid[y + 3][x] == grid[y + 2][x + 1] == grid[y + 1][x + 2] == grid[y][x + 3] != " ":
-                return grid[y + 3][x]
+    if grid.winner != 0:
+        return make_token(COLORS[grid.winner])
 
     # vérifie si la grille est pleine
-    if all(all(token != " " for token in line) for line in grid):
+    if grid.is_full():
         return "t"
 
     return ""
 
 
-def auto_play(grid: list[list[str]]) -> int:
-    """Choisi la position à jouer.
+def column_order(width: int) -> list[int]:
+    """Retourne les colonnes de la grille, de celle du milieu vers celles des bords.
 
-    Le puissance 4 n'a pas de niveaux de difficulté car c'est compliqué de déterminer la meilleur stratégie.
-    Si cette fonction est appelée avec le nom d'un joueur, son comportement n'est pas définie.
+    Les colonnes du milieu font partie de plus de lignes, les examiner en premier accélère la recherche.
 
-    :param grid:          La grille de jeu
-    :returns:             La position où le bot va placer son sympbol
+    :param width: La largeur de la grille
+    :returns:     Les colonnes dans l'ordre où les examiner
     """
-    x = randint(0, 6)
-    while grid[0][x] != " ":
-        x = randint(0, 6)
-    return x
+    return sorted(range(width), key=lambda x: abs(2 * x - width + 1))
 
 
-def game(player1: str, player2: str) -> None:
-    """Lance une partie de puissance 4 et sauvegarde le score à la fin de la partie.
+def canonical_column(grid: DropGrid, x: int, symmetry: int, inverse: bool = False) -> int:
+    """Transforme une colonne de la position en la colonne correspondante de la position canonique, ou l'inverse.
 
-    Ce jeu utilise des séquences d'échappement ANSI pour afficher des couleurs des jetons.
+    :param grid:     La grille de jeu
+    :param x:        La colonne (-1 si aucune colonne n'a été jouée: elle n'est pas transformée)
+    :param symmetry: L'indice de la symétrie renvoyé par `DropGrid.canonical`
+    :param inverse:  Vrai pour transformer une colonne de la position canonique en une colonne de la position
+    :returns:        La colonne transformée
+    """
+    if x < 0 or symmetry == 0:
+        return x
+    # les symétries d'une grille à gravité gardent les lignes: une colonne se transforme comme sa case du haut
+    return grid.from_canonical(x, symmetry) if inverse else grid.to_canonical(x, symmetry)
 
-    :param player1: Le nom du joueur 1 (celui qui commence)
-    :param player2: Le nom du joueur 2
+
+def endgame_score(outcome: int, distance: int, depth: int) -> int:
+    """Convertit un résultat de la table de finales en score de `negamax`.
+
+    :param outcome:  Le résultat pour le joueur dont c'est le tour (voir `tablebase`)
+    :param distance: Le nombre de demi-coups avant la fin de la partie
+    :param depth:    Le nombre de demi-coups qu'il reste à examiner
+    :returns:        Le score: comme pour une fin de partie trouvée par la recherche, plus tôt c'est mieux
     """
-    grid: list[list[str]]
-    playing: str
-    waiting: str
-    winner: str
-    loser: str
-    color: str
-    x: int
+    if outcome == WIN:
+        return WIN_SCORE + max(depth - distance, 0)
+    if outcome == LOSS:
+        return -WIN_SCORE - max(depth - distance, 0)
+    return 0
 
-    grid = [
-        [" ", " ", " ", " ", " ", " ", " "],
-        [" ", " ", " ", " ", " ", " ", " "],
-        [" ", " ", " ", " ", " ", " ", " "],
-        [" ", " ", " ", " ", " ", " ", " "],
-        [" ", " ", " ", " ", " ", " ", " "],
-        [" ", " ", " ", " ", " ", " ", " "],
-    ]
-    playing, waiting = player2, player1
 
-    while True:
-        playing, waiting = waiting, playing
+def to_table(score: int, depth: int) -> int:
+    """Convertit un score de `negamax` en score à garder dans la table de transposition.
 
-        color = P1_COLOR if playing == player1 else P2_COLOR
-        if playing[0] == "\t":
-            x = auto_play(grid)
-            drop_token(x, color, grid)
-        else:
-            place_token(playing, color, grid)
+    Le score d'une fin de partie dépend de la profondeur qu'il restait à examiner (voir `negamax`): il est remplacé
+    par `WIN_SCORE` moins le nombre de demi-coups avant la fin de la partie, qui ne dépend que de la position.
 
-        winner = check_win(grid)
-        if winner != "":
+    :param score: Le score
+    :param depth: Le nombre de demi-coups qu'il restait à examiner
+    :returns:     Le score à garder
+    """
+    if score >= WIN_SCORE:
+        return score - depth
+    if score <= -WIN_SCORE:
+        return score + depth
+    return score
+
+
+def from_table(score: int, depth: int) -> int:
+    """Convertit un score gardé dans la table de transposition en score de `negamax` (l'inverse de `to_table`).
+
+    :param score: Le score gardé
+    :param depth: Le nombre de demi-coups qu'il reste à examiner
+    :returns:     Le score, comme pour une fin de partie trouvée par la recherche (voir `endgame_score`)
+    """
+    if score > WIN_SCORE - MAX_PLIES:
+        return max(score + depth, WIN_SCORE)
+    if score < -WIN_SCORE + MAX_PLIES:
+        return min(score - depth, -WIN_SCORE)
+    return score
+
+
+def is_forced(score: int) -> bool:
+    """Vérifie si un score gardé dans la table de transposition est celui d'une victoire ou d'une défaite forcée.
+
+    :param score: Le score gardé (voir `to_table`)
+    :returns:     Vrai si la fin de la partie est connue
+    """
+    return abs(score) > WIN_SCORE - MAX_PLIES
+
+
+def negamax(
+    grid: DropGrid,
+    depth: int,
+    alpha: int,
+    beta: int,
+    order: list[int],
+    table: dict[int, tuple[int, int, int, bool, int]],
+    deadline: float,
+    check: Callable[[], None] | None = None,
+    cache: Cache | None = None,
+    endgame: Tablebase | None = None,
+) -> int:
+    """Évalue la position par une recherche alpha-beta.
+
+    L'évaluation d'une position non terminée est celle tenue à jour par la grille (`DropGrid.score`). Chaque
+    coup examiné ne touche que les lignes qui passent par la case jouée: le coût d'un nœud ne dépend pas
+    du nombre total de cases.
+
+    :param grid:     La grille de jeu (elle est modifiée pendant la recherche puis remise dans son état initial)
+    :param depth:    Le nombre de demi-coups qu'il reste à examiner
+    :param alpha:    Le score minimum que le joueur est déjà sûr d'obtenir
+    :param beta:     Le score maximum que l'adversaire laissera le joueur obtenir
+    :param order:    Les colonnes dans l'ordre où les examiner (voir `column_order`)
+    :param table:    La table de transposition: pour chaque clé canonique de position (les positions symétriques
+                     partagent leur entrée, voir `DropGrid.canonical`), la profondeur de la recherche, son score
+                     (voir `to_table`), le meilleur coup trouvé dans la position canonique (voir
+                     `canonical_column`), vrai si la position a été la racine d'une recherche complète à cette
+                     profondeur (le coup est alors sûr, voir `search`), et la nature du score (`EXACT`, `LOWER` ou
+                     `UPPER`)
+    :param deadline: L'instant (selon `time.monotonic`) auquel la recherche doit s'arrêter
+    :param check:    Si précisée, une fonction appelée à chaque position (voir `ponder.Ponderer.check`)
+    :param cache:    Si précisé, le cache sur disque qui complète la table de transposition pour les recherches d'au
+                     moins `CACHE_DEPTH` demi-coups
+    :param endgame:  Si précisée, la table de finales qui donne le score exact des positions qu'elle contient
+    :returns:        Le score de la position du point de vue du joueur dont c'est le tour
+    """
+    best_score: int = -WIN_SCORE * 2
+    best_move: int = -1
+    original_alpha: int = alpha
+    key: int
+    symmetry: int
+    entry: tuple[int, int, int, bool, int] | None
+    solved: tuple[int, int, int] | None
+    moves: list[int]
+    hint: int
+    score: int
+    x: int
+
+    if grid.winner != 0:
+        # le joueur précédent vient de gagner, plus tôt c'est pire
+        return -WIN_SCORE - depth
+    if grid.is_full():
+        return 0
+    if depth == 0:
+        return grid.score if grid.turn == 1 else -grid.score
+    if time.monotonic() > deadline:
+        raise SearchTimeout
+    if check is not None:
+        check()
+
+    key, symmetry = grid.canonical()
+    if endgame is not None and depth > 1 and len(grid.cells) - len(grid.moves) <= endgame.empties:
+        # juste avant l'horizon, chercher dans la table coûterait plus cher que la recherche elle-même
+        solved = endgame.get(key)
+        if solved is not None:
+            return endgame_score(solved[0], solved[1], depth)
+
+    entry = table.get(key)
+    if entry is None and cache is not None and depth >= CACHE_DEPTH:
+        entry = cache.get(key)
+        if entry is not None:
+            table[key] = entry
+    moves = [x for x in order if grid.can_play(x)]
+    if entry is not None:
+        if entry[0] >= depth and is_forced(entry[1]):
+            # une victoire ou une défaite forcée reste vraie quelle que soit la profondeur, mais une borne ne
+            # suffit que si elle est en dehors de la fenêtre
+            score = from_table(entry[1], depth)
+            if entry[4] == EXACT or (entry[4] == LOWER and score >= beta) or (entry[4] == UPPER and score <= alpha):
+                return score
+        hint = canonical_column(grid, entry[2], symmetry, inverse=True)
+        if hint in moves:
+            moves.remove(hint)
+            moves.insert(0, hint)
+    if symmetry == 0 and grid.is_symmetric():
+        # un coup et son reflet mènent à des positions symétriques, de même score: seule une moitié est examinée
+        moves = [x for x in moves if 2 * x < grid.width]
+
+    for x in moves:
+        grid.play(grid.column_cell(x))
+        try:
+            score = -negamax(grid, depth - 1, -beta, -alpha, order, table, deadline, check, cache, endgame)
+        finally:
+            grid.undo()
+
+        if score > best_score:
+            best_score, best_move = score, x
+        alpha = max(alpha, score)
+        if alpha >= beta:
+            break
+
+    table[key] = (
+        depth,
+        to_table(best_score, depth),
+        canonical_column(grid, best_move, symmetry),
+        False,
+        UPPER if best_score <= original_alpha else LOWER if best_score >= beta else EXACT,
+    )
+    if cache is not None and depth >= CACHE_DEPTH:
+        cache.put(key, table[key])
+    return best_score
+
+
+def search(
+    grid: DropGrid,
+    max_depth: int,
+    deadline: float,
+    table: dict[int, tuple[int, int, int, bool, int]],
+    check: Callable[[], None] | None = None,
+    cache: Cache | None = None,
+    endgame: Tablebase | None = None,
+) -> int:
+    """Cherche le meilleur coup par approfondissement itératif.
+
+    La recherche est recommencée avec une profondeur de plus en plus grande, jusqu'à `max_depth` ou jusqu'à
+    l'échéance. Le coup retourné est celui de la dernière recherche terminée (ou, si aucune n'a eu le temps de se
+    terminer, celui de la table de transposition ou la colonne la plus au centre).
+
+    La table de transposition est gardée d'un coup à l'autre: les positions examinées au coup précédent
+    servent à ordonner les coups, et les victoires forcées déjà trouvées n'ont pas à être recherchées à nouveau.
+    Si la position a déjà été la racine d'une recherche (par exemple pendant la réflexion du bot au tour de
+    l'humain, voir `ponder`), la recherche reprend à la profondeur suivante. Avec un cache sur disque, c'est aussi
+    vrai des positions examinées lors des exécutions précédentes du programme. Avec une table de finales (voir
+    `tablebase`), les positions qu'elle contient sont jouées immédiatement, et parfaitement.
+
+    :param grid:      La grille de jeu
+    :param max_depth: La profondeur maximum de la recherche, en demi-coups
+    :param deadline:  L'instant (selon `time.monotonic`) auquel la recherche doit s'arrêter
+    :param table:     La table de transposition (voir `negamax`)
+    :param check:     Si précisée, une fonction appelée à chaque position (voir `ponder.Ponderer.check`)
+    :param cache:     Si précisé, le cache sur disque (voir `negamax`)
+    :param endgame:   Si précisée, la table de finales (voir `endgame_table`)
+    :returns:         La colonne à jouer
+    """
+    order: list[int] = column_order(grid.width)
+    best_move: int = next(x for x in order if grid.can_play(x))
+    solved: tuple[int, int, int] | None
+    key: int
+    symmetry: int
+    entry: tuple[int, int, int, bool, int] | None
+    first_depth: int = 1
+    score: int
+    depth: int
+
+    if endgame is not None:
+        solved = endgame.probe(grid)
+        if solved is not None:
+            # la position est dans la table de finales: le coup parfait y est déjà écrit
+            return solved[2]
+
+    key, symmetry = grid.canonical()
+    entry = table.get(key)
+    if entry is None and cache is not None:
+        entry = cache.get(key)
+    if entry is not None and entry[3]:
+        best_move = canonical_column(grid, entry[2], symmetry, inverse=True)
+        if entry[0] >= max_depth or is_forced(entry[1]):
+            return best_move
+        first_depth = entry[0] + 1
+
+    for depth in range(first_depth, max_depth + 1):
+        try:
+            score = negamax(
+                grid, depth, -WIN_SCORE * 2, WIN_SCORE * 2, order, table, deadline, check, cache, endgame
+            )
+        except SearchTimeout:
             break
 
-    if winner == "t":
+        best_move = canonical_column(grid, table[key][2], symmetry, inverse=True)
+        # la racine est cherchée avec une fenêtre complète: son score est exact
+        table[key] = (depth, to_table(score, depth), table[key][2], True, EXACT)
+        if cache is not None:
+            cache.put(key, table[key])
+        if abs(score) >= WIN_SCORE:
+            # la partie est jouée d'avance, chercher plus loin ne changera rien
+            break
+
+    return best_move
+
+
+def search_depth(bot: Bot) -> int:
+    """Retourne la profondeur de recherche d'un bot de niveau moyen ou difficile.
+
+    :param bot: Le bot
+    :returns:   La profondeur maximum de sa recherche, en demi-coups
+    """
+    return SEARCH_DEPTHS[bot.level] if bot.depth is None else bot.depth
+
+
+def endgame_table(bot: Bot, grid: DropGrid) -> Tablebase | None:
+    """Retourne la table de finales consultée par un bot: seul le bot difficile joue les finales parfaitement.
+
+    :param bot:  Le bot
+    :param grid: La grille de jeu
+    :returns:    La table de finales de la taille de la grille, ou None
+    """
+    return get_tablebase(grid.width, grid.height) if bot.level == 2 else None
+
+
+def ponder(bot: Bot, grid: DropGrid, check: Callable[[], None]) -> None:
+    """Cherche à l'avance les réponses du bot à chaque coup possible de l'humain (voir `ponder.Ponderer`).
+
+    Les coups de l'humain sont approfondis ensemble, une profondeur à la fois, en commençant par les colonnes du
+    milieu: quel que soit le moment où l'humain joue, toutes ses réponses ont été examinées à peu près autant.
+    Les résultats sont gardés dans la table de transposition du bot, que `search` relira.
+
+    :param bot:   Le bot qui réfléchit
+    :param grid:  Une copie de la grille, où c'est à l'humain de jouer
+    :param check: La fonction à appeler à chaque position examinée
+    """
+    replies: list[int] = [x for x in column_order(grid.width) if grid.can_play(x)]
+    endgame: Tablebase | None = endgame_table(bot, grid)
+    depth: int
+    x: int
+
+    for depth in range(1, search_depth(bot) + 1):
+        for x in replies:
+            grid.play(grid.column_cell(x))
+            if not grid.is_over():
+                search(grid, depth, math.inf, bot.memory, check, bot.state, endgame)
+            grid.undo()
+
+
+def auto_play(bot: Bot, grid: DropGrid, deadline: float) -> int:
+    """Choisi la colonne à jouer en fonction du niveau de difficulté du bot (voir `bots.play`).
+
+    :param bot:      Le bot qui joue
+    :param grid:     La grille de jeu
+    :param deadline: L'instant (selon `time.monotonic`) auquel le bot doit avoir choisi sa colonne
+    :returns:        La colonne où le bot va placer son jeton
+    """
+    diff_level: int
+    x: int
+
+    diff_level = bot.level
+
+    if diff_level == 0:  # niveau de difficulté facile
+        x = randint(0, grid.width - 1)
+        while not grid.can_play(x):
+            x = randint(0, grid.width - 1)
+        return x
+    else:  # niveaux de difficulté moyen et difficile
+        # l'état du bot est le cache sur disque ouvert par `game` (il n'y en a pas pendant les simulations)
+        return search(
+            grid, search_depth(bot), deadline, bot.memory, cache=bot.state, endgame=endgame_table(bot, grid)
+        )
+
+
+def prompt_size() -> tuple[int, int]:
+    """Demande aux joueurs sur quelle taille de grille ils veulent jouer.
+
+    :returns: La largeur et la hauteur de la grille
+    """
+    choice: int
+    width: int
+    height: int
+
+    choice = display.prompt_choice("Sur quelle grille voulez-vous jouer ?", [size[0] for size in SIZES])
+    _, width, height = SIZES[choice]
+
+    if width == 0:
+        width = display.prompt_int(f"Largeur de la grille (entre {bold('4')} et {bold('30')}) ?", 4, 30)
+        height = display.prompt_int(f"Hauteur de la grille (entre {bold('4')} et {bold('30')}) ?", 4, 30)
+
+    return width, height
+
+
+def play_turn(
+    grid: DropGrid, players: tuple[Player, Player], choose: Callable[[Player, Player, DropGrid], int]
+) -> int | None:
+    """Fait jouer le joueur dont c'est le tour: le déroulement d'une partie, commun à `game` et `simulate`.
+
+    :param grid:    La grille de jeu
+    :param players: Le joueur 1 et le joueur 2
+    :param choose:  La fonction qui choisit la colonne du joueur, appelée avec le joueur, son adversaire et la grille
+    :returns:       Le joueur qui a gagné (1 ou 2, 0 en cas d'égalité), ou None si la partie n'est pas terminée
+    """
+    grid.play(grid.column_cell(choose(players[grid.turn - 1], players[2 - grid.turn], grid)))
+    return grid.result()
+
+
+def bot_column(bot: Player, opponent: Player, grid: DropGrid) -> int:
+    """Demande sa colonne à un bot, sans rien afficher (voir `play_turn`).
+
+    :param bot:      Le bot qui doit jouer
+    :param opponent: Son adversaire
+    :param grid:     La grille de jeu
+    :returns:        La colonne où le bot va placer son jeton
+    """
+    assert isinstance(bot, Bot)
+    return bots.play(bot, auto_play, grid)
+
+
+def choose_column(player: Player, opponent: Player, grid: DropGrid) -> int:
+    """Demande sa colonne au joueur dont c'est le tour, pendant une partie lancée depuis le menu (voir `play_turn`).
+
+    Le jeton tombe dans une copie de la grille: c'est `play_turn` qui joue le coup.
+
+    :param player:   Le joueur qui doit jouer
+    :param opponent: Son adversaire, qui réfléchit pendant le tour de l'humain si c'est un bot
+    :param grid:     La grille de jeu
+    :returns:        La colonne où le joueur va placer son jeton
+    """
+    shown: DropGrid = grid.copy()
+    ponderer: Ponderer
+
+    if isinstance(player, Bot):
+        drop_token(bot_column(player, opponent, grid), shown)
+    elif isinstance(opponent, Bot) and opponent.level > 0:
+        # le bot réfléchit pendant que l'humain choisit son coup
+        ponderer = Ponderer(partial(ponder, opponent, grid.copy())).start()
+        try:
+            place_token(player, shown, ponderer)
+        finally:
+            ponderer.stop()
+    else:
+        place_token(player, shown)
+
+    return shown.moves[-1] % shown.width
+
+
+def simulate(player1: Bot, player2: Bot, variant: int) -> tuple[int, int]:
+    """Joue une partie entre deux bots sans rien afficher ni attendre de touche.
+
+    :param player1: Le bot qui commence
+    :param player2: L'autre bot
+    :param variant: L'indice de la taille de grille dans `SIZES` (la taille personnalisée n'est pas acceptée)
+    :returns:       Le joueur qui a gagné (1 ou 2, 0 en cas d'égalité) et le nombre de coups joués
+    """
+    players: tuple[Bot, Bot] = (player1, player2)
+    grid: DropGrid
+    result: int | None = None
+
+    player1.new_game()
+    player2.new_game()
+    grid = DropGrid(*SIZES[variant][1:], ALIGN)
+
+    while result is None:
+        result = play_turn(grid, players, bot_column)
+
+    return result, len(grid.moves)
+
+
+def game(player1: Player, player2: Player) -> None:
+    """Lance une partie de puissance 4 et sauvegarde le score à la fin de la partie.
+
+    Ce jeu utilise des séquences d'échappement ANSI pour afficher des couleurs des jetons.
+
+    :param player1: Le joueur 1 (celui qui commence)
+    :param player2: Le joueur 2
+    """
+    players: tuple[Player, Player] = (player1, player2)
+    grid: DropGrid
+    playing: Player
+    winner: Player
+    loser: Player
+    result: int | None = None
+
+    for playing in players:
+        if isinstance(playing, Bot):
+            playing.new_game()
+
+    grid = DropGrid(*prompt_size(), ALIGN)
+    for playing in players:
+        if isinstance(playing, Bot) and playing.level > 0:
+            # le bot reprend les évaluations des parties précédentes, même d'une exécution à l'autre: chaque
+            # profondeur de recherche a son propre cache, pour qu'un bot ne joue pas les coups d'un bot plus fort
+            playing.state = get_cache(f"pow4-{grid.width}x{grid.height}-d{search_depth(playing)}")
+
+    while result is None:
+        result = play_turn(grid, players, choose_column)
+
+    for playing in players:
+        if isinstance(playing, Bot) and playing.state is not None:
+            playing.state.flush()
+
+    if result == 0:
         add_score(player1, player2, tie=True)
 
         display.screen(
@@ -274,11 +756,11 @@ def game(player1: str, player2: str) -> None:
             keys={"ENTER": "Continuer"},
         )
     else:
-        winner, loser = (player1, player2) if winner == make_token(P1_COLOR) else (player2, player1)
+        winner, loser = players[result - 1], players[2 - result]
         add_score(winner, loser)
 
         display.screen(
-            [f"{bold(get_display_name(winner))} a gagné !!!"],
+            [f"{bold(winner.display_name)} a gagné !!!"],
             keys={"ENTER": "Continuer"},
         )
 
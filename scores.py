@@ -1,9 +1,16 @@
 from __future__ import annotations
 
+import threading
+import time
 from pathlib import Path
 from typing import Iterable
 
+import metrics
+
 SCORES_PATH = Path(__file__).parent.resolve() / "scores"
+# à prendre pendant la lecture, la modification et l'écriture d'un tableau des scores, quand plusieurs sessions
+# tournent dans le même processus (voir `telnet`)
+SCORES_LOCK = threading.Lock()
 ScoreLine = tuple[str, list[float]]
 
 
@@ -22,6 +29,7 @@ def get_scores(game: str) -> list[ScoreLine]:
     name: str
     numbers: list[str]
     line: str
+    start: float = time.perf_counter() if metrics.ENABLED else 0.0
 
     SCORES_PATH.mkdir(parents=True, exist_ok=True)
     path = SCORES_PATH.joinpath(game.lower() + ".txt")
@@ -34,6 +42,8 @@ def get_scores(game: str) -> list[ScoreLine]:
         name, *numbers = line.rsplit("\t")
         scores.append((name, list(map(float, numbers))))
 
+    if metrics.ENABLED:
+        metrics.observe("scores_io_seconds", time.perf_counter() - start, game=game, operation="read")
     return scores
 
 
@@ -49,6 +59,7 @@ def set_scores(game: str, scores: Iterable[ScoreLine]) -> None:
     name: str
     numbers: list[float]
     numbers_str: str
+    start: float = time.perf_counter() if metrics.ENABLED else 0.0
 
     SCORES_PATH.mkdir(parents=True, exist_ok=True)
     path = SCORES_PATH.joinpath(game.lower() + ".txt")
@@ -58,3 +69,6 @@ def set_scores(game: str, scores: Iterable[ScoreLine]) -> None:
         for name, numbers in scores:
             numbers_str = "\t".join(map(str, numbers))
             f.write(f"{name}\t{numbers_str}\n")
+
+    if metrics.ENABLED:
+        metrics.observe("scores_io_seconds", time.perf_counter() - start, game=game, operation="write")
@@ -0,0 +1,391 @@
+"""Serveur de parties en réseau: deux joueurs sur deux terminaux différents jouent l'un contre l'autre.
+
+Un seul processus accueille des milliers de parties en même temps: chaque connexion est une coroutine `asyncio` (pas
+de fil d'exécution par connexion), et les règles de chaque partie sont celles de `sessions`. Par exemple:
+
+    python3 server.py --port 7777
+    python3 client.py --port 7777
+
+Le protocole est fait de lignes de texte UTF-8, dont les mots sont séparés par des espaces. Le client envoie:
+
+    HELLO <nom>                  se présente (le nom ne contient pas d'espace), avant toute autre commande
+    LIST                         demande les parties qui attendent un deuxième joueur
+    NEW <jeu> <variante>         crée une partie (voir `sessions.GAMES` et `sessions.variant_names`), il en sera le
+                                 joueur 1
+    JOIN <partie>                rejoint une partie, il en sera le joueur 2
+    PLAY <jeu> <variante>        cherche un adversaire de niveau proche (voir `matchmaking`), la partie commence
+                                 dès qu'il est trouvé
+    MOVE <nombre> [<nombre>...]  joue un coup (voir les règles de chaque jeu dans `sessions`)
+    QUIT                         abandonne la partie en cours, ou arrête de chercher un adversaire
+
+Et le serveur répond:
+
+    OK                                                 la commande a réussi
+    SESSIONS [<partie>,<jeu>,<variante>,<nom>...]      les parties qui attendent un deuxième joueur
+    CREATED <partie>                                   la partie a été créée, elle attend un deuxième joueur
+    START <joueur> <jeu> <variante> <nom 1> <nom 2> [<paramètre>...]
+                                                       la partie commence (envoyé aux deux joueurs, avec leur numéro
+                                                       et les paramètres de la partie, voir `sessions.make_setup`)
+    MOVED <joueur> <nombre> [<nombre>...]              un joueur a joué (la forme publique du coup)
+    END <gagnant>                                      la partie est terminée (0 en cas d'égalité)
+    ERROR <message>                                    la commande est invalide, elle a été ignorée
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from matchmaking import DEFAULT_RATING, SCOREBOARDS, Matchmaker, Ticket, load_ratings
+from players import Player
+from sessions import GAMES, OVER, PLAYING, WAITING, ProtocolError, Session, variant_names
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 7777
+# la longueur maximum d'une ligne envoyée par un client, en octets
+MAX_LINE = 1024
+# l'intervalle entre deux élargissements de la recherche des joueurs qui attendent un adversaire, en secondes
+MATCH_INTERVAL = 0.5
+
+
+def parse_int(word: str) -> int:
+    """Lit un nombre entier envoyé par un client.
+
+    :param word: Le mot qui contient le nombre
+    :returns:    Le nombre
+    :raises ProtocolError: Si le mot n'est pas un nombre entier
+    """
+    try:
+        return int(word)
+    except ValueError:
+        raise ProtocolError(f"nombre attendu: {word}") from None
+
+
+class Connection:
+    """Un client connecté au serveur."""
+
+    __slots__ = ("writer", "name", "session", "player")
+
+    # le flux vers le client
+    writer: asyncio.StreamWriter
+    # le nom du client, vide tant qu'il ne s'est pas présenté
+    name: str
+    # la partie du client et son numéro de joueur dans cette partie (1 ou 2), s'il est dans une partie
+    session: Session | None
+    player: int
+
+    def __init__(self, writer: asyncio.StreamWriter) -> None:
+        """Crée un client qui ne s'est pas encore présenté.
+
+        :param writer: Le flux vers le client
+        """
+        self.writer = writer
+        self.name = ""
+        self.session = None
+        self.player = 0
+
+    def send(self, line: str) -> None:
+        """Envoie une ligne au client.
+
+        La ligne est ajoutée au tampon d'écriture du flux, sans attendre qu'elle soit vraiment envoyée.
+
+        :param line: La ligne, sans le retour à la ligne
+        """
+        if not self.writer.is_closing():
+            self.writer.write(line.encode() + b"\n")
+
+
+class Server:
+    """L'état du serveur: les parties en cours et les clients qui y jouent."""
+
+    __slots__ = ("sessions", "players", "next_id", "scores", "save_scores", "matchmaker", "ratings")
+
+    # les parties qui ne sont pas terminées, par identifiant
+    sessions: dict[int, Session]
+    # les clients de chaque partie, par identifiant de partie (l'indice 0 n'est pas utilisé)
+    players: dict[int, list[Connection | None]]
+    # l'identifiant de la prochaine partie créée
+    next_id: int
+    # le fil d'exécution qui écrit les tableaux des scores, pour que les écritures ne bloquent pas les connexions
+    scores: ThreadPoolExecutor
+    # vrai si le résultat des parties est enregistré dans les tableaux des scores
+    save_scores: bool
+    # les clients qui attendent un adversaire
+    matchmaker: Matchmaker
+    # le niveau des joueurs de chaque jeu, d'après les tableaux des scores (vide sans enregistrement des scores)
+    ratings: dict[str, dict[str, float]]
+
+    def __init__(self, save_scores: bool = True) -> None:
+        """Crée un serveur sans partie.
+
+        :param save_scores: Vrai si le résultat des parties doit être enregistré dans les tableaux des scores
+        """
+        self.sessions = {}
+        self.players = {}
+        self.next_id = 1
+        self.scores = ThreadPoolExecutor(max_workers=1)
+        self.save_scores = save_scores
+        self.matchmaker = Matchmaker()
+        self.ratings = {game: load_ratings(game) if save_scores else {} for game in SCOREBOARDS}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Lit et exécute les commandes d'un client jusqu'à ce qu'il se déconnecte.
+
+        :param reader: Le flux depuis le client
+        :param writer: Le flux vers le client
+        """
+        connection: Connection = Connection(writer)
+        line: bytes
+
+        try:
+            while True:
+                try:
+                    line = await reader.readuntil(b"\n")
+                except asyncio.LimitOverrunError:
+                    connection.send("ERROR ligne trop longue")
+                    break
+                except asyncio.IncompleteReadError:
+                    break
+
+                try:
+                    self.execute(connection, line.decode(errors="replace").split())
+                except ProtocolError as error:
+                    connection.send(f"ERROR {error}")
+                # le client attend que ses réponses soient envoyées avant de lire sa prochaine commande
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.leave(connection)
+            writer.close()
+
+    def execute(self, connection: Connection, words: list[str]) -> None:
+        """Exécute une commande d'un client.
+
+        :param connection: Le client
+        :param words:      Les mots de la commande
+        :raises ProtocolError: Si la commande est invalide
+        """
+        session: Session
+        waiting: list[str]
+
+        if not words:
+            raise ProtocolError("commande vide")
+
+        if words[0] == "HELLO" and len(words) == 2:
+            connection.name = words[1]
+            connection.send("OK")
+            return
+        if connection.name == "":
+            raise ProtocolError("présentez-vous d'abord avec HELLO")
+
+        if words[0] == "LIST" and len(words) == 1:
+            waiting = [
+                f"{session.id},{session.game},{session.variant},{session.names[1]}"
+                for session in self.sessions.values()
+                if session.state == WAITING
+            ]
+            connection.send(" ".join(["SESSIONS"] + waiting))
+        elif words[0] == "NEW" and len(words) == 3:
+            self.check_free(connection)
+            session = Session(self.next_id, words[1], parse_int(words[2]), connection.name)
+            self.next_id += 1
+            self.sessions[session.id] = session
+            self.players[session.id] = [None, connection, None]
+            connection.session, connection.player = session, 1
+            connection.send(f"CREATED {session.id}")
+        elif words[0] == "JOIN" and len(words) == 2:
+            self.check_free(connection)
+            if parse_int(words[1]) not in self.sessions:
+                raise ProtocolError("partie inconnue")
+            session = self.sessions[parse_int(words[1])]
+            session.join(connection.name)
+            self.players[session.id][2] = connection
+            connection.session, connection.player = session, 2
+            self.start(session)
+        elif words[0] == "PLAY" and len(words) == 3:
+            self.check_free(connection)
+            if words[1] not in GAMES or not 0 <= parse_int(words[2]) < len(variant_names(words[1])):
+                raise ProtocolError("jeu ou variante inconnu")
+            connection.send("OK")
+            self.enqueue(connection, words[1], parse_int(words[2]))
+        elif words[0] == "MOVE" and len(words) > 1:
+            if connection.session is None:
+                raise ProtocolError("vous n'êtes dans aucune partie")
+            self.move(connection, connection.session, [parse_int(word) for word in words[1:]])
+        elif words[0] == "QUIT" and len(words) == 1:
+            self.leave(connection)
+            connection.send("OK")
+        else:
+            raise ProtocolError(f"commande inconnue: {words[0]}")
+
+    def check_free(self, connection: Connection) -> None:
+        """Vérifie qu'un client n'est dans aucune partie et n'attend pas d'adversaire.
+
+        :param connection: Le client
+        :raises ProtocolError: Si le client est dans une partie ou attend un adversaire
+        """
+        if connection.session is not None:
+            raise ProtocolError("vous êtes déjà dans une partie")
+        if self.matchmaker.waiting(connection):
+            raise ProtocolError("vous attendez déjà un adversaire")
+
+    def enqueue(self, connection: Connection, game: str, variant: int) -> None:
+        """Cherche un adversaire à un client, et commence la partie s'il y en a un d'assez proche.
+
+        :param connection: Le client
+        :param game:       Le jeu
+        :param variant:    L'indice de la variante
+        """
+        rating: float = self.ratings[game].get(connection.name, DEFAULT_RATING)
+        pair: tuple[Ticket, Ticket] | None
+
+        pair = self.matchmaker.enqueue(connection, connection.name, game, variant, rating, time.monotonic())
+        if pair is not None:
+            self.pair(*pair)
+
+    def pair(self, first: Ticket, second: Ticket) -> None:
+        """Commence la partie de deux clients qui attendaient un adversaire.
+
+        :param first:  Le ticket du client qui attendait depuis le plus longtemps, qui sera le joueur 1
+        :param second: Le ticket de l'autre client
+        """
+        session: Session = Session(self.next_id, first.game, first.variant, first.name)
+
+        assert isinstance(first.player, Connection) and isinstance(second.player, Connection)
+        session.join(second.name)
+        self.next_id += 1
+        self.sessions[session.id] = session
+        self.players[session.id] = [None, first.player, second.player]
+        first.player.session, first.player.player = session, 1
+        second.player.session, second.player.player = session, 2
+        self.start(session)
+
+    async def match(self) -> None:
+        """Élargit régulièrement la recherche des clients qui attendent un adversaire, jusqu'à l'arrêt du serveur."""
+        while True:
+            await asyncio.sleep(MATCH_INTERVAL)
+            for first, second in self.matchmaker.tick(time.monotonic()):
+                self.pair(first, second)
+
+    def update_ratings(self, game: str, loaded: asyncio.Future[dict[str, float]]) -> None:
+        """Remplace le niveau des joueurs d'un jeu, quand il a été recalculé après l'enregistrement d'un score.
+
+        :param game:   Le jeu
+        :param loaded: Le calcul du niveau des joueurs (voir `matchmaking.load_ratings`), terminé
+        """
+        if loaded.exception() is None:
+            self.ratings[game] = loaded.result()
+
+    def start(self, session: Session) -> None:
+        """Annonce le début d'une partie à ses deux joueurs.
+
+        :param session: La partie, qui vient d'être rejointe par le joueur 2
+        """
+        description: str = " ".join([session.game, str(session.variant), *session.names[1:], *map(str, session.setup)])
+        connection: Connection | None
+        player: int
+
+        for player in (1, 2):
+            connection = self.players[session.id][player]
+            if connection is not None:
+                connection.send(f"START {player} {description}")
+
+    def broadcast(self, session: Session, line: str) -> None:
+        """Envoie une ligne aux deux joueurs d'une partie.
+
+        :param session: La partie
+        :param line:    La ligne
+        """
+        connection: Connection | None
+
+        for connection in self.players[session.id][1:]:
+            if connection is not None:
+                connection.send(line)
+
+    def move(self, connection: Connection, session: Session, move: list[int]) -> None:
+        """Joue le coup d'un client, et termine la partie si c'était le dernier coup.
+
+        :param connection: Le client
+        :param session:    Sa partie
+        :param move:       Le coup
+        :raises ProtocolError: Si le coup est invalide
+        """
+        public: list[int] = session.move(connection.player, move)
+
+        self.broadcast(session, " ".join(["MOVED", str(connection.player), *map(str, public)]))
+        if session.state == OVER:
+            if self.save_scores:
+                self.scores.submit(session.rules.add_score, Player(session.names[1]), Player(session.names[2]))
+                asyncio.wrap_future(self.scores.submit(load_ratings, session.game)).add_done_callback(
+                    partial(self.update_ratings, session.game)
+                )
+            self.close(session)
+
+    def leave(self, connection: Connection) -> None:
+        """Fait quitter sa partie à un client (qui abandonne si elle était en cours), ou arrête sa recherche.
+
+        :param connection: Le client
+        """
+        session: Session | None = connection.session
+
+        self.matchmaker.cancel(connection)
+        if session is None:
+            return
+        if session.state == PLAYING:
+            session.leave(connection.player)
+        self.close(session)
+
+    def close(self, session: Session) -> None:
+        """Termine une partie: envoie le résultat aux joueurs et oublie la partie.
+
+        :param session: La partie
+        """
+        connection: Connection | None
+
+        if session.state == OVER:
+            self.broadcast(session, f"END {session.winner}")
+        for connection in self.players.pop(session.id)[1:]:
+            if connection is not None:
+                connection.session = None
+                connection.player = 0
+        del self.sessions[session.id]
+
+
+async def serve(host: str, port: int, server: Server) -> None:
+    """Accepte les connexions des clients, jusqu'à ce que le programme soit arrêté.
+
+    :param host:   L'adresse sur laquelle écouter
+    :param port:   Le port sur lequel écouter
+    :param server: L'état du serveur
+    """
+    listener: asyncio.Server = await asyncio.start_server(server.handle, host, port, limit=MAX_LINE)
+
+    async with listener:
+        await asyncio.gather(listener.serve_forever(), server.match())
+
+
+def main() -> None:
+    """Lit les arguments de la ligne de commande et lance le serveur."""
+    parser: argparse.ArgumentParser
+    args: argparse.Namespace
+
+    parser = argparse.ArgumentParser(description="Héberge des parties en réseau entre deux joueurs.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="l'adresse sur laquelle écouter")
+    parser.add_argument("-p", "--port", type=int, default=DEFAULT_PORT, help="le port sur lequel écouter")
+    parser.add_argument(
+        "--no-scores", action="store_true", help="ne pas enregistrer le résultat des parties dans les scores"
+    )
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.host, args.port, Server(not args.no_scores)))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
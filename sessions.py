@@ -0,0 +1,460 @@
+"""Les règles des quatre jeux pour des parties en réseau, entre deux joueurs qui ne partagent pas le même terminal.
+
+Une partie en réseau est une machine à états (voir `Session`): elle attend son deuxième joueur, puis chaque coup
+envoyé par un joueur est vérifié par les règles du jeu avant d'être appliqué et transmis aux deux joueurs, jusqu'à
+la fin de la partie. Les coups sont des listes d'entiers, pour que le protocole reste compact (voir `server`).
+
+Le serveur et les clients utilisent les mêmes règles: le serveur vérifie chaque coup (`Rules.check`), puis le serveur
+et les deux clients l'appliquent (`Rules.apply`). Seul le serveur connaît les secrets (le nombre à deviner au plus ou
+moins): `check` retourne la forme publique du coup, qui suffit aux clients pour suivre la partie. Par exemple:
+
+    rules = make_rules("pow4", make_setup("pow4", 0))
+    rules.apply(1, rules.check(1, [3]))
+"""
+
+from __future__ import annotations
+
+from random import randint
+
+import allumettes
+import morpion
+import plus_minus
+import pow4
+from allumettes import Heaps, legal_takes
+from board import DropGrid, Grid
+from players import Player
+
+# les jeux qui peuvent être joués en réseau (les mêmes noms que dans `simulation.GAMES`)
+GAMES = ("allumettes", "morpion", "plus_minus", "pow4")
+# les états d'une partie: en attente du deuxième joueur, en cours, terminée
+WAITING = 0
+PLAYING = 1
+OVER = 2
+# les réponses au plus ou moins: le nombre est plus grand, plus petit, ou c'est le bon nombre
+ANSWERS = {"+": 1, "-": -1, "=": 0}
+
+
+class ProtocolError(Exception):
+    """Levée quand un joueur envoie un message invalide (commande inconnue, coup illégal, pas son tour, etc.)."""
+
+
+def variant_names(game: str) -> list[str]:
+    """Retourne le nom des variantes d'un jeu qui peuvent être jouées en réseau.
+
+    La variante personnalisée n'en fait pas partie: elle demande des valeurs aux joueurs avant la partie.
+
+    :param game: Le nom du jeu (dans `GAMES`)
+    :returns:    Le nom de chaque variante, dans l'ordre de leur indice
+    """
+    if game == "allumettes":
+        return [variant[0] for variant in allumettes.VARIANTS[:-1]]
+    elif game == "morpion":
+        return [variant[0] for variant in morpion.VARIANTS[:-1]]
+    elif game == "pow4":
+        return [size[0] for size in pow4.SIZES[:-1]]
+    else:
+        return ["Classique"]
+
+
+def make_setup(game: str, variant: int) -> list[int]:
+    """Tire les paramètres d'une nouvelle partie (ils sont envoyés aux deux joueurs au début de la partie).
+
+    :param game:    Le nom du jeu (dans `GAMES`)
+    :param variant: L'indice de la variante (voir `variant_names`)
+    :returns:       Les paramètres de la partie, à passer à `make_rules`
+    :raises ProtocolError: Si le jeu ou la variante n'existe pas
+    """
+    heap_count: int
+
+    if game not in GAMES or not 0 <= variant < len(variant_names(game)):
+        raise ProtocolError("jeu ou variante inconnu")
+
+    if game == "allumettes":
+        _, heap_count, _, _ = allumettes.VARIANTS[variant]
+        return [variant] + [randint(15, 30) for _ in range(heap_count)]
+    elif game == "morpion":
+        return list(morpion.VARIANTS[variant][1:])
+    elif game == "pow4":
+        return list(pow4.SIZES[variant][1:])
+    else:
+        # c'est le joueur 1 qui choisit la borne maximum et le nombre, avec son premier coup
+        return []
+
+
+def make_rules(game: str, setup: list[int]) -> Rules:
+    """Crée les règles d'une partie.
+
+    :param game:  Le nom du jeu (dans `GAMES`)
+    :param setup: Les paramètres de la partie (voir `make_setup`)
+    :returns:     Les règles, au début de la partie
+    """
+    if game == "allumettes":
+        return AllumettesRules(setup)
+    elif game == "morpion":
+        return MorpionRules(setup)
+    elif game == "pow4":
+        return Pow4Rules(setup)
+    else:
+        return PlusMinusRules(setup)
+
+
+def expect(move: list[int], count: int) -> None:
+    """Vérifie qu'un coup est composé du bon nombre d'entiers.
+
+    :param move:  Le coup
+    :param count: Le nombre d'entiers attendus
+    :raises ProtocolError: Si le coup n'a pas le bon nombre d'entiers
+    """
+    if len(move) != count:
+        raise ProtocolError(f"{count} nombre(s) attendu(s)")
+
+
+class Rules:
+    """Les règles d'un jeu pour une partie en réseau (chaque jeu en définit une sous-classe)."""
+
+    __slots__ = ()
+
+    def turn(self) -> int:
+        """Retourne le joueur qui doit jouer (1 ou 2)."""
+        raise NotImplementedError
+
+    def result(self) -> int | None:
+        """Retourne le résultat de la partie.
+
+        :returns: Le joueur qui a gagné (1 ou 2), 0 en cas d'égalité, ou None si la partie n'est pas terminée
+        """
+        raise NotImplementedError
+
+    def check(self, player: int, move: list[int]) -> list[int]:
+        """Vérifie un coup (appelée par le serveur seulement, avant `apply`).
+
+        :param player: Le joueur qui joue (1 ou 2), c'est forcément son tour
+        :param move:   Le coup tel qu'envoyé par le joueur
+        :returns:      La forme publique du coup, qui est envoyée aux deux joueurs
+        :raises ProtocolError: Si le coup est illégal
+        """
+        raise NotImplementedError
+
+    def apply(self, player: int, move: list[int]) -> None:
+        """Applique un coup vérifié par `check`.
+
+        :param player: Le joueur qui joue (1 ou 2)
+        :param move:   La forme publique du coup
+        """
+        raise NotImplementedError
+
+    def add_score(self, player1: Player, player2: Player) -> None:
+        """Enregistre le résultat de la partie terminée dans le tableau des scores du jeu.
+
+        :param player1: Le joueur 1
+        :param player2: Le joueur 2
+        """
+        raise NotImplementedError
+
+
+class MorpionRules(Rules):
+    """Le morpion: un coup est l'indice de la case jouée."""
+
+    __slots__ = ("grid",)
+
+    # la grille de la partie
+    grid: Grid
+
+    def __init__(self, setup: list[int]) -> None:
+        """Crée une grille vide.
+
+        :param setup: La largeur et la hauteur de la grille, et le nombre de symboles à aligner
+        """
+        self.grid = Grid(*setup)
+
+    def turn(self) -> int:
+        """Voir `Rules.turn`."""
+        return self.grid.turn
+
+    def result(self) -> int | None:
+        """Voir `Rules.result`."""
+        return self.grid.result()
+
+    def check(self, player: int, move: list[int]) -> list[int]:
+        """Vérifie que la case existe et qu'elle est vide (voir `Rules.check`)."""
+        expect(move, 1)
+        if not 0 <= move[0] < len(self.grid.cells) or self.grid.cells[move[0]] != 0:
+            raise ProtocolError("case invalide")
+        return move
+
+    def apply(self, player: int, move: list[int]) -> None:
+        """Place le symbole du joueur dans la case (voir `Rules.apply`)."""
+        self.grid.play(move[0])
+
+    def add_score(self, player1: Player, player2: Player) -> None:
+        """Enregistre la victoire, la défaite ou l'égalité avec `morpion.add_score`."""
+        if self.grid.result() == 0:
+            morpion.add_score(player1, player2, tie=True)
+        elif self.grid.result() == 1:
+            morpion.add_score(player1, player2)
+        else:
+            morpion.add_score(player2, player1)
+
+
+class Pow4Rules(Rules):
+    """Le puissance 4: un coup est l'indice de la colonne où tombe le jeton."""
+
+    __slots__ = ("grid",)
+
+    # la grille de la partie
+    grid: DropGrid
+
+    def __init__(self, setup: list[int]) -> None:
+        """Crée une grille vide.
+
+        :param setup: La largeur et la hauteur de la grille
+        """
+        self.grid = DropGrid(*setup, pow4.ALIGN)
+
+    def turn(self) -> int:
+        """Voir `Rules.turn`."""
+        return self.grid.turn
+
+    def result(self) -> int | None:
+        """Voir `Rules.result`."""
+        return self.grid.result()
+
+    def check(self, player: int, move: list[int]) -> list[int]:
+        """Vérifie que la colonne existe et qu'elle n'est pas pleine (voir `Rules.check`)."""
+        expect(move, 1)
+        if not 0 <= move[0] < self.grid.width or not self.grid.can_play(move[0]):
+            raise ProtocolError("colonne invalide")
+        return move
+
+    def apply(self, player: int, move: list[int]) -> None:
+        """Fait tomber le jeton du joueur dans la colonne (voir `Rules.apply`)."""
+        self.grid.play(self.grid.column_cell(move[0]))
+
+    def add_score(self, player1: Player, player2: Player) -> None:
+        """Enregistre la victoire, la défaite ou l'égalité avec `pow4.add_score`."""
+        if self.grid.result() == 0:
+            pow4.add_score(player1, player2, tie=True)
+        elif self.grid.result() == 1:
+            pow4.add_score(player1, player2)
+        else:
+            pow4.add_score(player2, player1)
+
+
+class AllumettesRules(Rules):
+    """Le jeu des allumettes: un coup est l'indice du tas, suivi du nombre d'allumettes à y prendre."""
+
+    __slots__ = ("heaps",)
+
+    # la position de la partie
+    heaps: Heaps
+
+    def __init__(self, setup: list[int]) -> None:
+        """Crée la position du début de la partie.
+
+        :param setup: L'indice de la variante (dans `allumettes.VARIANTS`), puis le nombre d'allumettes de chaque tas
+        """
+        _, _, takes, misere = allumettes.VARIANTS[setup[0]]
+        self.heaps = Heaps(setup[1:], takes, misere)
+
+    def turn(self) -> int:
+        """Voir `Rules.turn`."""
+        return self.heaps.turn
+
+    def result(self) -> int | None:
+        """Voir `Rules.result`."""
+        return self.heaps.result()
+
+    def check(self, player: int, move: list[int]) -> list[int]:
+        """Vérifie que le tas existe et qu'il est possible d'y prendre autant d'allumettes (voir `Rules.check`)."""
+        expect(move, 2)
+        if not 0 <= move[0] < len(self.heaps.heaps):
+            raise ProtocolError("tas invalide")
+        if move[1] not in legal_takes(self.heaps.takes, self.heaps.heaps[move[0]]):
+            raise ProtocolError("nombre d'allumettes invalide")
+        return move
+
+    def apply(self, player: int, move: list[int]) -> None:
+        """Enlève les allumettes du tas (voir `Rules.apply`)."""
+        self.heaps.play((move[0], move[1]))
+
+    def add_score(self, player1: Player, player2: Player) -> None:
+        """Enregistre la victoire et la défaite avec `allumettes.add_score`."""
+        if self.heaps.result() == 1:
+            allumettes.add_score(player1, player2)
+        else:
+            allumettes.add_score(player2, player1)
+
+
+class PlusMinusRules(Rules):
+    """Le plus ou moins, où le joueur 1 fait deviner et le joueur 2 devine.
+
+    Le premier coup du joueur 1 est la borne maximum suivie du nombre à deviner (seule la borne est publique). Ensuite
+    le joueur 2 envoie un nombre, et le joueur 1 répond (voir `ANSWERS`): la forme publique de la réponse contient
+    aussi la vraie réponse, que le serveur calcule. Comme dans `plus_minus.game`, le joueur 1 perd une vie à chaque
+    mauvaise réponse, et la partie s'arrête quand le nombre est trouvé ou qu'il n'a plus de vie.
+    """
+
+    __slots__ = ("maximum", "number", "guess", "truth", "guess_count", "lives", "next")
+
+    # la borne maximum du nombre à deviner, 0 tant que le joueur 1 ne l'a pas choisie
+    maximum: int
+    # le nombre à deviner, -1 s'il n'est pas connu (chez les clients)
+    number: int
+    # le dernier nombre proposé par le joueur 2, et la vraie réponse à ce nombre (None avant la première réponse)
+    guess: int
+    truth: int | None
+    # le nombre d'essais du joueur 2
+    guess_count: int
+    # le nombre de vies du joueur 1
+    lives: int
+    # le joueur qui doit jouer
+    next: int
+
+    def __init__(self, setup: list[int]) -> None:
+        """Crée une partie où le joueur 1 doit choisir son nombre.
+
+        :param setup: Les paramètres de la partie (vide: ils sont choisis par le joueur 1)
+        """
+        self.maximum = 0
+        self.number = -1
+        self.guess = -1
+        self.truth = None
+        self.guess_count = 0
+        self.lives = plus_minus.P1_LIVES
+        self.next = 1
+
+    def turn(self) -> int:
+        """Voir `Rules.turn`."""
+        return self.next
+
+    def result(self) -> int | None:
+        """Voir `Rules.result`."""
+        # le joueur 2 gagne toujours, c'est son nombre d'essais qui compte
+        return 2 if self.lives == 0 or self.truth == 0 else None
+
+    def check(self, player: int, move: list[int]) -> list[int]:
+        """Vérifie le choix du nombre, la proposition ou la réponse, selon le moment de la partie (voir `check`)."""
+        if self.maximum == 0:
+            expect(move, 2)
+            if move[0] < 10 or not 0 <= move[1] <= move[0]:
+                raise ProtocolError("la borne doit valoir au moins 10, et le nombre être entre 0 et la borne")
+            self.number = move[1]
+            return move[:1]
+        elif player == 2:
+            expect(move, 1)
+            if move[0] < 0:
+                raise ProtocolError("nombre invalide")
+            return move
+        else:
+            expect(move, 1)
+            if move[0] not in ANSWERS.values():
+                raise ProtocolError("réponse invalide")
+            return [move[0], (self.number > self.guess) - (self.number < self.guess)]
+
+    def apply(self, player: int, move: list[int]) -> None:
+        """Applique le choix du nombre, la proposition ou la réponse (voir `Rules.apply`)."""
+        if self.maximum == 0:
+            self.maximum = move[0]
+        elif player == 2:
+            self.guess = move[0]
+            self.guess_count += 1
+        else:
+            self.truth = move[1]
+            if move[0] != move[1]:
+                self.lives -= 1
+        self.next = 3 - player
+
+    def add_score(self, player1: Player, player2: Player) -> None:
+        """Enregistre le nombre d'essais du joueur 2 avec `plus_minus.add_score`."""
+        plus_minus.add_score(player2, self.guess_count, self.maximum)
+
+
+class Session:
+    """Une partie en réseau entre deux joueurs: la machine à états qui vérifie les messages des joueurs.
+
+    La partie est créée par le joueur 1 (état `WAITING`), commence quand le joueur 2 la rejoint (état `PLAYING`), et
+    se termine (état `OVER`) quand les règles le disent ou quand un joueur abandonne.
+    """
+
+    __slots__ = ("id", "game", "variant", "setup", "rules", "names", "state", "winner")
+
+    # l'identifiant de la partie, unique sur le serveur
+    id: int
+    # le nom du jeu et l'indice de sa variante
+    game: str
+    variant: int
+    # les paramètres de la partie (voir `make_setup`), et ses règles
+    setup: list[int]
+    rules: Rules
+    # le nom de chaque joueur (l'indice 0 n'est pas utilisé)
+    names: list[str]
+    # l'état de la partie (`WAITING`, `PLAYING` ou `OVER`)
+    state: int
+    # le joueur qui a gagné (0 en cas d'égalité), une fois la partie terminée
+    winner: int
+
+    def __init__(self, id: int, game: str, variant: int, name: str) -> None:
+        """Crée une partie qui attend son deuxième joueur.
+
+        :param id:      L'identifiant de la partie
+        :param game:    Le nom du jeu
+        :param variant: L'indice de la variante
+        :param name:    Le nom du joueur 1, qui crée la partie
+        :raises ProtocolError: Si le jeu ou la variante n'existe pas
+        """
+        self.id = id
+        self.game = game
+        self.variant = variant
+        self.setup = make_setup(game, variant)
+        self.rules = make_rules(game, self.setup)
+        self.names = ["", name, ""]
+        self.state = WAITING
+        self.winner = 0
+
+    def join(self, name: str) -> None:
+        """Fait rejoindre la partie au joueur 2, ce qui la commence.
+
+        :param name: Le nom du joueur 2
+        :raises ProtocolError: Si la partie a déjà commencé, ou si le joueur 2 a le même nom que le joueur 1
+        """
+        if self.state != WAITING:
+            raise ProtocolError("la partie a déjà commencé")
+        if name == self.names[1]:
+            raise ProtocolError("le nom est déjà pris")
+        self.names[2] = name
+        self.state = PLAYING
+
+    def move(self, player: int, move: list[int]) -> list[int]:
+        """Vérifie et applique le coup d'un joueur.
+
+        :param player: Le joueur (1 ou 2)
+        :param move:   Le coup, tel qu'envoyé par le joueur
+        :returns:      La forme publique du coup, à envoyer aux deux joueurs
+        :raises ProtocolError: Si la partie n'est pas en cours, si ce n'est pas le tour du joueur ou si le coup est
+                               illégal
+        """
+        public: list[int]
+        result: int | None
+
+        if self.state != PLAYING:
+            raise ProtocolError("la partie n'est pas en cours")
+        if self.rules.turn() != player:
+            raise ProtocolError("ce n'est pas votre tour")
+
+        public = self.rules.check(player, move)
+        self.rules.apply(player, public)
+
+        result = self.rules.result()
+        if result is not None:
+            self.state = OVER
+            self.winner = result
+        return public
+
+    def leave(self, player: int) -> None:
+        """Fait abandonner un joueur: si la partie était en cours, l'autre joueur la gagne.
+
+        :param player: Le joueur qui abandonne (1 ou 2)
+        """
+        if self.state == PLAYING:
+            self.winner = 3 - player
+        self.state = OVER
@@ -0,0 +1,181 @@
+"""Parties entre bots, jouées à pleine vitesse sans terminal.
+
+Ce module sert à régler la difficulté des bots: il joue un grand nombre de parties entre deux niveaux de difficulté
+et affiche les taux de victoire et d'égalité, ainsi que le nombre de coups joués par seconde. Par exemple:
+
+    python3 simulation.py morpion 2 1 --games 10000 --variant 1
+
+Avec une graine (`--seed`), les bots n'ont plus de temps de réflexion maximum: leurs recherches ne s'arrêtent qu'à
+leur profondeur ou à leur nombre de parties aléatoires, pour que les mêmes parties soient rejouées quelle que soit la
+charge de la machine.
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import random
+import time
+from typing import Callable
+
+import allumettes
+import morpion
+import plus_minus
+import pow4
+from players import Bot, MoveStats
+
+# pour chaque jeu: la fonction qui joue une partie entre deux bots, et le nom des variantes acceptées
+# (la dernière variante de chaque jeu est la variante personnalisée, qui demande des valeurs au joueur)
+GAMES: dict[str, tuple[Callable[[Bot, Bot, int], tuple[int, int]], list[str]]] = {
+    "allumettes": (allumettes.simulate, [variant[0] for variant in allumettes.VARIANTS[:-1]]),
+    "morpion": (morpion.simulate, [variant[0] for variant in morpion.VARIANTS[:-1]]),
+    "plus_minus": (lambda player1, player2, variant: plus_minus.simulate(player1, player2), ["Classique"]),
+    "pow4": (pow4.simulate, [size[0] for size in pow4.SIZES[:-1]]),
+}
+
+
+class SimulationResult:
+    """Le bilan d'une série de parties entre deux bots."""
+
+    __slots__ = ("games", "wins", "moves", "duration", "stats")
+
+    # le nombre de parties jouées
+    games: int
+    # le nombre d'égalités, puis le nombre de victoires de chaque joueur
+    wins: list[int]
+    # le nombre total de coups joués
+    moves: int
+    # le temps total passé à jouer, en secondes
+    duration: float
+    # le temps de réflexion de chaque bot
+    stats: tuple[MoveStats, MoveStats]
+
+    def __init__(self) -> None:
+        """Crée un bilan vide."""
+        self.games = 0
+        self.wins = [0, 0, 0]
+        self.moves = 0
+        self.duration = 0.0
+        self.stats = (MoveStats(), MoveStats())
+
+    def add(self, winner: int, moves: int) -> None:
+        """Ajoute le résultat d'une partie au bilan.
+
+        :param winner: Le joueur qui a gagné (1 ou 2, 0 en cas d'égalité)
+        :param moves:  Le nombre de coups joués pendant la partie
+        """
+        self.games += 1
+        self.wins[winner] += 1
+        self.moves += moves
+
+    def rate(self, winner: int) -> float:
+        """Retourne la proportion des parties gagnées par `winner`.
+
+        :param winner: Le joueur (1 ou 2, 0 pour les égalités)
+        :returns:      La proportion, entre 0 et 1
+        """
+        return self.wins[winner] / self.games if self.games else 0.0
+
+    def moves_per_second(self) -> float:
+        """Retourne le nombre de coups joués par seconde."""
+        return self.moves / self.duration if self.duration else 0.0
+
+
+def run(
+    game: str, level1: int, level2: int, count: int, *, variant: int = 0, seed: int | None = None
+) -> SimulationResult:
+    """Joue `count` parties entre deux bots.
+
+    :param game:    Le nom du jeu (une clé de `GAMES`)
+    :param level1:  Le niveau de difficulté du bot qui commence (entre 0 et 2)
+    :param level2:  Le niveau de difficulté de l'autre bot
+    :param count:   Le nombre de parties à jouer
+    :param variant: L'indice de la variante du jeu (voir `GAMES`)
+    :param seed:    La graine du générateur aléatoire, pour pouvoir rejouer exactement les mêmes parties (les bots
+                    n'ont alors pas de temps de réflexion maximum, voir le début du module)
+    :returns:       Le bilan des parties
+    """
+    simulate: Callable[[Bot, Bot, int], tuple[int, int]] = GAMES[game][0]
+    # une recherche arrêtée par une échéance dépend de la vitesse de la machine, et ne serait pas rejouée à l'identique
+    duration: float | None = None if seed is None else math.inf
+    player1: Bot = Bot(1, level1, duration=duration)
+    player2: Bot = Bot(2, level2, duration=duration)
+    result: SimulationResult = SimulationResult()
+    start: float
+    winner: int
+    moves: int
+
+    if seed is not None:
+        random.seed(seed)
+
+    start = time.perf_counter()
+    for _ in range(count):
+        winner, moves = simulate(player1, player2, variant)
+        result.add(winner, moves)
+    result.duration = time.perf_counter() - start
+    result.stats = (player1.stats, player2.stats)
+
+    return result
+
+
+def format_result(result: SimulationResult) -> list[str]:
+    """Met en forme le bilan d'une série de parties.
+
+    :param result: Le bilan
+    :returns:      Les lignes à afficher
+    """
+    lines: list[str] = [
+        f"Parties jouées:       {result.games}",
+        f"Victoires du bot 1:   {result.rate(1):.2%}",
+        f"Victoires du bot 2:   {result.rate(2):.2%}",
+        f"Égalités:             {result.rate(0):.2%}",
+        f"Coups par partie:     {result.moves / max(result.games, 1):.2f}",
+        f"Coups par seconde:    {result.moves_per_second():.0f}",
+    ]
+    index: int
+    stats: MoveStats
+
+    for index, stats in enumerate(result.stats, 1):
+        if stats.moves:
+            lines.append(
+                f"Réflexion du bot {index}:  {stats.mean() * 1000:.2f} ms par coup, "
+                + f"{stats.longest * 1000:.2f} ms au plus"
+                + (f", {stats.overruns} dépassements" if stats.overruns else "")
+            )
+
+    return lines
+
+
+def main() -> None:
+    """Lit les arguments de la ligne de commande, joue les parties demandées et affiche leur bilan."""
+    parser: argparse.ArgumentParser
+    args: argparse.Namespace
+    variants: list[str]
+    result: SimulationResult
+
+    parser = argparse.ArgumentParser(description="Joue des parties entre deux bots, sans affichage.")
+    parser.add_argument("game", choices=GAMES, help="le jeu")
+    parser.add_argument("level1", type=int, choices=range(3), help="le niveau de difficulté du bot qui commence")
+    parser.add_argument("level2", type=int, choices=range(3), help="le niveau de difficulté de l'autre bot")
+    parser.add_argument("-n", "--games", type=int, default=1000, help="le nombre de parties à jouer")
+    parser.add_argument("-v", "--variant", type=int, default=0, help="l'indice de la variante du jeu")
+    parser.add_argument(
+        "-s",
+        "--seed",
+        type=int,
+        default=None,
+        help="la graine du générateur aléatoire (les bots n'ont alors pas de temps de réflexion maximum)",
+    )
+    args = parser.parse_args()
+
+    variants = GAMES[args.game][1]
+    if not 0 <= args.variant < len(variants):
+        parser.error(f"la variante doit être entre 0 et {len(variants) - 1}: " + ", ".join(variants))
+
+    result = run(args.game, args.level1, args.level2, args.games, variant=args.variant, seed=args.seed)
+    print(variants[args.variant])
+    print("\n".join(format_result(result)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,500 @@
+"""Table de finales du puissance 4: le résultat parfait des positions où il ne reste que quelques cases vides.
+
+La table est calculée par analyse rétrograde. Les positions de départ sont tirées de parties jouées à l'avance (un
+coup gagnant ou un blocage si possible, sinon un coup au hasard) au moment où il ne reste plus que `empties` cases
+vides. Toutes les positions atteignables depuis elles sont énumérées, puis résolues à rebours: d'abord les grilles
+pleines, puis les positions avec une case vide, deux cases vides, etc. Le résultat d'une position se déduit de ceux
+de ses successeurs, déjà connus. Par exemple:
+
+    python3 tablebase.py --empties 10 --games 500
+
+Le fichier écrit dans le dossier `tablebase` est trié par clé canonique de position (voir `board.Grid.canonical`) et
+découpé en blocs compressés: un index donne la première clé et la position de chaque bloc. Il est ouvert par `mmap`
+à la première consultation, et seuls les blocs consultés sont lus et décompressés. Un filtre de Bloom écarte la
+plupart des positions absentes de la table sans décompresser de bloc: la recherche du bot en consulte beaucoup.
+"""
+
+from __future__ import annotations
+
+import argparse
+import mmap
+import random
+import struct
+import time
+import zlib
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import BinaryIO
+
+from board import DropGrid
+
+TABLEBASE_PATH = Path(__file__).parent.resolve() / "tablebase"
+# le nombre de jetons à aligner (le même que `pow4.ALIGN`)
+ALIGN = 4
+# l'en-tête du fichier: signature, version du format, largeur, hauteur, nombre de cases vides maximum,
+# nombre de blocs, nombre de positions et taille du filtre de Bloom (en bits)
+HEADER = struct.Struct("<4sIHHHIQQ")
+MAGIC = b"S1TB"
+VERSION = 1
+# une entrée de l'index: première clé du bloc, position et taille du bloc dans le fichier
+INDEX_ENTRY = struct.Struct("<QQI")
+# le nombre de positions d'un bloc
+BLOCK_SIZE = 512
+# le nombre de blocs décompressés gardés en mémoire
+BLOCK_CACHE = 64
+# le nombre de bits du filtre de Bloom par position, et le nombre de bits testés par position
+BLOOM_BITS = 10
+BLOOM_HASHES = 4
+# les résultats d'une position, pour le joueur dont c'est le tour
+DRAW = 0
+WIN = 1
+LOSS = 2
+# marque les positions sans coup (jamais écrites dans la table)
+NO_MOVE = 0xFF
+
+# les tables déjà ouvertes, par taille de grille (None si le fichier n'existe pas, voir `get_tablebase`)
+_tablebases: dict[tuple[int, int], Tablebase | None] = {}
+
+
+def encode(outcome: int, distance: int, move: int) -> int:
+    """Range le résultat d'une position dans un entier de 16 bits.
+
+    :param outcome:  Le résultat pour le joueur dont c'est le tour (`DRAW`, `WIN` ou `LOSS`)
+    :param distance: Le nombre de demi-coups avant la fin de la partie, si les deux joueurs jouent parfaitement
+    :param move:     La meilleure colonne, dans la position canonique
+    :returns:        Le résultat encodé
+    """
+    return outcome << 14 | distance << 8 | move
+
+
+def decode(value: int) -> tuple[int, int, int]:
+    """Retrouve le résultat d'une position à partir de son encodage (voir `encode`).
+
+    :param value: Le résultat encodé
+    :returns:     Le résultat, le nombre de demi-coups avant la fin de la partie et la meilleure colonne
+    """
+    return value >> 14, value >> 8 & 0x3F, value & 0xFF
+
+
+def bloom_bits(key: int, size: int) -> list[int]:
+    """Retourne les bits du filtre de Bloom qui correspondent à une clé.
+
+    Les clés de Zobrist sont déjà aléatoires: leurs deux moitiés servent de fonctions de hachage.
+
+    :param key:  La clé canonique de la position
+    :param size: La taille du filtre, en bits
+    :returns:    Les indices des `BLOOM_HASHES` bits
+    """
+    low: int = key & 0xFFFFFFFF
+    high: int = key >> 32 | 1
+
+    return [(low + i * high) % size for i in range(BLOOM_HASHES)]
+
+
+def column_key(grid: DropGrid, x: int, symmetry: int) -> int:
+    """Transforme une colonne de la position en la colonne correspondante de la position canonique.
+
+    :param grid:     La grille de jeu
+    :param x:        La colonne
+    :param symmetry: L'indice de la symétrie renvoyé par `DropGrid.canonical`
+    :returns:        La colonne dans la position canonique
+    """
+    # les symétries d'une grille à gravité gardent les lignes: une colonne se transforme comme sa case du haut
+    return grid.to_canonical(x, symmetry)
+
+
+class Tablebase:
+    """Une table de finales ouverte en lecture (voir le début du module)."""
+
+    __slots__ = ("path", "file", "map", "width", "height", "empties", "blocks", "size", "bloom", "cache")
+
+    # le chemin du fichier
+    path: Path
+    # le fichier ouvert, et sa projection en mémoire
+    file: BinaryIO
+    map: mmap.mmap
+    # la taille de la grille
+    width: int
+    height: int
+    # le nombre maximum de cases vides des positions de la table
+    empties: int
+    # le nombre de blocs, et le nombre de positions
+    blocks: int
+    size: int
+    # la taille du filtre de Bloom, en bits (il suit l'index dans le fichier)
+    bloom: int
+    # les derniers blocs décompressés: pour chaque indice de bloc, les clés et les résultats encodés
+    cache: dict[int, tuple[array, array]]
+
+    def __init__(self, path: Path) -> None:
+        """Ouvre une table de finales.
+
+        :param path: Le chemin du fichier
+        :raises ValueError: Si le fichier n'est pas une table de finales, ou s'il est incomplet
+        """
+        magic: bytes
+        version: int
+        end: int
+        length: int
+
+        self.path = path
+        self.file = path.open("rb")
+        if path.stat().st_size < HEADER.size:
+            self.file.close()
+            raise ValueError(f"{path} n'est pas une table de finales, ou est incomplète")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.width, self.height, self.empties, self.blocks, self.size, self.bloom = HEADER.unpack_from(
+            self.map
+        )
+        # l'index et le filtre de Bloom suivent l'en-tête, et le dernier bloc termine le fichier
+        end = HEADER.size + self.blocks * INDEX_ENTRY.size + self.bloom // 8
+        if self.blocks > 0 and len(self.map) >= end:
+            _, end, length = INDEX_ENTRY.unpack_from(self.map, HEADER.size + (self.blocks - 1) * INDEX_ENTRY.size)
+            end += length
+        if magic != MAGIC or version != VERSION or self.bloom == 0 or len(self.map) != end:
+            self.close()
+            raise ValueError(f"{path} n'est pas une table de finales, ou est incomplète")
+        self.cache = {}
+
+    def _first_key(self, block: int) -> int:
+        """Retourne la première clé d'un bloc, lue dans l'index.
+
+        :param block: L'indice du bloc
+        :returns:     La clé
+        """
+        return INDEX_ENTRY.unpack_from(self.map, HEADER.size + block * INDEX_ENTRY.size)[0]
+
+    def _block(self, block: int) -> tuple[array, array]:
+        """Retourne le contenu d'un bloc, en le décompressant s'il n'est pas déjà en mémoire.
+
+        :param block: L'indice du bloc
+        :returns:     Les clés du bloc (triées) et leurs résultats encodés
+        """
+        offset: int
+        length: int
+        data: bytes
+        keys: array = array("Q")
+        values: array = array("H")
+
+        if block not in self.cache:
+            if len(self.cache) >= BLOCK_CACHE:
+                # le bloc décompressé le plus ancien est oublié
+                del self.cache[next(iter(self.cache))]
+            _, offset, length = INDEX_ENTRY.unpack_from(self.map, HEADER.size + block * INDEX_ENTRY.size)
+            data = zlib.decompress(self.map[offset : offset + length])
+            keys.frombytes(data[: len(data) * 4 // 5])
+            values.frombytes(data[len(data) * 4 // 5 :])
+            self.cache[block] = keys, values
+
+        return self.cache[block]
+
+    def get(self, key: int) -> tuple[int, int, int] | None:
+        """Cherche le résultat d'une position canonique.
+
+        :param key: La clé canonique de la position
+        :returns:   Le résultat, le nombre de demi-coups avant la fin de la partie et la meilleure colonne
+                    (dans la position canonique), ou None si la position n'est pas dans la table
+        """
+        start: int = HEADER.size + self.blocks * INDEX_ENTRY.size
+        low: int = 0
+        high: int = self.blocks
+        middle: int
+        keys: array
+        values: array
+        i: int
+
+        for i in bloom_bits(key, self.bloom):
+            if not self.map[start + (i >> 3)] >> (i & 7) & 1:
+                return None
+
+        # le bloc qui peut contenir la clé est le dernier dont la première clé ne la dépasse pas
+        while low < high:
+            middle = (low + high) // 2
+            if self._first_key(middle) <= key:
+                low = middle + 1
+            else:
+                high = middle
+        if low == 0:
+            return None
+
+        keys, values = self._block(low - 1)
+        i = bisect_left(keys, key)
+        if i == len(keys) or keys[i] != key:
+            return None
+        return decode(values[i])
+
+    def probe(self, grid: DropGrid) -> tuple[int, int, int] | None:
+        """Cherche le résultat de la position de la grille.
+
+        :param grid: La grille de jeu (de la taille de la table, la partie ne doit pas être terminée)
+        :returns:    Le résultat pour le joueur dont c'est le tour, le nombre de demi-coups avant la fin de la partie
+                     et la colonne à jouer, ou None si la position n'est pas dans la table
+        """
+        key: int
+        symmetry: int
+        result: tuple[int, int, int] | None
+
+        if len(grid.cells) - len(grid.moves) > self.empties:
+            return None
+
+        key, symmetry = grid.canonical()
+        result = self.get(key)
+        if result is None:
+            return None
+        return result[0], result[1], grid.from_canonical(result[2], symmetry)
+
+    def close(self) -> None:
+        """Ferme le fichier."""
+        self.map.close()
+        self.file.close()
+
+
+def tablebase_path(width: int, height: int) -> Path:
+    """Retourne le chemin du fichier de la table de finales d'une taille de grille.
+
+    :param width:  La largeur de la grille
+    :param height: La hauteur de la grille
+    :returns:      Le chemin
+    """
+    return TABLEBASE_PATH / f"pow4-{width}x{height}.tb"
+
+
+def get_tablebase(width: int, height: int) -> Tablebase | None:
+    """Retourne la table de finales d'une taille de grille, en l'ouvrant à la première demande.
+
+    :param width:  La largeur de la grille
+    :param height: La hauteur de la grille
+    :returns:      La table, ou None s'il n'y a pas de table pour cette taille de grille (ou si son fichier est
+                   illisible)
+    """
+    path: Path = tablebase_path(width, height)
+
+    if (width, height) not in _tablebases:
+        try:
+            _tablebases[width, height] = Tablebase(path) if path.exists() else None
+        except (OSError, ValueError):
+            # un fichier abîmé ou incomplet est ignoré: le bot cherche ses coups lui-même
+            _tablebases[width, height] = None
+    return _tablebases[width, height]
+
+
+def sample_move(grid: DropGrid) -> int:
+    """Choisit un coup plausible: un coup gagnant, sinon le blocage d'une victoire de l'adversaire, sinon au hasard.
+
+    :param grid: La grille de jeu
+    :returns:    L'indice de la case
+    """
+    moves: list[int] = grid.legal_moves()
+    player: int
+
+    for player in (grid.turn, 3 - grid.turn):
+        for cell in moves:
+            if grid.winning_cells(player) >> cell & 1:
+                return cell
+    return random.choice(moves)
+
+
+def sample_roots(width: int, height: int, empties: int, games: int) -> list[DropGrid]:
+    """Joue des parties jusqu'à ce qu'il ne reste que `empties` cases vides.
+
+    :param width:   La largeur de la grille
+    :param height:  La hauteur de la grille
+    :param empties: Le nombre de cases vides des positions de départ
+    :param games:   Le nombre de parties à jouer (celles qui se terminent avant ne donnent pas de position)
+    :returns:       Les positions de départ, sans doublon
+    """
+    roots: dict[int, DropGrid] = {}
+    grid: DropGrid
+
+    for _ in range(games):
+        grid = DropGrid(width, height, ALIGN)
+        while not grid.is_over() and len(grid.cells) - len(grid.moves) > empties:
+            grid.play(sample_move(grid))
+        if not grid.is_over():
+            roots.setdefault(grid.canonical()[0], grid)
+
+    return list(roots.values())
+
+
+def explore(grid: DropGrid, levels: list[dict[int, list[tuple[int, int, bool]]]]) -> None:
+    """Énumère les positions atteignables depuis la position de la grille (voir `enumerate_positions`).
+
+    :param grid:   La grille de jeu (elle est modifiée pendant l'énumération puis remise dans son état initial)
+    :param levels: Les positions déjà énumérées, par nombre de cases vides, complétées par cette fonction
+    """
+    key: int
+    symmetry: int
+    level: int = len(grid.cells) - len(grid.moves)
+    moves: list[tuple[int, int, bool]] = []
+    cell: int
+
+    key, symmetry = grid.canonical()
+    if key in levels[level]:
+        return
+
+    for cell in grid.legal_moves():
+        grid.play(cell)
+        moves.append((column_key(grid, cell % grid.width, symmetry), grid.canonical()[0], grid.winner != 0))
+        if not grid.is_over():
+            explore(grid, levels)
+        grid.undo()
+
+    levels[level][key] = moves
+
+
+def enumerate_positions(roots: list[DropGrid], empties: int) -> list[dict[int, list[tuple[int, int, bool]]]]:
+    """Énumère les positions atteignables depuis les positions de départ.
+
+    :param roots:   Les positions de départ
+    :param empties: Le nombre de cases vides des positions de départ
+    :returns:       Pour chaque nombre de cases vides, les positions non terminées (par clé canonique), chacune
+                    avec ses coups: la colonne (dans la position canonique), la clé canonique de la position obtenue
+                    et vrai si ce coup gagne la partie
+    """
+    levels: list[dict[int, list[tuple[int, int, bool]]]] = [{} for _ in range(empties + 1)]
+    grid: DropGrid
+
+    for grid in roots:
+        explore(grid, levels)
+
+    return levels
+
+
+def rank(outcome: int, distance: int) -> tuple[int, int]:
+    """Classe un résultat: les victoires d'abord (la plus rapide en premier), puis le match nul, puis les défaites.
+
+    :param outcome:  Le résultat pour le joueur qui choisit son coup
+    :param distance: Le nombre de demi-coups avant la fin de la partie
+    :returns:        Le rang du résultat, d'autant plus grand que le résultat est meilleur
+    """
+    if outcome == WIN:
+        return 2, -distance
+    if outcome == DRAW:
+        return 1, 0
+    return 0, distance
+
+
+def solve(levels: list[dict[int, list[tuple[int, int, bool]]]]) -> dict[int, int]:
+    """Résout les positions à rebours, des grilles presque pleines vers les positions de départ.
+
+    Les positions qui ont `n` cases vides ne mènent qu'à des positions qui en ont `n - 1`, déjà résolues: le
+    résultat de chaque position est celui de son meilleur coup (voir `rank`).
+
+    :param levels: Les positions, par nombre de cases vides (voir `enumerate_positions`)
+    :returns:      Le résultat encodé de chaque position (voir `encode`), par clé canonique
+    """
+    results: dict[int, int] = {}
+    opposite: tuple[int, int, int] = (DRAW, LOSS, WIN)
+    level: dict[int, list[tuple[int, int, bool]]]
+    key: int
+    moves: list[tuple[int, int, bool]]
+    best: tuple[tuple[int, int], int, int, int]
+    move: int
+    child: int
+    wins: bool
+    outcome: int
+    distance: int
+
+    for level in levels:
+        for key, moves in level.items():
+            best = ((-1, 0), DRAW, 0, NO_MOVE)
+            for move, child, wins in moves:
+                if wins:
+                    outcome, distance = WIN, 1
+                elif child not in results:
+                    # la grille est pleine après ce coup
+                    outcome, distance = DRAW, 1
+                else:
+                    outcome, distance, _ = decode(results[child])
+                    outcome, distance = opposite[outcome], distance + 1
+                if rank(outcome, distance) > best[0]:
+                    best = (rank(outcome, distance), outcome, distance, move)
+            results[key] = encode(best[1], best[2], best[3])
+
+    return results
+
+
+def write_tablebase(path: Path, width: int, height: int, empties: int, results: dict[int, int]) -> None:
+    """Écrit une table de finales, triée par clé et découpée en blocs compressés.
+
+    :param path:    Le chemin du fichier
+    :param width:   La largeur de la grille
+    :param height:  La hauteur de la grille
+    :param empties: Le nombre maximum de cases vides des positions
+    :param results: Le résultat encodé de chaque position, par clé canonique (voir `solve`)
+    """
+    keys: list[int] = sorted(results)
+    blocks: list[bytes] = []
+    index: list[tuple[int, int, int]] = []
+    bloom: bytearray = bytearray((len(keys) * BLOOM_BITS + 7) // 8 or 1)
+    offset: int = HEADER.size + (len(keys) + BLOCK_SIZE - 1) // BLOCK_SIZE * INDEX_ENTRY.size + len(bloom)
+    start: int
+    chunk: list[int]
+    key: int
+    i: int
+    f: BinaryIO
+
+    for key in keys:
+        for i in bloom_bits(key, len(bloom) * 8):
+            bloom[i >> 3] |= 1 << (i & 7)
+
+    for start in range(0, len(keys), BLOCK_SIZE):
+        chunk = keys[start : start + BLOCK_SIZE]
+        blocks.append(
+            zlib.compress(array("Q", chunk).tobytes() + array("H", [results[key] for key in chunk]).tobytes(), 9)
+        )
+        index.append((chunk[0], offset, len(blocks[-1])))
+        offset += len(blocks[-1])
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, width, height, empties, len(blocks), len(keys), len(bloom) * 8))
+        for entry in index:
+            f.write(INDEX_ENTRY.pack(*entry))
+        f.write(bloom)
+        for block in blocks:
+            f.write(block)
+
+
+def main() -> None:
+    """Lit les arguments de la ligne de commande, calcule une table de finales et l'écrit."""
+    parser: argparse.ArgumentParser
+    args: argparse.Namespace
+    width: int
+    height: int
+    roots: list[DropGrid]
+    levels: list[dict[int, list[tuple[int, int, bool]]]]
+    results: dict[int, int]
+    path: Path
+    start: float
+
+    parser = argparse.ArgumentParser(description="Calcule une table de finales du puissance 4.")
+    parser.add_argument("-W", "--width", type=int, default=7, help="la largeur de la grille")
+    parser.add_argument("-H", "--height", type=int, default=6, help="la hauteur de la grille")
+    parser.add_argument("-e", "--empties", type=int, default=10, help="le nombre maximum de cases vides")
+    parser.add_argument("-n", "--games", type=int, default=500, help="le nombre de parties qui donnent les positions")
+    parser.add_argument("-s", "--seed", type=int, default=None, help="la graine du générateur aléatoire")
+    args = parser.parse_args()
+
+    if not 1 <= args.empties <= 63:
+        parser.error("le nombre de cases vides doit être entre 1 et 63")
+    random.seed(args.seed)
+    width, height = args.width, args.height
+
+    start = time.perf_counter()
+    roots = sample_roots(width, height, args.empties, args.games)
+    levels = enumerate_positions(roots, args.empties)
+    results = solve(levels)
+    path = tablebase_path(width, height)
+    write_tablebase(path, width, height, args.empties, results)
+
+    print(f"Positions de départ:   {len(roots)}")
+    print(f"Positions résolues:    {len(results)}")
+    print(f"Taille du fichier:     {path.stat().st_size} octets")
+    print(f"Durée du calcul:       {time.perf_counter() - start:.1f} s")
+    print(f"Table écrite dans {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,638 @@
+"""Affiche l'interface complète du programme sur des terminaux distants, tous servis par un seul processus.
+
+Chaque terminal se connecte avec un client telnet (`telnet 127.0.0.1 2323`) et obtient sa propre session, comme s'il
+avait lancé `main.py`. Par exemple:
+
+    python3 telnet.py --port 2323
+
+Toutes les connexions sont gérées par une seule boucle `asyncio`. L'interface, elle, reste celle du programme local:
+chaque session la fait tourner dans son propre fil d'exécution, dont le terminal (voir `terminal.set_console`) est
+une `RemoteConsole`. Ses touches viennent de la connexion, et ce qu'elle affiche est appliqué à un écran virtuel
+(voir `frames`): à chaque `terminal.flush`, seule la différence avec la dernière image envoyée part sur le réseau.
+
+Le mode brute et la taille du terminal sont négociés pour chaque session avec le protocole telnet: le serveur
+demande au client de ne plus afficher ni garder les caractères tapés (options ECHO et SUPPRESS-GO-AHEAD), et de lui
+envoyer la taille de sa fenêtre, à chaque fois qu'elle change (option NAWS).
+
+Des spectateurs peuvent regarder une session sans y jouer, en se connectant sur un deuxième port
+(`telnet 127.0.0.1 2324`) puis en choisissant la session. Chaque image n'est dessinée et encodée qu'une fois, pour le
+joueur: les mêmes octets sont ensuite écrits tels quels sur la connexion de chaque spectateur (voir `Audience`). Un
+spectateur trop lent n'accumule pas les images en retard: celles qu'il ne peut pas recevoir sont sautées, et il
+reçoit l'image la plus récente, entière, dès que sa connexion se libère.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import codecs
+import queue
+import threading
+from typing import Callable
+
+import metrics
+import terminal
+from frames import Frame
+from main import main as run_interface
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 2323
+DEFAULT_SPECTATOR_PORT = 2324
+# la taille d'un terminal qui n'a pas (encore) envoyé la sienne
+DEFAULT_SIZE = (80, 24)
+# la plus grande taille acceptée d'un client (chaque image de la session garde une case par caractère de l'écran):
+# une taille plus grande est ramenée à celle-ci
+MAX_SIZE = (500, 200)
+# le nombre maximum d'octets gardés d'un paquet à l'autre: une commande telnet pas terminée (une sous-négociation
+# sans IAC SE, par exemple) ou la ligne tapée par un spectateur. Au-delà, la connexion est fermée
+MAX_PENDING = 1024
+# le temps laissé au client pour envoyer la taille de sa fenêtre avant que la session ne commence, en secondes
+NAWS_DELAY = 0.5
+# la quantité d'octets en attente d'envoi vers un spectateur au-delà de laquelle il ne reçoit plus les images, et
+# en deçà de laquelle il reçoit à nouveau l'image la plus récente
+SPECTATOR_HIGH_WATER = 64 * 1024
+SPECTATOR_LOW_WATER = 16 * 1024
+# les commandes et options du protocole telnet utilisées (voir les RFC 854, 857, 858 et 1073)
+IAC = 255
+DONT = 254
+DO = 253
+WONT = 252
+WILL = 251
+SB = 250
+SE = 240
+ECHO = 1
+SGA = 3
+NAWS = 31
+
+
+class RemoteConsole(terminal.Console):
+    """Le terminal d'une session distante (voir `terminal.Console`).
+
+    Les touches sont déposées par la boucle `asyncio` et lues par le fil d'exécution de la session. Ce que la session
+    écrit est appliqué à un écran virtuel, et seule la différence avec l'écran déjà envoyé est envoyée à chaque
+    `flush`.
+    """
+
+    __slots__ = ("keys", "size", "frame", "sent", "written", "output", "show")
+
+    # les caractères reçus et pas encore lus, None quand la connexion est fermée
+    keys: queue.SimpleQueue[str | None]
+    # la taille du terminal (largeur, hauteur)
+    size: tuple[int, int]
+    # l'écran tel que la session l'a dessiné, et tel que le terminal l'affiche (None s'il n'est pas connu)
+    frame: Frame
+    sent: Frame | None
+    # ce qui a été écrit depuis le dernier `flush`, appliqué à l'écran virtuel en une seule fois
+    written: list[str]
+    # les fonctions qui envoient au terminal des octets, et les octets d'une nouvelle image avec cette image (elles
+    # peuvent être appelées depuis n'importe quel fil d'exécution)
+    output: Callable[[bytes], None]
+    show: Callable[[bytes, Frame], None]
+
+    def __init__(self, output: Callable[[bytes], None], show: Callable[[bytes, Frame], None]) -> None:
+        """Crée le terminal d'une session qui vient de se connecter.
+
+        :param output: La fonction qui envoie des octets au terminal
+        :param show:   La fonction qui envoie une nouvelle image au terminal: les octets qui la dessinent à partir de
+                       l'image précédente, et l'image elle-même (qui ne changera plus)
+        """
+        super().__init__()
+        self.keys = queue.SimpleQueue()
+        self.size = DEFAULT_SIZE
+        self.frame = Frame(*DEFAULT_SIZE)
+        self.sent = None
+        self.written = []
+        self.output = output
+        self.show = show
+
+    def read(self) -> str:
+        """Attend la prochaine touche (voir `terminal.Console.read`).
+
+        :raises EOFError: Si la connexion a été fermée, pour que la session s'arrête
+        """
+        key: str | None = self.keys.get()
+
+        if key is None:
+            # les lectures suivantes doivent aussi échouer
+            self.keys.put(None)
+            raise EOFError
+        return key
+
+    def write(self, text: str) -> None:
+        """Garde du texte pour l'écran virtuel (voir `terminal.Console.write`)."""
+        self.written.append(text)
+
+    def flush(self) -> None:
+        """Envoie au terminal ce qui a changé sur l'écran virtuel depuis le dernier envoi."""
+        changes: str
+
+        if (self.frame.width, self.frame.height) != self.size:
+            # le terminal a changé de taille: l'écran est redessiné entièrement à partir de maintenant
+            self.frame = Frame(*self.size)
+            self.sent = None
+        self.frame.feed("".join(self.written))
+        self.written.clear()
+
+        changes = self.frame.diff(self.sent)
+
+        if changes:
+            self.sent = self.frame.copy()
+            self.show(changes.encode(), self.sent)
+
+    def get_size(self) -> tuple[int, int]:
+        """Retourne la taille envoyée par le client telnet (voir `terminal.Console.get_size`)."""
+        return self.size
+
+    def discard_input(self) -> None:
+        """Oublie les touches pas encore lues, mais pas la fermeture de la connexion."""
+        try:
+            while True:
+                if self.keys.get_nowait() is None:
+                    self.keys.put(None)
+                    return
+        except queue.Empty:
+            pass
+
+    def make_raw(self) -> None:
+        """Demande au client telnet de ne plus afficher les caractères tapés et de les envoyer un par un."""
+        self.output(bytes([IAC, WILL, ECHO, IAC, WILL, SGA]))
+
+    def restore(self) -> None:
+        """Rend au client telnet l'affichage des caractères tapés."""
+        self.output(bytes([IAC, WONT, ECHO, IAC, WONT, SGA]))
+
+    def hangup(self) -> None:
+        """Signale à la session que la connexion est fermée."""
+        self.keys.put(None)
+
+
+def parse_telnet(data: bytes) -> tuple[bytes, list[bytes], bytes]:
+    """Sépare les commandes telnet des caractères envoyés par un client.
+
+    :param data: Les octets reçus, précédés du début de commande qui n'était pas complet au paquet précédent
+    :returns:    Les caractères, le contenu des sous-négociations (sans IAC SB ni IAC SE), et le début d'une commande
+                 coupée à la fin des octets (à remettre devant le prochain paquet)
+    """
+    text: bytearray = bytearray()
+    negotiations: list[bytes] = []
+    end: int
+    i: int = 0
+
+    while i < len(data):
+        if data[i] != IAC:
+            text.append(data[i])
+            i += 1
+        elif i + 1 >= len(data):
+            return bytes(text), negotiations, data[i:]
+        elif data[i + 1] == IAC:
+            text.append(IAC)
+            i += 2
+        elif data[i + 1] in (DO, DONT, WILL, WONT):
+            if i + 2 >= len(data):
+                return bytes(text), negotiations, data[i:]
+            # les réponses du client aux options proposées par le serveur n'ont pas besoin de réponse
+            i += 3
+        elif data[i + 1] == SB:
+            end = data.find(bytes([IAC, SE]), i + 2)
+            if end < 0:
+                return bytes(text), negotiations, data[i:]
+            negotiations.append(data[i + 2 : end].replace(bytes([IAC, IAC]), bytes([IAC])))
+            i = end + 2
+        else:
+            i += 2
+
+    return bytes(text), negotiations, b""
+
+
+def run_session(console: RemoteConsole, close: Callable[[], None]) -> None:
+    """Fait tourner l'interface du programme pour une session (dans le fil d'exécution de la session).
+
+    :param console: Le terminal de la session
+    :param close:   La fonction qui ferme la connexion, appelée à la fin de la session
+    """
+    terminal.set_console(console)
+    try:
+        run_interface()
+    except EOFError:
+        # le client s'est déconnecté
+        pass
+    finally:
+        close()
+
+
+class Audience:
+    """Les spectateurs d'une session, et la dernière image de la session (dans la boucle `asyncio` seulement).
+
+    Les octets de chaque image sont écrits tels quels sur la connexion de chaque spectateur: regarder une session ne
+    coûte pas plus qu'une écriture par image et par spectateur. Un spectateur dont la connexion est saturée (voir
+    `Spectator.pause_writing`) saute les images suivantes, puis reçoit la dernière image entière quand sa connexion
+    se libère. Elle n'est dessinée qu'une fois, quel que soit le nombre de spectateurs en retard.
+    """
+
+    __slots__ = ("viewers", "frame", "full")
+
+    # les spectateurs
+    viewers: set[Spectator]
+    # la dernière image de la session, None tant qu'elle n'a rien affiché
+    frame: Frame | None
+    # les octets qui dessinent entièrement la dernière image, None tant qu'aucun spectateur n'en a eu besoin
+    full: bytes | None
+
+    def __init__(self) -> None:
+        """Crée une session sans spectateur."""
+        self.viewers = set()
+        self.frame = None
+        self.full = None
+
+    def full_frame(self) -> bytes:
+        """Retourne les octets qui dessinent entièrement la dernière image, sur un terminal dans n'importe quel état.
+
+        :returns: Les octets (vide si la session n'a encore rien affiché)
+        """
+        if self.frame is None:
+            return b""
+        if self.full is None:
+            self.full = self.frame.diff(None).encode()
+        return self.full
+
+    def publish(self, data: bytes, frame: Frame) -> None:
+        """Envoie une nouvelle image à tous les spectateurs qui peuvent la recevoir.
+
+        :param data:  Les octets qui dessinent l'image à partir de la précédente
+        :param frame: L'image
+        """
+        viewer: Spectator
+
+        self.frame = frame
+        self.full = None
+        for viewer in self.viewers:
+            if viewer.paused:
+                viewer.behind = True
+            else:
+                viewer.transport.write(data)
+
+    def add(self, viewer: Spectator) -> None:
+        """Ajoute un spectateur, et lui envoie la dernière image.
+
+        :param viewer: Le spectateur
+        """
+        self.viewers.add(viewer)
+        viewer.transport.write(self.full_frame())
+
+    def remove(self, viewer: Spectator) -> None:
+        """Retire un spectateur.
+
+        :param viewer: Le spectateur
+        """
+        self.viewers.discard(viewer)
+
+    def close(self) -> None:
+        """Ferme la connexion de tous les spectateurs, à la fin de la session."""
+        viewer: Spectator
+
+        for viewer in list(self.viewers):
+            viewer.transport.write("\x1b[0m\r\nLa session est terminée.\r\n".encode())
+            viewer.transport.close()
+        self.viewers.clear()
+
+
+class Hub:
+    """Les sessions en cours, pour que les spectateurs puissent choisir celle qu'ils regardent."""
+
+    __slots__ = ("sessions", "next_id")
+
+    # les sessions qui ont commencé et ne sont pas terminées, par numéro
+    sessions: dict[int, TelnetSession]
+    # le numéro de la prochaine session
+    next_id: int
+
+    def __init__(self) -> None:
+        """Crée un serveur sans session."""
+        self.sessions = {}
+        self.next_id = 1
+
+    def add(self, session: TelnetSession) -> int:
+        """Enregistre une session qui commence.
+
+        :param session: La session
+        :returns:       Son numéro
+        """
+        self.sessions[self.next_id] = session
+        self.next_id += 1
+        return self.next_id - 1
+
+
+class TelnetSession(asyncio.Protocol):
+    """La connexion d'un terminal distant: décode le protocole telnet et transmet les touches à la session."""
+
+    __slots__ = ("loop", "hub", "id", "transport", "console", "audience", "thread", "pending", "decoder", "after_cr")
+
+    # la boucle qui gère la connexion, et les sessions en cours
+    loop: asyncio.AbstractEventLoop
+    hub: Hub
+    # le numéro de la session (0 tant qu'elle n'a pas commencé)
+    id: int
+    # la connexion
+    transport: asyncio.Transport
+    # le terminal de la session, ses spectateurs, et le fil d'exécution où elle tourne (None tant qu'elle n'a pas
+    # commencé)
+    console: RemoteConsole
+    audience: Audience
+    thread: threading.Thread | None
+    # le début d'une commande telnet coupée entre deux paquets (au plus `MAX_PENDING` octets)
+    pending: bytes
+    # le décodeur UTF-8 des touches (un caractère peut aussi être coupé entre deux paquets)
+    decoder: codecs.IncrementalDecoder
+    # vrai si le dernier caractère reçu était un retour chariot
+    after_cr: bool
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, hub: Hub) -> None:
+        """Prépare une connexion.
+
+        :param loop: La boucle qui gère la connexion
+        :param hub:  Les sessions en cours
+        """
+        self.loop = loop
+        self.hub = hub
+        self.id = 0
+        self.audience = Audience()
+        self.thread = None
+        self.pending = b""
+        self.decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.after_cr = False
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        """Demande sa taille au client, et lance la session dès qu'elle est connue (ou après `NAWS_DELAY`).
+
+        :param transport: La connexion
+        """
+        assert isinstance(transport, asyncio.Transport)
+        self.transport = transport
+        self.console = RemoteConsole(self.output, self.show)
+        self.send(bytes([IAC, DO, NAWS]))
+        self.loop.call_later(NAWS_DELAY, self.start)
+
+    def send(self, data: bytes) -> None:
+        """Envoie des octets au client, si la connexion est encore ouverte (depuis la boucle seulement).
+
+        :param data: Les octets
+        """
+        if not self.transport.is_closing():
+            self.transport.write(data)
+
+    def output(self, data: bytes) -> None:
+        """Envoie des octets au client depuis n'importe quel fil d'exécution.
+
+        :param data: Les octets
+        """
+        self.loop.call_soon_threadsafe(self.send, data)
+
+    def display(self, data: bytes, frame: Frame) -> None:
+        """Envoie une nouvelle image au client et à ses spectateurs (depuis la boucle seulement).
+
+        :param data:  Les octets qui dessinent l'image à partir de la précédente
+        :param frame: L'image
+        """
+        self.send(data)
+        self.audience.publish(data, frame)
+
+    def show(self, data: bytes, frame: Frame) -> None:
+        """Envoie une nouvelle image au client et à ses spectateurs depuis n'importe quel fil d'exécution.
+
+        :param data:  Les octets qui dessinent l'image à partir de la précédente
+        :param frame: L'image
+        """
+        self.loop.call_soon_threadsafe(self.display, data, frame)
+
+    def close(self) -> None:
+        """Ferme la connexion depuis n'importe quel fil d'exécution."""
+        self.loop.call_soon_threadsafe(self.transport.close)
+
+    def start(self) -> None:
+        """Lance la session, si elle n'a pas déjà commencé."""
+        if self.thread is None and not self.transport.is_closing():
+            self.id = self.hub.add(self)
+            self.thread = threading.Thread(target=run_session, args=(self.console, self.close), daemon=True)
+            self.thread.start()
+
+    def negotiate(self, data: bytes) -> None:
+        """Traite une sous-négociation telnet (IAC SB ... IAC SE).
+
+        :param data: Le contenu de la sous-négociation, sans IAC SB ni IAC SE
+        """
+        width: int
+        height: int
+
+        if len(data) == 5 and data[0] == NAWS:
+            width = data[1] << 8 | data[2]
+            height = data[3] << 8 | data[4]
+            if width > 0 and height > 0:
+                # une taille nulle est ignorée, une taille démesurée est réduite (voir `MAX_SIZE`)
+                self.console.size = (min(width, MAX_SIZE[0]), min(height, MAX_SIZE[1]))
+            self.start()
+
+    def data_received(self, data: bytes) -> None:
+        """Sépare les commandes telnet des touches, et transmet les touches à la session.
+
+        :param data: Les octets reçus
+        """
+        text: bytes
+        negotiations: list[bytes]
+        negotiation: bytes
+        char: str
+
+        text, negotiations, self.pending = parse_telnet(self.pending + data)
+        if len(self.pending) > MAX_PENDING:
+            self.transport.close()
+            return
+        for negotiation in negotiations:
+            self.negotiate(negotiation)
+
+        for char in self.decoder.decode(text):
+            if self.after_cr and char in "\n\0":
+                # la touche entrée est envoyée comme "\r\n" ou "\r\0"
+                self.after_cr = False
+                continue
+            self.after_cr = char == "\r"
+            if char in "\r\n":
+                self.console.keys.put("\n")
+            elif char == "\b":
+                self.console.keys.put("\x7f")
+            else:
+                self.console.keys.put(char)
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        """Arrête la session quand le client se déconnecte, et renvoie ses spectateurs.
+
+        :param exc: L'erreur qui a fermé la connexion, s'il y en a une
+        """
+        self.console.hangup()
+        self.hub.sessions.pop(self.id, None)
+        self.audience.close()
+
+
+class Spectator(asyncio.Protocol):
+    """La connexion d'un spectateur: il choisit une session, puis reçoit ses images jusqu'à ce qu'il tape "q"."""
+
+    __slots__ = ("hub", "transport", "audience", "paused", "behind", "pending", "line")
+
+    # les sessions en cours
+    hub: Hub
+    # la connexion
+    transport: asyncio.Transport
+    # les spectateurs de la session regardée, None tant qu'elle n'a pas été choisie
+    audience: Audience | None
+    # vrai si la connexion est saturée, et si des images ont été sautées depuis qu'elle l'est
+    paused: bool
+    behind: bool
+    # le début d'une commande telnet coupée entre deux paquets (au plus `MAX_PENDING` octets)
+    pending: bytes
+    # ce qui a été tapé du numéro de la session (au plus `MAX_PENDING` octets)
+    line: bytes
+
+    def __init__(self, hub: Hub) -> None:
+        """Prépare la connexion d'un spectateur.
+
+        :param hub: Les sessions en cours
+        """
+        self.hub = hub
+        self.audience = None
+        self.paused = False
+        self.behind = False
+        self.pending = b""
+        self.line = b""
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        """Affiche les sessions en cours et demande laquelle regarder.
+
+        :param transport: La connexion
+        """
+        assert isinstance(transport, asyncio.Transport)
+        self.transport = transport
+        self.transport.set_write_buffer_limits(high=SPECTATOR_HIGH_WATER, low=SPECTATOR_LOW_WATER)
+        self.prompt()
+
+    def prompt(self) -> None:
+        """Affiche les sessions en cours et demande laquelle regarder (ferme la connexion s'il n'y en a aucune)."""
+        session: TelnetSession
+
+        if not self.hub.sessions:
+            self.transport.write(b"Aucune session en cours.\r\n")
+            self.transport.close()
+            return
+
+        self.transport.write(b"Sessions en cours:\r\n")
+        for session in self.hub.sessions.values():
+            self.transport.write(f"  {session.id} ({session.console.size[0]}x{session.console.size[1]})\r\n".encode())
+        self.transport.write("Session à regarder (ENTER: la dernière): ".encode())
+
+    def watch(self, line: str) -> None:
+        """Commence à regarder la session choisie.
+
+        :param line: Le numéro de la session tapé par le spectateur, vide pour la dernière session
+        """
+        number: int
+
+        if line.strip() == "" and self.hub.sessions:
+            number = max(self.hub.sessions)
+        elif line.strip().isdigit():
+            number = int(line)
+        else:
+            number = 0
+
+        if number not in self.hub.sessions:
+            self.transport.write(b"Session inconnue.\r\n")
+            self.prompt()
+            return
+
+        self.audience = self.hub.sessions[number].audience
+        # le client n'affiche plus ce qui est tapé, et envoie "q" sans attendre la touche entrée
+        self.transport.write(bytes([IAC, WILL, ECHO, IAC, WILL, SGA]))
+        self.audience.add(self)
+
+    def data_received(self, data: bytes) -> None:
+        """Lit le numéro de la session à regarder, puis attend que le spectateur tape "q".
+
+        :param data: Les octets reçus
+        """
+        text: bytes
+
+        text, _, self.pending = parse_telnet(self.pending + data)
+        if len(self.pending) > MAX_PENDING:
+            self.transport.close()
+            return
+        if self.audience is not None:
+            if b"q" in text:
+                self.transport.write(bytes([IAC, WONT, ECHO, IAC, WONT, SGA]) + b"\x1b[0m\x1b[2J\x1b[H\x1b[?25h")
+                self.transport.close()
+            return
+
+        self.line += text
+        if b"\n" in self.line or b"\r" in self.line:
+            self.watch(self.line.replace(b"\r", b"\n").split(b"\n")[0].decode(errors="replace"))
+            self.line = b""
+        elif len(self.line) > MAX_PENDING:
+            self.transport.close()
+
+    def pause_writing(self) -> None:
+        """Appelée quand trop d'octets attendent d'être envoyés au spectateur: les images suivantes sont sautées."""
+        self.paused = True
+
+    def resume_writing(self) -> None:
+        """Appelée quand la connexion du spectateur s'est libérée: il reçoit la dernière image s'il en a sauté."""
+        self.paused = False
+        if self.behind and self.audience is not None:
+            self.behind = False
+            self.transport.write(self.audience.full_frame())
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        """Retire le spectateur de la session qu'il regardait.
+
+        :param exc: L'erreur qui a fermé la connexion, s'il y en a une
+        """
+        if self.audience is not None:
+            self.audience.remove(self)
+
+
+async def serve(host: str, port: int, spectator_port: int) -> None:
+    """Accepte les connexions des terminaux et des spectateurs, jusqu'à ce que le programme soit arrêté.
+
+    :param host:           L'adresse sur laquelle écouter
+    :param port:           Le port sur lequel écouter les terminaux qui jouent
+    :param spectator_port: Le port sur lequel écouter les spectateurs
+    """
+    loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+    hub: Hub = Hub()
+    listener: asyncio.Server = await loop.create_server(lambda: TelnetSession(loop, hub), host, port)
+    spectators: asyncio.Server = await loop.create_server(lambda: Spectator(hub), host, spectator_port)
+
+    async with listener, spectators:
+        await asyncio.gather(listener.serve_forever(), spectators.serve_forever())
+
+
+def main() -> None:
+    """Lit les arguments de la ligne de commande et lance le serveur."""
+    parser: argparse.ArgumentParser
+    args: argparse.Namespace
+
+    parser = argparse.ArgumentParser(description="Affiche le programme sur des terminaux distants (telnet).")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="l'adresse sur laquelle écouter")
+    parser.add_argument("-p", "--port", type=int, default=DEFAULT_PORT, help="le port sur lequel écouter")
+    parser.add_argument(
+        "-s",
+        "--spectator-port",
+        type=int,
+        default=DEFAULT_SPECTATOR_PORT,
+        help="le port sur lequel écouter les spectateurs",
+    )
+    args = parser.parse_args()
+
+    metrics.setup_from_environment()
+    try:
+        asyncio.run(serve(args.host, args.port, args.spectator_port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,11 @@
 """Utilitaires pour contrôler le terminal.
 
 La majorité des fonctions de ce module utilisent des codes d'échappement ANSI.
+
+Le terminal utilisé est celui de la session en cours (voir `Console` et `set_console`): par défaut l'entrée et la
+sortie standard, mais chaque session d'un serveur qui affiche l'interface sur des terminaux distants (voir `telnet`)
+a le sien. Tout ce qui est écrit ou lu passe donc par `write`, `flush` et `get_key`, jamais directement par
+`sys.stdin` et `sys.stdout`.
 """
 
 from __future__ import annotations
@@ -10,8 +15,11 @@ import re
 import sys
 import termios
 import tty
+from contextvars import ContextVar
 from typing import Any
 
+import metrics
+
 
 def make_raw(fd: int) -> list[Any]:
     """Passe le terminal donné par `fd` en mode brute.
@@ -60,9 +68,98 @@ def restore(fd: int, mode: list[Any]) -> None:
     termios.tcsetattr(fd, termios.TCSADRAIN, mode)
 
 
+class Console:
+    """Un terminal: d'où viennent les touches, où va l'affichage, et sa taille.
+
+    Cette classe est le terminal local (l'entrée et la sortie standard), les terminaux distants en sont des
+    sous-classes.
+    """
+
+    __slots__ = ("mode",)
+
+    # le mode dans lequel était le terminal avant de passer en mode brute (voir `make_raw`)
+    mode: list[Any] | None
+
+    def __init__(self) -> None:
+        """Crée le terminal local."""
+        self.mode = None
+
+    def read(self) -> str:
+        """Lit un caractère (attend qu'une touche soit appuyée).
+
+        :returns: Le caractère, ou "" si l'entrée est fermée
+        """
+        return sys.stdin.read(1)
+
+    def write(self, text: str) -> None:
+        """Écrit du texte, qui ne sera affiché qu'après l'appel de `flush`.
+
+        :param text: Le texte, séquences d'échappement comprises
+        """
+        sys.stdout.write(text)
+
+    def flush(self) -> None:
+        """Affiche tout ce qui a été écrit."""
+        sys.stdout.flush()
+
+    def get_size(self) -> tuple[int, int]:
+        """Retourne la taille du terminal dans le format (largeur, hauteur)."""
+        return os.get_terminal_size()
+
+    def discard_input(self) -> None:
+        """Supprime toutes les touches appuyées qui n'ont pas encore été lues."""
+        termios.tcflush(sys.stdin.fileno(), termios.TCIOFLUSH)
+
+    def make_raw(self) -> None:
+        """Passe le terminal en mode brute (voir la fonction `make_raw`)."""
+        self.mode = make_raw(sys.stdin.fileno())
+
+    def restore(self) -> None:
+        """Remet le terminal dans le mode où il était avant l'appel de `make_raw`."""
+        if self.mode is not None:
+            restore(sys.stdin.fileno(), self.mode)
+            self.mode = None
+
+
+# le terminal de la session en cours: chaque fil d'exécution (ou tâche asyncio) peut avoir le sien
+_console: ContextVar[Console] = ContextVar("console", default=Console())
+
+
+def get_console() -> Console:
+    """Retourne le terminal de la session en cours."""
+    return _console.get()
+
+
+def set_console(console: Console) -> None:
+    """Change le terminal de la session en cours (dans le contexte courant seulement, voir `contextvars`).
+
+    :param console: Le terminal
+    """
+    _console.set(console)
+
+
+def write(text: str) -> None:
+    """Écrit du texte sur le terminal de la session.
+
+    Le texte ne sera affiché qu'après avoir appelé `flush`.
+
+    :param text: Le texte, séquences d'échappement comprises
+    """
+    if metrics.ENABLED:
+        metrics.count_output(text)
+    _console.get().write(text)
+
+
+def flush() -> None:
+    """Affiche tout ce qui a été écrit sur le terminal de la session."""
+    _console.get().flush()
+    if metrics.ENABLED:
+        metrics.frame_shown()
+
+
 def flush_stdin() -> None:
-    """Supprimme toute les entrées en attente sur l'entrée standard."""
-    termios.tcflush(sys.stdin.fileno(), termios.TCIOFLUSH)
+    """Supprimme toute les entrées en attente sur l'entrée du terminal."""
+    _console.get().discard_input()
 
 
 def get_size() -> tuple[int, int]:
@@ -70,76 +167,76 @@ def get_size() -> tuple[int, int]:
 
     :returns: La taille du terminal
     """
-    return os.get_terminal_size()
+    return _console.get().get_size()
 
 
 def hide_cursor() -> None:
     """Cache le curseur du terminal.
 
-    Cette fonction ne sera effective qu'après avoir flush stdout.
+    Cette fonction ne sera effective qu'après avoir appelé `flush`.
     """
-    print("\x1b[?25l", end="")
+    write("\x1b[?25l")
 
 
 def show_cursor() -> None:
     """Affiche le curseur du terminal.
 
-    Cette fonction ne sera effective qu'après avoir flush stdout.
+    Cette fonction ne sera effective qu'après avoir appelé `flush`.
     """
-    print("\x1b[?25h", end="")
+    write("\x1b[?25h")
 
 
 def set_cursor(x: int, y: int) -> None:
     """Place le curseur en x,y sur le terminal.
 
-    Cette fonction ne sera effective qu'après avoir flush stdout.
+    Cette fonction ne sera effective qu'après avoir appelé `flush`.
     Si l'une des deux coordonnées est négative, rien ne se passera.
     Si les coordonnées sont en dehors de l'écran, le curseur sera "clamp" sur les bords.
 
     :param x:    La colonne où sera mis le curseur (la première colonne est 1 et non 0)
     :param y:    La ligne où sera mis le curseur (la première ligne est 1 et non 0)
     """
-    print(f"\x1b[{y};{x}H", end="")
+    write(f"\x1b[{y};{x}H")
 
 
 def set_cursor_x(x: int) -> None:
     """Place le curseur à la colonne `x` sur le terminal.
 
-    Cette fonction ne sera effective qu'après avoir flush stdout.
+    Cette fonction ne sera effective qu'après avoir appelé `flush`.
     Si x est négative, rien ne se passera.
     Si x est en dehors de l'écran, le curseur sera "clamp" sur les bords.
 
     :param x:    La colonne où sera mis le curseur (la première colonne est 1 et non 0)
     """
-    print(f"\x1b[{x}G", end="")
+    write(f"\x1b[{x}G")
 
 
 def cursor_up(lines: int) -> None:
     """Déplace le curseur de `lines` lignes vers le haut, relativement à sa position actuelle.
 
-    Cette fonction ne sera effective qu'après avoir flush stdout.
+    Cette fonction ne sera effective qu'après avoir appelé `flush`.
 
     :param lines:  Le nombre de lignes
     """
-    print(f"\x1b[{lines}A", end="")
+    write(f"\x1b[{lines}A")
 
 
 def cursor_left(columns: int) -> None:
     """Déplace le curseur de `columns` colonnes vers la gauche, relativement à sa position actuelle.
 
-    Cette fonction ne sera effective qu'après avoir flush stdout.
+    Cette fonction ne sera effective qu'après avoir appelé `flush`.
 
     :param      lines:  Le nombre de colonnes
     """
-    print(f"\x1b[{columns}D", end="")
+    write(f"\x1b[{columns}D")
 
 
 def clear() -> None:
     """Efface le terminal.
 
-    Cette fonction ne sera effective qu'après avoir flush stdout.
+    Cette fonction ne sera effective qu'après avoir appelé `flush`.
     """
-    print("\x1b[2J", end="")
+    write("\x1b[2J")
 
 
 def red(text: str) -> str:
@@ -189,7 +286,7 @@ def invert(text: str) -> str:
 
 
 def get_key() -> str:
-    r"""Lit un (et un seul) caractère depuis stdin.
+    r"""Lit un (et un seul) caractère depuis le terminal de la session.
 
     Les touches spéciales (qui commencent avec \x1b) lisent plusieurs caractères.
     Certaines touches spéciales sont reconnues et retourne leur nom. Ces touches sont UP, DOWN, RIGHT, LEFT qui
@@ -197,12 +294,13 @@ def get_key() -> str:
 
     :returns: Le caractère qui a été lu.
     """
+    console: Console = _console.get()
     next_char: str
 
-    next_char = sys.stdin.read(1)
+    next_char = console.read()
     if next_char == "\x1b":  # it's a special key
-        sys.stdin.read(1)  # should be '['
-        next_char = sys.stdin.read(1)
+        console.read()  # should be '['
+        next_char = console.read()
 
         if next_char == "A":  # up arrow
             next_char = "UP"
@@ -223,6 +321,8 @@ def get_key() -> str:
     elif next_char == "\x7f":
         next_char = "BACKSPACE"
 
+    if metrics.ENABLED:
+        metrics.key_read()
     return next_char
 
 
@@ -0,0 +1,455 @@
+"""Tournois entre configurations de bots, joués en parallèle sur tous les cœurs.
+
+Chaque configuration est un niveau de difficulté (voir `display.DIFFICULTY_LEVELS`), éventuellement accompagné d'une
+profondeur de recherche et d'un temps de réflexion par coup. Les parties sont regroupées en lots envoyés à un
+`ProcessPoolExecutor`, et le résultat de chaque partie est écrit dans un fichier JSON Lines dès que son lot est
+terminé. Par exemple:
+
+    python3 tournament.py pow4 --bot 1 --bot 2 --bot rapide=2,6,0.05 --games 100 --swiss 3
+
+La graine de chaque partie ne dépend que de la graine du tournoi et de la place de la partie dans le tournoi: les
+résultats sont les mêmes quel que soit le nombre de processus ou la taille des lots (sauf pour les bots dont la
+recherche est arrêtée par leur temps de réflexion, qui dépend de la charge de la machine).
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, TextIO
+
+from display import DIFFICULTY_LEVELS
+from players import Bot
+from simulation import GAMES
+
+TOURNAMENTS_PATH = Path(__file__).parent.resolve() / "tournaments"
+# le nombre de parties d'un lot: assez pour que le coût de l'envoi d'un lot à un processus soit négligeable,
+# assez peu pour que tous les processus restent occupés jusqu'à la fin du tournoi
+CHUNK_SIZE = 50
+
+
+class BotConfig:
+    """Une configuration de bot qui participe à un tournoi."""
+
+    __slots__ = ("name", "level", "depth", "duration")
+
+    # le nom de la configuration, tel qu'il apparaît dans les résultats
+    name: str
+    # le niveau de difficulté du bot (entre 0 et 2)
+    level: int
+    # la profondeur maximum de recherche, None pour celle du niveau de difficulté
+    depth: int | None
+    # le temps de réflexion maximum par coup en secondes, None pour celui du niveau de difficulté
+    duration: float | None
+
+    def __init__(self, name: str, level: int, depth: int | None = None, duration: float | None = None) -> None:
+        """Crée une configuration.
+
+        :param name:     Le nom de la configuration
+        :param level:    Le niveau de difficulté du bot (entre 0 et 2)
+        :param depth:    La profondeur maximum de recherche, None pour celle du niveau de difficulté
+        :param duration: Le temps de réflexion maximum par coup, None pour celui du niveau de difficulté
+        """
+        self.name = name
+        self.level = level
+        self.depth = depth
+        self.duration = duration
+
+    def make_bot(self, index: int) -> Bot:
+        """Crée un bot qui suit cette configuration.
+
+        :param index: L'indice du bot (1 s'il commence, 2 sinon)
+        :returns:     Le bot
+        """
+        return Bot(index, self.level, depth=self.depth, duration=self.duration)
+
+
+class Chunk:
+    """Un lot de parties entre deux configurations, envoyé à un processus du tournoi."""
+
+    __slots__ = ("game", "variant", "seed", "round_number", "first", "second", "start", "count")
+
+    # le nom du jeu (une clé de `simulation.GAMES`) et l'indice de sa variante
+    game: str
+    variant: int
+    # la graine du tournoi
+    seed: int
+    # le numéro de la ronde
+    round_number: int
+    # les deux configurations: `first` commence les parties d'indice pair, `second` celles d'indice impair
+    first: BotConfig
+    second: BotConfig
+    # l'indice de la première partie du lot dans la rencontre, et le nombre de parties du lot
+    start: int
+    count: int
+
+    def __init__(
+        self,
+        game: str,
+        variant: int,
+        seed: int,
+        round_number: int,
+        first: BotConfig,
+        second: BotConfig,
+        start: int,
+        count: int,
+    ) -> None:
+        """Crée un lot de parties (voir la description des attributs)."""
+        self.game = game
+        self.variant = variant
+        self.seed = seed
+        self.round_number = round_number
+        self.first = first
+        self.second = second
+        self.start = start
+        self.count = count
+
+
+def parse_config(text: str) -> BotConfig:
+    """Lit une configuration de bot écrite sous la forme "[nom=]niveau[,profondeur[,temps]]".
+
+    :param text: La configuration, par exemple "2", "profond=2,12" ou "rapide=2,6,0.05"
+    :returns:    La configuration
+    :raises ValueError: Si la configuration est mal écrite
+    """
+    name: str
+    values: list[str]
+    level: int
+
+    name, _, text = text.rpartition("=")
+    values = text.split(",")
+    if not 1 <= len(values) <= 3:
+        raise ValueError(f"configuration invalide: {text!r}")
+
+    level = int(values[0])
+    if not 0 <= level < len(DIFFICULTY_LEVELS):
+        raise ValueError(f"niveau de difficulté invalide: {level}")
+
+    return BotConfig(
+        name or DIFFICULTY_LEVELS[level],
+        level,
+        int(values[1]) if len(values) > 1 and values[1] else None,
+        float(values[2]) if len(values) > 2 and values[2] else None,
+    )
+
+
+def game_seed(seed: int, round_number: int, first: str, second: str, index: int) -> int:
+    """Calcule la graine d'une partie du tournoi.
+
+    :param seed:         La graine du tournoi
+    :param round_number: Le numéro de la ronde
+    :param first:        Le nom de la configuration qui commence les parties paires de la rencontre
+    :param second:       Le nom de l'autre configuration
+    :param index:        L'indice de la partie dans la rencontre
+    :returns:            La graine, sur 64 bits
+    """
+    key: bytes = f"{seed}/{round_number}/{first}/{second}/{index}".encode()
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "big")
+
+
+def play_chunk(chunk: Chunk) -> list[dict[str, Any]]:
+    """Joue un lot de parties (cette fonction est exécutée par les processus du tournoi).
+
+    :param chunk: Le lot à jouer
+    :returns:     Le résultat de chaque partie, prêt à être écrit en JSON
+    """
+    simulate = GAMES[chunk.game][0]
+    bots: tuple[Bot, Bot] = (chunk.first.make_bot(1), chunk.second.make_bot(2))
+    reversed_bots: tuple[Bot, Bot] = (chunk.second.make_bot(1), chunk.first.make_bot(2))
+    records: list[dict[str, Any]] = []
+    index: int
+    seed: int
+    swap: bool
+    start: float
+    winner: int
+    moves: int
+
+    for index in range(chunk.start, chunk.start + chunk.count):
+        seed = game_seed(chunk.seed, chunk.round_number, chunk.first.name, chunk.second.name, index)
+        swap = index % 2 == 1
+        random.seed(seed)
+
+        start = time.perf_counter()
+        winner, moves = simulate(*(reversed_bots if swap else bots), chunk.variant)
+
+        records.append(
+            {
+                "round": chunk.round_number,
+                "game": index,
+                "seed": seed,
+                "player1": (chunk.second if swap else chunk.first).name,
+                "player2": (chunk.first if swap else chunk.second).name,
+                "winner": winner,
+                "moves": moves,
+                "duration": time.perf_counter() - start,
+            }
+        )
+
+    return records
+
+
+def round_robin_pairings(count: int) -> list[tuple[int, int]]:
+    """Retourne toutes les rencontres d'un tournoi toutes rondes.
+
+    :param count: Le nombre de configurations
+    :returns:     Les paires d'indices de configurations qui se rencontrent
+    """
+    return [(i, j) for i in range(count) for j in range(i + 1, count)]
+
+
+def swiss_pairings(
+    points: list[float], played: set[tuple[int, int]], byes: set[int]
+) -> tuple[list[tuple[int, int]], int | None]:
+    """Apparie les configurations pour une ronde d'un tournoi suisse.
+
+    Les configurations sont classées par nombre de points, puis chacune rencontre la suivante dans le classement
+    qu'elle n'a pas encore rencontrée. S'il y a un nombre impair de configurations, la moins bien classée de celles
+    qui n'ont pas encore été exemptées est exemptée (la moins bien classée de toutes, si elles l'ont toutes été).
+
+    :param points: Le nombre de points de chaque configuration
+    :param played: Les rencontres déjà jouées (avec le plus petit indice en premier)
+    :param byes:   Les configurations déjà exemptées
+    :returns:      Les rencontres de la ronde, et l'indice de la configuration exemptée (ou None)
+    """
+    waiting: list[int] = sorted(range(len(points)), key=lambda i: (-points[i], i))
+    pairings: list[tuple[int, int]] = []
+    bye: int | None = None
+    first: int
+    second: int
+
+    if len(waiting) % 2 == 1:
+        bye = next((i for i in reversed(waiting) if i not in byes), waiting[-1])
+        waiting.remove(bye)
+
+    while waiting:
+        first = waiting.pop(0)
+        # si toutes les rencontres possibles ont déjà eu lieu, on accepte de rejouer la plus proche
+        second = next((i for i in waiting if (min(first, i), max(first, i)) not in played), waiting[0])
+        waiting.remove(second)
+        pairings.append((first, second))
+
+    return pairings, bye
+
+
+def write_records(records: list[dict[str, Any]], output: TextIO) -> None:
+    """Écrit des résultats de parties dans le fichier du tournoi, une ligne JSON par partie.
+
+    :param records: Les résultats
+    :param output:  Le fichier
+    """
+    record: dict[str, Any]
+
+    for record in records:
+        output.write(json.dumps(record) + "\n")
+    output.flush()
+
+
+def play_round(
+    executor: ProcessPoolExecutor,
+    pairings: list[tuple[int, int]],
+    configs: list[BotConfig],
+    points: list[float],
+    output: TextIO,
+    *,
+    game: str,
+    variant: int,
+    seed: int,
+    round_number: int,
+    games: int,
+    chunk_size: int,
+) -> None:
+    """Joue toutes les rencontres d'une ronde et ajoute leurs points au classement.
+
+    Dans une rencontre, les deux configurations commencent chacune la moitié des parties. Une victoire rapporte
+    un point, une égalité un demi-point.
+
+    :param executor:     Les processus qui jouent les parties
+    :param pairings:     Les rencontres de la ronde (paires d'indices dans `configs`)
+    :param configs:      Les configurations du tournoi
+    :param points:       Le nombre de points de chaque configuration (il est mis à jour)
+    :param output:       Le fichier où écrire le résultat de chaque partie
+    :param game:         Le nom du jeu
+    :param variant:      L'indice de la variante du jeu
+    :param seed:         La graine du tournoi
+    :param round_number: Le numéro de la ronde
+    :param games:        Le nombre de parties de chaque rencontre
+    :param chunk_size:   Le nombre maximum de parties par lot
+    """
+    index: dict[str, int] = {config.name: i for i, config in enumerate(configs)}
+    futures: list[Future[list[dict[str, Any]]]] = []
+    future: Future[list[dict[str, Any]]]
+    record: dict[str, Any]
+    chunk: Chunk
+    first: int
+    second: int
+    start: int
+
+    for first, second in pairings:
+        for start in range(0, games, chunk_size):
+            chunk = Chunk(
+                game,
+                variant,
+                seed,
+                round_number,
+                configs[first],
+                configs[second],
+                start,
+                min(chunk_size, games - start),
+            )
+            futures.append(executor.submit(play_chunk, chunk))
+
+    for future in as_completed(futures):
+        write_records(future.result(), output)
+        for record in future.result():
+            if record["winner"] == 0:
+                points[index[record["player1"]]] += 0.5
+                points[index[record["player2"]]] += 0.5
+            else:
+                points[index[record[f"player{record['winner']}"]]] += 1
+
+
+def run_tournament(
+    game: str,
+    configs: list[BotConfig],
+    output: TextIO,
+    *,
+    variant: int = 0,
+    games: int = 100,
+    rounds: int | None = None,
+    seed: int = 0,
+    workers: int | None = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> list[float]:
+    """Joue un tournoi entre plusieurs configurations de bots.
+
+    :param game:       Le nom du jeu (une clé de `simulation.GAMES`)
+    :param configs:    Les configurations qui participent (leurs noms doivent être différents)
+    :param output:     Le fichier où écrire le résultat de chaque partie, au fur et à mesure
+    :param variant:    L'indice de la variante du jeu
+    :param games:      Le nombre de parties de chaque rencontre
+    :param rounds:     Le nombre de rondes d'un tournoi suisse, None pour un tournoi toutes rondes
+    :param seed:       La graine du tournoi
+    :param workers:    Le nombre de processus, None pour un par cœur
+    :param chunk_size: Le nombre maximum de parties par lot
+    :returns:          Le nombre de points de chaque configuration
+    """
+    points: list[float] = [0.0] * len(configs)
+    played: set[tuple[int, int]] = set()
+    # les configurations déjà exemptées, pour que l'exemption ne revienne pas toujours à la même
+    byes: set[int] = set()
+    pairings: list[tuple[int, int]]
+    bye: int | None
+    round_number: int
+
+    if len({config.name for config in configs}) != len(configs):
+        raise ValueError("deux configurations ont le même nom")
+
+    with ProcessPoolExecutor(workers) as executor:
+        if rounds is None:
+            play_round(
+                executor,
+                round_robin_pairings(len(configs)),
+                configs,
+                points,
+                output,
+                game=game,
+                variant=variant,
+                seed=seed,
+                round_number=0,
+                games=games,
+                chunk_size=chunk_size,
+            )
+        else:
+            for round_number in range(rounds):
+                pairings, bye = swiss_pairings(points, played, byes)
+                if bye is not None:
+                    # l'exempté marque autant de points que s'il avait fait match nul
+                    points[bye] += games / 2
+                    byes.add(bye)
+                played.update((min(pairing), max(pairing)) for pairing in pairings)
+                play_round(
+                    executor,
+                    pairings,
+                    configs,
+                    points,
+                    output,
+                    game=game,
+                    variant=variant,
+                    seed=seed,
+                    round_number=round_number,
+                    games=games,
+                    chunk_size=chunk_size,
+                )
+
+    return points
+
+
+def main() -> None:
+    """Lit les arguments de la ligne de commande, joue le tournoi demandé et affiche le classement."""
+    parser: argparse.ArgumentParser
+    args: argparse.Namespace
+    configs: list[BotConfig]
+    path: Path
+    points: list[float]
+    start: float
+    duration: float
+    i: int
+
+    parser = argparse.ArgumentParser(description="Joue un tournoi entre plusieurs configurations de bots.")
+    parser.add_argument("game", choices=GAMES, help="le jeu")
+    parser.add_argument(
+        "-b",
+        "--bot",
+        action="append",
+        required=True,
+        help='une configuration de bot, "[nom=]niveau[,profondeur[,temps]]" (à répéter pour chaque configuration)',
+    )
+    parser.add_argument("-n", "--games", type=int, default=100, help="le nombre de parties de chaque rencontre")
+    parser.add_argument("-v", "--variant", type=int, default=0, help="l'indice de la variante du jeu")
+    parser.add_argument("--swiss", type=int, metavar="RONDES", help="joue un tournoi suisse en RONDES rondes")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="la graine du tournoi")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count(), help="le nombre de processus")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="le nombre de parties par lot")
+    parser.add_argument("-o", "--output", type=Path, help="le fichier des résultats (JSON Lines)")
+    args = parser.parse_args()
+
+    try:
+        configs = [parse_config(text) for text in args.bot]
+    except ValueError as error:
+        parser.error(str(error))
+    if len(configs) < 2:
+        parser.error("il faut au moins deux configurations")
+    if not 0 <= args.variant < len(GAMES[args.game][1]):
+        parser.error(f"la variante doit être entre 0 et {len(GAMES[args.game][1]) - 1}")
+
+    path = args.output or TOURNAMENTS_PATH / f"{args.game}-{args.seed}.jsonl"
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    start = time.perf_counter()
+    with path.open("w") as output:
+        points = run_tournament(
+            args.game,
+            configs,
+            output,
+            variant=args.variant,
+            games=args.games,
+            rounds=args.swiss,
+            seed=args.seed,
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+        )
+    duration = time.perf_counter() - start
+
+    for i in sorted(range(len(configs)), key=lambda i: -points[i]):
+        print(f"{configs[i].name:<20} {points[i]:>8.1f}")
+    print(f"Résultats écrits dans {path} ({duration:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,468 @@
+"""Enregistrement des touches et des images d'une session dans un fichier de trace, et rejeu de la trace sans terminal.
+
+Pendant l'enregistrement, le terminal de la session est enveloppé dans une `TracingConsole`: chaque caractère lu
+(les touches, telles que `terminal.get_key` les reçoit) et chaque image affichée (tout ce qui a été écrit entre deux
+`terminal.flush`) est ajouté à la trace, avec le temps écoulé depuis l'évènement précédent (selon
+`time.perf_counter`). L'enregistrement est activé par une variable d'environnement, lue au lancement de l'interface:
+
+    S101_TRACE=/tmp/kiosque.s1t python3 main.py
+
+Le rejeu fait tourner l'interface sans terminal (voir `ReplayConsole`), en lui donnant les touches de la trace au
+rythme où elles ont été tapées ou le plus vite possible, et mesure le temps entre chaque touche et l'image qui la
+suit, à comparer avec celui de l'enregistrement. Par exemple:
+
+    python3 tracing.py /tmp/kiosque.s1t --speed max
+
+Le format du fichier est un en-tête (`HEADER`: signature, version, taille du terminal et graine du générateur
+aléatoire, pour que le rejeu tire les mêmes nombres), suivi des évènements: un octet pour leur type (`KEY` ou
+`FRAME`), le temps écoulé depuis l'évènement précédent en microsecondes et la longueur du contenu (deux entiers de
+taille variable, voir `write_varint`), puis le contenu en UTF-8.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import struct
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import BinaryIO, Iterator
+
+import terminal
+
+# l'en-tête d'un fichier de trace: signature, version du format, largeur et hauteur du terminal, graine
+HEADER = struct.Struct("<4sBHHQ")
+MAGIC = b"S1TR"
+VERSION = 1
+# les types d'évènements: un caractère lu, une image affichée
+KEY = 1
+FRAME = 2
+# la variable d'environnement qui active l'enregistrement (le chemin de la trace, où "{}" est remplacé par le
+# numéro de la session quand plusieurs sessions tournent dans le même processus, voir `telnet`)
+TRACE_VARIABLE = "S101_TRACE"
+# les vitesses de rejeu
+SPEEDS = ("recorded", "max")
+
+# le nombre de sessions déjà enregistrées par le processus
+_traces: int = 0
+_lock: threading.Lock = threading.Lock()
+
+
+def write_varint(output: BinaryIO, value: int) -> None:
+    """Écrit un entier positif sur autant d'octets que nécessaire (7 bits par octet, le bit de poids fort indique
+    qu'un autre octet suit).
+
+    :param output: Le fichier
+    :param value:  L'entier
+    """
+    data: bytearray = bytearray()
+
+    while value >= 0x80:
+        data.append(value & 0x7F | 0x80)
+        value >>= 7
+    data.append(value)
+    output.write(data)
+
+
+def read_varint(data: bytes, position: int) -> tuple[int, int]:
+    """Lit un entier écrit par `write_varint`.
+
+    :param data:     Le contenu du fichier
+    :param position: La position de l'entier
+    :returns:        L'entier, et la position qui le suit
+    :raises ValueError: Si le fichier se termine au milieu de l'entier
+    """
+    value: int = 0
+    shift: int = 0
+
+    while True:
+        if position >= len(data):
+            raise ValueError("trace tronquée")
+        value |= (data[position] & 0x7F) << shift
+        shift += 7
+        position += 1
+        if data[position - 1] < 0x80:
+            return value, position
+
+
+class TraceWriter:
+    """Un fichier de trace en cours d'écriture."""
+
+    __slots__ = ("output", "last")
+
+    # le fichier
+    output: BinaryIO
+    # le moment du dernier évènement, selon `time.perf_counter`
+    last: float
+
+    def __init__(self, path: Path, size: tuple[int, int], seed: int) -> None:
+        """Crée le fichier et écrit son en-tête.
+
+        :param path: Le chemin du fichier
+        :param size: La taille du terminal (largeur, hauteur)
+        :param seed: La graine du générateur aléatoire de la session
+        """
+        self.output = path.open("wb")
+        self.output.write(HEADER.pack(MAGIC, VERSION, *size, seed))
+        self.last = time.perf_counter()
+
+    def record(self, kind: int, text: str) -> None:
+        """Ajoute un évènement à la trace.
+
+        :param kind: Le type de l'évènement (`KEY` ou `FRAME`)
+        :param text: Son contenu
+        """
+        now: float = time.perf_counter()
+        data: bytes = text.encode()
+
+        self.output.write(bytes([kind]))
+        write_varint(self.output, round((now - self.last) * 1_000_000))
+        write_varint(self.output, len(data))
+        self.output.write(data)
+        self.last = now
+        if kind == FRAME:
+            # la trace doit être utilisable même si le programme s'arrête brutalement
+            self.output.flush()
+
+    def close(self) -> None:
+        """Termine l'écriture du fichier."""
+        self.output.close()
+
+
+def read_trace(path: Path) -> tuple[tuple[int, int], int, list[tuple[int, float, str]]]:
+    """Lit un fichier de trace.
+
+    :param path: Le chemin du fichier
+    :returns:    La taille du terminal, la graine du générateur aléatoire, et les évènements: leur type, leur moment
+                 en secondes depuis le début de la trace, et leur contenu
+    :raises ValueError: Si le fichier n'est pas une trace, ou pas dans la version comprise par ce module
+    """
+    data: bytes = path.read_bytes()
+    events: list[tuple[int, float, str]] = []
+    magic: bytes
+    version: int
+    width: int
+    height: int
+    seed: int
+    position: int = HEADER.size
+    moment: float = 0.0
+    kind: int
+    delta: int
+    length: int
+
+    if len(data) < HEADER.size:
+        raise ValueError("ce fichier n'est pas une trace")
+    magic, version, width, height, seed = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("ce fichier n'est pas une trace, ou vient d'une autre version")
+
+    while position < len(data):
+        kind = data[position]
+        delta, position = read_varint(data, position + 1)
+        length, position = read_varint(data, position)
+        moment += delta / 1_000_000
+        events.append((kind, moment, data[position : position + length].decode(errors="replace")))
+        position += length
+
+    return (width, height), seed, events
+
+
+class TracingConsole(terminal.Console):
+    """Un terminal qui enregistre dans une trace tout ce qui le traverse (voir `terminal.Console`)."""
+
+    __slots__ = ("inner", "trace", "written")
+
+    # le terminal enveloppé
+    inner: terminal.Console
+    # la trace
+    trace: TraceWriter
+    # ce qui a été écrit depuis le dernier `flush`
+    written: list[str]
+
+    def __init__(self, inner: terminal.Console, trace: TraceWriter) -> None:
+        """Enveloppe un terminal.
+
+        :param inner: Le terminal
+        :param trace: La trace, déjà ouverte
+        """
+        super().__init__()
+        self.inner = inner
+        self.trace = trace
+        self.written = []
+
+    def read(self) -> str:
+        """Lit un caractère du terminal enveloppé, et l'enregistre."""
+        char: str = self.inner.read()
+
+        self.trace.record(KEY, char)
+        return char
+
+    def write(self, text: str) -> None:
+        """Écrit du texte sur le terminal enveloppé, et le garde pour la prochaine image."""
+        self.inner.write(text)
+        self.written.append(text)
+
+    def flush(self) -> None:
+        """Affiche tout ce qui a été écrit, et l'enregistre comme une image."""
+        self.inner.flush()
+        self.trace.record(FRAME, "".join(self.written))
+        self.written.clear()
+
+    def get_size(self) -> tuple[int, int]:
+        """Voir `terminal.Console.get_size`."""
+        return self.inner.get_size()
+
+    def discard_input(self) -> None:
+        """Voir `terminal.Console.discard_input`."""
+        self.inner.discard_input()
+
+    def make_raw(self) -> None:
+        """Voir `terminal.Console.make_raw`."""
+        self.inner.make_raw()
+
+    def restore(self) -> None:
+        """Remet le terminal enveloppé dans son mode d'origine, et termine la trace."""
+        self.inner.restore()
+        self.trace.close()
+
+
+def setup_from_environment() -> None:
+    """Enregistre la session en cours si la variable d'environnement `TRACE_VARIABLE` le demande.
+
+    Le terminal de la session est remplacé par une `TracingConsole`. Dans un processus qui fait tourner plusieurs
+    sessions (voir `telnet`), seule la première est enregistrée, sauf si le chemin contient "{}".
+    """
+    global _traces
+    path: str | None = os.environ.get(TRACE_VARIABLE)
+    console: terminal.Console = terminal.get_console()
+    seed: int
+
+    with _lock:
+        if path is None or (_traces > 0 and "{}" not in path):
+            return
+        _traces += 1
+        path = path.replace("{}", str(_traces))
+
+    # le générateur aléatoire est commun à tout le processus: avec plusieurs sessions, le rejeu ne tire les mêmes
+    # nombres que si la session était seule
+    seed = random.getrandbits(63)
+    random.seed(seed)
+    terminal.set_console(TracingConsole(console, TraceWriter(Path(path), console.get_size(), seed)))
+
+
+class ReplayConsole(terminal.Console):
+    """Un terminal sans écran dont les touches viennent d'une trace (voir `terminal.Console`)."""
+
+    __slots__ = ("keys", "size", "speed", "start", "written", "last_key", "frames")
+
+    # les caractères de la trace, avec leur moment en secondes depuis le début de la trace
+    keys: Iterator[tuple[float, str]]
+    # la taille du terminal enregistré
+    size: tuple[int, int]
+    # vrai si les touches sont données au rythme de l'enregistrement, faux pour les donner le plus vite possible
+    speed: bool
+    # le début du rejeu, selon `time.perf_counter`
+    start: float
+    # ce qui a été écrit depuis la dernière image
+    written: list[str]
+    # le moment où la dernière touche a été lue, None si une image l'a déjà suivie
+    last_key: float | None
+    # chaque image affichée: le temps écoulé depuis la touche qui l'a précédée (None pour les images qui ne suivent
+    # pas directement une touche), et son contenu
+    frames: list[tuple[float | None, str]]
+
+    def __init__(self, keys: list[tuple[float, str]], size: tuple[int, int], recorded_speed: bool) -> None:
+        """Crée un terminal qui rejoue des touches.
+
+        :param keys:           Les caractères à rejouer, avec leur moment depuis le début de la trace
+        :param size:           La taille du terminal
+        :param recorded_speed: Vrai pour rejouer au rythme de l'enregistrement, faux pour rejouer au plus vite
+        """
+        super().__init__()
+        self.keys = iter(keys)
+        self.size = size
+        self.speed = recorded_speed
+        self.start = time.perf_counter()
+        self.written = []
+        self.last_key = None
+        self.frames = []
+
+    def read(self) -> str:
+        """Retourne le prochain caractère de la trace, en attendant son moment si le rejeu suit l'enregistrement.
+
+        :raises EOFError: Quand tous les caractères ont été rejoués
+        """
+        moment: float
+        char: str
+        delay: float
+
+        try:
+            moment, char = next(self.keys)
+        except StopIteration:
+            raise EOFError from None
+
+        delay = self.start + moment - time.perf_counter()
+        if self.speed and delay > 0:
+            time.sleep(delay)
+        self.last_key = time.perf_counter()
+        return char
+
+    def write(self, text: str) -> None:
+        """Garde le texte pour la prochaine image."""
+        self.written.append(text)
+
+    def flush(self) -> None:
+        """Enregistre l'image, et le temps écoulé depuis la dernière touche."""
+        self.frames.append(
+            (None if self.last_key is None else time.perf_counter() - self.last_key, "".join(self.written))
+        )
+        self.written.clear()
+        self.last_key = None
+
+    def get_size(self) -> tuple[int, int]:
+        """Retourne la taille du terminal enregistré."""
+        return self.size
+
+    def discard_input(self) -> None:
+        """Ne fait rien: les touches rejouées ne sont jamais en avance."""
+
+    def make_raw(self) -> None:
+        """Ne fait rien: il n'y a pas de vrai terminal."""
+
+    def restore(self) -> None:
+        """Ne fait rien: il n'y a pas de vrai terminal."""
+
+
+def key_latencies(events: list[tuple[int, float, str]]) -> list[float]:
+    """Retourne le temps entre chaque touche enregistrée et l'image qui l'a suivie.
+
+    :param events: Les évènements de la trace (voir `read_trace`)
+    :returns:      Les temps, en secondes
+    """
+    latencies: list[float] = []
+    last_key: float | None = None
+    kind: int
+    moment: float
+
+    for kind, moment, _ in events:
+        if kind == KEY:
+            last_key = moment
+        elif last_key is not None:
+            latencies.append(moment - last_key)
+            last_key = None
+
+    return latencies
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """Retourne une valeur telle qu'une proportion `fraction` des valeurs lui soit inférieure.
+
+    :param values:   Les valeurs
+    :param fraction: La proportion, entre 0 et 1 (0.5 pour la médiane)
+    :returns:        La valeur (0 s'il n'y a aucune valeur)
+    """
+    values = sorted(values)
+
+    if not values:
+        return 0.0
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def format_latencies(latencies: list[float]) -> str:
+    """Met en forme la répartition de temps de réponse.
+
+    :param latencies: Les temps, en secondes
+    :returns:         La médiane, le 99e centile et le maximum, en millisecondes
+    """
+    return (
+        f"{percentile(latencies, 0.5) * 1000:.2f} ms (médiane), {percentile(latencies, 0.99) * 1000:.2f} ms "
+        + f"(99e centile), {max(latencies, default=0.0) * 1000:.2f} ms (maximum)"
+    )
+
+
+def replay(path: Path, recorded_speed: bool) -> list[str]:
+    """Rejoue une trace sans terminal, et compare les temps de réponse à ceux de l'enregistrement.
+
+    Les parties rejouées écrivent leurs scores et leur cache dans un dossier temporaire: les tableaux des scores du
+    projet ne changent pas, et le rejeu ne dépend pas des fichiers déjà présents.
+
+    :param path:           Le chemin de la trace
+    :param recorded_speed: Vrai pour rejouer au rythme de l'enregistrement, faux pour rejouer au plus vite
+    :returns:              Le bilan, ligne par ligne
+    """
+    import cache
+    import scores
+    import tablebase
+    from main import main as run_interface
+
+    directory: str
+    size: tuple[int, int]
+    seed: int
+    events: list[tuple[int, float, str]]
+    console: ReplayConsole
+    recorded: list[str]
+    replayed: list[float]
+    start: float
+    duration: float
+
+    size, seed, events = read_trace(path)
+    console = ReplayConsole([(moment, text) for kind, moment, text in events if kind == KEY], size, recorded_speed)
+    recorded = [text for kind, _, text in events if kind == FRAME]
+
+    with tempfile.TemporaryDirectory() as directory:
+        scores.SCORES_PATH = Path(directory) / "scores"
+        cache.CACHE_PATH = Path(directory) / "cache"
+        tablebase.TABLEBASE_PATH = Path(directory) / "tablebase"
+
+        random.seed(seed)
+        terminal.set_console(console)
+        start = time.perf_counter()
+        try:
+            run_interface()
+        except EOFError:
+            # toutes les touches ont été rejouées
+            pass
+        duration = time.perf_counter() - start
+    replayed = [latency for latency, _ in console.frames if latency is not None]
+
+    return [
+        f"Touches:               {sum(kind == KEY for kind, _, _ in events)}",
+        f"Images:                {len(console.frames)} rejouées, {len(recorded)} enregistrées, "
+        + f"{sum(a[1] == b for a, b in zip(console.frames, recorded))} identiques",
+        f"Octets affichés:       {sum(len(text.encode()) for _, text in console.frames)} rejoués, "
+        + f"{sum(len(text.encode()) for text in recorded)} enregistrés",
+        f"Touche → image:        {format_latencies(replayed)}",
+        f"  à l'enregistrement:  {format_latencies(key_latencies(events))}",
+        f"Durée du rejeu:        {duration:.2f} s (enregistrement: {events[-1][1] if events else 0.0:.2f} s)",
+    ]
+
+
+def main() -> None:
+    """Lit les arguments de la ligne de commande, rejoue la trace et affiche le bilan."""
+    parser: argparse.ArgumentParser
+    args: argparse.Namespace
+    line: str
+
+    parser = argparse.ArgumentParser(description="Rejoue une trace enregistrée avec S101_TRACE, sans terminal.")
+    parser.add_argument("trace", type=Path, help="le fichier de trace")
+    parser.add_argument(
+        "-s",
+        "--speed",
+        choices=SPEEDS,
+        default="recorded",
+        help="au rythme de l'enregistrement (recorded) ou le plus vite possible (max)",
+    )
+    args = parser.parse_args()
+
+    try:
+        for line in replay(args.trace, args.speed == "recorded"):
+            print(line)
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+
+
+if __name__ == "__main__":
+    main()